@@ -0,0 +1,113 @@
+"""Índices compostos para o padrão de acesso por médico e competência
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00.000000
+
+Todas as consultas de cálculo e de listagem filtram por `medico_id` e
+`competencia` (quase sempre com `ativo` e, quando existe, `confirmado`).
+No PostgreSQL os índices são parciais (`WHERE ativo`) e criados com
+`CONCURRENTLY`, sem bloquear escritas; no SQLite o predicado parcial é
+`ativo = 1`, que é a forma gerada pelo SQLAlchemy para filtros booleanos.
+
+A migração se aplica ao esquema completo (src/models/*.py) e ao esquema
+simplificado de `init_database()` (src/models/__init__.py), em que só
+`plantoes` existe, com `data_inicio` e sem `ativo`, `confirmado` e (até a
+0005) `competencia`: para ele vale o índice por médico e data de início.
+Tabelas ausentes são ignoradas (registrado no log); uma tabela existente sem
+as colunas de nenhum dos dois esquemas faz a migração falhar.
+"""
+from typing import Sequence, Union
+
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (nome, tabela, colunas, parcial por ativo)
+INDICES = [
+    ("ix_plantoes_medico_competencia", "plantoes", ["medico_id", "competencia", "confirmado"], True),
+    ("ix_plantoes_competencia_data", "plantoes", ["competencia", "data"], True),
+    ("ix_procedimentos_particulares_medico_competencia", "procedimentos_particulares", ["medico_id", "competencia", "confirmado"], True),
+    ("ix_procedimentos_particulares_competencia", "procedimentos_particulares", ["competencia", "data_procedimento"], True),
+    ("ix_producao_administrativa_medico_competencia", "producao_administrativa", ["medico_id", "competencia", "confirmado"], True),
+    ("ix_producao_administrativa_competencia", "producao_administrativa", ["competencia", "data_inicio"], True),
+    ("ix_prolabores_medico_competencia", "prolabores", ["medico_id", "competencia", "confirmado"], True),
+    ("ix_prolabores_competencia", "prolabores", ["competencia", "data"], True),
+    ("ix_descontos_creditos_medico_competencia", "descontos_creditos", ["medico_id", "competencia", "tipo"], True),
+    ("ix_descontos_creditos_competencia", "descontos_creditos", ["competencia", "data"], True),
+    ("ix_resultados_calculo_producao_medico_competencia", "resultados_calculo_producao", ["medico_id", "competencia", "status"], False),
+    ("ix_resultados_calculo_producao_competencia", "resultados_calculo_producao", ["competencia", "status"], False),
+    ("ix_resultados_calculo_prolabore_medico_competencia", "resultados_calculo_prolabore", ["medico_id", "competencia", "status"], False),
+    ("ix_resultados_calculo_prolabore_competencia", "resultados_calculo_prolabore", ["competencia", "status"], False),
+    ("ix_itens_calculados_producao_resultado", "itens_calculados_producao", ["resultado_calculo_id"], False),
+    ("ix_itens_calculados_prolabore_resultado", "itens_calculados_prolabore", ["resultado_calculo_id"], False),
+]
+
+# Índices do esquema simplificado, usados quando a tabela não tem as colunas do completo
+INDICES_SIMPLIFICADO = [
+    ("ix_plantoes_medico_data_inicio", "plantoes", ["medico_id", "data_inicio"], False),
+]
+
+
+def _colunas_necessarias(indices):
+    return {coluna for _, _, colunas, parcial in indices for coluna in [*colunas, *(["ativo"] if parcial else [])]}
+
+
+def _indices_aplicaveis():
+    """Índices das tabelas existentes, do esquema completo ou do simplificado."""
+    inspector = sa.inspect(op.get_bind())
+    tabelas = set(inspector.get_table_names())
+    ausentes = []
+    for tabela in dict.fromkeys(tabela for _, tabela, _, _ in INDICES):
+        if tabela not in tabelas:
+            ausentes.append(tabela)
+            continue
+        existentes = {coluna["name"] for coluna in inspector.get_columns(tabela)}
+        completo = [indice for indice in INDICES if indice[1] == tabela]
+        simplificado = [indice for indice in INDICES_SIMPLIFICADO if indice[1] == tabela]
+        if _colunas_necessarias(completo) <= existentes:
+            yield from completo
+        elif simplificado and _colunas_necessarias(simplificado) <= existentes:
+            yield from simplificado
+        else:
+            faltando = sorted(_colunas_necessarias(completo) - existentes)
+            raise RuntimeError(
+                f"{tabela} não tem as colunas dos índices de competência: {', '.join(faltando)}. "
+                "Aplique as alterações de esquema pendentes antes de migrar."
+            )
+    if ausentes:
+        logger.info(f"Tabelas ausentes, sem índices de competência: {', '.join(ausentes)}")
+
+
+def upgrade() -> None:
+    indices = list(_indices_aplicaveis())
+    # CREATE INDEX CONCURRENTLY não pode rodar dentro de uma transação
+    with op.get_context().autocommit_block():
+        for nome, tabela, colunas, parcial in indices:
+            op.create_index(
+                nome,
+                tabela,
+                colunas,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text("ativo") if parcial else None,
+                sqlite_where=sa.text("ativo = 1") if parcial else None,
+            )
+
+
+def downgrade() -> None:
+    indices = list(_indices_aplicaveis())
+    with op.get_context().autocommit_block():
+        for nome, tabela, colunas, parcial in indices:
+            op.drop_index(nome, table_name=tabela, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,54 @@
+"""Índices para a paginação por cursor das listagens
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00.000000
+
+As listagens paginadas por cursor ordenam por (nome, id) ou
+(data_inicio, id); com estes índices cada página é uma busca por faixa,
+com custo constante independentemente da profundidade.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (nome, tabela, colunas)
+INDICES = [
+    ("ix_medicos_nome_id", "medicos", ["nome", "id"]),
+    ("ix_empresas_nome_id", "empresas", ["nome", "id"]),
+    ("ix_hospitais_nome_id", "hospitais", ["nome", "id"]),
+    ("ix_tipos_plantao_nome_id", "tipos_plantao", ["nome", "id"]),
+    ("ix_plantoes_data_inicio_id", "plantoes", ["data_inicio", "id"]),
+]
+
+
+def _indices_aplicaveis():
+    """Retorna os índices cujas tabelas e colunas existem no banco."""
+    inspector = sa.inspect(op.get_bind())
+    tabelas = set(inspector.get_table_names())
+    for nome, tabela, colunas in INDICES:
+        if tabela in tabelas and set(colunas) <= {c["name"] for c in inspector.get_columns(tabela)}:
+            yield nome, tabela, colunas
+
+
+def upgrade() -> None:
+    indices = list(_indices_aplicaveis())
+    with op.get_context().autocommit_block():
+        for nome, tabela, colunas in indices:
+            op.create_index(nome, tabela, colunas, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    indices = list(_indices_aplicaveis())
+    with op.get_context().autocommit_block():
+        for nome, tabela, colunas in indices:
+            op.drop_index(nome, table_name=tabela, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,106 @@
+"""Colunas de busca normalizadas e índices trigrama
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00.000000
+
+Substitui as buscas ilike('%termo%') por uma coluna `busca` com o texto
+em minúsculas e sem acentos, mantida na escrita pelos modelos. No
+PostgreSQL a coluna recebe um índice GIN gin_trgm_ops (pg_trgm), usado
+tanto por LIKE '%termo%' quanto pela similaridade; nos demais bancos a
+busca usa o índice n-grama em memória de src.utils.busca.
+"""
+import unicodedata
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# tabela -> campos que compõem o texto de busca
+TABELAS = {
+    "users": ["nome", "email"],
+    "usuarios": ["nome_completo", "email"],
+    "medicos": ["nome", "crm", "cpf", "email", "especialidade"],
+    "empresas": ["nome", "razao_social", "cnpj"],
+    "hospitais": ["nome", "cidade"],
+}
+
+TAMANHO_LOTE = 1000
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """Cópia congelada de src.utils.busca.normalizar na data desta migração."""
+    if not texto:
+        return ""
+    decomposto = unicodedata.normalize("NFKD", texto)
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(sem_acentos.casefold().split())
+
+
+def _tabelas_aplicaveis():
+    """Retorna as tabelas existentes que têm todos os campos de origem."""
+    inspector = sa.inspect(op.get_bind())
+    tabelas = set(inspector.get_table_names())
+    for tabela, campos in TABELAS.items():
+        if tabela not in tabelas:
+            continue
+        colunas = {c["name"] for c in inspector.get_columns(tabela)}
+        if set(campos) <= colunas:
+            yield tabela, campos, "busca" in colunas
+
+
+def _preencher(tabela, campos):
+    """Calcula a coluna `busca` das linhas existentes, em lotes."""
+    conexao = op.get_bind()
+    alvo = sa.table(tabela, sa.column("id"), sa.column("busca"), *[sa.column(c) for c in campos])
+    linhas = conexao.execute(
+        sa.select(alvo.c.id, *[alvo.c[c] for c in campos]).where(alvo.c.busca.is_(None))
+    ).all()
+    atualizar = sa.update(alvo).where(alvo.c.id == sa.bindparam("_id")).values(busca=sa.bindparam("_busca"))
+    for inicio in range(0, len(linhas), TAMANHO_LOTE):
+        conexao.execute(atualizar, [
+            {"_id": linha[0], "_busca": normalizar(" ".join(str(v) for v in linha[1:] if v))}
+            for linha in linhas[inicio:inicio + TAMANHO_LOTE]
+        ])
+
+
+def upgrade() -> None:
+    tabelas = list(_tabelas_aplicaveis())
+    for tabela, campos, existe in tabelas:
+        if not existe:
+            op.add_column(tabela, sa.Column("busca", sa.Text(), nullable=True))
+        _preencher(tabela, campos)
+
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    with op.get_context().autocommit_block():
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for tabela, _, _ in tabelas:
+            op.create_index(
+                f"ix_{tabela}_busca_trgm", tabela, ["busca"],
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_using="gin",
+                postgresql_ops={"busca": "gin_trgm_ops"},
+            )
+
+
+def downgrade() -> None:
+    tabelas = list(_tabelas_aplicaveis())
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for tabela, _, _ in tabelas:
+                op.drop_index(f"ix_{tabela}_busca_trgm", table_name=tabela,
+                              if_exists=True, postgresql_concurrently=True)
+    for tabela, _, existe in tabelas:
+        if existe:
+            with op.batch_alter_table(tabela) as batch:
+                batch.drop_column("busca")
@@ -0,0 +1,199 @@
+"""Chaves UUID compactas
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00.000000
+
+As chaves primárias e estrangeiras dos modelos de domínio deixam de ser
+VARCHAR(36) (36 bytes por valor, em cada índice que as contém) e passam a
+ser o tipo nativo `uuid` no PostgreSQL (16 bytes) e BLOB de 16 bytes no
+SQLite. Novas chaves são UUIDv7 (src.utils.uuid7), ordenadas pelo tempo.
+
+Os valores existentes são preservados: um UUID textual vira o mesmo UUID
+binário. Valores que não são UUID válidos (cargas manuais, importações)
+são mapeados para md5(valor), da mesma forma nos dois bancos, o que mantém
+as referências entre tabelas consistentes. Como o md5 não pode ser
+invertido, os pares (valor original, UUID) ficam na tabela
+`uuids_convertidos_0004`, usada pelo downgrade para restaurar os valores
+originais e removida em seguida. Bancos migrados antes dessa tabela existir
+não têm o registro: ali o downgrade devolve a forma textual do md5.
+"""
+import hashlib
+import re
+import uuid
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# tabela -> colunas UUID (chave primária, estrangeiras e referências)
+COLUNAS = {
+    "usuarios": ["id", "medico_id_associado"],
+    "grupos_acesso": ["id"],
+    "usuarios_grupos": ["id", "usuario_id", "grupo_id"],
+    "empresas": ["id"],
+    "hospitais": ["id"],
+    "medicos": ["id"],
+    "tipos_plantao": ["id"],
+    "medicos_empresas": ["id", "medico_id", "empresa_id"],
+    "contratos": ["id", "empresa_id", "hospital_id"],
+    "contratos_tipos_plantao": ["id", "contrato_id", "tipo_plantao_id"],
+    "plantoes": ["id", "medico_id", "hospital_id", "contrato_id", "tipo_plantao_id", "usuario_confirmacao_id"],
+    "procedimentos_particulares": ["id", "medico_id", "usuario_confirmacao_id"],
+    "producao_administrativa": ["id", "medico_id", "usuario_confirmacao_id"],
+    "prolabores": ["id", "medico_id", "usuario_confirmacao_id"],
+    "descontos_creditos": ["id", "medico_id"],
+    "tabelas_inss": ["id"],
+    "tabelas_irrf": ["id"],
+    "parametros_fiscais_empresa": ["id", "empresa_id"],
+    "vinculos_fiscais_medicos": ["id", "medico_id"],
+    "parametros_pdf": ["id"],
+    "resultados_calculo_producao": ["id", "medico_id", "usuario_calculo_id", "usuario_finalizacao_id"],
+    "itens_calculados_producao": ["id", "resultado_calculo_id", "item_id"],
+    "resultados_calculo_prolabore": ["id", "medico_id", "usuario_calculo_id", "usuario_finalizacao_id"],
+    "itens_calculados_prolabore": ["id", "resultado_calculo_id", "prolabore_id"],
+    "historico_operacoes": ["id", "usuario_id", "entidade_id"],
+}
+
+# Valores não-UUID convertidos por md5, para o downgrade restaurá-los
+TABELA_CONVERTIDOS = "uuids_convertidos_0004"
+_REGEX_UUID_POSTGRESQL = "^[0-9a-f]{8}-?([0-9a-f]{4}-?){3}[0-9a-f]{12}$"
+
+_UUID_TEXTUAL = re.compile(r"^[0-9a-fA-F]{8}-?([0-9a-fA-F]{4}-?){3}[0-9a-fA-F]{12}$")
+
+
+def _uuid_de_texto(valor: str) -> uuid.UUID:
+    if _UUID_TEXTUAL.match(valor):
+        return uuid.UUID(valor)
+    return uuid.UUID(hashlib.md5(valor.encode()).hexdigest())
+
+
+def _colunas_aplicaveis(tipo_origem):
+    """(tabela, colunas) existentes no banco cujo tipo atual é `tipo_origem`."""
+    inspector = sa.inspect(op.get_bind())
+    tabelas = set(inspector.get_table_names())
+    for tabela, colunas in COLUNAS.items():
+        if tabela not in tabelas:
+            continue
+        existentes = {c["name"]: c["type"] for c in inspector.get_columns(tabela)}
+        aplicaveis = [c for c in colunas if c in existentes and isinstance(existentes[c], tipo_origem)]
+        if aplicaveis:
+            yield tabela, aplicaveis
+
+
+def _chaves_estrangeiras(alvos):
+    """Chaves estrangeiras que envolvem alguma das colunas convertidas, de qualquer lado."""
+    inspector = sa.inspect(op.get_bind())
+    convertidas = {(tabela, coluna) for tabela, colunas in alvos for coluna in colunas}
+    for tabela in inspector.get_table_names():
+        for fk in inspector.get_foreign_keys(tabela):
+            if not fk.get("name"):
+                continue
+            locais = {(tabela, c) for c in fk["constrained_columns"]}
+            remotas = {(fk["referred_table"], c) for c in fk["referred_columns"]}
+            if (locais | remotas) & convertidas:
+                yield tabela, fk
+
+
+def _registrar_convertidos(alvos):
+    """Grava em TABELA_CONVERTIDOS os valores atuais que não são UUID (e o md5 que os substituirá)."""
+    conexao = op.get_bind()
+    originais = set()
+    for tabela, colunas in alvos:
+        for coluna in colunas:
+            alvo = sa.table(tabela, sa.column(coluna, sa.String))
+            consulta = sa.select(alvo.c[coluna]).distinct().where(alvo.c[coluna].is_not(None))
+            if conexao.dialect.name == "postgresql":
+                consulta = consulta.where(~alvo.c[coluna].regexp_match(_REGEX_UUID_POSTGRESQL, flags="i"))
+            originais.update(
+                valor for valor in conexao.execute(consulta).scalars()
+                if not _UUID_TEXTUAL.match(valor)
+            )
+    registro = op.create_table(
+        TABELA_CONVERTIDOS,
+        sa.Column("original", sa.Text(), primary_key=True),
+        sa.Column("convertido", sa.String(36), nullable=False, index=True),
+    )
+    if originais:
+        op.bulk_insert(registro, [
+            {"original": valor, "convertido": str(_uuid_de_texto(valor))} for valor in sorted(originais)
+        ])
+
+
+def _restaurar_convertidos(alvos):
+    """Devolve os valores originais das colunas (já textuais) e remove TABELA_CONVERTIDOS."""
+    if TABELA_CONVERTIDOS not in sa.inspect(op.get_bind()).get_table_names():
+        return
+    for tabela, colunas in alvos:
+        for coluna in colunas:
+            op.execute(
+                f'UPDATE "{tabela}" SET "{coluna}" = r.original FROM {TABELA_CONVERTIDOS} r '
+                f'WHERE "{tabela}"."{coluna}" = r.convertido'
+            )
+    op.drop_table(TABELA_CONVERTIDOS)
+
+
+def _alterar_postgresql(alvos, tipo, expressao, depois=None):
+    # As FKs são removidas antes e recriadas depois: os dois lados de cada
+    # referência precisam mudar de tipo antes que a restrição volte a valer
+    chaves = list(_chaves_estrangeiras(alvos))
+    for tabela, fk in chaves:
+        op.drop_constraint(fk["name"], tabela, type_="foreignkey")
+    for tabela, colunas in alvos:
+        for coluna in colunas:
+            op.alter_column(tabela, coluna, type_=tipo, postgresql_using=expressao.format(c=f'"{coluna}"'))
+    if depois is not None:
+        depois(alvos)
+    for tabela, fk in chaves:
+        op.create_foreign_key(
+            fk["name"], tabela, fk["referred_table"],
+            fk["constrained_columns"], fk["referred_columns"],
+            ondelete=fk.get("options", {}).get("ondelete"),
+        )
+
+
+def _reescrever_sqlite(alvos, funcao, tipo_atual):
+    # No SQLite o tipo declarado não restringe o armazenamento: basta
+    # reescrever os valores (os índices existentes são atualizados junto)
+    conexao = op.get_bind()
+    conexao.connection.dbapi_connection.create_function("_converter_uuid", 1, funcao, deterministic=True)
+    for tabela, colunas in alvos:
+        for coluna in colunas:
+            conexao.execute(sa.text(
+                f'UPDATE "{tabela}" SET "{coluna}" = _converter_uuid("{coluna}") '
+                f"WHERE typeof(\"{coluna}\") = '{tipo_atual}'"
+            ))
+
+
+def upgrade() -> None:
+    alvos = list(_colunas_aplicaveis(sa.String))
+    if not alvos:
+        return
+    _registrar_convertidos(alvos)
+    if op.get_bind().dialect.name == "postgresql":
+        _alterar_postgresql(
+            alvos, sa.Uuid(),
+            "CASE WHEN {c} ~* '^[0-9a-f]{{8}}-?([0-9a-f]{{4}}-?){{3}}[0-9a-f]{{12}}$' "
+            "THEN {c}::uuid ELSE md5({c})::uuid END",
+        )
+    else:
+        _reescrever_sqlite(alvos, lambda valor: _uuid_de_texto(valor).bytes, "text")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        alvos = list(_colunas_aplicaveis(sa.Uuid))
+        if alvos:
+            _alterar_postgresql(alvos, sa.String(36), "{c}::text", depois=_restaurar_convertidos)
+    else:
+        alvos = list(_colunas_aplicaveis(sa.String))
+        _reescrever_sqlite(alvos, lambda valor: str(uuid.UUID(bytes=bytes(valor))), "blob")
+        _restaurar_convertidos(alvos)
@@ -0,0 +1,140 @@
+"""Particionamento por competência de plantões e itens calculados
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00.000000
+
+`plantoes` e `itens_calculados_producao` crescem sem limite, mas quase todas
+as consultas tocam só as competências recentes. No PostgreSQL as duas viram
+tabelas particionadas por faixa de competência (uma partição por mês, da
+competência mais antiga existente até três meses à frente, mais uma partição
+padrão); as seguintes são criadas por `python particoes.py criar`.
+
+`itens_calculados_producao` ganha a coluna `competencia` (copiada do
+resultado do cálculo) e `plantoes`, quando não a tem, a ganha calculada de
+`data_inicio`; ela é a chave de particionamento. A chave primária e os
+índices únicos das tabelas particionadas passam a incluir `competencia`,
+exigência do PostgreSQL (a unicidade passa a valer dentro de cada
+competência). Chaves estrangeiras de outras tabelas que apontam para uma
+tabela a particionar não têm como ser recriadas (exigiriam um índice único
+só em `id`); nesse caso a migração falha listando-as, sem alterar nada.
+Nos demais bancos só as colunas e o catálogo de arquivos
+(`arquivos_competencia`, usado por src.utils.particoes) são criados.
+"""
+import datetime
+import logging
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.migracoes.particionamento import competencia_de, eh_particionada, recriar
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tabelas particionadas por esta migração (historico_operacoes é da 0008)
+TABELAS_PARTICIONADAS = ("plantoes", "itens_calculados_producao")
+
+# Cópia congelada do catálogo de src.utils.particoes no momento desta migração
+arquivos_competencia = sa.Table(
+    "arquivos_competencia", sa.MetaData(),
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("tabela", sa.String(100), nullable=False),
+    sa.Column("competencia_inicio", sa.String(7), nullable=False),
+    sa.Column("competencia_fim", sa.String(7), nullable=False),
+    sa.Column("caminho", sa.String(500), nullable=False),
+    sa.Column("linhas", sa.Integer, nullable=False),
+    sa.Column("criado_em", sa.DateTime(timezone=True), server_default=sa.func.now()),
+)
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+
+def _colunas(tabela):
+    inspector = sa.inspect(op.get_bind())
+    if tabela not in inspector.get_table_names():
+        return set()
+    return {c["name"] for c in inspector.get_columns(tabela)}
+
+
+def _adicionar_competencia_itens():
+    colunas = _colunas("itens_calculados_producao")
+    if not colunas or "competencia" in colunas:
+        return False
+    op.add_column("itens_calculados_producao", sa.Column("competencia", sa.String(7), nullable=True))
+    conexao = op.get_bind()
+    if "competencia" in _colunas("resultados_calculo_producao"):
+        conexao.execute(sa.text(
+            "UPDATE itens_calculados_producao SET competencia = ("
+            "SELECT r.competencia FROM resultados_calculo_producao r "
+            "WHERE r.id = itens_calculados_producao.resultado_calculo_id)"
+        ))
+    # Itens sem resultado: competência da data do próprio item
+    linhas = conexao.execute(sa.text(
+        "SELECT id, data FROM itens_calculados_producao WHERE competencia IS NULL AND data IS NOT NULL"
+    )).all() if "data" in colunas else []
+    for id_, data in linhas:
+        if isinstance(data, str):
+            data = datetime.date.fromisoformat(data[:10])
+        conexao.execute(sa.text("UPDATE itens_calculados_producao SET competencia = :c WHERE id = :id"),
+                        {"c": competencia_de(data), "id": id_})
+    return True
+
+
+def _adicionar_competencia_plantoes():
+    colunas = _colunas("plantoes")
+    if not colunas or "competencia" in colunas or "data_inicio" not in colunas:
+        return False
+    op.add_column("plantoes", sa.Column("competencia", sa.String(7), nullable=True))
+    conexao = op.get_bind()
+    if conexao.dialect.name == "postgresql":
+        op.execute("UPDATE plantoes SET competencia = to_char(data_inicio, 'YYYY-MM')")
+        op.alter_column("plantoes", "competencia", nullable=False)
+    else:
+        op.execute("UPDATE plantoes SET competencia = strftime('%Y-%m', data_inicio)")
+    return True
+
+
+def upgrade() -> None:
+    conexao = op.get_bind()
+    if not sa.inspect(conexao).has_table(arquivos_competencia.name):
+        arquivos_competencia.create(conexao)
+    competencia_adicionada = _adicionar_competencia_itens()
+    _adicionar_competencia_plantoes()
+
+    if conexao.dialect.name != "postgresql":
+        return
+    sem_competencia = conexao.execute(sa.text(
+        "SELECT count(*) FROM itens_calculados_producao WHERE competencia IS NULL"
+    )).scalar() if competencia_adicionada else None
+    if sem_competencia == 0:
+        op.alter_column("itens_calculados_producao", "competencia", nullable=False)
+    elif sem_competencia:
+        # Ficam na partição padrão até serem corrigidos
+        logger.warning(f"{sem_competencia} itens calculados sem competência; a coluna permanece anulável")
+    for tabela in TABELAS_PARTICIONADAS:
+        if "competencia" in _colunas(tabela) and not eh_particionada(conexao, tabela):
+            recriar(tabela, particionar=True, chave=["id", "competencia"])
+
+
+def downgrade() -> None:
+    conexao = op.get_bind()
+    if conexao.dialect.name == "postgresql":
+        for tabela in TABELAS_PARTICIONADAS:
+            if eh_particionada(conexao, tabela):
+                # Partições consolidadas no schema de arquivo voltam para a tabela
+                recriar(tabela, particionar=False, chave=["id"])
+    if "competencia" in _colunas("itens_calculados_producao"):
+        with op.batch_alter_table("itens_calculados_producao") as batch:
+            batch.drop_column("competencia")
+    # Só a tabela de plantoes com data_inicio recebeu a coluna nesta migração
+    if {"competencia", "data_inicio"} <= _colunas("plantoes"):
+        with op.batch_alter_table("plantoes") as batch:
+            batch.drop_column("competencia")
+    if sa.inspect(conexao).has_table(arquivos_competencia.name):
+        arquivos_competencia.drop(conexao)
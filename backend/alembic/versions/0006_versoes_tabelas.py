@@ -0,0 +1,51 @@
+"""Contadores de versão das tabelas de referência
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00.000000
+
+Cria `versoes_tabelas`, usada por src.utils.versoes para gerar os ETags das
+rotas de dados de referência (tipos de plantão, hospitais, empresas,
+contratos). As tabelas versionadas já começam com um contador, para que os
+incrementos concorrentes sejam sempre UPDATEs.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Cópias congeladas de src.utils.versoes na data desta migração
+versoes_tabelas = sa.Table(
+    "versoes_tabelas", sa.MetaData(),
+    sa.Column("tabela", sa.String(100), primary_key=True),
+    sa.Column("versao", sa.Integer, nullable=False, default=0),
+    sa.Column("atualizado_em", sa.DateTime(timezone=True), server_default=sa.func.now()),
+)
+TABELAS_VERSIONADAS = frozenset({
+    "tipos_plantao", "hospitais", "empresas", "contratos", "contratos_tipos_plantao",
+})
+
+
+def upgrade() -> None:
+    conexao = op.get_bind()
+    if not sa.inspect(conexao).has_table(versoes_tabelas.name):
+        versoes_tabelas.create(conexao)
+    existentes = set(conexao.execute(sa.select(versoes_tabelas.c.tabela)).scalars())
+    novas = sorted(TABELAS_VERSIONADAS - existentes)
+    if novas:
+        op.bulk_insert(versoes_tabelas, [{"tabela": tabela, "versao": 1} for tabela in novas])
+
+
+def downgrade() -> None:
+    conexao = op.get_bind()
+    if sa.inspect(conexao).has_table(versoes_tabelas.name):
+        versoes_tabelas.drop(conexao)
@@ -0,0 +1,43 @@
+"""Histórico de operações (auditoria)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 00:00:00.000000
+
+Cria `historico_operacoes` no esquema atual (chaves inteiras, usuário em
+`users`), gravada em lotes por src.utils.auditoria. Bancos que já têm a
+tabela do esquema antigo ficam como estão.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("historico_operacoes"):
+        return
+    op.create_table(
+        "historico_operacoes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("usuario_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("tipo_operacao", sa.String(50), nullable=False),
+        sa.Column("entidade", sa.String(50), nullable=False),
+        sa.Column("entidade_id", sa.Integer(), nullable=True),
+        sa.Column("dados_anteriores", sa.JSON(none_as_null=True), nullable=True),
+        sa.Column("dados_novos", sa.JSON(none_as_null=True), nullable=True),
+        sa.Column("data_hora", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("ip_origem", sa.String(50), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("historico_operacoes"):
+        op.drop_table("historico_operacoes")
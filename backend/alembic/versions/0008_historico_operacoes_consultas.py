@@ -0,0 +1,94 @@
+"""Índices, competência e partições do histórico de operações
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 00:00:00.000000
+
+A auditoria consulta `historico_operacoes` por entidade (e id), por usuário e
+por período, sempre dos mais recentes para os mais antigos; cada caminho
+ganha um índice composto terminado em (data_hora, id), a ordem da paginação
+por cursor de GET /api/auditoria.
+
+A tabela ganha `competencia` (mês de data_hora), usada pela retenção
+(`python particoes.py reter`) e, no PostgreSQL, como chave de partições
+mensais, com a mesma recriação de plantões (migração 0005,
+src.migracoes.particionamento); a chave primária passa a ser (id, competencia).
+"""
+import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.migracoes.particionamento import competencia_de, eh_particionada, recriar
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABELA = "historico_operacoes"
+
+# (nome, colunas)
+INDICES = [
+    ("ix_historico_operacoes_entidade", ["entidade", "entidade_id", "data_hora", "id"]),
+    ("ix_historico_operacoes_usuario", ["usuario_id", "data_hora", "id"]),
+    ("ix_historico_operacoes_data_hora", ["data_hora", "id"]),
+]
+
+# No SQLite o batch recria a tabela a partir da reflexão; sem resolver as
+# chaves estrangeiras, a tabela referenciada (users) não precisa ser refletida
+REFLEXAO = {"resolve_fks": False}
+
+
+def _colunas():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(TABELA):
+        return set()
+    return {c["name"] for c in inspector.get_columns(TABELA)}
+
+
+def _preencher_competencia():
+    conexao = op.get_bind()
+    if conexao.dialect.name == "postgresql":
+        op.execute(f"UPDATE {TABELA} SET competencia = to_char(data_hora, 'YYYY-MM') WHERE data_hora IS NOT NULL")
+    elif conexao.dialect.name == "sqlite":
+        op.execute(f"UPDATE {TABELA} SET competencia = strftime('%Y-%m', data_hora) WHERE data_hora IS NOT NULL")
+    else:
+        for id_, data_hora in conexao.execute(sa.text(f"SELECT id, data_hora FROM {TABELA} WHERE data_hora IS NOT NULL")):
+            conexao.execute(sa.text(f"UPDATE {TABELA} SET competencia = :c WHERE id = :id"),
+                            {"c": competencia_de(data_hora), "id": id_})
+    # Sem data_hora: competência da migração (a linha fica na partição do mês atual)
+    conexao.execute(sa.text(f"UPDATE {TABELA} SET competencia = :c WHERE competencia IS NULL"),
+                    {"c": competencia_de(datetime.date.today())})
+
+
+def upgrade() -> None:
+    colunas = _colunas()
+    if not colunas:
+        return
+    conexao = op.get_bind()
+    if "competencia" not in colunas:
+        op.add_column(TABELA, sa.Column("competencia", sa.String(7), nullable=True))
+        _preencher_competencia()
+        with op.batch_alter_table(TABELA, reflect_kwargs=REFLEXAO) as batch:
+            batch.alter_column("competencia", existing_type=sa.String(7), nullable=False)
+    if conexao.dialect.name == "postgresql" and not eh_particionada(conexao, TABELA):
+        recriar(TABELA, particionar=True, chave=["id", "competencia"])
+    for nome, colunas_indice in INDICES:
+        op.create_index(nome, TABELA, colunas_indice, if_not_exists=True)
+
+
+def downgrade() -> None:
+    colunas = _colunas()
+    if "competencia" not in colunas:
+        return
+    conexao = op.get_bind()
+    for nome, _ in INDICES:
+        op.drop_index(nome, table_name=TABELA, if_exists=True)
+    if eh_particionada(conexao, TABELA):
+        recriar(TABELA, particionar=False, chave=["id"])
+    with op.batch_alter_table(TABELA, reflect_kwargs=REFLEXAO) as batch:
+        batch.drop_column("competencia")
@@ -0,0 +1,49 @@
+"""Conteúdo dos arquivos de competência no catálogo
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 00:00:00.000000
+
+Sem ARQUIVO_DIR (um disco persistente), os períodos exportados por
+`python particoes.py arquivar --destino arquivo` e `reter` ficam
+compactados em `arquivos_competencia.conteudo`: o disco local do Render é
+apagado a cada deploy. `caminho` passa a ser opcional.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABELA = "arquivos_competencia"
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(TABELA):
+        return
+    if "conteudo" in {c["name"] for c in inspector.get_columns(TABELA)}:
+        return
+    with op.batch_alter_table(TABELA) as batch:
+        batch.add_column(sa.Column("conteudo", sa.LargeBinary(), nullable=True))
+        batch.alter_column("caminho", existing_type=sa.String(500), nullable=True)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(TABELA) or "conteudo" not in {c["name"] for c in inspector.get_columns(TABELA)}:
+        return
+    no_banco = op.get_bind().execute(sa.text(f"SELECT count(*) FROM {TABELA} WHERE caminho IS NULL")).scalar()
+    if no_banco:
+        raise RuntimeError(
+            f"{no_banco} arquivos de competência estão só no banco; exporte-os para ARQUIVO_DIR antes de reverter"
+        )
+    with op.batch_alter_table(TABELA) as batch:
+        batch.drop_column("conteudo")
+        batch.alter_column("caminho", existing_type=sa.String(500), nullable=False)
@@ -1,8 +1,11 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.openapi.utils import get_openapi
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any
+import asyncio
 import os
 import logging
 from datetime import datetime, timedelta
@@ -18,18 +21,35 @@ logging.basicConfig(
 logger = logging.getLogger("medflow-api")
 
 # Importar modelos e rotas
-from src.models import get_db, init_database, User
+from src.models import get_db, criar_tabelas, criar_usuarios_iniciais, User, engine, async_engine, SessionLocal, AsyncSessionLocal
+from src.models import replica_engine, async_replica_engine
+from src.utils.metricas_pool import metricas_pool, metricas_pool_assincrono
+from src.utils.metricas_pool import metricas_pool_replica, metricas_pool_replica_assincrono
+from src.utils.replica import RoteamentoReplicaMiddleware, replica_de
+from src.utils.versoes import CacheCondicionalMiddleware
+from src.utils.compressao import CompressaoMiddleware
+from src.utils.metricas import MetricasHttpMiddleware, coletar_caches, coletor_pools, registro_metricas
+from src.utils.perfil import PerfilRequisicaoMiddleware
+from src.utils.consultas_lentas import RegistroConsultas, registro_consultas
+from src.utils.auditoria import coletar_auditoria, escritor_auditoria
 from src.routes import auth, medicos, empresas, hospitais, plantoes, procedimentos, contratos
 from src.routes import tipos_plantao, producao_administrativa, prolabores, descontos_creditos
-from src.routes import calculos, relatorios, importacao_exportacao
+from src.routes import calculos, busca, auditoria
+from src.utils.carregamento_tardio import RouterTardio
+from src.utils.busca_global import carregar_indice_global
 
 # Criar aplicação FastAPI
 app = FastAPI(
     title="MedFlow API",
     description="API para o sistema MedFlow de gestão de produção médica",
-    version="1.0.0"
+    version="1.0.0",
+    # Respostas serializadas com orjson (datetimes e listas grandes bem mais rápido que json)
+    default_response_class=ORJSONResponse,
 )
 
+# ETag/304 nos dados de referência (o mais interno: respostas 304 também recebem CORS)
+app.add_middleware(CacheCondicionalMiddleware, sessoes=AsyncSessionLocal)
+
 # Configurar CORS
 origins = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:5173").split(",")
 app.add_middleware(
@@ -40,14 +60,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Middleware para logging de requisições
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = datetime.now()
-    response = await call_next(request)
-    process_time = (datetime.now() - start_time).total_seconds() * 1000
-    logger.info(f"{request.method} {request.url.path} - {response.status_code} - {process_time:.2f}ms")
-    return response
+# Contagem de SQL por requisição (Server-Timing, alerta de N+1) e perfil sob demanda para administradores
+app.add_middleware(PerfilRequisicaoMiddleware, verificar_admin=auth.authorization_de_admin)
+
+# Métricas por rota (GET /metrics) e log estruturado amostrado das requisições
+app.add_middleware(MetricasHttpMiddleware)
+
+# Leituras na réplica (DATABASE_REPLICA_URL), com fixação no primário após escritas
+app.add_middleware(RoteamentoReplicaMiddleware)
+
+# Compressão Brotli/gzip negociada (o mais externo, comprime todas as respostas)
+app.add_middleware(CompressaoMiddleware)
 
 # Middleware para tratamento de exceções
 @app.exception_handler(Exception)
@@ -73,7 +96,7 @@ async def root():
 async def health_check(db: Session = Depends(get_db)):
     try:
         # Verificar conexão com o banco de dados
-        db.execute("SELECT 1").fetchall()
+        db.execute(text("SELECT 1")).fetchall()
         
         return {
             "status": "ok",
@@ -89,6 +112,65 @@ async def health_check(db: Session = Depends(get_db)):
             "timestamp": datetime.now().isoformat()
         }
 
+# Métricas do pool de conexões (administradores)
+@app.get("/api/metrics/pool")
+async def pool_metrics(current_user: User = Depends(auth.get_current_active_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Sem permissão para ver as métricas do pool")
+    metricas = {
+        "sincrono": metricas_pool.resumo(engine.pool),
+        "assincrono": metricas_pool_assincrono.resumo(async_engine.pool),
+    }
+    if replica_engine is not None:
+        metricas["replica"] = {
+            "sincrono": {**replica_de(engine).resumo(), **metricas_pool_replica.resumo(replica_engine.pool)},
+            "assincrono": {**replica_de(async_engine.sync_engine).resumo(),
+                           **metricas_pool_replica_assincrono.resumo(async_replica_engine.pool)},
+        }
+    return metricas
+
+# Consultas SQL agregadas por impressão digital (tempo total, p95, lentas)
+@app.get("/api/metrics/consultas")
+async def query_metrics(
+    ordenar: str = "tempo_total_ms",
+    limite: int = 50,
+    current_user: User = Depends(auth.get_current_active_user),
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Sem permissão para ver as estatísticas de consultas")
+    if ordenar not in RegistroConsultas.ORDENACOES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Ordenação inválida. Permitidas: {', '.join(RegistroConsultas.ORDENACOES)}",
+        )
+    return {
+        "limite_lenta_ms": registro_consultas.limite_lenta_s * 1000,
+        "descartadas": registro_consultas.descartadas,
+        "consultas": registro_consultas.resumo(ordenar, max(limite, 1)),
+    }
+
+@app.delete("/api/metrics/consultas", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_query_metrics(current_user: User = Depends(auth.get_current_active_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Sem permissão para limpar as estatísticas de consultas")
+    registro_consultas.limpar()
+
+# Métricas no formato do Prometheus: latência por rota, requisições em andamento, pools e caches
+pools_monitorados = {
+    "principal": (metricas_pool, lambda: engine.pool),
+    "principal_async": (metricas_pool_assincrono, lambda: async_engine.pool),
+}
+if replica_engine is not None:
+    pools_monitorados["replica"] = (metricas_pool_replica, lambda: replica_engine.pool)
+    pools_monitorados["replica_async"] = (metricas_pool_replica_assincrono, lambda: async_replica_engine.pool)
+registro_metricas.registrar_coletor(coletor_pools(pools_monitorados))
+registro_metricas.registrar_coletor(coletar_caches)
+registro_metricas.registrar_coletor(coletar_auditoria)
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(registro_metricas.texto(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Incluir rotas
 app.include_router(auth.router, prefix="/api/auth", tags=["Autenticação"])
 app.include_router(medicos.router, prefix="/api/medicos", tags=["Médicos"])
@@ -102,18 +184,69 @@ app.include_router(producao_administrativa.router, prefix="/api/producao-adminis
 app.include_router(prolabores.router, prefix="/api/prolabores", tags=["Pró-Labores"])
 app.include_router(descontos_creditos.router, prefix="/api/descontos-creditos", tags=["Descontos e Créditos"])
 app.include_router(calculos.router, prefix="/api/calculos", tags=["Cálculos"])
-app.include_router(relatorios.router, prefix="/api/relatorios", tags=["Relatórios"])
-app.include_router(importacao_exportacao.router, prefix="/api/importacao-exportacao", tags=["Importação e Exportação"])
+app.include_router(busca.router, prefix="/api/busca", tags=["Busca"])
+app.include_router(auditoria.router, prefix="/api/auditoria", tags=["Auditoria"])
+
+# Subsistemas pesados (PDF, importação/exportação) são importados apenas na
+# primeira requisição, para não atrasar a inicialização e o /api/health
+routers_tardios = [
+    (RouterTardio("src.routes.relatorios"), "/api/relatorios", ["Relatórios"]),
+    (RouterTardio("src.routes.importacao_exportacao"), "/api/importacao-exportacao", ["Importação e Exportação"]),
+]
+for router_tardio, prefixo, tags in routers_tardios:
+    app.mount(prefixo, router_tardio)
+
+def custom_openapi():
+    """Gera o schema OpenAPI incluindo as rotas dos routers tardios."""
+    if app.openapi_schema:
+        return app.openapi_schema
+    documentacao = APIRouter()
+    for router_tardio, prefixo, tags in routers_tardios:
+        documentacao.include_router(router_tardio.carregar(), prefix=prefixo, tags=tags)
+    app.openapi_schema = get_openapi(
+        title=app.title,
+        version=app.version,
+        description=app.description,
+        routes=app.routes + documentacao.routes,
+    )
+    return app.openapi_schema
+
+app.openapi = custom_openapi
 
 # Inicializar banco de dados
 @app.on_event("startup")
 async def startup_event():
     logger.info("Inicializando aplicação...")
     try:
-        init_database()
+        criar_tabelas()
         logger.info("Banco de dados inicializado com sucesso")
     except Exception as e:
         logger.error(f"Erro ao inicializar banco de dados: {str(e)}", exc_info=True)
+    
+    # Usuários iniciais (hash bcrypt, ~0,5 s no banco vazio) e, depois deles, o
+    # índice da busca global: em segundo plano para não atrasar o startup
+    asyncio.get_running_loop().run_in_executor(None, preparar_dados_iniciais)
+
+def preparar_dados_iniciais():
+    try:
+        criar_usuarios_iniciais()
+    except Exception as e:
+        logger.error(f"Erro ao criar os usuários iniciais: {str(e)}", exc_info=True)
+    construir_indice_global()
+
+def construir_indice_global():
+    try:
+        carregar_indice_global(SessionLocal)
+    except Exception as e:
+        logger.error(f"Erro ao construir o índice de busca global: {str(e)}", exc_info=True)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Grava o que ainda está na fila de auditoria antes de fechar as conexões
+    await asyncio.get_running_loop().run_in_executor(None, escritor_auditoria.parar)
+    await async_engine.dispose()
+    if async_replica_engine is not None:
+        await async_replica_engine.dispose()
 
 # Ponto de entrada para execução direta
 if __name__ == "__main__":
@@ -0,0 +1,529 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import logging
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("medflow-benchmark")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def preparar_banco(nome: str) -> str:
+    """Aponta DATABASE_URL para um SQLite temporário; deve rodar antes de importar src.models."""
+    if "src.models" in sys.modules:
+        raise RuntimeError("preparar_banco() deve ser chamado antes de importar src.models")
+    caminho = os.path.join(tempfile.mkdtemp(prefix="medflow-bench-"), f"{nome}.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{caminho}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    sys.path.insert(0, BASE_DIR)
+    logging.getLogger("medflow-models").setLevel(logging.WARNING)
+    logging.getLogger("medflow-api").setLevel(logging.WARNING)
+    return caminho
+
+def resumir(latencias_ms):
+    """Resumo (p50/p95/máximo) de uma lista de latências em ms."""
+    if not latencias_ms:
+        return "sem amostras"
+    ordenadas = sorted(latencias_ms)
+    p95 = ordenadas[max(0, int(len(ordenadas) * 0.95) - 1)]
+    return f"p50={statistics.median(ordenadas):.1f}ms p95={p95:.1f}ms max={ordenadas[-1]:.1f}ms"
+
+# ---------------------------------------------------------------------------
+# Concorrência: requisições rápidas enquanto relatórios lentos estão em curso
+# ---------------------------------------------------------------------------
+
+# Consulta propositalmente lenta (CPU no SQLite, que libera o GIL durante a execução)
+CONSULTA_LENTA = (
+    "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < :n) "
+    "SELECT count(*) FROM c"
+)
+
+def benchmark_concorrencia(args):
+    preparar_banco("concorrencia")
+
+    from fastapi import Depends
+    from httpx import ASGITransport, AsyncClient
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import Session
+
+    from app import app
+    from src.models import Base, Medico, SessionLocal, engine, get_async_db, get_db
+    from src.routes.auth import get_current_active_user
+
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        db.add_all([Medico(nome=f"Médico {i}", crm=str(i), cpf=f"{i:011d}") for i in range(200)])
+        db.commit()
+
+    # Rotas de relatório lento: a versão antiga (Session síncrona dentro de
+    # async def, bloqueando o event loop) e a versão com AsyncSession
+    @app.get("/benchmark/lento-sincrono")
+    async def lento_sincrono(db: Session = Depends(get_db)):
+        return {"total": db.execute(text(CONSULTA_LENTA), {"n": args.custo}).scalar()}
+
+    @app.get("/benchmark/lento-assincrono")
+    async def lento_assincrono(db: AsyncSession = Depends(get_async_db)):
+        return {"total": (await db.execute(text(CONSULTA_LENTA), {"n": args.custo})).scalar()}
+
+    app.dependency_overrides[get_current_active_user] = lambda: None
+
+    async def cenario(rota_lenta):
+        latencias = []
+        fim = time.perf_counter() + args.duracao
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            async def lentos():
+                while time.perf_counter() < fim:
+                    await client.get(rota_lenta)
+
+            async def rapidos():
+                while time.perf_counter() < fim:
+                    inicio = time.perf_counter()
+                    resposta = await client.get("/api/medicos/?limit=20")
+                    resposta.raise_for_status()
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+
+            await asyncio.gather(*[lentos() for _ in range(args.lentos)],
+                                 *[rapidos() for _ in range(args.rapidos)])
+        return latencias
+
+    for nome, rota in (("Session síncrona", "/benchmark/lento-sincrono"),
+                       ("AsyncSession", "/benchmark/lento-assincrono")):
+        latencias = asyncio.run(cenario(rota))
+        print(f"{nome:>17}: {len(latencias) / args.duracao:8.1f} req/s rápidas  ({resumir(latencias)})")
+
+# ---------------------------------------------------------------------------
+# Paginação: OFFSET versus cursor (keyset) em páginas profundas
+# ---------------------------------------------------------------------------
+
+def benchmark_paginacao(args):
+    preparar_banco("paginacao")
+
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert, select
+
+    from src.models import Base, Hospital, Medico, Plantao, SessionLocal, TipoPlantao, engine
+    from src.utils.paginacao import aplicar_cursor, codificar_cursor
+    from src.routes.plantoes import CHAVE_CURSOR
+
+    Base.metadata.create_all(engine)
+    inicio = datetime(2020, 1, 1, 7)
+    with engine.begin() as conn:
+        conn.execute(insert(Medico), [{"nome": "Médico", "crm": "1", "cpf": "1"}])
+        conn.execute(insert(Hospital), [{"nome": "Hospital"}])
+        conn.execute(insert(TipoPlantao), [{"nome": "12h"}])
+        for lote in range(0, args.linhas, 50_000):
+            conn.execute(insert(Plantao), [
+                {"data_inicio": inicio + timedelta(hours=i // 3), "data_fim": inicio + timedelta(hours=i // 3 + 12),
+                 "valor": 1000.0, "medico_id": 1, "hospital_id": 1, "tipo_plantao_id": 1}
+                for i in range(lote, min(lote + 50_000, args.linhas))
+            ])
+
+    def cronometrar(consulta, db):
+        amostras = []
+        for _ in range(args.repeticoes):
+            t0 = time.perf_counter()
+            db.execute(consulta).scalars().all()
+            amostras.append((time.perf_counter() - t0) * 1000)
+        return statistics.median(amostras)
+
+    print(f"{args.linhas} plantões, páginas de {args.limite} linhas (mediana de {args.repeticoes} execuções)")
+    print(f"{'posição':>10} {'offset (ms)':>12} {'cursor (ms)':>12}")
+    with SessionLocal() as db:
+        for fracao in (0, 0.1, 0.5, 0.9, 0.99):
+            posicao = int(args.linhas * fracao)
+            offset = select(Plantao).order_by(*CHAVE_CURSOR).offset(posicao).limit(args.limite)
+            cursor = None
+            if posicao:
+                anterior = db.execute(select(*CHAVE_CURSOR).order_by(*CHAVE_CURSOR)
+                                      .offset(posicao - 1).limit(1)).one()
+                cursor = codificar_cursor(list(anterior))
+            keyset = aplicar_cursor(select(Plantao), CHAVE_CURSOR, cursor, args.limite)
+            print(f"{posicao:>10} {cronometrar(offset, db):>12.2f} {cronometrar(keyset, db):>12.2f}")
+
+# ---------------------------------------------------------------------------
+# Busca: ilike('%termo%') versus coluna normalizada com índice n-grama
+# ---------------------------------------------------------------------------
+
+def benchmark_busca(args):
+    preparar_banco("busca")
+
+    import random
+    from sqlalchemy import insert, select
+
+    from src.models import Base, Medico, SessionLocal, engine
+    from src.utils.busca import filtrar_busca, normalizar
+
+    Base.metadata.create_all(engine)
+    aleatorio = random.Random(42)
+    nomes = ["José", "João", "Maria", "Ana", "Antônio", "Francisco", "Luíza", "Conceição", "Sebastião", "Márcia"]
+    sobrenomes = ["Silva", "Souza", "Araújo", "Pereira", "Gonçalves", "Ávila", "Brandão", "Simões", "Lima", "Melo"]
+    with engine.begin() as conn:
+        for lote in range(0, args.linhas, 50_000):
+            linhas = []
+            for i in range(lote, min(lote + 50_000, args.linhas)):
+                nome = f"{aleatorio.choice(nomes)} {aleatorio.choice(sobrenomes)} {aleatorio.choice(sobrenomes)} {i}"
+                linhas.append({"nome": nome, "crm": str(i), "cpf": f"{i:011d}", "busca": normalizar(nome)})
+            conn.execute(insert(Medico), linhas)
+
+    def cronometrar(funcao):
+        amostras = []
+        for _ in range(args.repeticoes):
+            t0 = time.perf_counter()
+            funcao()
+            amostras.append((time.perf_counter() - t0) * 1000)
+        return statistics.median(amostras)
+
+    print(f"{args.linhas} médicos, mediana de {args.repeticoes} execuções (top 20)")
+    print(f"{'termo':>18} {'ilike (ms)':>11} {'índice (ms)':>12} {'ilike/índice':>13}")
+    with SessionLocal() as db:
+        t0 = time.perf_counter()
+        filtrar_busca(db, select(Medico), Medico, "carga")
+        print(f"carga inicial do índice n-grama: {(time.perf_counter() - t0) * 1000:.0f} ms")
+        for termo in ("conceicao", "Simões 4217", "avila brandao", "marcia"):
+            ilike = select(Medico).where(Medico.nome.ilike(f"%{termo}%")).limit(20)
+            def por_indice():
+                return db.execute(filtrar_busca(db, select(Medico), Medico, termo, limite=20)).all()
+            print(f"{termo:>18} {cronometrar(lambda: db.execute(ilike).all()):>11.2f} "
+                  f"{cronometrar(por_indice):>12.2f} {len(db.execute(ilike).all()):>6}/{len(por_indice())}")
+
+# ---------------------------------------------------------------------------
+# Busca global: índice invertido de médicos, hospitais e empresas
+# ---------------------------------------------------------------------------
+
+def benchmark_busca_global(args):
+    preparar_banco("busca_global")
+
+    import random
+    from sqlalchemy import insert
+
+    from src.models import Base, Empresa, Hospital, Medico, SessionLocal, engine
+    from src.utils.busca_global import carregar_indice_global, indice_global
+
+    Base.metadata.create_all(engine)
+    aleatorio = random.Random(42)
+    nomes = ["José", "João", "Maria", "Ana", "Antônio", "Francisco", "Luíza", "Conceição", "Sebastião", "Márcia"]
+    sobrenomes = ["Silva", "Souza", "Araújo", "Pereira", "Gonçalves", "Ávila", "Brandão", "Simões", "Lima", "Melo"]
+    with engine.begin() as conn:
+        conn.execute(insert(Medico), [
+            {"nome": f"{aleatorio.choice(nomes)} {aleatorio.choice(sobrenomes)} {aleatorio.choice(sobrenomes)}",
+             "crm": f"{i}-SP", "cpf": f"{i:09d}{i % 100:02d}"}
+            for i in range(args.linhas)
+        ])
+        conn.execute(insert(Empresa), [
+            {"nome": f"Clínica {aleatorio.choice(sobrenomes)} {i}", "razao_social": f"Serviços Médicos {i} Ltda",
+             "cnpj": f"{i:08d}0001{i % 100:02d}"}
+            for i in range(args.linhas // 20)
+        ])
+        conn.execute(insert(Hospital), [
+            {"nome": f"Hospital {aleatorio.choice(sobrenomes)} {i}", "cidade": "Campinas"}
+            for i in range(args.linhas // 20)
+        ])
+
+    inicio = time.perf_counter()
+    carregar_indice_global(SessionLocal)
+    print(f"{args.linhas} médicos + {args.linhas // 10} hospitais/empresas; "
+          f"construção do índice: {(time.perf_counter() - inicio) * 1000:.0f} ms")
+    for termo in ("jose", "jose avila", "123456", "000012345", "clinica lima", "hospital 42", "conc"):
+        latencias = []
+        for _ in range(args.repeticoes):
+            t0 = time.perf_counter()
+            resultados = indice_global.buscar(termo, 20)
+            latencias.append((time.perf_counter() - t0) * 1000)
+        print(f"{termo:>15}: {len(resultados):>3} resultados  {resumir(latencias)}")
+
+# ---------------------------------------------------------------------------
+# Chaves UUID: VARCHAR(36) com uuid4 versus 16 bytes com uuid4 e UUIDv7
+# ---------------------------------------------------------------------------
+
+def benchmark_uuid(args):
+    sys.path.insert(0, BASE_DIR)
+    import uuid
+    from sqlalchemy import Column, Float, MetaData, String, Table, create_engine, insert, text
+
+    from src.utils.uuid7 import UUIDCompacto, uuid7
+
+    variantes = [
+        ("texto uuid4", String(36), lambda: str(uuid.uuid4())),
+        ("16 bytes uuid4", UUIDCompacto(), uuid.uuid4),
+        ("16 bytes uuid7", UUIDCompacto(), uuid7),
+    ]
+    diretorio = tempfile.mkdtemp(prefix="medflow-bench-")
+    print(f"{args.linhas} plantões em lotes de {args.lote} (cada lote em uma transação)")
+    for nome, tipo, gerar in variantes:
+        metadata = MetaData()
+        plantoes = Table(
+            "plantoes", metadata,
+            Column("id", tipo, primary_key=True),
+            Column("medico_id", tipo, nullable=False, index=True),
+            Column("valor", Float, nullable=False),
+        )
+        engine = create_engine(f"sqlite:///{os.path.join(diretorio, nome.replace(' ', '_'))}.db")
+        metadata.create_all(engine)
+        medicos = [gerar() for _ in range(500)]
+        with engine.connect() as conn:
+            # Cache pequeno para que o padrão de escrita nas páginas do índice apareça no tempo
+            conn.exec_driver_sql("PRAGMA cache_size = -2000")
+            inicio = time.perf_counter()
+            for lote in range(0, args.linhas, args.lote):
+                conn.execute(insert(plantoes), [
+                    {"id": gerar(), "medico_id": medicos[i % len(medicos)], "valor": 100.0}
+                    for i in range(lote, min(lote + args.lote, args.linhas))
+                ])
+                conn.commit()
+            duracao = time.perf_counter() - inicio
+            tamanho_pagina = conn.exec_driver_sql("PRAGMA page_size").scalar()
+            paginas = conn.exec_driver_sql("PRAGMA page_count").scalar()
+            indice_pk = conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'plantoes' "
+                "AND name LIKE 'sqlite_autoindex%'"
+            )).scalar()
+            try:
+                tamanhos = dict(conn.execute(text(
+                    "SELECT name, SUM(pgsize) FROM dbstat WHERE name IN (:pk, 'ix_plantoes_medico_id') GROUP BY name"
+                ), {"pk": indice_pk}).all())
+                indices = (f"índice PK {tamanhos[indice_pk] / 2**20:6.1f} MiB, "
+                           f"índice medico_id {tamanhos['ix_plantoes_medico_id'] / 2**20:6.1f} MiB")
+            except Exception:
+                indices = "tamanho dos índices indisponível (SQLite sem dbstat)"
+        engine.dispose()
+        print(f"{nome:>15}: {args.linhas / duracao:9.0f} linhas/s  "
+              f"banco {paginas * tamanho_pagina / 2**20:6.1f} MiB  {indices}")
+
+# ---------------------------------------------------------------------------
+# Projeção: listagem completa versus ?fields= com poucas colunas
+# ---------------------------------------------------------------------------
+
+def benchmark_projecao(args):
+    preparar_banco("projecao")
+
+    from httpx import ASGITransport, AsyncClient
+    from sqlalchemy import insert
+
+    from app import app
+    from src.models import Base, Medico, engine
+    from src.routes.auth import get_current_active_user
+
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Medico), [
+            {"nome": f"Médico {i}", "crm": f"{i}-SP", "cpf": f"{i:011d}", "rg": f"{i:09d}",
+             "telefone": "(11) 3333-4444", "celular": "(11) 99999-8888", "email": f"medico{i}@exemplo.com.br",
+             "endereco": f"Rua das Palmeiras, {i}", "cidade": "São Paulo", "estado": "SP", "cep": "01000-000",
+             "especialidade": "Clínica Médica", "banco": "001", "agencia": "1234", "conta": f"{i:08d}",
+             "pix": f"medico{i}@exemplo.com.br", "observacoes": "Disponível para plantões noturnos"}
+            for i in range(args.linhas)
+        ])
+
+    app.dependency_overrides[get_current_active_user] = lambda: None
+
+    async def medir(url):
+        latencias = []
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            for _ in range(args.repeticoes):
+                inicio = time.perf_counter()
+                resposta = await client.get(url)
+                resposta.raise_for_status()
+                latencias.append((time.perf_counter() - inicio) * 1000)
+        return len(resposta.content), latencias
+
+    print(f"{args.linhas} médicos, {args.limite} por requisição")
+    for nome, parametros in (("completa", ""), ("fields=id,nome", "&fields=id,nome"),
+                             ("fields=id,nome,crm,email", "&fields=id,nome,crm,email")):
+        tamanho, latencias = asyncio.run(medir(f"/api/medicos/?limit={args.limite}{parametros}"))
+        print(f"{nome:>25}: {tamanho / 1024:8.1f} KiB  {resumir(latencias)}")
+
+# ---------------------------------------------------------------------------
+# Serialização: entidades ORM + pydantic + json versus tuplas + orjson
+# ---------------------------------------------------------------------------
+
+def benchmark_serializacao(args):
+    preparar_banco("serializacao")
+
+    import json
+    from datetime import datetime, timedelta
+    from typing import List
+
+    import orjson
+    from pydantic import TypeAdapter
+    from sqlalchemy import insert, select
+
+    from src.models import Base, Plantao, SessionLocal, engine
+    from src.routes.plantoes import CHAVE_CURSOR, PlantaoResponse
+    from src.utils.projecao import Projecao
+
+    Base.metadata.create_all(engine)
+    inicio = datetime(2024, 1, 1, 7, 0)
+    with engine.begin() as conn:
+        conn.execute(insert(Plantao), [
+            {"medico_id": i % 500 + 1, "hospital_id": i % 20 + 1, "tipo_plantao_id": i % 4 + 1,
+             "data_inicio": inicio + timedelta(hours=12 * i), "data_fim": inicio + timedelta(hours=12 * i + 12),
+             "valor": 1500.0 + i % 7, "status": "realizado", "observacoes": None, "created_at": inicio}
+            for i in range(args.linhas)
+        ])
+
+    adaptador = TypeAdapter(List[PlantaoResponse])
+
+    def entidades(db, dumps):
+        # Caminho anterior do FastAPI: valida o response_model a partir dos atributos e serializa
+        objetos = db.scalars(select(Plantao)).all()
+        return dumps(adaptador.dump_python(adaptador.validate_python(objetos), mode="json"))
+
+    def tuplas(db):
+        projecao = Projecao(Plantao, PlantaoResponse, extras=CHAVE_CURSOR)
+        return projecao.responder(db.execute(projecao.consulta()).all()).body
+
+    cenarios = (
+        ("ORM + pydantic + json", lambda db: entidades(db, lambda c: json.dumps(c).encode())),
+        ("ORM + pydantic + orjson", lambda db: entidades(db, orjson.dumps)),
+        ("tuplas + orjson", tuplas),
+    )
+    print(f"{args.linhas} plantões por resposta")
+    for nome, executar in cenarios:
+        latencias = []
+        for _ in range(args.repeticoes):
+            with SessionLocal() as db:
+                t0 = time.perf_counter()
+                corpo = executar(db)
+                latencias.append((time.perf_counter() - t0) * 1000)
+        linhas_por_segundo = args.linhas / (statistics.median(latencias) / 1000)
+        print(f"{nome:>24}: {linhas_por_segundo:10.0f} linhas/s  {len(corpo) / 2**20:5.1f} MiB  {resumir(latencias)}")
+
+# ---------------------------------------------------------------------------
+# Leitura: pico de memória com entidades ORM, linhas Core e yield_per
+# ---------------------------------------------------------------------------
+
+def benchmark_leitura(args):
+    preparar_banco("leitura")
+
+    import gc
+    import tracemalloc
+    from typing import List
+
+    import orjson
+    from pydantic import TypeAdapter
+    from sqlalchemy import insert, select
+
+    from src.models import AsyncSessionLocal, Base, Medico, async_engine, engine
+    from src.routes.medicos import MedicoResponse
+    from src.utils.leitura import consulta_leitura, ler, transmitir
+
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Medico), [
+            {"nome": f"Médico {i}", "crm": f"{i}-SP", "cpf": f"{i:011d}", "email": f"medico{i}@exemplo.com.br",
+             "cidade": "São Paulo", "estado": "SP", "especialidade": "Clínica Médica",
+             "observacoes": "Disponível para plantões noturnos"}
+            for i in range(args.linhas)
+        ])
+
+    adaptador = TypeAdapter(List[MedicoResponse])
+    campos = [nome for nome in MedicoResponse.model_fields if nome in Medico.__table__.c]
+
+    async def entidades(db):
+        objetos = (await db.execute(select(Medico))).scalars().all()
+        return len(orjson.dumps(adaptador.dump_python(adaptador.validate_python(objetos), mode="json")))
+
+    async def mapeamentos(db):
+        return len(orjson.dumps([dict(linha) for linha in await ler(db, consulta_leitura(Medico, campos))]))
+
+    async def em_lotes(db):
+        tamanho = 0
+        async for lote in transmitir(db, consulta_leitura(Medico, campos), args.lote):
+            tamanho += len(orjson.dumps([dict(linha) for linha in lote]))
+        return tamanho
+
+    async def medir(executar):
+        async with AsyncSessionLocal() as db:
+            gc.collect()
+            tracemalloc.start()
+            inicio = time.perf_counter()
+            tamanho = await executar(db)
+            duracao = time.perf_counter() - inicio
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return tamanho, duracao, pico
+
+    async def executar_todos():
+        for nome, executar in (("entidades ORM", entidades), ("linhas Core", mapeamentos),
+                               (f"yield_per={args.lote}", em_lotes)):
+            tamanho, duracao, pico = await medir(executar)
+            print(f"{nome:>16}: pico {pico / 2**20:7.1f} MiB  {duracao * 1000:7.0f} ms  "
+                  f"({tamanho / 2**20:.1f} MiB de JSON)")
+        await async_engine.dispose()
+
+    print(f"{args.linhas} médicos")
+    asyncio.run(executar_todos())
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de desempenho da API MedFlow")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    concorrencia = subparsers.add_parser(
+        "concorrencia", help="Vazão de requisições rápidas concorrendo com relatórios lentos")
+    concorrencia.add_argument("--duracao", type=float, default=5.0, help="Duração de cada cenário (s)")
+    concorrencia.add_argument("--lentos", type=int, default=2, help="Clientes executando o relatório lento")
+    concorrencia.add_argument("--rapidos", type=int, default=8, help="Clientes executando listagens rápidas")
+    concorrencia.add_argument("--custo", type=int, default=2_000_000, help="Tamanho da consulta lenta")
+    concorrencia.set_defaults(executar=benchmark_concorrencia)
+
+    paginacao = subparsers.add_parser(
+        "paginacao", help="Latência de páginas profundas com OFFSET e com cursor")
+    paginacao.add_argument("--linhas", type=int, default=300_000, help="Quantidade de plantões")
+    paginacao.add_argument("--limite", type=int, default=100, help="Tamanho da página")
+    paginacao.add_argument("--repeticoes", type=int, default=5, help="Execuções por medição")
+    paginacao.set_defaults(executar=benchmark_paginacao)
+
+    busca = subparsers.add_parser(
+        "busca", help="Busca textual com ilike versus coluna normalizada indexada")
+    busca.add_argument("--linhas", type=int, default=150_000, help="Quantidade de médicos")
+    busca.add_argument("--repeticoes", type=int, default=5, help="Execuções por medição")
+    busca.set_defaults(executar=benchmark_busca)
+
+    busca_global = subparsers.add_parser(
+        "busca-global", help="Latência da busca global (GET /api/busca)")
+    busca_global.add_argument("--linhas", type=int, default=100_000, help="Quantidade de médicos")
+    busca_global.add_argument("--repeticoes", type=int, default=20, help="Execuções por termo")
+    busca_global.set_defaults(executar=benchmark_busca_global)
+
+    chaves_uuid = subparsers.add_parser(
+        "uuid", help="Inserção em massa e tamanho dos índices com chaves texto, uuid4 e UUIDv7")
+    chaves_uuid.add_argument("--linhas", type=int, default=500_000, help="Quantidade de plantões")
+    chaves_uuid.add_argument("--lote", type=int, default=5_000, help="Linhas por transação")
+    chaves_uuid.set_defaults(executar=benchmark_uuid)
+
+    projecao = subparsers.add_parser(
+        "projecao", help="Tamanho da resposta e latência de listagens com e sem ?fields=")
+    projecao.add_argument("--linhas", type=int, default=20_000, help="Quantidade de médicos")
+    projecao.add_argument("--limite", type=int, default=10_000, help="Registros por requisição")
+    projecao.add_argument("--repeticoes", type=int, default=10, help="Execuções por medição")
+    projecao.set_defaults(executar=benchmark_projecao)
+
+    serializacao = subparsers.add_parser(
+        "serializacao", help="Linhas/s serializadas via entidades ORM e pydantic versus tuplas e orjson")
+    serializacao.add_argument("--linhas", type=int, default=50_000, help="Plantões por resposta")
+    serializacao.add_argument("--repeticoes", type=int, default=5, help="Execuções por cenário")
+    serializacao.set_defaults(executar=benchmark_serializacao)
+
+    leitura = subparsers.add_parser(
+        "leitura", help="Pico de memória de uma listagem grande via ORM, Core e yield_per")
+    leitura.add_argument("--linhas", type=int, default=100_000, help="Quantidade de médicos")
+    leitura.add_argument("--lote", type=int, default=2_000, help="Linhas por lote no yield_per")
+    leitura.set_defaults(executar=benchmark_leitura)
+
+    args = parser.parse_args()
+    args.executar(args)
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,20 @@ logger = logging.getLogger("medflow-migrations")
 # Carregar variáveis de ambiente
 load_dotenv()
 
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def aplicar_migracoes_alembic(engine):
+    """Aplica as migrações Alembic pendentes (índices, alterações de esquema)."""
+    from alembic import command
+    from alembic.config import Config
+    
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "alembic"))
+    with engine.connect() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+        connection.commit()
+
 def run_migrations():
     """Executa migrações no banco de dados."""
     try:
@@ -66,6 +80,11 @@ def run_migrations():
         Base.metadata.create_all(engine)
         logger.info("Tabelas criadas com sucesso")
         
+        # Aplicar migrações Alembic
+        logger.info("Aplicando migrações Alembic...")
+        aplicar_migracoes_alembic(engine)
+        logger.info("Migrações Alembic aplicadas com sucesso")
+        
         # Criar sessão
         Session = sessionmaker(bind=engine)
         session = Session()
@@ -0,0 +1,119 @@
+import argparse
+import datetime
+import os
+import sys
+import logging
+from sqlalchemy import create_engine
+from dotenv import load_dotenv
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("medflow-particoes")
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from src.utils.particoes import (
+    TABELAS_PARTICIONADAS, competencia_anterior, competencia_de, consolidar_ano, criar_particoes, descartar_arquivos,
+    eh_particionada, exportar_ano, particoes, reter,
+)
+
+def comando_criar(engine, args):
+    """Cria as partições da competência atual e dos próximos meses (agendar mensalmente)."""
+    with engine.begin() as conexao:
+        criadas = criar_particoes(conexao, args.meses)
+    for nome in criadas:
+        logger.info(f"Partição criada: {nome}")
+    if not criadas:
+        logger.info("Nenhuma partição nova necessária")
+
+def comando_listar(engine, args):
+    with engine.connect() as conexao:
+        for tabela in TABELAS_PARTICIONADAS:
+            if not eh_particionada(conexao, tabela):
+                print(f"{tabela}: não particionada")
+                continue
+            print(f"{tabela}:")
+            for schema, nome, limites in particoes(conexao, tabela):
+                print(f"  {schema}.{nome:<45} {limites}")
+
+def comando_arquivar(engine, args):
+    """Consolida (partição anual no schema `arquivo`) ou exporta (gzip) um ano fechado."""
+    tabelas = [args.tabela] if args.tabela else list(TABELAS_PARTICIONADAS)
+    for tabela in tabelas:
+        with engine.begin() as conexao:
+            if args.destino == "particao":
+                nome = consolidar_ano(conexao, tabela, args.ano, args.tablespace)
+                logger.info(f"{tabela} {args.ano} consolidada em {nome}")
+            else:
+                caminho, linhas = exportar_ano(conexao, tabela, args.ano, args.diretorio)
+                logger.info(f"{tabela} {args.ano}: {linhas} linhas exportadas para {caminho}")
+
+def comando_reter(engine, args):
+    """Exporta para arquivos compactados os meses do histórico de operações além da retenção (agendar mensalmente)."""
+    with engine.begin() as conexao:
+        exportados = reter(conexao, args.tabela, args.meses, args.diretorio)
+        descartados = 0
+        if args.descartar_apos:
+            limite = competencia_anterior(competencia_de(datetime.date.today()), args.descartar_apos - 1)
+            descartados = descartar_arquivos(conexao, args.tabela, limite)
+    if not exportados:
+        logger.info(f"Nenhum mês de {args.tabela} além da retenção de {args.meses} meses")
+    if descartados:
+        logger.info(f"{descartados} arquivos descartados")
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerenciamento das partições por competência")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    criar = subparsers.add_parser("criar", help="Cria as partições dos próximos meses")
+    criar.add_argument("--meses", type=int, default=3, help="Meses à frente da competência atual")
+    criar.set_defaults(executar=comando_criar)
+
+    listar = subparsers.add_parser("listar", help="Lista as partições e seus limites")
+    listar.set_defaults(executar=comando_listar)
+
+    arquivar = subparsers.add_parser("arquivar", help="Arquiva um ano fechado")
+    arquivar.add_argument("ano", type=int, help="Ano fechado a arquivar")
+    arquivar.add_argument("--tabela", choices=TABELAS_PARTICIONADAS, help="Apenas esta tabela (padrão: todas)")
+    arquivar.add_argument("--destino", choices=["particao", "arquivo"], default="particao",
+                          help="particao: partição anual no schema arquivo; arquivo: JSON Lines compactado")
+    arquivar.add_argument("--tablespace", default=os.getenv("ARQUIVO_TABLESPACE"),
+                          help="Tablespace da partição anual (ex.: disco mais barato)")
+    arquivar.add_argument("--diretorio", default=os.getenv("ARQUIVO_DIR") or None,
+                          help="Diretório dos arquivos compactados (disco persistente); sem ele, ficam no banco")
+    arquivar.set_defaults(executar=comando_arquivar)
+
+    reter_cmd = subparsers.add_parser("reter", help="Aplica a retenção do histórico de operações")
+    reter_cmd.add_argument("--tabela", choices=TABELAS_PARTICIONADAS, default="historico_operacoes",
+                           help="Tabela com retenção (padrão: historico_operacoes)")
+    reter_cmd.add_argument("--meses", type=int, default=int(os.getenv("AUDITORIA_RETENCAO_MESES", "24")),
+                           help="Meses mantidos no banco, incluindo o atual")
+    reter_cmd.add_argument("--descartar-apos", type=int, default=int(os.getenv("AUDITORIA_DESCARTE_MESES", "0")),
+                           help="Apaga os arquivos com mais de N meses (0: nunca)")
+    reter_cmd.add_argument("--diretorio", default=os.getenv("ARQUIVO_DIR") or None,
+                           help="Diretório dos arquivos compactados (disco persistente); sem ele, ficam no banco")
+    reter_cmd.set_defaults(executar=comando_reter)
+
+    args = parser.parse_args()
+    database_url = os.getenv("DATABASE_URL", "sqlite:///./medflow.db")
+    engine = create_engine(database_url)
+    try:
+        args.executar(engine, args)
+    except (ValueError, FileExistsError) as e:
+        logger.error(str(e))
+        sys.exit(1)
+    finally:
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+import logging
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler()
+    ]
+)
+logger = logging.getLogger("medflow-perfil-importacao")
+
+# Meta documentada no README: tempo até a primeira resposta do /api/health
+META_PRIMEIRO_HEALTH_MS = float(os.getenv("META_PRIMEIRO_HEALTH_MS", "2500"))
+
+# Script executado em um processo novo para medir a inicialização a frio; o
+# instante da resposta é impresso por ele, para que o encerramento do processo
+# (shutdown, atexit, coleta dos módulos) não entre na medida
+SCRIPT_HEALTH = """
+import logging
+import time
+logging.disable(logging.CRITICAL)
+from fastapi.testclient import TestClient
+from app import app
+with TestClient(app) as client:
+    resposta = client.get("/api/health")
+    print(resposta.status_code, time.time())
+"""
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def coletar_tempos_importacao(modulo: str):
+    """Executa `python -X importtime` em um processo novo e retorna os tempos por módulo."""
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if resultado.returncode != 0:
+        logger.error(f"Falha ao importar {modulo}:\n{resultado.stderr[-2000:]}")
+        sys.exit(1)
+
+    tempos = []
+    for linha in resultado.stderr.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        # Formato: "import time:  <próprio us> | <cumulativo us> | <indentação><módulo>"
+        proprio, cumulativo, nome = linha.split(":", 1)[1].split("|")
+        tempos.append({
+            "modulo": nome.strip(),
+            "proprio_ms": int(proprio) / 1000,
+            "cumulativo_ms": int(cumulativo) / 1000,
+        })
+    return tempos
+
+def medir_primeiro_health() -> float:
+    """Mede, em um processo novo, o tempo até a primeira resposta do /api/health (ms)."""
+    inicio = time.time()
+    resultado = subprocess.run(
+        [sys.executable, "-c", SCRIPT_HEALTH],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+    )
+    saida = resultado.stdout.split()
+    if resultado.returncode != 0 or len(saida) != 2 or saida[0] != "200":
+        logger.error(f"/api/health não respondeu com sucesso:\n{resultado.stderr[-2000:]}")
+        sys.exit(1)
+    return (float(saida[1]) - inicio) * 1000
+
+def imprimir_relatorio(tempos, top: int):
+    """Imprime os módulos mais lentos por tempo próprio e por tempo cumulativo."""
+    for chave, titulo in (("proprio_ms", "tempo próprio"), ("cumulativo_ms", "tempo cumulativo")):
+        print(f"\nImportações mais lentas ({titulo}):")
+        print(f"{'ms':>10}  módulo")
+        for item in sorted(tempos, key=lambda t: t[chave], reverse=True)[:top]:
+            print(f"{item[chave]:>10.1f}  {item['modulo']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatório de tempo de importação da API MedFlow")
+    parser.add_argument("--modulo", default="app", help="Módulo a importar (padrão: app)")
+    parser.add_argument("--top", type=int, default=20, help="Quantidade de módulos listados")
+    parser.add_argument("--verificar", action="store_true",
+                        help="Falha (código 1) se o primeiro /api/health exceder a meta")
+    args = parser.parse_args()
+
+    tempos = coletar_tempos_importacao(args.modulo)
+    imprimir_relatorio(tempos, args.top)
+
+    total = next((t["cumulativo_ms"] for t in tempos if t["modulo"] == args.modulo), None)
+    if total is not None:
+        print(f"\nImportação de '{args.modulo}': {total:.1f} ms")
+
+    primeiro_health = medir_primeiro_health()
+    print(f"Tempo até o primeiro /api/health: {primeiro_health:.1f} ms (meta: {META_PRIMEIRO_HEALTH_MS:.0f} ms)")
+
+    if args.verificar and primeiro_health > META_PRIMEIRO_HEALTH_MS:
+        logger.error("Meta de inicialização excedida")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+"""
+Código compartilhado pelas migrações do Alembic.
+
+Os módulos daqui são congelados: as migrações já aplicadas dependem do
+comportamento que eles tinham quando foram escritas. Não importam nada de
+src.models nem de src.utils; uma mudança vira um módulo novo, usado só
+pelas migrações novas.
+"""
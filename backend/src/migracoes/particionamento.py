@@ -0,0 +1,170 @@
+"""
+Recriação de tabelas particionadas por competência (PostgreSQL), usada pelas
+migrações 0005 (plantões e itens calculados) e 0008 (histórico de operações).
+
+Cópia congelada das funções de src.utils.particoes que as migrações usam e
+da reconstrução da tabela: a tabela é renomeada, recriada com LIKE
+(particionada por faixa de competência ou não), recebe os dados e tem de
+volta os índices, a sequência do id e as chaves estrangeiras, próprias e
+recebidas. Chaves estrangeiras de outras tabelas impedem o particionamento
+(a chave primária passa a incluir competencia); a migração falha listando-as,
+sem alterar nada. Índices únicos ganham `competencia`; os que não puderem
+ser adaptados (expressões, WHERE, INCLUDE) também fazem a migração falhar.
+"""
+import datetime
+import logging
+import re
+from typing import List, Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+MESES_A_FRENTE = 3
+
+
+def competencia_de(data: datetime.date) -> str:
+    return f"{data.year:04d}-{data.month:02d}"
+
+
+def proxima_competencia(competencia: str) -> str:
+    ano, mes = int(competencia[:4]), int(competencia[5:7])
+    return f"{ano + mes // 12:04d}-{mes % 12 + 1:02d}"
+
+
+def competencias_entre(inicio: str, fim: str) -> List[str]:
+    competencias = []
+    atual = inicio
+    while atual <= fim:
+        competencias.append(atual)
+        atual = proxima_competencia(atual)
+    return competencias
+
+
+def nome_particao(tabela: str, competencia: str) -> str:
+    return f"{tabela}_p{competencia[:4]}_{competencia[5:7]}"
+
+
+def eh_particionada(conexao, tabela: str) -> bool:
+    if conexao.dialect.name != "postgresql":
+        return False
+    return bool(conexao.execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :tabela AND c.relnamespace = 'public'::regnamespace"
+    ), {"tabela": tabela}).scalar())
+
+
+def criar_particao_mensal(conexao, tabela: str, competencia: str):
+    """Partição mensal da competência (a tabela recém-criada ainda não tem a partição padrão)."""
+    if sa.inspect(conexao).has_table(nome_particao(tabela, competencia)):
+        return
+    conexao.execute(sa.text(
+        f'CREATE TABLE "{nome_particao(tabela, competencia)}" PARTITION OF "{tabela}" '
+        f"FOR VALUES FROM ('{competencia}') TO ('{proxima_competencia(competencia)}')"
+    ))
+
+
+# Índice único simples: CREATE UNIQUE INDEX nome ON tabela USING metodo (colunas)
+_INDICE_UNICO = re.compile(r"^(CREATE UNIQUE INDEX .+ USING \w+ \()([^()]*)\)$")
+
+
+def indice_unico_particionado(tabela: str, definicao: str) -> str:
+    """Definição do índice único com `competencia` entre as colunas (exigência das tabelas particionadas)."""
+    encontrado = _INDICE_UNICO.match(definicao)
+    if encontrado is None:
+        raise RuntimeError(
+            f"Índice único de {tabela} não pode ser adaptado ao particionamento: {definicao}. "
+            "Inclua competencia nele ou remova-o antes de migrar."
+        )
+    colunas = [c.strip() for c in encontrado.group(2).split(",")]
+    if "competencia" in colunas:
+        return definicao
+    logger.warning(f"Índice único de {tabela} passa a incluir competencia: {definicao}")
+    return f"{encontrado.group(1)}{', '.join(colunas + ['competencia'])})"
+
+
+def chaves_estrangeiras_recebidas(tabela: str):
+    """(tabela de origem, nome, definição) das chaves estrangeiras de outras tabelas que apontam para `tabela`."""
+    return [tuple(linha) for linha in op.get_bind().execute(sa.text(
+        "SELECT o.relname, c.conname, pg_get_constraintdef(c.oid) FROM pg_constraint c "
+        "JOIN pg_class o ON o.oid = c.conrelid "
+        "WHERE c.contype = 'f' AND c.confrelid = CAST(:tabela AS regclass) AND c.conrelid <> c.confrelid"
+    ), {"tabela": f"public.{tabela}"})]
+
+
+def _estrutura(tabela: str, particionar: bool):
+    """Definições dos índices (exceto a chave primária) e chaves estrangeiras da tabela."""
+    conexao = op.get_bind()
+    inspector = sa.inspect(conexao)
+    chave_primaria = inspector.get_pk_constraint(tabela)["name"]
+    indices = []
+    for nome, definicao, unico in conexao.execute(sa.text(
+        "SELECT i.indexname, i.indexdef, x.indisunique FROM pg_indexes i "
+        "JOIN pg_class c ON c.relname = i.indexname AND c.relnamespace = 'public'::regnamespace "
+        "JOIN pg_index x ON x.indexrelid = c.oid "
+        "WHERE i.schemaname = 'public' AND i.tablename = :tabela"
+    ), {"tabela": tabela}):
+        if nome == chave_primaria:
+            continue
+        indices.append(indice_unico_particionado(tabela, definicao) if unico and particionar else definicao)
+    return chave_primaria, indices, inspector.get_foreign_keys(tabela)
+
+
+def recriar(tabela: str, particionar: bool, chave: Sequence[str], meses_a_frente: int = MESES_A_FRENTE):
+    """Recria `tabela` (particionada ou não) com os mesmos dados, índices e chaves estrangeiras."""
+    conexao = op.get_bind()
+    recebidas = chaves_estrangeiras_recebidas(tabela)
+    if recebidas and particionar:
+        raise RuntimeError(
+            f"{tabela} não pode ser particionada: é referenciada por "
+            + ", ".join(f"{origem}.{nome}" for origem, nome, _ in recebidas)
+            + f" e a chave primária particionada é ({', '.join(chave)}). "
+            "Remova essas chaves estrangeiras ou inclua competencia nelas antes de migrar."
+        )
+    chave_primaria, indices, chaves_estrangeiras = _estrutura(tabela, particionar)
+    # Removidas explicitamente (e recriadas no fim) em vez de sumirem num DROP ... CASCADE
+    for origem, nome, _ in recebidas:
+        op.drop_constraint(nome, origem, type_="foreignkey")
+    antiga = f"{tabela}_anterior"
+    op.execute(f'ALTER TABLE "{tabela}" RENAME TO "{antiga}"')
+    op.execute(f'ALTER INDEX "{chave_primaria}" RENAME TO "{antiga}_pkey"')
+    particionamento = " PARTITION BY RANGE (competencia)" if particionar else ""
+    op.execute(
+        f'CREATE TABLE "{tabela}" (LIKE "{antiga}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS '
+        f"INCLUDING STORAGE INCLUDING COMMENTS){particionamento}"
+    )
+    op.execute(f'ALTER TABLE "{tabela}" ADD CONSTRAINT "{chave_primaria}" PRIMARY KEY ({", ".join(chave)})')
+    # A sequência do id (serial), copiada no DEFAULT, pertence à tabela antiga:
+    # passa para a nova, senão o DROP da antiga a levaria junto
+    sequencia = conexao.execute(
+        sa.text("SELECT pg_get_serial_sequence(:tabela, 'id')"), {"tabela": f'public."{antiga}"'}
+    ).scalar()
+    if sequencia:
+        op.execute(f'ALTER SEQUENCE {sequencia} OWNED BY "{tabela}".id')
+
+    if particionar:
+        mais_antiga = conexao.execute(sa.text(
+            f"SELECT min(competencia) FROM \"{antiga}\" WHERE competencia ~ '^[0-9]{{4}}-[0-9]{{2}}$'"
+        )).scalar()
+        atual = competencia_de(datetime.date.today())
+        fim = atual
+        for _ in range(meses_a_frente):
+            fim = proxima_competencia(fim)
+        for competencia in competencias_entre(min(mais_antiga or atual, atual), fim):
+            criar_particao_mensal(conexao, tabela, competencia)
+        # Competências fora das partições (inválidas ou além do horizonte)
+        op.execute(f'CREATE TABLE "{tabela}_padrao" PARTITION OF "{tabela}" DEFAULT')
+
+    op.execute(f'INSERT INTO "{tabela}" SELECT * FROM "{antiga}"')
+    # Sem CASCADE: uma view ou outra dependência não prevista faz a migração falhar
+    op.execute(f'DROP TABLE "{antiga}"')
+    for definicao in indices:
+        op.execute(definicao)
+    for fk in chaves_estrangeiras:
+        op.create_foreign_key(
+            fk["name"], tabela, fk["referred_table"], fk["constrained_columns"], fk["referred_columns"],
+            ondelete=fk.get("options", {}).get("ondelete"),
+        )
+    for origem, nome, definicao in recebidas:
+        op.execute(f'ALTER TABLE "{origem}" ADD CONSTRAINT "{nome}" {definicao}')
@@ -1,14 +1,25 @@
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Text, Date, Table
+from sqlalchemy import create_engine, event, Index, Column, Integer, String, Boolean, DateTime, ForeignKey, Float, Text, Date, Table, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship, Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.sql import func
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
+from functools import lru_cache
 import os
 from dotenv import load_dotenv
-from passlib.context import CryptContext
 import logging
 
+from src.utils.busca import registrar_busca
+from src.utils.busca_global import registrar_entidade
+from src.utils.metricas_pool import metricas_pool, metricas_pool_assincrono, PoolMonitorado, PoolAssincronoMonitorado
+from src.utils.metricas_pool import metricas_pool_replica, metricas_pool_replica_assincrono
+from src.utils.metricas_pool import PoolReplicaMonitorado, PoolReplicaAssincronoMonitorado
+from src.utils.replica import SessaoRoteada, registrar_replica
+from src.utils.versoes import metadata_versoes
+from src.utils.auditoria import auditar_sessoes, escritor_auditoria, registrar_auditoria
+from src.utils.particoes import competencia_de
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -22,21 +33,83 @@ logger = logging.getLogger("medflow-models")
 # Carregar variáveis de ambiente
 load_dotenv()
 
-# Configurar hash de senha
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Configurar hash de senha (passlib só é importado no primeiro uso)
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def get_password_hash(password: str) -> str:
     """Gera hash da senha."""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica se a senha está correta."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 # Configurar banco de dados
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./medflow.db")
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _env_bool(nome: str, padrao: bool) -> bool:
+    return os.getenv(nome, str(padrao)).strip().lower() in ("1", "true", "yes", "sim")
+
+def get_engine_options(url: str) -> Dict[str, Any]:
+    """
+    Monta as opções do engine a partir das variáveis de ambiente.
+
+    - DB_POOL_SIZE / DB_MAX_OVERFLOW: tamanho do pool por processo. Se
+      DB_POOL_SIZE não for informado e DB_MAX_CONNECTIONS for, o limite de
+      conexões do banco é dividido entre os WEB_CONCURRENCY workers.
+    - DB_POOL_TIMEOUT: segundos de espera por uma conexão livre.
+    - DB_POOL_RECYCLE: idade máxima (s) de uma conexão; o Postgres do Render
+      derruba conexões ociosas, então o padrão é 300.
+    - DB_POOL_PRE_PING: testa a conexão antes de entregá-la (padrão: ligado).
+    - DB_STATEMENT_TIMEOUT_MS: statement_timeout do Postgres (0 desliga).
+    - DB_PGBOUNCER: PgBouncer em modo transaction; parâmetros de sessão não
+      são suportados, então o statement_timeout é aplicado por transação. O
+      psycopg2 não usa prepared statements no servidor, o que é compatível
+      com esse modo.
+    """
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") == "sqlite:"):
+        return {}
+
+    max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    pool_size = os.getenv("DB_POOL_SIZE")
+    if pool_size is None and os.getenv("DB_MAX_CONNECTIONS"):
+        workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+        por_worker = int(os.getenv("DB_MAX_CONNECTIONS")) // workers
+        pool_size = max(1, por_worker - max_overflow)
+        max_overflow = min(max_overflow, max(0, por_worker - pool_size))
+
+    options: Dict[str, Any] = {
+        "poolclass": PoolMonitorado,
+        "pool_size": int(pool_size or 5),
+        "max_overflow": max_overflow,
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "300")),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+    }
+
+    statement_timeout = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    if url.startswith("postgres") and statement_timeout > 0 and not _env_bool("DB_PGBOUNCER", False):
+        options["connect_args"] = {"options": f"-c statement_timeout={statement_timeout}"}
+    return options
+
+def _configurar_statement_timeout_por_transacao(engine):
+    """Aplica o statement_timeout com SET LOCAL no início de cada transação (PgBouncer)."""
+    statement_timeout = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    if statement_timeout <= 0:
+        return
+
+    @event.listens_for(engine, "begin")
+    def _set_local_statement_timeout(conn):
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {statement_timeout}")
+
+engine = create_engine(DATABASE_URL, **get_engine_options(DATABASE_URL))
+metricas_pool.monitorar(engine)
+if DATABASE_URL.startswith("postgres") and _env_bool("DB_PGBOUNCER", False):
+    _configurar_statement_timeout_por_transacao(engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=SessaoRoteada)
 Base = declarative_base()
 
 # Função para obter sessão do banco de dados
@@ -47,6 +120,71 @@ def get_db():
     finally:
         db.close()
 
+# Configurar acesso assíncrono (asyncpg no PostgreSQL, aiosqlite no SQLite)
+def get_async_url(url: str) -> str:
+    """Converte a URL síncrona para o driver assíncrono equivalente."""
+    for prefixo in ("postgres://", "postgresql://", "postgresql+psycopg2://"):
+        if url.startswith(prefixo):
+            return "postgresql+asyncpg://" + url[len(prefixo):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+def get_async_engine_options(url: str) -> Dict[str, Any]:
+    """Opções do engine assíncrono: as mesmas do pool síncrono, com os connect_args do asyncpg."""
+    options = get_engine_options(url)
+    if not options:
+        return options
+
+    options["poolclass"] = PoolAssincronoMonitorado
+    options.pop("connect_args", None)
+    if url.startswith("postgresql+asyncpg"):
+        statement_timeout = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+        if _env_bool("DB_PGBOUNCER", False):
+            # PgBouncer em modo transaction não suporta prepared statements nomeados
+            options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+        elif statement_timeout > 0:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(statement_timeout)}}
+    return options
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or get_async_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **get_async_engine_options(ASYNC_DATABASE_URL))
+metricas_pool_assincrono.monitorar(async_engine.sync_engine)
+if ASYNC_DATABASE_URL.startswith("postgresql") and _env_bool("DB_PGBOUNCER", False):
+    _configurar_statement_timeout_por_transacao(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False,
+                                       sync_session_class=SessaoRoteada)
+
+# Réplica de leitura (opcional): requisições GET e relatórios leem dela,
+# escritas continuam no primário (veja src/utils/replica.py)
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+replica_engine = None
+async_replica_engine = None
+if DATABASE_REPLICA_URL:
+    opcoes_replica = get_engine_options(DATABASE_REPLICA_URL)
+    if opcoes_replica:
+        opcoes_replica["poolclass"] = PoolReplicaMonitorado
+    replica_engine = create_engine(DATABASE_REPLICA_URL, **opcoes_replica)
+    metricas_pool_replica.monitorar(replica_engine)
+    registrar_replica(engine, replica_engine)
+
+    ASYNC_DATABASE_REPLICA_URL = os.getenv("ASYNC_DATABASE_REPLICA_URL") or get_async_url(DATABASE_REPLICA_URL)
+    opcoes_replica = get_async_engine_options(ASYNC_DATABASE_REPLICA_URL)
+    if opcoes_replica:
+        opcoes_replica["poolclass"] = PoolReplicaAssincronoMonitorado
+    async_replica_engine = create_async_engine(ASYNC_DATABASE_REPLICA_URL, **opcoes_replica)
+    metricas_pool_replica_assincrono.monitorar(async_replica_engine.sync_engine)
+    registrar_replica(async_engine.sync_engine, async_replica_engine.sync_engine)
+    if DATABASE_REPLICA_URL.startswith("postgres") and _env_bool("DB_PGBOUNCER", False):
+        _configurar_statement_timeout_por_transacao(replica_engine)
+        _configurar_statement_timeout_por_transacao(async_replica_engine.sync_engine)
+    logger.info("Réplica de leitura configurada")
+
+# Função para obter sessão assíncrona do banco de dados
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # Modelo de Usuário
 class User(Base):
     __tablename__ = "users"
@@ -59,10 +197,16 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Texto normalizado para busca (src.utils.busca); índice trigrama na migração 0003
+    busca = Column(Text)
 
 # Modelo de Médico
 class Medico(Base):
     __tablename__ = "medicos"
+    __table_args__ = (
+        # Paginação por cursor: ORDER BY nome, id
+        Index("ix_medicos_nome_id", "nome", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(100), nullable=False)
@@ -86,10 +230,16 @@ class Medico(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Texto normalizado para busca (src.utils.busca); índice trigrama na migração 0003
+    busca = Column(Text)
 
 # Modelo de Empresa
 class Empresa(Base):
     __tablename__ = "empresas"
+    __table_args__ = (
+        # Paginação por cursor: ORDER BY nome, id
+        Index("ix_empresas_nome_id", "nome", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(100), nullable=False)
@@ -105,12 +255,18 @@ class Empresa(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Texto normalizado para busca (src.utils.busca); índice trigrama na migração 0003
+    busca = Column(Text)
 
     hospitais = relationship("Hospital", back_populates="empresa")
 
 # Modelo de Hospital
 class Hospital(Base):
     __tablename__ = "hospitais"
+    __table_args__ = (
+        # Paginação por cursor: ORDER BY nome, id
+        Index("ix_hospitais_nome_id", "nome", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(100), nullable=False)
@@ -124,6 +280,8 @@ class Hospital(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Texto normalizado para busca (src.utils.busca); índice trigrama na migração 0003
+    busca = Column(Text)
 
     empresa = relationship("Empresa", back_populates="hospitais")
     plantoes = relationship("Plantao", back_populates="hospital")
@@ -131,6 +289,10 @@ class Hospital(Base):
 # Modelo de Tipo de Plantão
 class TipoPlantao(Base):
     __tablename__ = "tipos_plantao"
+    __table_args__ = (
+        # Paginação por cursor: ORDER BY nome, id
+        Index("ix_tipos_plantao_nome_id", "nome", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nome = Column(String(100), nullable=False)
@@ -141,9 +303,22 @@ class TipoPlantao(Base):
 
     plantoes = relationship("Plantao", back_populates="tipo_plantao")
 
+def _competencia_do_plantao(contexto) -> str:
+    """Competência (YYYY-MM) de data_inicio, calculada também nos INSERTs pelo Core."""
+    data = contexto.get_current_parameters()["data_inicio"]
+    if isinstance(data, str):
+        data = datetime.fromisoformat(data)
+    return competencia_de(data)
+
 # Modelo de Plantão
 class Plantao(Base):
     __tablename__ = "plantoes"
+    __table_args__ = (
+        # Paginação por cursor: ORDER BY data_inicio, id
+        Index("ix_plantoes_data_inicio_id", "data_inicio", "id"),
+        # Plantões do médico no período (migração 0001, esquema simplificado)
+        Index("ix_plantoes_medico_data_inicio", "medico_id", "data_inicio"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     data_inicio = Column(DateTime(timezone=True), nullable=False)
@@ -156,19 +331,84 @@ class Plantao(Base):
     observacoes = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Mês de data_inicio: chave das partições mensais no PostgreSQL (migração 0005)
+    competencia = Column(String(7), nullable=False, default=_competencia_do_plantao)
 
     medico = relationship("Medico")
     hospital = relationship("Hospital", back_populates="plantoes")
     tipo_plantao = relationship("TipoPlantao", back_populates="plantoes")
 
+@event.listens_for(Plantao, "before_update")
+def _atualizar_competencia_plantao(mapper, connection, plantao):
+    # Mudar data_inicio de mês move o plantão para a partição da nova competência
+    plantao.competencia = competencia_de(plantao.data_inicio)
+
+# Histórico de operações (auditoria): gravado em lotes por src.utils.auditoria
+class HistoricoOperacao(Base):
+    __tablename__ = "historico_operacoes"
+    __table_args__ = (
+        # Consultas da auditoria (GET /api/auditoria), mais recentes primeiro; migração 0008
+        Index("ix_historico_operacoes_entidade", "entidade", "entidade_id", "data_hora", "id"),
+        Index("ix_historico_operacoes_usuario", "usuario_id", "data_hora", "id"),
+        Index("ix_historico_operacoes_data_hora", "data_hora", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    usuario_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    tipo_operacao = Column(String(50), nullable=False)  # create, update, delete, create_lote, etc.
+    entidade = Column(String(50), nullable=False)  # nome da tabela
+    entidade_id = Column(Integer, nullable=True)  # vazio nos registros de lote
+    dados_anteriores = Column(JSON(none_as_null=True), nullable=True)  # só as colunas alteradas (linha inteira na exclusão)
+    dados_novos = Column(JSON(none_as_null=True), nullable=True)
+    data_hora = Column(DateTime(timezone=True), server_default=func.now())
+    ip_origem = Column(String(50), nullable=True)
+    # Mês de data_hora (YYYY-MM): chave das partições mensais e do arquivamento (src/utils/particoes.py)
+    competencia = Column(String(7), nullable=False)
+
+    usuario = relationship("User")
+
+# Colunas de busca normalizadas (minúsculas, sem acentos), mantidas na escrita
+registrar_busca(User, "nome", "email")
+registrar_busca(Medico, "nome", "crm", "cpf", "email", "especialidade")
+registrar_busca(Empresa, "nome", "razao_social", "cnpj")
+registrar_busca(Hospital, "nome", "cidade")
+
+# Entidades da busca global (GET /api/busca)
+registrar_entidade("medico", Medico, titulo="nome", campos=("nome", "cpf", "crm"), detalhe="CRM {crm} · CPF {cpf}")
+registrar_entidade("hospital", Hospital, titulo="nome", campos=("nome",), detalhe="{cidade}")
+registrar_entidade("empresa", Empresa, titulo="nome", campos=("nome", "razao_social", "cnpj"), detalhe="CNPJ {cnpj}")
+
+# Auditoria das alterações feitas pelo ORM (só as colunas alteradas; veja src/utils/auditoria.py)
+registrar_auditoria(User, sigilosos=("senha_hash",))
+registrar_auditoria(Medico)
+registrar_auditoria(Empresa)
+registrar_auditoria(Hospital)
+registrar_auditoria(TipoPlantao)
+registrar_auditoria(Plantao)
+escritor_auditoria.configurar(engine, HistoricoOperacao.__table__)
+# Só as sessões da aplicação (SessionLocal e AsyncSessionLocal) são auditadas
+auditar_sessoes(SessaoRoteada)
+
 # Função para inicializar o banco de dados
 def init_database():
     """Inicializa o banco de dados e cria usuário admin se não existir."""
+    criar_tabelas()
+    criar_usuarios_iniciais()
+
+def criar_tabelas():
+    """Cria as tabelas ausentes (não aplica migrações; veja migrations.py)."""
     try:
         logger.info("Criando tabelas...")
         Base.metadata.create_all(bind=engine)
+        metadata_versoes.create_all(bind=engine)
         logger.info("Tabelas criadas com sucesso")
-        
+    except Exception as e:
+        logger.error(f"Erro ao criar tabelas: {str(e)}", exc_info=True)
+        raise
+
+def criar_usuarios_iniciais():
+    """Cria os usuários admin e médico de teste, se não existirem (hash bcrypt de cada senha)."""
+    try:
         # Criar sessão
         db = SessionLocal()
         
@@ -1,24 +1,31 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, DateTime, Text, Float, JSON
+from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, DateTime, Text, Float, JSON, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from . import Base
-import uuid
+# historico_operacoes é mapeada uma única vez, em src/models (gravada por src.utils.auditoria)
+from . import HistoricoOperacao  # noqa: F401
+from src.utils.uuid7 import UUIDCompacto, uuid7
 
 class ResultadoCalculoProducao(Base):
     __tablename__ = "resultados_calculo_producao"
+    # Índices criados pela migração alembic 0001_indices_competencia
+    __table_args__ = (
+        Index("ix_resultados_calculo_producao_medico_competencia", "medico_id", "competencia", "status"),
+        Index("ix_resultados_calculo_producao_competencia", "competencia", "status"),
+    )
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    medico_id = Column(String(36), ForeignKey("medicos.id"), nullable=False)
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
+    medico_id = Column(UUIDCompacto, ForeignKey("medicos.id"), nullable=False)
     competencia = Column(String(7), nullable=False)  # Formato: YYYY-MM
     data_calculo = Column(DateTime(timezone=True), server_default=func.now())
-    usuario_calculo_id = Column(String(36), ForeignKey("usuarios.id"), nullable=False)
+    usuario_calculo_id = Column(UUIDCompacto, ForeignKey("usuarios.id"), nullable=False)
     valor_bruto_total = Column(Float, nullable=False)
     valor_descontos_total = Column(Float, nullable=False)
     valor_liquido_total = Column(Float, nullable=False)
     observacoes = Column(Text, nullable=True)
     status = Column(String(20), nullable=False)  # rascunho, finalizado, cancelado
     data_finalizacao = Column(DateTime(timezone=True), nullable=True)
-    usuario_finalizacao_id = Column(String(36), ForeignKey("usuarios.id"), nullable=True)
+    usuario_finalizacao_id = Column(UUIDCompacto, ForeignKey("usuarios.id"), nullable=True)
     
     # Relacionamentos
     medico = relationship("Medico")
@@ -31,11 +38,17 @@ class ResultadoCalculoProducao(Base):
 
 class ItemCalculadoProducao(Base):
     __tablename__ = "itens_calculados_producao"
+    # Índices criados pela migração alembic 0001_indices_competencia
+    # No PostgreSQL a tabela é particionada por competência (migração 0005, src.utils.particoes)
+    __table_args__ = (
+        Index("ix_itens_calculados_producao_resultado", "resultado_calculo_id"),
+    )
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    resultado_calculo_id = Column(String(36), ForeignKey("resultados_calculo_producao.id"), nullable=False)
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
+    resultado_calculo_id = Column(UUIDCompacto, ForeignKey("resultados_calculo_producao.id"), nullable=False)
+    competencia = Column(String(7), nullable=False)  # Competência do resultado; chave de particionamento
     tipo_item = Column(String(50), nullable=False)  # plantao, procedimento, producao_administrativa, desconto, credito
-    item_id = Column(String(36), nullable=False)  # ID do item original
+    item_id = Column(UUIDCompacto, nullable=False)  # ID do item original
     descricao = Column(String(200), nullable=False)
     data = Column(Date, nullable=False)
     valor_bruto = Column(Float, nullable=False)
@@ -50,12 +63,17 @@ class ItemCalculadoProducao(Base):
 
 class ResultadoCalculoProLabore(Base):
     __tablename__ = "resultados_calculo_prolabore"
+    # Índices criados pela migração alembic 0001_indices_competencia
+    __table_args__ = (
+        Index("ix_resultados_calculo_prolabore_medico_competencia", "medico_id", "competencia", "status"),
+        Index("ix_resultados_calculo_prolabore_competencia", "competencia", "status"),
+    )
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    medico_id = Column(String(36), ForeignKey("medicos.id"), nullable=False)
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
+    medico_id = Column(UUIDCompacto, ForeignKey("medicos.id"), nullable=False)
     competencia = Column(String(7), nullable=False)  # Formato: YYYY-MM
     data_calculo = Column(DateTime(timezone=True), server_default=func.now())
-    usuario_calculo_id = Column(String(36), ForeignKey("usuarios.id"), nullable=False)
+    usuario_calculo_id = Column(UUIDCompacto, ForeignKey("usuarios.id"), nullable=False)
     valor_bruto_total = Column(Float, nullable=False)
     valor_inss = Column(Float, nullable=False)
     valor_irrf = Column(Float, nullable=False)
@@ -64,7 +82,7 @@ class ResultadoCalculoProLabore(Base):
     observacoes = Column(Text, nullable=True)
     status = Column(String(20), nullable=False)  # rascunho, finalizado, cancelado
     data_finalizacao = Column(DateTime(timezone=True), nullable=True)
-    usuario_finalizacao_id = Column(String(36), ForeignKey("usuarios.id"), nullable=True)
+    usuario_finalizacao_id = Column(UUIDCompacto, ForeignKey("usuarios.id"), nullable=True)
     
     # Relacionamentos
     medico = relationship("Medico")
@@ -77,10 +95,14 @@ class ResultadoCalculoProLabore(Base):
 
 class ItemCalculadoProLabore(Base):
     __tablename__ = "itens_calculados_prolabore"
+    # Índices criados pela migração alembic 0001_indices_competencia
+    __table_args__ = (
+        Index("ix_itens_calculados_prolabore_resultado", "resultado_calculo_id"),
+    )
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    resultado_calculo_id = Column(String(36), ForeignKey("resultados_calculo_prolabore.id"), nullable=False)
-    prolabore_id = Column(String(36), ForeignKey("prolabores.id"), nullable=False)
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
+    resultado_calculo_id = Column(UUIDCompacto, ForeignKey("resultados_calculo_prolabore.id"), nullable=False)
+    prolabore_id = Column(UUIDCompacto, ForeignKey("prolabores.id"), nullable=False)
     descricao = Column(String(200), nullable=False)
     data = Column(Date, nullable=False)
     valor_bruto = Column(Float, nullable=False)
@@ -96,23 +118,3 @@ class ItemCalculadoProLabore(Base):
     
     def __repr__(self):
         return f"<ItemCalculadoProLabore {self.descricao}>"
-
-class HistoricoOperacao(Base):
-    __tablename__ = "historico_operacoes"
-
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    usuario_id = Column(String(36), ForeignKey("usuarios.id"), nullable=False)
-    tipo_operacao = Column(String(50), nullable=False)  # create, update, delete, login, etc.
-    entidade = Column(String(50), nullable=False)  # nome da tabela/entidade
-    entidade_id = Column(String(36), nullable=True)  # ID do registro afetado
-    dados_anteriores = Column(JSON, nullable=True)  # Dados antes da operação
-    dados_novos = Column(JSON, nullable=True)  # Dados após a operação
-    data_hora = Column(DateTime(timezone=True), server_default=func.now())
-    ip_origem = Column(String(50), nullable=True)
-    
-    # Relacionamentos
-    usuario = relationship("User")
-    
-    def __repr__(self):
-        return f"<HistoricoOperacao {self.tipo_operacao} - {self.entidade} - {self.data_hora}>"
-
@@ -2,14 +2,15 @@ from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, DateT
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from . import Base
-import uuid
+from src.utils.uuid7 import UUIDCompacto, uuid7
+from src.utils.busca_global import registrar_entidade
 
 class Contrato(Base):
     __tablename__ = "contratos"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    empresa_id = Column(String(36), ForeignKey("empresas.id"), nullable=False)
-    hospital_id = Column(String(36), ForeignKey("hospitais.id"), nullable=False)
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
+    empresa_id = Column(UUIDCompacto, ForeignKey("empresas.id"), nullable=False)
+    hospital_id = Column(UUIDCompacto, ForeignKey("hospitais.id"), nullable=False)
     numero_contrato = Column(String(50), nullable=True)
     data_inicio = Column(Date, nullable=False)
     data_fim = Column(Date, nullable=True)
@@ -33,9 +34,9 @@ class Contrato(Base):
 class ContratoTipoPlantao(Base):
     __tablename__ = "contratos_tipos_plantao"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    contrato_id = Column(String(36), ForeignKey("contratos.id"), nullable=False)
-    tipo_plantao_id = Column(String(36), ForeignKey("tipos_plantao.id"), nullable=False)
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
+    contrato_id = Column(UUIDCompacto, ForeignKey("contratos.id"), nullable=False)
+    tipo_plantao_id = Column(UUIDCompacto, ForeignKey("tipos_plantao.id"), nullable=False)
     valor = Column(Float, nullable=False)
     observacoes = Column(Text, nullable=True)
     ativo = Column(Boolean, default=True)
@@ -49,3 +50,5 @@ class ContratoTipoPlantao(Base):
     def __repr__(self):
         return f"<ContratoTipoPlantao {self.contrato_id} - {self.tipo_plantao_id}>"
 
+# Entidade da busca global (GET /api/busca)
+registrar_entidade("contrato", Contrato, titulo="numero_contrato", campos=("numero_contrato",), detalhe="Vigência {data_inicio}")
@@ -2,12 +2,12 @@ from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, DateT
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from . import Base
-import uuid
+from src.utils.uuid7 import UUIDCompacto, uuid7
 
 class TabelaINSS(Base):
     __tablename__ = "tabelas_inss"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
     ano_vigencia = Column(Integer, nullable=False)
     faixa = Column(Integer, nullable=False)
     valor_inicial = Column(Float, nullable=False)
@@ -24,7 +24,7 @@ class TabelaINSS(Base):
 class TabelaIRRF(Base):
     __tablename__ = "tabelas_irrf"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
     ano_vigencia = Column(Integer, nullable=False)
     faixa = Column(Integer, nullable=False)
     valor_inicial = Column(Float, nullable=False)
@@ -41,8 +41,8 @@ class TabelaIRRF(Base):
 class ParametrosFiscaisEmpresa(Base):
     __tablename__ = "parametros_fiscais_empresa"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    empresa_id = Column(String(36), ForeignKey("empresas.id"), nullable=False)
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
+    empresa_id = Column(UUIDCompacto, ForeignKey("empresas.id"), nullable=False)
     percentual_iss = Column(Float, nullable=True)
     percentual_inss_empresa = Column(Float, nullable=True)
     percentual_irrf_empresa = Column(Float, nullable=True)
@@ -62,8 +62,8 @@ class ParametrosFiscaisEmpresa(Base):
 class VinculoFiscalMedico(Base):
     __tablename__ = "vinculos_fiscais_medicos"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    medico_id = Column(String(36), ForeignKey("medicos.id"), nullable=False)
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
+    medico_id = Column(UUIDCompacto, ForeignKey("medicos.id"), nullable=False)
     tipo_vinculo = Column(String(50), nullable=False)  # PJ, CLT, Autônomo, etc.
     retem_inss = Column(Boolean, default=False)
     retem_irrf = Column(Boolean, default=False)
@@ -85,7 +85,7 @@ class VinculoFiscalMedico(Base):
 class ParametrosPDF(Base):
     __tablename__ = "parametros_pdf"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
     nome_parametro = Column(String(100), nullable=False)
     valor = Column(Text, nullable=False)
     descricao = Column(Text, nullable=True)
@@ -2,12 +2,12 @@ from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, DateT
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from . import Base
-import uuid
+from src.utils.uuid7 import UUIDCompacto, uuid7
 
 class Medico(Base):
     __tablename__ = "medicos"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
     nome = Column(String(100), nullable=False)
     cpf = Column(String(14), unique=True, nullable=False)
     crm = Column(String(20), nullable=False)
@@ -1,15 +1,15 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, DateTime, Text, Float, Table
+from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, DateTime, Text, Float, Table, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from . import Base
-import uuid
+from src.utils.uuid7 import UUIDCompacto, uuid7
 
 class MedicoEmpresa(Base):
     __tablename__ = "medicos_empresas"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    medico_id = Column(String(36), ForeignKey("medicos.id"), nullable=False)
-    empresa_id = Column(String(36), ForeignKey("empresas.id"), nullable=False)
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
+    medico_id = Column(UUIDCompacto, ForeignKey("medicos.id"), nullable=False)
+    empresa_id = Column(UUIDCompacto, ForeignKey("empresas.id"), nullable=False)
     data_vinculo = Column(Date, nullable=False)
     data_desvinculo = Column(Date, nullable=True)
     observacoes = Column(Text, nullable=True)
@@ -26,9 +26,14 @@ class MedicoEmpresa(Base):
 
 class ProducaoAdministrativa(Base):
     __tablename__ = "producao_administrativa"
+    # Índices criados pela migração alembic 0001_indices_competencia
+    __table_args__ = (
+        Index("ix_producao_administrativa_medico_competencia", "medico_id", "competencia", "confirmado", postgresql_where=text("ativo"), sqlite_where=text("ativo = 1")),
+        Index("ix_producao_administrativa_competencia", "competencia", "data_inicio", postgresql_where=text("ativo"), sqlite_where=text("ativo = 1")),
+    )
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    medico_id = Column(String(36), ForeignKey("medicos.id"), nullable=False)
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
+    medico_id = Column(UUIDCompacto, ForeignKey("medicos.id"), nullable=False)
     descricao = Column(String(200), nullable=False)
     data_inicio = Column(Date, nullable=False)
     data_fim = Column(Date, nullable=True)
@@ -36,7 +41,7 @@ class ProducaoAdministrativa(Base):
     competencia = Column(String(7), nullable=False)  # Formato: YYYY-MM
     confirmado = Column(Boolean, default=False)
     data_confirmacao = Column(DateTime(timezone=True), nullable=True)
-    usuario_confirmacao_id = Column(String(36), ForeignKey("usuarios.id"), nullable=True)
+    usuario_confirmacao_id = Column(UUIDCompacto, ForeignKey("usuarios.id"), nullable=True)
     observacoes = Column(Text, nullable=True)
     ativo = Column(Boolean, default=True)
     created_date = Column(DateTime(timezone=True), server_default=func.now())
@@ -51,9 +56,14 @@ class ProducaoAdministrativa(Base):
 
 class ProLabore(Base):
     __tablename__ = "prolabores"
+    # Índices criados pela migração alembic 0001_indices_competencia
+    __table_args__ = (
+        Index("ix_prolabores_medico_competencia", "medico_id", "competencia", "confirmado", postgresql_where=text("ativo"), sqlite_where=text("ativo = 1")),
+        Index("ix_prolabores_competencia", "competencia", "data", postgresql_where=text("ativo"), sqlite_where=text("ativo = 1")),
+    )
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    medico_id = Column(String(36), ForeignKey("medicos.id"), nullable=False)
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
+    medico_id = Column(UUIDCompacto, ForeignKey("medicos.id"), nullable=False)
     descricao = Column(String(200), nullable=False)
     data = Column(Date, nullable=False)
     valor_bruto = Column(Float, nullable=False)
@@ -61,7 +71,7 @@ class ProLabore(Base):
     competencia = Column(String(7), nullable=False)  # Formato: YYYY-MM
     confirmado = Column(Boolean, default=False)
     data_confirmacao = Column(DateTime(timezone=True), nullable=True)
-    usuario_confirmacao_id = Column(String(36), ForeignKey("usuarios.id"), nullable=True)
+    usuario_confirmacao_id = Column(UUIDCompacto, ForeignKey("usuarios.id"), nullable=True)
     observacoes = Column(Text, nullable=True)
     ativo = Column(Boolean, default=True)
     created_date = Column(DateTime(timezone=True), server_default=func.now())
@@ -76,9 +86,14 @@ class ProLabore(Base):
 
 class DescontoCredito(Base):
     __tablename__ = "descontos_creditos"
+    # Índices criados pela migração alembic 0001_indices_competencia
+    __table_args__ = (
+        Index("ix_descontos_creditos_medico_competencia", "medico_id", "competencia", "tipo", postgresql_where=text("ativo"), sqlite_where=text("ativo = 1")),
+        Index("ix_descontos_creditos_competencia", "competencia", "data", postgresql_where=text("ativo"), sqlite_where=text("ativo = 1")),
+    )
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    medico_id = Column(String(36), ForeignKey("medicos.id"), nullable=False)
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
+    medico_id = Column(UUIDCompacto, ForeignKey("medicos.id"), nullable=False)
     tipo = Column(String(10), nullable=False)  # "desconto" ou "credito"
     descricao = Column(String(200), nullable=False)
     data = Column(Date, nullable=False)
@@ -98,7 +113,7 @@ class DescontoCredito(Base):
 class GrupoAcesso(Base):
     __tablename__ = "grupos_acesso"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
     nome = Column(String(100), nullable=False)
     descricao = Column(Text, nullable=True)
     permissoes = Column(Text, nullable=False)  # JSON com as permissões
@@ -115,9 +130,9 @@ class GrupoAcesso(Base):
 class UsuarioGrupo(Base):
     __tablename__ = "usuarios_grupos"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    usuario_id = Column(String(36), ForeignKey("usuarios.id"), nullable=False)
-    grupo_id = Column(String(36), ForeignKey("grupos_acesso.id"), nullable=False)
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
+    usuario_id = Column(UUIDCompacto, ForeignKey("usuarios.id"), nullable=False)
+    grupo_id = Column(UUIDCompacto, ForeignKey("grupos_acesso.id"), nullable=False)
     created_date = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relacionamentos
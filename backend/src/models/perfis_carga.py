@@ -0,0 +1,95 @@
+"""
+Perfis de carga (eager loading) das consultas da API.
+
+Cada perfil reúne as opções joinedload/selectinload de que uma listagem ou
+relatório precisa para serializar seus relacionamentos sem N+1. As rotas
+aplicam o perfil com com_perfil(); relatórios que rodam fora de uma
+requisição podem usar o gerenciador usando_perfil().
+
+Com DB_RAISELOAD=true, qualquer lazy load que aconteça depois que um perfil
+foi declarado no contexto atual levanta CargaNaoPrevistaError, apontando o
+relacionamento que faltou no perfil.
+"""
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from . import Empresa, Hospital, Plantao
+
+# Relacionamentos muitos-para-um usam joinedload (uma única consulta);
+# coleções usam selectinload (uma consulta extra por relacionamento)
+PERFIS: Dict[str, Callable[[], List]] = {
+    "plantao.detalhado": lambda: [
+        joinedload(Plantao.medico),
+        joinedload(Plantao.hospital).joinedload(Hospital.empresa),
+        joinedload(Plantao.tipo_plantao),
+    ],
+    "hospital.detalhado": lambda: [
+        joinedload(Hospital.empresa),
+    ],
+    "empresa.detalhado": lambda: [
+        selectinload(Empresa.hospitais),
+    ],
+}
+
+_perfil_ativo: ContextVar[Optional[str]] = ContextVar("perfil_carga_ativo", default=None)
+
+
+class CargaNaoPrevistaError(Exception):
+    """Lazy load dentro de uma requisição que declarou um perfil de carga."""
+
+
+def opcoes_perfil(nome: str) -> List:
+    """Opções de carga do perfil `nome`."""
+    try:
+        return PERFIS[nome]()
+    except KeyError:
+        raise ValueError(f"Perfil de carga desconhecido: {nome}")
+
+
+def com_perfil(consulta, nome: str):
+    """Aplica o perfil `nome` a um select() e o declara no contexto da requisição."""
+    opcoes = opcoes_perfil(nome)
+    _perfil_ativo.set(nome)
+    return consulta.options(*opcoes)
+
+
+@contextmanager
+def usando_perfil(nome: str):
+    """Declara o perfil `nome` durante o bloco e fornece suas opções de carga."""
+    opcoes = opcoes_perfil(nome)
+    token = _perfil_ativo.set(nome)
+    try:
+        yield opcoes
+    finally:
+        _perfil_ativo.reset(token)
+
+
+def _verificar_lazy_load(estado):
+    perfil = _perfil_ativo.get()
+    if perfil is None or estado.lazy_loaded_from is None:
+        return
+    objeto = estado.lazy_loaded_from
+    relacionamentos = [
+        chave for chave, atributo in objeto.mapper.relationships.items()
+        if chave in objeto.unloaded
+    ]
+    raise CargaNaoPrevistaError(
+        f"Lazy load de {objeto.class_.__name__} (relacionamentos não carregados: "
+        f"{', '.join(relacionamentos)}) com o perfil '{perfil}' ativo; "
+        f"inclua o relacionamento no perfil em src/models/perfis_carga.py"
+    )
+
+
+def ativar_modo_estrito():
+    """Passa a levantar CargaNaoPrevistaError em lazy loads com perfil declarado."""
+    if not event.contains(Session, "do_orm_execute", _verificar_lazy_load):
+        event.listen(Session, "do_orm_execute", _verificar_lazy_load)
+
+
+if os.getenv("DB_RAISELOAD", "false").lower() in ("1", "true", "yes", "on"):
+    ativar_modo_estrito()
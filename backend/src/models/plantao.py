@@ -1,17 +1,23 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, DateTime, Text, Float, Time
+from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, DateTime, Text, Float, Time, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from . import Base
-import uuid
+from src.utils.uuid7 import UUIDCompacto, uuid7
 
 class Plantao(Base):
     __tablename__ = "plantoes"
+    # Índices criados pela migração alembic 0001_indices_competencia; no
+    # PostgreSQL a tabela é particionada por competência (migração 0005)
+    __table_args__ = (
+        Index("ix_plantoes_medico_competencia", "medico_id", "competencia", "confirmado", postgresql_where=text("ativo"), sqlite_where=text("ativo = 1")),
+        Index("ix_plantoes_competencia_data", "competencia", "data", postgresql_where=text("ativo"), sqlite_where=text("ativo = 1")),
+    )
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    medico_id = Column(String(36), ForeignKey("medicos.id"), nullable=False)
-    hospital_id = Column(String(36), ForeignKey("hospitais.id"), nullable=False)
-    contrato_id = Column(String(36), ForeignKey("contratos.id"), nullable=False)
-    tipo_plantao_id = Column(String(36), ForeignKey("tipos_plantao.id"), nullable=False)
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
+    medico_id = Column(UUIDCompacto, ForeignKey("medicos.id"), nullable=False)
+    hospital_id = Column(UUIDCompacto, ForeignKey("hospitais.id"), nullable=False)
+    contrato_id = Column(UUIDCompacto, ForeignKey("contratos.id"), nullable=False)
+    tipo_plantao_id = Column(UUIDCompacto, ForeignKey("tipos_plantao.id"), nullable=False)
     data = Column(Date, nullable=False)
     hora_inicio = Column(Time, nullable=False)
     hora_fim = Column(Time, nullable=False)
@@ -21,7 +27,7 @@ class Plantao(Base):
     competencia = Column(String(7), nullable=False)  # Formato: YYYY-MM
     confirmado = Column(Boolean, default=False)
     data_confirmacao = Column(DateTime(timezone=True), nullable=True)
-    usuario_confirmacao_id = Column(String(36), ForeignKey("usuarios.id"), nullable=True)
+    usuario_confirmacao_id = Column(UUIDCompacto, ForeignKey("usuarios.id"), nullable=True)
     ativo = Column(Boolean, default=True)
     created_date = Column(DateTime(timezone=True), server_default=func.now())
     updated_date = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,14 +1,20 @@
-from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, DateTime, Text, Float
+from sqlalchemy import Column, Integer, String, Boolean, Date, ForeignKey, DateTime, Text, Float, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from . import Base
-import uuid
+from src.utils.uuid7 import UUIDCompacto, uuid7
+from src.utils.busca_global import registrar_entidade
 
 class ProcedimentoParticular(Base):
     __tablename__ = "procedimentos_particulares"
+    # Índices criados pela migração alembic 0001_indices_competencia
+    __table_args__ = (
+        Index("ix_procedimentos_particulares_medico_competencia", "medico_id", "competencia", "confirmado", postgresql_where=text("ativo"), sqlite_where=text("ativo = 1")),
+        Index("ix_procedimentos_particulares_competencia", "competencia", "data_procedimento", postgresql_where=text("ativo"), sqlite_where=text("ativo = 1")),
+    )
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    medico_id = Column(String(36), ForeignKey("medicos.id"), nullable=False)
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
+    medico_id = Column(UUIDCompacto, ForeignKey("medicos.id"), nullable=False)
     nome_paciente = Column(String(100), nullable=False)
     data_procedimento = Column(Date, nullable=False)
     tipo_procedimento = Column(String(100), nullable=False)
@@ -19,7 +25,7 @@ class ProcedimentoParticular(Base):
     competencia = Column(String(7), nullable=False)  # Formato: YYYY-MM
     confirmado = Column(Boolean, default=False)
     data_confirmacao = Column(DateTime(timezone=True), nullable=True)
-    usuario_confirmacao_id = Column(String(36), ForeignKey("usuarios.id"), nullable=True)
+    usuario_confirmacao_id = Column(UUIDCompacto, ForeignKey("usuarios.id"), nullable=True)
     observacoes = Column(Text, nullable=True)
     ativo = Column(Boolean, default=True)
     created_date = Column(DateTime(timezone=True), server_default=func.now())
@@ -32,3 +38,5 @@ class ProcedimentoParticular(Base):
     def __repr__(self):
         return f"<ProcedimentoParticular {self.medico_id} - {self.nome_paciente} - {self.data_procedimento}>"
 
+# Entidade da busca global (GET /api/busca)
+registrar_entidade("procedimento", ProcedimentoParticular, titulo="nome_paciente", campos=("nome_paciente",), detalhe="{tipo_procedimento} · {data_procedimento}")
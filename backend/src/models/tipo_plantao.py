@@ -2,12 +2,12 @@ from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from . import Base
-import uuid
+from src.utils.uuid7 import UUIDCompacto, uuid7
 
 class TipoPlantao(Base):
     __tablename__ = "tipos_plantao"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
     nome = Column(String(100), nullable=False)
     descricao = Column(Text, nullable=True)
     duracao_horas = Column(Float, nullable=False)
@@ -2,21 +2,24 @@ from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, T
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from . import Base
-import uuid
+from src.utils.uuid7 import UUIDCompacto, uuid7
+from src.utils.busca import registrar_busca
 
 class User(Base):
     __tablename__ = "usuarios"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDCompacto, primary_key=True, default=uuid7)
     nome_completo = Column(String(100), nullable=False)
     email = Column(String(100), unique=True, nullable=False)
     senha_hash = Column(String(255), nullable=False)
     perfil = Column(String(20), nullable=False)  # admin, operador, medico
-    medico_id_associado = Column(String(36), ForeignKey("medicos.id"), nullable=True)
+    medico_id_associado = Column(UUIDCompacto, ForeignKey("medicos.id"), nullable=True)
     ativo = Column(Boolean, default=True)
     created_date = Column(DateTime(timezone=True), server_default=func.now())
     updated_date = Column(DateTime(timezone=True), onupdate=func.now())
     ultimo_login = Column(DateTime(timezone=True), nullable=True)
+    # Nome/e-mail normalizados para busca (src.utils.busca); índice trigrama na migração 0003
+    busca = Column(Text)
     
     # Relacionamentos
     medico = relationship("Medico", back_populates="usuario")
@@ -25,3 +28,5 @@ class User(Base):
     def __repr__(self):
         return f"<User {self.nome_completo}>"
 
+# Coluna de busca normalizada (minúsculas, sem acentos), mantida na escrita
+registrar_busca(User, "nome_completo", "email")
@@ -0,0 +1,110 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, Optional
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime, timezone
+
+from src.models import get_async_db, HistoricoOperacao
+from src.routes.auth import get_current_active_user, User
+from src.utils.paginacao import PaginaCursor, aplicar_cursor, decodificar_cursor, montar_pagina
+from src.utils.particoes import competencia_de, ler_arquivados
+from src.utils.projecao import Projecao
+
+# Modelos Pydantic
+class HistoricoOperacaoResponse(BaseModel):
+    id: int
+    usuario_id: Optional[int] = None
+    tipo_operacao: str
+    entidade: str
+    entidade_id: Optional[int] = None
+    dados_anteriores: Optional[Dict[str, Any]] = None
+    dados_novos: Optional[Dict[str, Any]] = None
+    data_hora: datetime
+    ip_origem: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+# Criar router
+router = APIRouter()
+
+# Mais recentes primeiro; os índices da migração 0008 terminam nessas colunas
+CHAVE_CURSOR = (HistoricoOperacao.data_hora, HistoricoOperacao.id)
+
+def _comparavel(data_hora: datetime) -> datetime:
+    # Datas com fuso (PostgreSQL) e sem fuso (SQLite, parâmetros) comparadas em UTC
+    if data_hora.tzinfo is None:
+        return data_hora
+    return data_hora.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _historico_arquivado(sessao, filtros, inicio, fim, antes_de, quantidade):
+    """
+    Até `quantidade` registros exportados pela retenção (particoes.py reter),
+    na ordem da listagem. Os meses exportados são anteriores a tudo o que
+    está no banco, então continuam a listagem depois da última linha dele.
+    """
+    competencias = (competencia_de(inicio) if inicio else "0000-01", competencia_de(fim) if fim else "9999-12")
+    encontrados = []
+    for registro in ler_arquivados(sessao.connection(), HistoricoOperacao.__tablename__, *competencias, **filtros):
+        data_hora = _comparavel(registro["data_hora"])
+        if inicio is not None and data_hora < _comparavel(inicio):
+            continue
+        if fim is not None and data_hora >= _comparavel(fim):
+            continue
+        if antes_de is not None and (data_hora, registro["id"]) >= (_comparavel(antes_de[0]), antes_de[1]):
+            continue
+        encontrados.append(registro)
+    encontrados.sort(key=lambda registro: (_comparavel(registro["data_hora"]), registro["id"]), reverse=True)
+    return encontrados[:quantidade]
+
+
+# Rotas
+@router.get("/", response_model=PaginaCursor[HistoricoOperacaoResponse])
+async def read_historico(
+    entidade: Optional[str] = Query(None, description="Tabela auditada (ex.: plantoes)"),
+    entidade_id: Optional[int] = None,
+    usuario_id: Optional[int] = None,
+    tipo_operacao: Optional[str] = None,
+    inicio: Optional[datetime] = None,
+    fim: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Sem permissão para consultar a auditoria")
+    if entidade_id is not None and entidade is None:
+        raise HTTPException(status_code=400, detail="entidade_id exige entidade")
+    if inicio is not None and fim is not None and fim < inicio:
+        raise HTTPException(status_code=400, detail="fim deve ser posterior a inicio")
+
+    projecao = Projecao(HistoricoOperacao, HistoricoOperacaoResponse, fields, extras=CHAVE_CURSOR)
+    consulta = projecao.consulta()
+    filtros = {
+        nome: valor for nome, valor in (
+            ("entidade", entidade), ("entidade_id", entidade_id),
+            ("usuario_id", usuario_id), ("tipo_operacao", tipo_operacao),
+        ) if valor is not None
+    }
+    for nome, valor in filtros.items():
+        consulta = consulta.where(HistoricoOperacao.__table__.c[nome] == valor)
+    # A faixa também filtra a competência, para o PostgreSQL descartar as partições de fora
+    if inicio is not None:
+        consulta = consulta.where(HistoricoOperacao.data_hora >= inicio,
+                                  HistoricoOperacao.competencia >= competencia_de(inicio))
+    if fim is not None:
+        consulta = consulta.where(HistoricoOperacao.data_hora < fim,
+                                  HistoricoOperacao.competencia <= competencia_de(fim))
+
+    result = await db.execute(aplicar_cursor(consulta, CHAVE_CURSOR, cursor or None, limit, descendente=True))
+    linhas = list(projecao.linhas(result))
+    if len(linhas) <= limit:
+        # O banco acabou: a listagem continua nos meses exportados, se a faixa os alcançar
+        antes_de = decodificar_cursor(cursor, CHAVE_CURSOR) if cursor else None
+        arquivados = await db.run_sync(
+            _historico_arquivado, filtros, inicio, fim, antes_de, limit + 1 - len(linhas)
+        )
+        linhas += [projecao.linha(registro) for registro in arquivados]
+    return projecao.responder(montar_pagina(linhas, CHAVE_CURSOR, limit))
@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
+from jose import JWTError
 import os
 from pydantic import BaseModel
 
-from src.models import get_db, User, verify_password
+from src.models import get_async_db, AsyncSessionLocal, User, verify_password
+from src.utils.auditoria import definir_origem
+from src.utils.carregamento_tardio import modulo_tardio
+
+# jose.jwt (e suas dependências criptográficas) só é carregado no primeiro uso
+jwt = modulo_tardio("jose.jwt")
 
 # Configuração do JWT
 SECRET_KEY = os.getenv("SECRET_KEY", "medflow_secret_key_development")
@@ -46,18 +53,20 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(User).filter(User.email == email))
+    return result.scalars().first()
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = get_user_by_email(db, email)
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    user = await get_user_by_email(db, email)
     if not user:
         return False
-    if not verify_password(password, user.senha_hash):
+    # bcrypt é CPU-bound: verificar fora do event loop
+    if not await run_in_threadpool(verify_password, password, user.senha_hash):
         return False
     return user
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Credenciais inválidas",
@@ -71,9 +80,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = get_user_by_email(db, email=token_data.email)
+    user = await get_user_by_email(db, email=token_data.email)
     if user is None:
         raise credentials_exception
+    # Operações auditadas desta requisição são atribuídas ao usuário autenticado
+    definir_origem(user.id, request.client.host if request.client else None)
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
@@ -81,10 +92,29 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
         raise HTTPException(status_code=400, detail="Usuário inativo")
     return current_user
 
+async def authorization_de_admin(authorization: str) -> bool:
+    """
+    O cabeçalho Authorization (`Bearer <token>`) é de um administrador ativo?
+
+    Para middlewares, que rodam antes das dependências das rotas.
+    """
+    esquema, _, token = authorization.partition(" ")
+    if esquema.lower() != "bearer" or not token:
+        return False
+    try:
+        email = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return False
+    if email is None:
+        return False
+    async with AsyncSessionLocal() as db:
+        user = await get_user_by_email(db, email)
+    return bool(user and user.is_active and user.is_admin)
+
 # Rotas
 @router.post("/login", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -104,8 +134,8 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     }
 
 @router.post("/login-json")
-async def login_json(user_data: UserLogin, db: Session = Depends(get_db)):
-    user = authenticate_user(db, user_data.email, user_data.password)
+async def login_json(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = await authenticate_user(db, user_data.email, user_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
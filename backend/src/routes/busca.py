@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from typing import List, Optional, Union
+from pydantic import BaseModel
+import time
+
+from src.models import SessionLocal
+from src.routes.auth import get_current_active_user, User
+from src.utils.busca_global import carregar_indice_global, indice_global
+
+# Modelos Pydantic
+class ResultadoBusca(BaseModel):
+    tipo: str
+    id: Union[int, str]
+    titulo: str
+    detalhe: str
+    pontuacao: int
+
+class RespostaBusca(BaseModel):
+    q: str
+    resultados: List[ResultadoBusca]
+    tempo_ms: float
+
+# Criar router
+router = APIRouter()
+
+# Rotas
+@router.get("", response_model=RespostaBusca)
+async def busca_global(
+    q: str = Query(..., min_length=1, description="Nome, CPF, CRM, CNPJ, nº de contrato ou paciente"),
+    tipos: Optional[str] = Query(None, description="Tipos separados por vírgula (ex.: medico,empresa)"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user)
+):
+    # O índice é construído no startup; se ainda não terminou, aguarda a carga
+    if not indice_global.pronto:
+        await run_in_threadpool(carregar_indice_global, SessionLocal)
+    
+    inicio = time.perf_counter()
+    filtro_tipos = {t.strip() for t in tipos.split(",") if t.strip()} if tipos else None
+    resultados = indice_global.buscar(q, limit, filtro_tipos)
+    return {
+        "q": q,
+        "resultados": resultados,
+        "tempo_ms": round((time.perf_counter() - inicio) * 1000, 3),
+    }
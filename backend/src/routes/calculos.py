@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime, date
 
-from src.models import get_db, User
+from src.models import get_async_db, User
 from src.routes.auth import get_current_active_user
 
 # Criar router
@@ -12,6 +12,6 @@ router = APIRouter()
 
 # Rota temporária
 @router.get("/")
-async def read_calculos(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+async def read_calculos(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
     return {"message": "Endpoint de cálculos em desenvolvimento"}
 
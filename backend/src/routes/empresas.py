@@ -1,10 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+from pydantic import BaseModel, ConfigDict
 
-from src.models import get_db, Empresa
+from src.models import get_async_db, Empresa
+from src.models.perfis_carga import com_perfil
 from src.routes.auth import get_current_active_user, User
+from src.utils.busca import buscar_async
+from src.utils.lote_ids import BatchGetRequest, LoteIds, buscar_por_ids, interpretar_ids, validar_ids
+from src.utils.paginacao import PaginaCursor, aplicar_cursor, montar_pagina
+from src.utils.projecao import Projecao
 
 # Modelos Pydantic
 class EmpresaBase(BaseModel):
@@ -29,15 +35,28 @@ class EmpresaUpdate(EmpresaBase):
 class EmpresaResponse(EmpresaBase):
     id: int
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class HospitalResumo(BaseModel):
+    id: int
+    nome: str
+    cidade: Optional[str] = None
+    is_active: bool = True
+    
+    model_config = ConfigDict(from_attributes=True)
+
+class EmpresaDetalhadaResponse(EmpresaResponse):
+    hospitais: List[HospitalResumo] = []
 
 # Criar router
 router = APIRouter()
 
+# Ordenação da paginação por cursor
+CHAVE_CURSOR = (Empresa.nome, Empresa.id)
+
 # Rotas
 @router.post("/", response_model=EmpresaResponse)
-async def create_empresa(empresa: EmpresaCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+async def create_empresa(empresa: EmpresaCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Sem permissão para criar empresas")
     
@@ -55,48 +74,82 @@ async def create_empresa(empresa: EmpresaCreate, db: Session = Depends(get_db),
         is_active=empresa.is_active
     )
     db.add(db_empresa)
-    db.commit()
-    db.refresh(db_empresa)
+    await db.commit()
+    await db.refresh(db_empresa)
     return db_empresa
 
-@router.get("/", response_model=List[EmpresaResponse])
-async def read_empresas(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    empresas = db.query(Empresa).offset(skip).limit(limit).all()
-    return empresas
+@router.post("/batch-get", response_model=LoteIds[EmpresaResponse])
+async def batch_get_empresas(requisicao: BatchGetRequest, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    return await buscar_por_ids(db, select(Empresa), Empresa, validar_ids(requisicao.ids))
+
+@router.get("/", response_model=Union[List[EmpresaResponse], LoteIds[EmpresaResponse], PaginaCursor[EmpresaResponse]])
+async def read_empresas(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, search: Optional[str] = None, ids: Optional[str] = None, fields: Optional[str] = None, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    # Serializa direto as colunas (todas as do modelo de resposta ou só as de ?fields=id,nome), sem entidades ORM
+    projecao = Projecao(Empresa, EmpresaResponse, fields, extras=CHAVE_CURSOR)
+    
+    # Busca em lote por ids (?ids=1,2,3), em uma única consulta
+    if ids is not None:
+        if cursor is not None or search:
+            raise HTTPException(status_code=400, detail="ids não pode ser combinado com busca ou paginação por cursor")
+        return projecao.responder(await buscar_por_ids(db, projecao.consulta(), Empresa, interpretar_ids(ids), projetada=True))
+    
+    # Busca ranqueada por similaridade (sem acentos e sem diferenciar maiúsculas)
+    if search and search.strip():
+        if cursor is not None:
+            raise HTTPException(status_code=400, detail="A busca não pode ser combinada com paginação por cursor")
+        return projecao.responder(await buscar_async(db, projecao.consulta(), Empresa, search, skip, limit, projetada=True))
+    
+    # Paginação por cursor quando `cursor` é informado (vazio na primeira página)
+    if cursor is not None:
+        result = await db.execute(aplicar_cursor(projecao.consulta(), CHAVE_CURSOR, cursor, limit))
+        return projecao.responder(montar_pagina(projecao.linhas(result), CHAVE_CURSOR, limit))
+    
+    result = await db.execute(projecao.consulta().offset(skip).limit(limit))
+    empresas = projecao.linhas(result)
+    return projecao.responder(empresas)
+
+# Empresa com seus hospitais, carregados pelo perfil "empresa.detalhado"
+@router.get("/{empresa_id}/detalhado", response_model=EmpresaDetalhadaResponse)
+async def read_empresa_detalhada(empresa_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    result = await db.execute(com_perfil(select(Empresa), "empresa.detalhado").where(Empresa.id == empresa_id))
+    db_empresa = result.scalars().first()
+    if db_empresa is None:
+        raise HTTPException(status_code=404, detail="Empresa não encontrada")
+    return db_empresa
 
 @router.get("/{empresa_id}", response_model=EmpresaResponse)
-async def read_empresa(empresa_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    db_empresa = db.query(Empresa).filter(Empresa.id == empresa_id).first()
+async def read_empresa(empresa_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    db_empresa = await db.get(Empresa, empresa_id)
     if db_empresa is None:
         raise HTTPException(status_code=404, detail="Empresa não encontrada")
     return db_empresa
 
 @router.put("/{empresa_id}", response_model=EmpresaResponse)
-async def update_empresa(empresa_id: int, empresa: EmpresaUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+async def update_empresa(empresa_id: int, empresa: EmpresaUpdate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Sem permissão para atualizar empresas")
     
-    db_empresa = db.query(Empresa).filter(Empresa.id == empresa_id).first()
+    db_empresa = await db.get(Empresa, empresa_id)
     if db_empresa is None:
         raise HTTPException(status_code=404, detail="Empresa não encontrada")
     
-    for key, value in empresa.dict().items():
+    for key, value in empresa.model_dump().items():
         setattr(db_empresa, key, value)
     
-    db.commit()
-    db.refresh(db_empresa)
+    await db.commit()
+    await db.refresh(db_empresa)
     return db_empresa
 
 @router.delete("/{empresa_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_empresa(empresa_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+async def delete_empresa(empresa_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Sem permissão para excluir empresas")
     
-    db_empresa = db.query(Empresa).filter(Empresa.id == empresa_id).first()
+    db_empresa = await db.get(Empresa, empresa_id)
     if db_empresa is None:
         raise HTTPException(status_code=404, detail="Empresa não encontrada")
     
-    db.delete(db_empresa)
-    db.commit()
+    await db.delete(db_empresa)
+    await db.commit()
     return None
 
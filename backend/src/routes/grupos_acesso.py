@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from src.models import db
 from src.models.fiscais_usuarios import GrupoAcesso
+from src.utils.paginacao import paginar_sem_contagem
 
 grupos_acesso_bp = Blueprint('grupos_acesso', __name__)
 
@@ -23,22 +24,17 @@ def list_grupos_acesso():
                 )
             )
         
-        items = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
+        # Sem COUNT(*) por página; o total só é calculado com ?total=1|estimado
+        items, pagination = paginar_sem_contagem(
+            query,
+            page=page,
+            per_page=per_page,
+            total=request.args.get('total')
         )
         
         return jsonify({
-            'data': [item.to_dict() for item in items.items],
-            'pagination': {
-                'page': items.page,
-                'pages': items.pages,
-                'per_page': items.per_page,
-                'total': items.total,
-                'has_next': items.has_next,
-                'has_prev': items.has_prev
-            }
+            'data': [item.to_dict() for item in items],
+            'pagination': pagination
         }), 200
         
     except Exception as e:
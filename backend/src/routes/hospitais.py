@@ -1,10 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+from pydantic import BaseModel, ConfigDict
 
-from src.models import get_db, Hospital, Empresa
+from src.models import get_async_db, Hospital, Empresa
+from src.models.perfis_carga import com_perfil
 from src.routes.auth import get_current_active_user, User
+from src.utils.busca import buscar_async
+from src.utils.lote_ids import BatchGetRequest, LoteIds, buscar_por_ids, interpretar_ids, validar_ids
+from src.utils.paginacao import PaginaCursor, aplicar_cursor, montar_pagina
+from src.utils.projecao import Projecao
 
 # Modelos Pydantic
 class HospitalBase(BaseModel):
@@ -27,20 +33,32 @@ class HospitalUpdate(HospitalBase):
 class HospitalResponse(HospitalBase):
     id: int
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class EmpresaResumo(BaseModel):
+    id: int
+    nome: str
+    cnpj: str
+    
+    model_config = ConfigDict(from_attributes=True)
+
+class HospitalDetalhadoResponse(HospitalResponse):
+    empresa: Optional[EmpresaResumo] = None
 
 # Criar router
 router = APIRouter()
 
+# Ordenação da paginação por cursor
+CHAVE_CURSOR = (Hospital.nome, Hospital.id)
+
 # Rotas
 @router.post("/", response_model=HospitalResponse)
-async def create_hospital(hospital: HospitalCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+async def create_hospital(hospital: HospitalCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Sem permissão para criar hospitais")
     
     # Verificar se a empresa existe
-    empresa = db.query(Empresa).filter(Empresa.id == hospital.empresa_id).first()
+    empresa = await db.get(Empresa, hospital.empresa_id)
     if not empresa:
         raise HTTPException(status_code=404, detail="Empresa não encontrada")
     
@@ -56,53 +74,89 @@ async def create_hospital(hospital: HospitalCreate, db: Session = Depends(get_db
         is_active=hospital.is_active
     )
     db.add(db_hospital)
-    db.commit()
-    db.refresh(db_hospital)
+    await db.commit()
+    await db.refresh(db_hospital)
     return db_hospital
 
-@router.get("/", response_model=List[HospitalResponse])
-async def read_hospitais(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    hospitais = db.query(Hospital).offset(skip).limit(limit).all()
-    return hospitais
+@router.post("/batch-get", response_model=LoteIds[HospitalResponse])
+async def batch_get_hospitais(requisicao: BatchGetRequest, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    return await buscar_por_ids(db, select(Hospital), Hospital, validar_ids(requisicao.ids))
+
+@router.get("/", response_model=Union[List[HospitalResponse], LoteIds[HospitalResponse], PaginaCursor[HospitalResponse]])
+async def read_hospitais(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, search: Optional[str] = None, ids: Optional[str] = None, fields: Optional[str] = None, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    # Serializa direto as colunas (todas as do modelo de resposta ou só as de ?fields=id,nome), sem entidades ORM
+    projecao = Projecao(Hospital, HospitalResponse, fields, extras=CHAVE_CURSOR)
+    
+    # Busca em lote por ids (?ids=1,2,3), em uma única consulta
+    if ids is not None:
+        if cursor is not None or search:
+            raise HTTPException(status_code=400, detail="ids não pode ser combinado com busca ou paginação por cursor")
+        return projecao.responder(await buscar_por_ids(db, projecao.consulta(), Hospital, interpretar_ids(ids), projetada=True))
+    
+    # Busca ranqueada por similaridade (sem acentos e sem diferenciar maiúsculas)
+    if search and search.strip():
+        if cursor is not None:
+            raise HTTPException(status_code=400, detail="A busca não pode ser combinada com paginação por cursor")
+        return projecao.responder(await buscar_async(db, projecao.consulta(), Hospital, search, skip, limit, projetada=True))
+    
+    # Paginação por cursor quando `cursor` é informado (vazio na primeira página)
+    if cursor is not None:
+        result = await db.execute(aplicar_cursor(projecao.consulta(), CHAVE_CURSOR, cursor, limit))
+        return projecao.responder(montar_pagina(projecao.linhas(result), CHAVE_CURSOR, limit))
+    
+    result = await db.execute(projecao.consulta().offset(skip).limit(limit))
+    hospitais = projecao.linhas(result)
+    return projecao.responder(hospitais)
+
+# Hospitais com a empresa, carregada pelo perfil "hospital.detalhado"
+@router.get("/detalhados", response_model=Union[List[HospitalDetalhadoResponse], PaginaCursor[HospitalDetalhadoResponse]])
+async def read_hospitais_detalhados(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    consulta = com_perfil(select(Hospital), "hospital.detalhado")
+    if cursor is not None:
+        result = await db.execute(aplicar_cursor(consulta, CHAVE_CURSOR, cursor, limit))
+        return montar_pagina(result.scalars().all(), CHAVE_CURSOR, limit)
+    
+    result = await db.execute(consulta.order_by(*CHAVE_CURSOR).offset(skip).limit(limit))
+    return result.scalars().all()
 
 @router.get("/{hospital_id}", response_model=HospitalResponse)
-async def read_hospital(hospital_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    db_hospital = db.query(Hospital).filter(Hospital.id == hospital_id).first()
+async def read_hospital(hospital_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    db_hospital = await db.get(Hospital, hospital_id)
     if db_hospital is None:
         raise HTTPException(status_code=404, detail="Hospital não encontrado")
     return db_hospital
 
 @router.put("/{hospital_id}", response_model=HospitalResponse)
-async def update_hospital(hospital_id: int, hospital: HospitalUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+async def update_hospital(hospital_id: int, hospital: HospitalUpdate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Sem permissão para atualizar hospitais")
     
-    db_hospital = db.query(Hospital).filter(Hospital.id == hospital_id).first()
+    db_hospital = await db.get(Hospital, hospital_id)
     if db_hospital is None:
         raise HTTPException(status_code=404, detail="Hospital não encontrado")
     
     # Verificar se a empresa existe
-    empresa = db.query(Empresa).filter(Empresa.id == hospital.empresa_id).first()
+    empresa = await db.get(Empresa, hospital.empresa_id)
     if not empresa:
         raise HTTPException(status_code=404, detail="Empresa não encontrada")
     
-    for key, value in hospital.dict().items():
+    for key, value in hospital.model_dump().items():
         setattr(db_hospital, key, value)
     
-    db.commit()
-    db.refresh(db_hospital)
+    await db.commit()
+    await db.refresh(db_hospital)
     return db_hospital
 
 @router.delete("/{hospital_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_hospital(hospital_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+async def delete_hospital(hospital_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Sem permissão para excluir hospitais")
     
-    db_hospital = db.query(Hospital).filter(Hospital.id == hospital_id).first()
+    db_hospital = await db.get(Hospital, hospital_id)
     if db_hospital is None:
         raise HTTPException(status_code=404, detail="Hospital não encontrado")
     
-    db.delete(db_hospital)
-    db.commit()
+    await db.delete(db_hospital)
+    await db.commit()
     return None
 
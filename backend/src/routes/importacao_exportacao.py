@@ -1,17 +1,192 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime, date
+from starlette.concurrency import run_in_threadpool
+import codecs
+import csv
+import io
+import os
 
-from src.models import get_db, User
+from src.models import AsyncSessionLocal, User, Medico, Hospital, Empresa, Plantao, TipoPlantao
 from src.routes.auth import get_current_active_user
+from src.routes.empresas import EmpresaCreate, EmpresaResponse
+from src.routes.hospitais import HospitalCreate, HospitalResponse
+from src.routes.medicos import MedicoCreate, MedicoResponse
+from src.routes.plantoes import PlantaoCreate, PlantaoResponse, consistencia_plantao
+from src.routes.tipos_plantao import TipoPlantaoCreate, TipoPlantaoResponse
+from src.utils.importacao import (
+    IMPORTACAO_MAX_MB, EspecificacaoImportacao, ErroImportacao, Referencia, importacoes, ler_relatorio,
+    salvar_upload, somente_digitos, variantes_cnpj,
+)
+from src.utils.leitura import consulta_leitura, transmitir
+
+# Modelos Pydantic
+class ErroLinhaImportacao(BaseModel):
+    linha: int
+    campo: str
+    mensagem: str
+
+class TarefaImportacaoResponse(BaseModel):
+    id: str
+    entidade: str
+    estado: str  # na_fila, processando, concluida, falhou, cancelada
+    mensagem: Optional[str] = None
+    arquivo: Optional[str] = None
+    usuario_id: Optional[int] = None
+    # Percentual do arquivo já lido
+    progresso: float
+    linhas_lidas: int
+    importadas: int
+    rejeitadas: int
+    colunas_ignoradas: List[str]
+    # Primeiros erros; o relatório completo está em /importacoes/{id}/erros.csv
+    erros: List[ErroLinhaImportacao]
+    criada_em: datetime
+    iniciada_em: Optional[datetime] = None
+    concluida_em: Optional[datetime] = None
 
 # Criar router
 router = APIRouter()
 
-# Rota temporária
+# Entidades importáveis e as colunas aceitas
 @router.get("/")
-async def read_importacao_exportacao(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    return {"message": "Endpoint de importação e exportação em desenvolvimento"}
+async def read_importacao_exportacao(current_user: User = Depends(get_current_active_user)):
+    return {
+        "exportaveis": list(EXPORTAVEIS),
+        "importaveis": {
+            entidade: {"colunas": especificacao.colunas, "obrigatorias": especificacao.obrigatorias}
+            for entidade, especificacao in IMPORTAVEIS.items()
+        },
+    }
+
+
+# Entidades exportáveis: modelo e modelo de resposta (define as colunas e sua ordem)
+EXPORTAVEIS = {
+    "medicos": (Medico, MedicoResponse),
+    "hospitais": (Hospital, HospitalResponse),
+    "empresas": (Empresa, EmpresaResponse),
+    "plantoes": (Plantao, PlantaoResponse),
+    "tipos-plantao": (TipoPlantao, TipoPlantaoResponse),
+}
+
+# Exportação em CSV, transmitida em lotes (yield_per) sem carregar a tabela na memória
+@router.get("/exportar/{entidade}.csv")
+async def exportar_csv(entidade: str, current_user: User = Depends(get_current_active_user)):
+    if entidade not in EXPORTAVEIS:
+        raise HTTPException(status_code=404, detail=f"Entidade não exportável. Use: {', '.join(EXPORTAVEIS)}")
+    modelo, resposta = EXPORTAVEIS[entidade]
+    campos = [nome for nome in resposta.model_fields if nome in modelo.__table__.c]
+    consulta = consulta_leitura(modelo, campos).order_by(modelo.__table__.c.id)
+
+    async def gerar():
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        escritor.writerow(campos)
+        # Sessão própria: a de get_async_db é encerrada antes do envio do corpo
+        async with AsyncSessionLocal() as db:
+            async for lote in transmitir(db, consulta):
+                escritor.writerows(linha.values() for linha in lote)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    return StreamingResponse(
+        gerar(),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{entidade}.csv"'},
+    )
+
+
+# Entidades importáveis. As referências aceitam o id ou a chave natural
+# (ex.: medico_crm no lugar de medico_id), resolvidas por bloco com um IN
+IMPORTAVEIS = {
+    "medicos": EspecificacaoImportacao(Medico, MedicoCreate, cpf=["cpf"], emails=["email"]),
+    "empresas": EspecificacaoImportacao(Empresa, EmpresaCreate, cnpj=["cnpj"], emails=["email"], exige_admin=True),
+    "hospitais": EspecificacaoImportacao(
+        Hospital, HospitalCreate, emails=["email"], exige_admin=True,
+        referencias=[Referencia("empresa_id", Empresa, "Empresa", "cnpj", somente_digitos, variantes_cnpj, feminino=True)],
+    ),
+    "tipos-plantao": EspecificacaoImportacao(TipoPlantao, TipoPlantaoCreate, exige_admin=True),
+    "plantoes": EspecificacaoImportacao(
+        Plantao, PlantaoCreate, validar=consistencia_plantao,
+        referencias=[
+            Referencia("medico_id", Medico, "Médico", "crm"),
+            Referencia("hospital_id", Hospital, "Hospital", "nome"),
+            Referencia("tipo_plantao_id", TipoPlantao, "Tipo de plantão", "nome"),
+        ],
+    ),
+}
+
+def _tarefa_do_usuario(tarefa_id: str, current_user: User):
+    tarefa = importacoes.obter(tarefa_id)
+    # Importações de outros usuários aparecem como inexistentes (exceto para administradores)
+    if tarefa is None or (tarefa.usuario_id != current_user.id and not current_user.is_admin):
+        raise HTTPException(status_code=404, detail="Importação não encontrada")
+    return tarefa
+
+# Importação em CSV: o arquivo é gravado em disco e processado em segundo
+# plano, em blocos; acompanhe por GET /importacoes/{id}
+@router.post("/importar/{entidade}", response_model=TarefaImportacaoResponse, status_code=status.HTTP_202_ACCEPTED)
+async def importar_csv(
+    entidade: str,
+    arquivo: UploadFile = File(...),
+    codificacao: str = "utf-8-sig",
+    delimitador: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user),
+):
+    if entidade not in IMPORTAVEIS:
+        raise HTTPException(status_code=404, detail=f"Entidade não importável. Use: {', '.join(IMPORTAVEIS)}")
+    especificacao = IMPORTAVEIS[entidade]
+    if especificacao.exige_admin and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail=f"Sem permissão para importar {entidade}")
+    try:
+        codecs.lookup(codificacao)
+    except LookupError:
+        raise HTTPException(status_code=400, detail=f"Codificação desconhecida: {codificacao}")
+    if delimitador is not None and len(delimitador) != 1:
+        raise HTTPException(status_code=400, detail="O delimitador deve ter um caractere")
+
+    tarefa = importacoes.criar(entidade, especificacao, current_user.id, arquivo.filename, codificacao, delimitador)
+    try:
+        tarefa.bytes_total = await run_in_threadpool(
+            salvar_upload, arquivo.file, tarefa.caminho_arquivo, int(IMPORTACAO_MAX_MB * 1024 * 1024)
+        )
+    except ErroImportacao as e:
+        importacoes.remover(tarefa)
+        raise HTTPException(status_code=413, detail=str(e))
+    # As leituras e gravações da tarefa usam uma sessão própria, independente da requisição
+    importacoes.iniciar(tarefa, AsyncSessionLocal)
+    return tarefa.resumo()
+
+@router.get("/importacoes", response_model=List[TarefaImportacaoResponse])
+async def listar_importacoes(current_user: User = Depends(get_current_active_user)):
+    tarefas = importacoes.listar(None if current_user.is_admin else current_user.id)
+    return [tarefa.resumo() for tarefa in tarefas]
+
+@router.get("/importacoes/{tarefa_id}", response_model=TarefaImportacaoResponse)
+async def read_importacao(tarefa_id: str, current_user: User = Depends(get_current_active_user)):
+    return _tarefa_do_usuario(tarefa_id, current_user).resumo()
+
+# Relatório completo dos erros por linha (parcial enquanto a importação corre)
+@router.get("/importacoes/{tarefa_id}/erros.csv")
+async def read_erros_importacao(tarefa_id: str, current_user: User = Depends(get_current_active_user)):
+    tarefa = _tarefa_do_usuario(tarefa_id, current_user)
+    if not os.path.exists(tarefa.caminho_erros):
+        raise HTTPException(status_code=404, detail="Relatório ainda não disponível")
+    return StreamingResponse(
+        ler_relatorio(tarefa.caminho_erros),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="importacao_{tarefa.id}_erros.csv"'},
+    )
 
+# Cancela uma importação em andamento (os blocos já gravados permanecem) ou descarta uma encerrada
+@router.delete("/importacoes/{tarefa_id}", response_model=TarefaImportacaoResponse)
+async def delete_importacao(tarefa_id: str, current_user: User = Depends(get_current_active_user)):
+    tarefa = _tarefa_do_usuario(tarefa_id, current_user)
+    if not await importacoes.cancelar(tarefa):
+        importacoes.remover(tarefa)
+    return tarefa.resumo()
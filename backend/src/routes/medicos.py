@@ -1,11 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+from pydantic import BaseModel, ConfigDict
 from datetime import date
 
-from src.models import get_db, Medico
+from src.models import get_async_db, Medico
 from src.routes.auth import get_current_active_user, User
+from src.utils.busca import buscar_async
+from src.utils.lote_ids import BatchGetRequest, LoteIds, buscar_por_ids, interpretar_ids, validar_ids
+from src.utils.paginacao import PaginaCursor, aplicar_cursor, montar_pagina
+from src.utils.projecao import Projecao
 
 # Modelos Pydantic
 class MedicoBase(BaseModel):
@@ -38,15 +43,17 @@ class MedicoUpdate(MedicoBase):
 class MedicoResponse(MedicoBase):
     id: int
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Criar router
 router = APIRouter()
 
+# Ordenação da paginação por cursor
+CHAVE_CURSOR = (Medico.nome, Medico.id)
+
 # Rotas
 @router.post("/", response_model=MedicoResponse)
-async def create_medico(medico: MedicoCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+async def create_medico(medico: MedicoCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
     db_medico = Medico(
         nome=medico.nome,
         crm=medico.crm,
@@ -69,45 +76,70 @@ async def create_medico(medico: MedicoCreate, db: Session = Depends(get_db), cur
         is_active=medico.is_active
     )
     db.add(db_medico)
-    db.commit()
-    db.refresh(db_medico)
+    await db.commit()
+    await db.refresh(db_medico)
     return db_medico
 
-@router.get("/", response_model=List[MedicoResponse])
-async def read_medicos(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    medicos = db.query(Medico).offset(skip).limit(limit).all()
-    return medicos
+@router.post("/batch-get", response_model=LoteIds[MedicoResponse])
+async def batch_get_medicos(requisicao: BatchGetRequest, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    return await buscar_por_ids(db, select(Medico), Medico, validar_ids(requisicao.ids))
+
+@router.get("/", response_model=Union[List[MedicoResponse], LoteIds[MedicoResponse], PaginaCursor[MedicoResponse]])
+async def read_medicos(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, search: Optional[str] = None, ids: Optional[str] = None, fields: Optional[str] = None, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    # Serializa direto as colunas (todas as do modelo de resposta ou só as de ?fields=id,nome), sem entidades ORM
+    projecao = Projecao(Medico, MedicoResponse, fields, extras=CHAVE_CURSOR)
+    
+    # Busca em lote por ids (?ids=1,2,3), em uma única consulta
+    if ids is not None:
+        if cursor is not None or search:
+            raise HTTPException(status_code=400, detail="ids não pode ser combinado com busca ou paginação por cursor")
+        return projecao.responder(await buscar_por_ids(db, projecao.consulta(), Medico, interpretar_ids(ids), projetada=True))
+    
+    # Busca ranqueada por similaridade (sem acentos e sem diferenciar maiúsculas)
+    if search and search.strip():
+        if cursor is not None:
+            raise HTTPException(status_code=400, detail="A busca não pode ser combinada com paginação por cursor")
+        return projecao.responder(await buscar_async(db, projecao.consulta(), Medico, search, skip, limit, projetada=True))
+    
+    # Paginação por cursor quando `cursor` é informado (vazio na primeira página)
+    if cursor is not None:
+        result = await db.execute(aplicar_cursor(projecao.consulta(), CHAVE_CURSOR, cursor, limit))
+        return projecao.responder(montar_pagina(projecao.linhas(result), CHAVE_CURSOR, limit))
+    
+    result = await db.execute(projecao.consulta().offset(skip).limit(limit))
+    medicos = projecao.linhas(result)
+    return projecao.responder(medicos)
 
 @router.get("/{medico_id}", response_model=MedicoResponse)
-async def read_medico(medico_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    db_medico = db.query(Medico).filter(Medico.id == medico_id).first()
+async def read_medico(medico_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    db_medico = await db.get(Medico, medico_id)
     if db_medico is None:
         raise HTTPException(status_code=404, detail="Médico não encontrado")
     return db_medico
 
 @router.put("/{medico_id}", response_model=MedicoResponse)
-async def update_medico(medico_id: int, medico: MedicoUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    db_medico = db.query(Medico).filter(Medico.id == medico_id).first()
+async def update_medico(medico_id: int, medico: MedicoUpdate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    db_medico = await db.get(Medico, medico_id)
     if db_medico is None:
         raise HTTPException(status_code=404, detail="Médico não encontrado")
     
-    for key, value in medico.dict().items():
+    for key, value in medico.model_dump().items():
         setattr(db_medico, key, value)
     
-    db.commit()
-    db.refresh(db_medico)
+    await db.commit()
+    await db.refresh(db_medico)
     return db_medico
 
 @router.delete("/{medico_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_medico(medico_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+async def delete_medico(medico_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Sem permissão para excluir médicos")
     
-    db_medico = db.query(Medico).filter(Medico.id == medico_id).first()
+    db_medico = await db.get(Medico, medico_id)
     if db_medico is None:
         raise HTTPException(status_code=404, detail="Médico não encontrado")
     
-    db.delete(db_medico)
-    db.commit()
+    await db.delete(db_medico)
+    await db.commit()
     return None
 
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from src.models import db
 from src.models.fiscais_usuarios import ParametrosFiscaisEmpresa
+from src.utils.paginacao import paginar_sem_contagem
 
 parametros_fiscais_empresa_bp = Blueprint('parametros_fiscais_empresa', __name__)
 
@@ -22,22 +23,17 @@ def list_parametros_fiscais_empresa():
                 )
             )
         
-        items = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
+        # Sem COUNT(*) por página; o total só é calculado com ?total=1|estimado
+        items, pagination = paginar_sem_contagem(
+            query,
+            page=page,
+            per_page=per_page,
+            total=request.args.get('total')
         )
         
         return jsonify({
-            'data': [item.to_dict() for item in items.items],
-            'pagination': {
-                'page': items.page,
-                'pages': items.pages,
-                'per_page': items.per_page,
-                'total': items.total,
-                'has_next': items.has_next,
-                'has_prev': items.has_prev
-            }
+            'data': [item.to_dict() for item in items],
+            'pagination': pagination
         }), 200
         
     except Exception as e:
@@ -1,11 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from pydantic import BaseModel
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Set, Union
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 
-from src.models import get_db, Plantao, Medico, Hospital, TipoPlantao
+from src.models import get_async_db, Plantao, Medico, Hospital, TipoPlantao
+from src.models.perfis_carga import com_perfil
 from src.routes.auth import get_current_active_user, User
+from src.utils.auditoria import auditar_lote
+from src.utils.lote_ids import BatchGetRequest, LoteIds, buscar_por_ids, interpretar_ids, validar_ids
+from src.utils.paginacao import PaginaCursor, aplicar_cursor, montar_pagina
+from src.utils.projecao import Projecao
 
 # Modelos Pydantic
 class PlantaoBase(BaseModel):
@@ -29,27 +35,123 @@ class PlantaoResponse(PlantaoBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class MedicoResumo(BaseModel):
+    id: int
+    nome: str
+    crm: str
+    
+    model_config = ConfigDict(from_attributes=True)
+
+class EmpresaResumo(BaseModel):
+    id: int
+    nome: str
+    
+    model_config = ConfigDict(from_attributes=True)
+
+class HospitalResumo(BaseModel):
+    id: int
+    nome: str
+    empresa: Optional[EmpresaResumo] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
+class TipoPlantaoResumo(BaseModel):
+    id: int
+    nome: str
+    
+    model_config = ConfigDict(from_attributes=True)
+
+class PlantaoDetalhadoResponse(PlantaoResponse):
+    medico: MedicoResumo
+    hospital: HospitalResumo
+    tipo_plantao: TipoPlantaoResumo
+
+class PlantaoBulkRequest(BaseModel):
+    plantoes: List[PlantaoCreate]
+    # Com atomico=True, qualquer erro cancela a importação inteira
+    atomico: bool = False
+
+class ErroPlantaoBulk(BaseModel):
+    indice: int
+    erros: List[str]
+
+class PlantaoBulkResponse(BaseModel):
+    criados: int
+    # Id criado para cada plantão enviado, na mesma ordem (None se rejeitado)
+    ids: List[Optional[int]]
+    erros: List[ErroPlantaoBulk]
 
 # Criar router
 router = APIRouter()
 
+# Ordenação da paginação por cursor
+CHAVE_CURSOR = (Plantao.data_inicio, Plantao.id)
+
+# Importação em lote
+MAXIMO_BULK = 10_000
+TAMANHO_LOTE_BULK = 1_000
+STATUS_PLANTAO = {"agendado", "realizado", "cancelado"}
+
+async def _referencias_ativas(db: AsyncSession, modelo, ids: Set[int]) -> Dict[int, bool]:
+    """id -> is_active dos registros existentes, em uma única consulta IN."""
+    if not ids:
+        return {}
+    result = await db.execute(select(modelo.id, modelo.is_active).where(modelo.id.in_(ids)))
+    return {id_: ativo is not False for id_, ativo in result.all()}
+
+def consistencia_plantao(plantao: PlantaoCreate) -> List[str]:
+    """Problemas do plantão que não dependem do banco (período e status)."""
+    problemas = []
+    if plantao.data_fim <= plantao.data_inicio:
+        problemas.append("data_fim deve ser posterior a data_inicio")
+    if plantao.status not in STATUS_PLANTAO:
+        problemas.append(f"Status inválido: {plantao.status}")
+    return problemas
+
+async def validar_plantoes(db: AsyncSession, plantoes: List[PlantaoCreate]) -> Dict[int, List[str]]:
+    """
+    Valida referências e consistência de todos os plantões com uma consulta por tabela.
+
+    O plantão do modelo em uso não tem contrato_id: o vínculo contrato /
+    ContratoTipoPlantao só existe em src/models/contrato.py, fora do schema
+    da API, e por isso não há o que conferir aqui.
+    """
+    referencias = {}
+    for campo, modelo in (("medico_id", Medico), ("hospital_id", Hospital), ("tipo_plantao_id", TipoPlantao)):
+        referencias[campo] = await _referencias_ativas(db, modelo, {getattr(p, campo) for p in plantoes})
+
+    nomes = {"medico_id": "Médico", "hospital_id": "Hospital", "tipo_plantao_id": "Tipo de plantão"}
+    erros: Dict[int, List[str]] = {}
+    for indice, plantao in enumerate(plantoes):
+        problemas = []
+        for campo, existentes in referencias.items():
+            id_ = getattr(plantao, campo)
+            if id_ not in existentes:
+                problemas.append(f"{nomes[campo]} {id_} não encontrado")
+            elif not existentes[id_]:
+                problemas.append(f"{nomes[campo]} {id_} está inativo")
+        problemas.extend(consistencia_plantao(plantao))
+        if problemas:
+            erros[indice] = problemas
+    return erros
+
 # Rotas
 @router.post("/", response_model=PlantaoResponse)
-async def create_plantao(plantao: PlantaoCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+async def create_plantao(plantao: PlantaoCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
     # Verificar se o médico existe
-    medico = db.query(Medico).filter(Medico.id == plantao.medico_id).first()
+    medico = await db.get(Medico, plantao.medico_id)
     if not medico:
         raise HTTPException(status_code=404, detail="Médico não encontrado")
     
     # Verificar se o hospital existe
-    hospital = db.query(Hospital).filter(Hospital.id == plantao.hospital_id).first()
+    hospital = await db.get(Hospital, plantao.hospital_id)
     if not hospital:
         raise HTTPException(status_code=404, detail="Hospital não encontrado")
     
     # Verificar se o tipo de plantão existe
-    tipo_plantao = db.query(TipoPlantao).filter(TipoPlantao.id == plantao.tipo_plantao_id).first()
+    tipo_plantao = await db.get(TipoPlantao, plantao.tipo_plantao_id)
     if not tipo_plantao:
         raise HTTPException(status_code=404, detail="Tipo de plantão não encontrado")
     
@@ -64,57 +166,137 @@ async def create_plantao(plantao: PlantaoCreate, db: Session = Depends(get_db),
         observacoes=plantao.observacoes
     )
     db.add(db_plantao)
-    db.commit()
-    db.refresh(db_plantao)
+    await db.commit()
+    await db.refresh(db_plantao)
     return db_plantao
 
-@router.get("/", response_model=List[PlantaoResponse])
-async def read_plantoes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    plantoes = db.query(Plantao).offset(skip).limit(limit).all()
-    return plantoes
+@router.post("/bulk", response_model=PlantaoBulkResponse)
+async def create_plantoes_bulk(requisicao: PlantaoBulkRequest, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    plantoes = requisicao.plantoes
+    if len(plantoes) > MAXIMO_BULK:
+        raise HTTPException(status_code=413, detail=f"Envie no máximo {MAXIMO_BULK} plantões por requisição")
+    
+    erros = await validar_plantoes(db, plantoes)
+    lista_erros = [ErroPlantaoBulk(indice=i, erros=e) for i, e in sorted(erros.items())]
+    if erros and requisicao.atomico:
+        raise HTTPException(status_code=422, detail=[e.model_dump() for e in lista_erros])
+    
+    validos = [i for i in range(len(plantoes)) if i not in erros]
+    ids: List[Optional[int]] = [None] * len(plantoes)
+    for inicio in range(0, len(validos), TAMANHO_LOTE_BULK):
+        lote = validos[inicio:inicio + TAMANHO_LOTE_BULK]
+        try:
+            # sort_by_parameter_order garante que o RETURNING venha na ordem
+            # dos parâmetros (o banco não garante a ordem por si)
+            result = await db.execute(
+                insert(Plantao).returning(Plantao.id, sort_by_parameter_order=True),
+                [plantoes[i].model_dump() for i in lote],
+            )
+            for indice, id_ in zip(lote, result.scalars().all()):
+                ids[indice] = id_
+            # Sem atomico, cada lote gravado é preservado mesmo se um lote seguinte falhar
+            if not requisicao.atomico:
+                await db.commit()
+        except Exception as e:
+            await db.rollback()
+            if requisicao.atomico:
+                raise
+            for indice in lote:
+                ids[indice] = None
+                lista_erros.append(ErroPlantaoBulk(indice=indice, erros=[f"Erro ao gravar: {e.__class__.__name__}"]))
+    if requisicao.atomico:
+        await db.commit()
+    # Um registro de auditoria para o lote inteiro (o insert() Core não passa pelo flush do ORM)
+    auditar_lote(Plantao.__tablename__, "create_lote", [id_ for id_ in ids if id_ is not None])
+    
+    lista_erros.sort(key=lambda erro: erro.indice)
+    return PlantaoBulkResponse(criados=sum(id_ is not None for id_ in ids), ids=ids, erros=lista_erros)
+
+@router.post("/batch-get", response_model=LoteIds[PlantaoResponse])
+async def batch_get_plantoes(requisicao: BatchGetRequest, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    return await buscar_por_ids(db, select(Plantao), Plantao, validar_ids(requisicao.ids))
+
+@router.get("/", response_model=Union[List[PlantaoResponse], LoteIds[PlantaoResponse], PaginaCursor[PlantaoResponse]])
+async def read_plantoes(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, ids: Optional[str] = None, fields: Optional[str] = None, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    # Serializa direto as colunas (todas as do modelo de resposta ou só as de ?fields=id,valor), sem entidades ORM
+    projecao = Projecao(Plantao, PlantaoResponse, fields, extras=CHAVE_CURSOR)
+    
+    # Busca em lote por ids (?ids=1,2,3), em uma única consulta
+    if ids is not None:
+        if cursor is not None:
+            raise HTTPException(status_code=400, detail="ids não pode ser combinado com paginação por cursor")
+        return projecao.responder(await buscar_por_ids(db, projecao.consulta(), Plantao, interpretar_ids(ids), projetada=True))
+    
+    # Paginação por cursor quando `cursor` é informado (vazio na primeira página)
+    if cursor is not None:
+        result = await db.execute(aplicar_cursor(projecao.consulta(), CHAVE_CURSOR, cursor, limit))
+        return projecao.responder(montar_pagina(projecao.linhas(result), CHAVE_CURSOR, limit))
+    
+    result = await db.execute(projecao.consulta().offset(skip).limit(limit))
+    plantoes = projecao.linhas(result)
+    return projecao.responder(plantoes)
+
+# Plantões com médico, hospital/empresa e tipo, carregados pelo perfil "plantao.detalhado"
+@router.get("/detalhados", response_model=Union[List[PlantaoDetalhadoResponse], PaginaCursor[PlantaoDetalhadoResponse]])
+async def read_plantoes_detalhados(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    consulta = com_perfil(select(Plantao), "plantao.detalhado")
+    if cursor is not None:
+        result = await db.execute(aplicar_cursor(consulta, CHAVE_CURSOR, cursor, limit))
+        return montar_pagina(result.scalars().all(), CHAVE_CURSOR, limit)
+    
+    result = await db.execute(consulta.order_by(*CHAVE_CURSOR).offset(skip).limit(limit))
+    return result.scalars().all()
+
+@router.get("/{plantao_id}/detalhado", response_model=PlantaoDetalhadoResponse)
+async def read_plantao_detalhado(plantao_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    result = await db.execute(com_perfil(select(Plantao), "plantao.detalhado").where(Plantao.id == plantao_id))
+    db_plantao = result.scalars().first()
+    if db_plantao is None:
+        raise HTTPException(status_code=404, detail="Plantão não encontrado")
+    return db_plantao
 
 @router.get("/{plantao_id}", response_model=PlantaoResponse)
-async def read_plantao(plantao_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    db_plantao = db.query(Plantao).filter(Plantao.id == plantao_id).first()
+async def read_plantao(plantao_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    db_plantao = await db.get(Plantao, plantao_id)
     if db_plantao is None:
         raise HTTPException(status_code=404, detail="Plantão não encontrado")
     return db_plantao
 
 @router.put("/{plantao_id}", response_model=PlantaoResponse)
-async def update_plantao(plantao_id: int, plantao: PlantaoUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    db_plantao = db.query(Plantao).filter(Plantao.id == plantao_id).first()
+async def update_plantao(plantao_id: int, plantao: PlantaoUpdate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    db_plantao = await db.get(Plantao, plantao_id)
     if db_plantao is None:
         raise HTTPException(status_code=404, detail="Plantão não encontrado")
     
     # Verificar se o médico existe
-    medico = db.query(Medico).filter(Medico.id == plantao.medico_id).first()
+    medico = await db.get(Medico, plantao.medico_id)
     if not medico:
         raise HTTPException(status_code=404, detail="Médico não encontrado")
     
     # Verificar se o hospital existe
-    hospital = db.query(Hospital).filter(Hospital.id == plantao.hospital_id).first()
+    hospital = await db.get(Hospital, plantao.hospital_id)
     if not hospital:
         raise HTTPException(status_code=404, detail="Hospital não encontrado")
     
     # Verificar se o tipo de plantão existe
-    tipo_plantao = db.query(TipoPlantao).filter(TipoPlantao.id == plantao.tipo_plantao_id).first()
+    tipo_plantao = await db.get(TipoPlantao, plantao.tipo_plantao_id)
     if not tipo_plantao:
         raise HTTPException(status_code=404, detail="Tipo de plantão não encontrado")
     
-    for key, value in plantao.dict().items():
+    for key, value in plantao.model_dump().items():
         setattr(db_plantao, key, value)
     
-    db.commit()
-    db.refresh(db_plantao)
+    await db.commit()
+    await db.refresh(db_plantao)
     return db_plantao
 
 @router.delete("/{plantao_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_plantao(plantao_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    db_plantao = db.query(Plantao).filter(Plantao.id == plantao_id).first()
+async def delete_plantao(plantao_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    db_plantao = await db.get(Plantao, plantao_id)
     if db_plantao is None:
         raise HTTPException(status_code=404, detail="Plantão não encontrado")
     
-    db.delete(db_plantao)
-    db.commit()
+    await db.delete(db_plantao)
+    await db.commit()
     return None
 
@@ -1,11 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 
-from src.models import get_db, User
+from src.models import get_db, get_async_db, User, Medico, Plantao
 from src.routes.auth import get_current_active_user
+from src.utils.leitura import ler
+from src.utils.particoes import competencia_de, ler_arquivados
+
+# Modelos Pydantic
+class PlantoesMedicoResponse(BaseModel):
+    medico_id: int
+    medico: str
+    quantidade: int
+    valor_total: float
 
 # Criar router
 router = APIRouter()
@@ -15,3 +26,54 @@ router = APIRouter()
 async def read_relatorios(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
     return {"message": "Endpoint de relatórios em desenvolvimento"}
 
+
+def _plantoes_arquivados(sessao, inicio: date, fim: date, hospital_id: Optional[int]):
+    """(quantidade, valor) por médico dos plantões exportados (particoes.py arquivar) que caem no período."""
+    filtros = {"hospital_id": hospital_id} if hospital_id is not None else {}
+    limite_inicio = datetime.combine(inicio, datetime.min.time())
+    limite_fim = datetime.combine(fim + timedelta(days=1), datetime.min.time())
+    totais = {}
+    for plantao in ler_arquivados(sessao.connection(), "plantoes", competencia_de(inicio), competencia_de(fim), **filtros):
+        data_inicio = plantao["data_inicio"].replace(tzinfo=None)
+        if not limite_inicio <= data_inicio < limite_fim:
+            continue
+        quantidade, valor = totais.get(plantao["medico_id"], (0, 0.0))
+        totais[plantao["medico_id"]] = (quantidade + 1, valor + float(plantao["valor"] or 0))
+    return totais
+
+
+# Resumo de plantões por médico no período (agregado no banco, sem entidades ORM;
+# competências exportadas para arquivo entram quando o período as alcança)
+@router.get("/plantoes-por-medico", response_model=List[PlantoesMedicoResponse])
+async def relatorio_plantoes_por_medico(inicio: date, fim: date, hospital_id: Optional[int] = None, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    if fim < inicio:
+        raise HTTPException(status_code=400, detail="fim deve ser posterior a inicio")
+    plantoes = Plantao.__table__
+    medicos = Medico.__table__
+    consulta = (
+        select(
+            medicos.c.id.label("medico_id"),
+            medicos.c.nome.label("medico"),
+            func.count(plantoes.c.id).label("quantidade"),
+            func.coalesce(func.sum(plantoes.c.valor), 0).label("valor_total"),
+        )
+        .join_from(plantoes, medicos, plantoes.c.medico_id == medicos.c.id)
+        .where(plantoes.c.data_inicio >= inicio, plantoes.c.data_inicio < fim + timedelta(days=1))
+        .group_by(medicos.c.id, medicos.c.nome)
+        .order_by(medicos.c.nome)
+    )
+    if hospital_id is not None:
+        consulta = consulta.where(plantoes.c.hospital_id == hospital_id)
+    resumo = {linha["medico_id"]: dict(linha) for linha in await ler(db, consulta)}
+    arquivados = await db.run_sync(_plantoes_arquivados, inicio, fim, hospital_id)
+    if not arquivados:
+        return list(resumo.values())
+    faltando = [medico_id for medico_id in arquivados if medico_id not in resumo]
+    if faltando:
+        for linha in await ler(db, select(medicos.c.id, medicos.c.nome).where(medicos.c.id.in_(faltando))):
+            resumo[linha["id"]] = {"medico_id": linha["id"], "medico": linha["nome"], "quantidade": 0, "valor_total": 0}
+    for medico_id, (quantidade, valor) in arquivados.items():
+        if medico_id in resumo:
+            resumo[medico_id]["quantidade"] += quantidade
+            resumo[medico_id]["valor_total"] = float(resumo[medico_id]["valor_total"]) + valor
+    return sorted(resumo.values(), key=lambda item: item["medico"])
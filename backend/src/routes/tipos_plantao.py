@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from pydantic import BaseModel
+from typing import List, Optional, Union
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 
 from src.models import get_db, TipoPlantao
 from src.routes.auth import get_current_active_user, User
+from src.utils.lote_ids import BatchGetRequest, LoteIds, filtrar_ids, interpretar_ids, montar_lote, validar_ids
+from src.utils.paginacao import PaginaCursor, aplicar_cursor, montar_pagina
+from src.utils.projecao import Projecao
 
 # Modelos Pydantic
 class TipoPlantaoBase(BaseModel):
@@ -24,12 +27,14 @@ class TipoPlantaoResponse(TipoPlantaoBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Criar router
 router = APIRouter()
 
+# Ordenação da paginação por cursor
+CHAVE_CURSOR = (TipoPlantao.nome, TipoPlantao.id)
+
 # Rotas
 @router.post("/", response_model=TipoPlantaoResponse)
 async def create_tipo_plantao(tipo_plantao: TipoPlantaoCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
@@ -46,10 +51,30 @@ async def create_tipo_plantao(tipo_plantao: TipoPlantaoCreate, db: Session = Dep
     db.refresh(db_tipo_plantao)
     return db_tipo_plantao
 
-@router.get("/", response_model=List[TipoPlantaoResponse])
-async def read_tipos_plantao(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    tipos_plantao = db.query(TipoPlantao).offset(skip).limit(limit).all()
-    return tipos_plantao
+@router.post("/batch-get", response_model=LoteIds[TipoPlantaoResponse])
+async def batch_get_tipos_plantao(requisicao: BatchGetRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+    ids = validar_ids(requisicao.ids)
+    return montar_lote(filtrar_ids(db.query(TipoPlantao), TipoPlantao, ids).all() if ids else [], ids)
+
+@router.get("/", response_model=Union[List[TipoPlantaoResponse], LoteIds[TipoPlantaoResponse], PaginaCursor[TipoPlantaoResponse]])
+async def read_tipos_plantao(skip: int = 0, limit: int = 100, cursor: Optional[str] = None, ids: Optional[str] = None, fields: Optional[str] = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+    # Serializa direto as colunas (todas as do modelo de resposta ou só as de ?fields=id,nome), sem entidades ORM
+    projecao = Projecao(TipoPlantao, TipoPlantaoResponse, fields, extras=CHAVE_CURSOR)
+    
+    # Busca em lote por ids (?ids=1,2,3), em uma única consulta
+    if ids is not None:
+        if cursor is not None:
+            raise HTTPException(status_code=400, detail="ids não pode ser combinado com paginação por cursor")
+        lista_ids = interpretar_ids(ids)
+        return projecao.responder(montar_lote(filtrar_ids(projecao.query(db), TipoPlantao, lista_ids).all() if lista_ids else [], lista_ids))
+    
+    # Paginação por cursor quando `cursor` é informado (vazio na primeira página)
+    if cursor is not None:
+        itens = aplicar_cursor(projecao.query(db), CHAVE_CURSOR, cursor, limit).all()
+        return projecao.responder(montar_pagina(itens, CHAVE_CURSOR, limit))
+    
+    tipos_plantao = projecao.query(db).offset(skip).limit(limit).all()
+    return projecao.responder(tipos_plantao)
 
 @router.get("/{tipo_plantao_id}", response_model=TipoPlantaoResponse)
 async def read_tipo_plantao(tipo_plantao_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
@@ -67,7 +92,7 @@ async def update_tipo_plantao(tipo_plantao_id: int, tipo_plantao: TipoPlantaoUpd
     if db_tipo_plantao is None:
         raise HTTPException(status_code=404, detail="Tipo de plantão não encontrado")
     
-    for key, value in tipo_plantao.dict().items():
+    for key, value in tipo_plantao.model_dump().items():
         setattr(db_tipo_plantao, key, value)
     
     db.commit()
@@ -2,6 +2,8 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from src.models import db
 from src.models.user import User
+from src.utils.busca import filtrar_busca
+from src.utils.paginacao import paginar_sem_contagem
 
 usuarios_bp = Blueprint('usuarios', __name__)
 
@@ -16,29 +18,20 @@ def list_usuarios():
         
         query = User.query
         if search:
-            query = query.filter(
-                db.or_(
-                    User.nome.ilike(f'%{search}%'),
-                    User.email.ilike(f'%{search}%')
-                )
-            )
-        
-        items = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
+            # Busca ranqueada sem acentos (pg_trgm ou índice n-grama local)
+            query = filtrar_busca(db.session, query, User, search)
+        
+        # Sem COUNT(*) por página; o total só é calculado com ?total=1|estimado
+        items, pagination = paginar_sem_contagem(
+            query,
+            page=page,
+            per_page=per_page,
+            total=request.args.get('total')
         )
         
         return jsonify({
-            'data': [item.to_dict() for item in items.items],
-            'pagination': {
-                'page': items.page,
-                'pages': items.pages,
-                'per_page': items.per_page,
-                'total': items.total,
-                'has_next': items.has_next,
-                'has_prev': items.has_prev
-            }
+            'data': [item.to_dict() for item in items],
+            'pagination': pagination
         }), 200
         
     except Exception as e:
@@ -0,0 +1,379 @@
+"""
+Histórico de operações (auditoria) gravado em segundo plano.
+
+As alterações feitas pelo ORM nos modelos registrados com
+registrar_auditoria(), em sessões da classe passada a auditar_sessoes(), são
+capturadas no flush (evento after_flush), só com
+as colunas que mudaram, lidas do histórico de atributos do SQLAlchemy:
+criação grava os valores preenchidos em `dados_novos`, atualização grava o
+antes e o depois apenas das colunas alteradas e exclusão grava a linha em
+`dados_anteriores`. Os registros ficam na sessão até o commit (um rollback
+os descarta) e então vão para a fila do EscritorAuditoria, que os grava em
+lotes numa thread própria, fora da requisição.
+
+Escritas em lote com insert()/update() Core não passam pelo flush e devem
+chamar auditar_lote(), que gera um único registro compacto para o lote;
+escritas em lote pelo ORM (importação de CSV) fazem o mesmo dentro de
+sem_captura_por_linha(), que desliga a captura linha a linha na sessão. O
+usuário e o IP vêm de definir_origem(), chamado na autenticação.
+
+Na parada da aplicação (e no atexit) o escritor esvazia a fila; o que não
+puder ser gravado, ou não couber na fila, vai para AUDITORIA_PENDENTES
+(JSON Lines) e é reenviado na próxima inicialização.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, time as hora
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+from uuid import UUID
+
+import orjson
+from sqlalchemy import event, insert, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("medflow-auditoria")
+
+AUDITORIA_LOTE = int(os.getenv("AUDITORIA_LOTE", "500"))
+AUDITORIA_INTERVALO_MS = float(os.getenv("AUDITORIA_INTERVALO_MS", "200"))
+AUDITORIA_FILA_MAX = int(os.getenv("AUDITORIA_FILA_MAX", "10000"))
+AUDITORIA_PENDENTES = os.getenv(
+    "AUDITORIA_PENDENTES",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "auditoria_pendente.jsonl"),
+)
+
+# Colunas mantidas pelo próprio banco ou derivadas: não entram no histórico
+IGNORADAS_PADRAO = ("created_at", "updated_at", "busca")
+SIGILO = "***"
+
+_origem: ContextVar[Tuple[Optional[int], Optional[str]]] = ContextVar("origem_auditoria", default=(None, None))
+
+# classe do modelo -> (colunas ignoradas, colunas sigilosas)
+_auditados: Dict[type, Tuple[frozenset, frozenset]] = {}
+
+
+def registrar_auditoria(modelo, ignorar: Sequence[str] = IGNORADAS_PADRAO, sigilosos: Sequence[str] = ()):
+    """Audita as criações, alterações e exclusões do modelo feitas pelo ORM."""
+    _auditados[modelo] = (frozenset(ignorar), frozenset(sigilosos))
+    # Atribuir a uma coluna expirada (depois de um commit) carrega o valor
+    # anterior; sem isso o histórico do atributo não teria o "antes"
+    for atributo in modelo.__mapper__.column_attrs:
+        if atributo.key not in ignorar:
+            event.listen(getattr(modelo, atributo.key), "set", _nada, active_history=True)
+
+
+def _nada(*args):
+    pass
+
+
+def definir_origem(usuario_id: Optional[int], ip: Optional[str] = None):
+    """Usuário e IP atribuídos às operações auditadas da requisição atual."""
+    _origem.set((usuario_id, ip))
+
+
+def _valor(valor: Any) -> Any:
+    if isinstance(valor, (datetime, date, hora)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, UUID):
+        return str(valor)
+    if isinstance(valor, bytes):
+        return valor.hex()
+    return valor
+
+
+def _intervalos(ids: Iterable[int]) -> List[List[int]]:
+    """[1, 2, 3, 7, 8] -> [[1, 3], [7, 8]]: ids de um lote ocupam pouco espaço no JSON."""
+    intervalos: List[List[int]] = []
+    for id_ in sorted(ids):
+        if intervalos and id_ == intervalos[-1][1] + 1:
+            intervalos[-1][1] = id_
+        else:
+            intervalos.append([id_, id_])
+    return intervalos
+
+
+# ---------------------------------------------------------------------------
+# Captura no flush
+# ---------------------------------------------------------------------------
+
+def _registro(tipo: str, tabela: str, entidade_id, anteriores, novos) -> Dict[str, Any]:
+    usuario_id, ip = _origem.get()
+    agora = datetime.now().astimezone()
+    return {
+        "usuario_id": usuario_id,
+        "tipo_operacao": tipo,
+        "entidade": tabela,
+        "entidade_id": entidade_id,
+        "dados_anteriores": anteriores,
+        "dados_novos": novos,
+        "data_hora": agora,
+        "ip_origem": ip,
+        "competencia": f"{agora.year:04d}-{agora.month:02d}",
+    }
+
+
+def _colunas(estado, ignoradas):
+    for atributo in estado.mapper.column_attrs:
+        if atributo.key not in ignoradas:
+            yield atributo.key
+
+
+def _capturar(estado, tipo: str) -> Optional[Dict[str, Any]]:
+    tabela = estado.mapper.local_table.name
+    ignoradas, sigilosas = _auditados[estado.mapper.class_]
+    anteriores, novos = {}, {}
+    for chave in _colunas(estado, ignoradas):
+        if tipo == "create":
+            valor = estado.dict.get(chave)
+            if valor is not None:
+                novos[chave] = SIGILO if chave in sigilosas else _valor(valor)
+        elif tipo == "delete":
+            valor = estado.dict.get(chave)
+            if valor is not None:
+                anteriores[chave] = SIGILO if chave in sigilosas else _valor(valor)
+        else:
+            historico = estado.attrs[chave].history
+            if not historico.has_changes():
+                continue
+            anterior = historico.deleted[0] if historico.deleted else None
+            novo = historico.added[0] if historico.added else None
+            if anterior == novo and historico.deleted:
+                continue
+            anteriores[chave] = SIGILO if chave in sigilosas else _valor(anterior)
+            novos[chave] = SIGILO if chave in sigilosas else _valor(novo)
+    if tipo == "update" and not novos:
+        return None
+    # A identidade dos objetos novos só é registrada depois do after_flush: lê a chave dos atributos
+    chave_primaria = estado.mapper.primary_key_from_instance(estado.obj())
+    entidade_id = chave_primaria[0] if len(chave_primaria) == 1 else None
+    return _registro(tipo, tabela, _valor(entidade_id), anteriores or None, novos or None)
+
+
+def auditar_sessoes(classe_sessao: Type[Session]):
+    """
+    Captura as alterações das sessões de `classe_sessao` (a SessaoRoteada da
+    aplicação). Sessões de outras classes, como as dos scripts e testes, não
+    são auditadas nem passam pelo escritor da aplicação.
+    """
+    if not event.contains(classe_sessao, "after_flush", _capturar_alteracoes):
+        event.listen(classe_sessao, "after_flush", _capturar_alteracoes)
+        event.listen(classe_sessao, "after_commit", _enfileirar_apos_commit)
+        event.listen(classe_sessao, "after_rollback", _descartar_apos_rollback)
+
+
+def _capturar_alteracoes(sessao, contexto):
+    if not _auditados or sessao.info.get("auditoria_em_lote"):
+        return
+    registros = []
+    for tipo, objetos in (("create", sessao.new), ("update", sessao.dirty), ("delete", sessao.deleted)):
+        for objeto in objetos:
+            estado = inspect(objeto)
+            if estado.mapper.class_ not in _auditados:
+                continue
+            registro = _capturar(estado, tipo)
+            if registro is not None:
+                registros.append(registro)
+    if registros:
+        sessao.info.setdefault("auditoria_pendente", []).extend(registros)
+
+
+def _enfileirar_apos_commit(sessao):
+    registros = sessao.info.pop("auditoria_pendente", None)
+    if registros:
+        escritor_auditoria.enfileirar(registros)
+
+
+def _descartar_apos_rollback(sessao):
+    sessao.info.pop("auditoria_pendente", None)
+
+
+@contextmanager
+def sem_captura_por_linha(sessao):
+    """Desliga a captura no flush da sessão; quem escreve chama auditar_lote() depois do commit."""
+    sessao.info["auditoria_em_lote"] = True
+    try:
+        yield
+    finally:
+        sessao.info.pop("auditoria_em_lote", None)
+
+
+def auditar_lote(entidade: str, tipo_operacao: str, ids: Sequence[int], dados: Optional[Dict[str, Any]] = None):
+    """
+    Registro único para uma escrita em lote (insert()/update() Core).
+
+    `dados_novos` guarda a quantidade, os ids em intervalos e, opcionalmente,
+    `dados` comuns ao lote. Chamar depois do commit.
+    """
+    if not ids:
+        return
+    novos = {"quantidade": len(ids), "ids": _intervalos(ids), **(dados or {})}
+    escritor_auditoria.enfileirar([_registro(tipo_operacao, entidade, None, None, novos)])
+
+
+# ---------------------------------------------------------------------------
+# Escritor em segundo plano
+# ---------------------------------------------------------------------------
+
+class EscritorAuditoria:
+    """
+    Grava os registros de auditoria em lotes (até `lote` registros ou a cada
+    `intervalo_ms`) numa thread daemon, com um INSERT executemany por lote.
+
+    A fila é limitada e quem enfileira nunca espera (o after_commit roda no
+    laço de eventos): se o banco não acompanhar, o excedente vai para
+    `pendentes` e é reenviado na próxima inicialização.
+    """
+
+    def __init__(self, lote: int = AUDITORIA_LOTE, intervalo_ms: float = AUDITORIA_INTERVALO_MS,
+                 fila_max: int = AUDITORIA_FILA_MAX, pendentes: str = AUDITORIA_PENDENTES, tentativas: int = 3):
+        self.lote = lote
+        self.intervalo_s = intervalo_ms / 1000
+        self.pendentes = pendentes
+        self.tentativas = tentativas
+        self._fila: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=fila_max)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.engine = None
+        self.tabela = None
+        self.gravados = 0
+        self.lotes = 0
+        self.falhas = 0
+
+    def configurar(self, engine, tabela):
+        """Engine (primário) e tabela de destino; a thread só inicia no primeiro registro."""
+        self.engine = engine
+        self.tabela = tabela
+
+    @property
+    def na_fila(self) -> int:
+        return self._fila.qsize()
+
+    def _iniciar(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._executar, name="medflow-auditoria", daemon=True)
+            self._thread.start()
+        self._reenviar_pendentes()
+
+    def enfileirar(self, registros: Iterable[Dict[str, Any]]):
+        """Chamado no after_commit, no laço de eventos: nunca bloqueia."""
+        if self._thread is None or not self._thread.is_alive():
+            self._iniciar()
+        self._colocar(list(registros))
+
+    def _colocar(self, registros: List[Dict[str, Any]]):
+        for posicao, registro in enumerate(registros):
+            try:
+                self._fila.put_nowait(registro)
+            except queue.Full:
+                excedentes = registros[posicao:]
+                self.falhas += len(excedentes)
+                self._salvar_pendentes(excedentes)
+                return
+
+    def _executar(self):
+        parar = False
+        while not parar:
+            primeiro = self._fila.get()
+            if primeiro is None:
+                break
+            lote = [primeiro]
+            prazo = time.monotonic() + self.intervalo_s
+            while len(lote) < self.lote:
+                restante = prazo - time.monotonic()
+                try:
+                    registro = self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait()
+                except queue.Empty:
+                    break
+                if registro is None:
+                    parar = True
+                    break
+                lote.append(registro)
+            self._gravar(lote)
+
+    def _gravar(self, lote: List[Dict[str, Any]]):
+        for tentativa in range(1, self.tentativas + 1):
+            try:
+                with self.engine.begin() as conexao:
+                    conexao.execute(insert(self.tabela), lote)
+                self.gravados += len(lote)
+                self.lotes += 1
+                return
+            except Exception as e:
+                logger.warning(f"Falha ao gravar {len(lote)} registros de auditoria "
+                               f"(tentativa {tentativa}/{self.tentativas}): {e}")
+                time.sleep(0.1 * 2 ** tentativa)
+        self.falhas += len(lote)
+        self._salvar_pendentes(lote)
+
+    def _salvar_pendentes(self, lote: List[Dict[str, Any]]):
+        try:
+            with open(self.pendentes, "ab") as arquivo:
+                for registro in lote:
+                    arquivo.write(orjson.dumps(registro, default=_valor) + b"\n")
+            logger.error(f"{len(lote)} registros de auditoria salvos em {self.pendentes} para reenvio")
+        except OSError as e:
+            logger.error(f"Registros de auditoria perdidos ({len(lote)}): {e}")
+
+    def _reenviar_pendentes(self):
+        if not os.path.exists(self.pendentes):
+            return
+        caminho = f"{self.pendentes}.{os.getpid()}.reenvio"
+        try:
+            os.replace(self.pendentes, caminho)
+        except OSError:
+            return
+        with open(caminho, "rb") as arquivo:
+            registros = [orjson.loads(linha) for linha in arquivo if linha.strip()]
+        for registro in registros:
+            registro["data_hora"] = datetime.fromisoformat(registro["data_hora"])
+            registro.setdefault("competencia", registro["data_hora"].strftime("%Y-%m"))
+        os.remove(caminho)
+        self._colocar(registros)
+        logger.info(f"{len(registros)} registros de auditoria pendentes reenviados")
+
+    def parar(self, timeout: Optional[float] = None):
+        """Grava tudo o que está na fila e encerra a thread."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._fila.put(None)
+        self._thread.join(timeout)
+        # Registros enfileirados depois do sinal de parada
+        restantes = []
+        while True:
+            try:
+                registro = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if registro is not None:
+                restantes.append(registro)
+        if restantes:
+            self._gravar(restantes)
+        logger.info(f"Escritor de auditoria encerrado ({self.gravados} registros gravados)")
+
+
+escritor_auditoria = EscritorAuditoria()
+atexit.register(escritor_auditoria.parar)
+
+
+def coletar_auditoria():
+    """Métricas do escritor para o /metrics (ver src.utils.metricas)."""
+    return [
+        ("medflow_auditoria_fila", "gauge", "Registros de auditoria aguardando gravação",
+         [((), escritor_auditoria.na_fila)]),
+        ("medflow_auditoria_gravados_total", "counter", "Registros de auditoria gravados",
+         [((), escritor_auditoria.gravados)]),
+        ("medflow_auditoria_lotes_total", "counter", "Lotes de auditoria gravados",
+         [((), escritor_auditoria.lotes)]),
+        ("medflow_auditoria_falhas_total", "counter", "Registros de auditoria não gravados (salvos para reenvio)",
+         [((), escritor_auditoria.falhas)]),
+    ]
@@ -0,0 +1,256 @@
+import heapq
+import logging
+import math
+import os
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import case, event, false, func, or_, select
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("medflow-busca")
+
+# Similaridade mínima (mesmo padrão do operador %> do pg_trgm, word_similarity_threshold)
+SIMILARIDADE_MINIMA = 0.6
+# Máximo de candidatos ranqueados pelo índice local antes dos demais filtros
+MAXIMO_CANDIDATOS = 1000
+# Segundos até o índice local ser recarregado do banco (0 desliga a recarga)
+BUSCA_INDICE_RECARGA = float(os.getenv("BUSCA_INDICE_RECARGA", "300"))
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """Texto em minúsculas, sem acentos e com espaços simples ("José  Ávila" -> "jose avila")."""
+    if not texto:
+        return ""
+    decomposto = unicodedata.normalize("NFKD", texto)
+    sem_acentos = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(sem_acentos.casefold().split())
+
+
+@lru_cache(maxsize=65536)
+def _trigramas_palavra(palavra: str) -> FrozenSet[str]:
+    palavra = f"  {palavra} "
+    return frozenset(palavra[i:i + 3] for i in range(len(palavra) - 2))
+
+
+def trigramas(texto: str) -> FrozenSet[str]:
+    """Trigramas de cada palavra, com as bordas usadas pelo pg_trgm ("  a", " ab", "ab ")."""
+    return frozenset().union(*map(_trigramas_palavra, texto.split()))
+
+
+# ---------------------------------------------------------------------------
+# Coluna normalizada mantida na escrita
+# ---------------------------------------------------------------------------
+
+# modelo -> (coluna de busca, campos de origem)
+_modelos_busca: Dict[type, Tuple[str, Sequence[str]]] = {}
+
+
+def valor_busca(objeto, campos: Iterable[str]) -> str:
+    return normalizar(" ".join(str(v) for v in (getattr(objeto, c) for c in campos) if v))
+
+
+def registrar_busca(modelo, *campos: str, coluna: str = "busca"):
+    """
+    Mantém `modelo.<coluna>` com o texto normalizado dos `campos` a cada
+    INSERT/UPDATE, e o índice n-grama local em sincronia com os commits.
+    """
+    _modelos_busca[modelo] = (coluna, campos)
+
+    def atualizar(mapper, connection, alvo):
+        setattr(alvo, coluna, valor_busca(alvo, campos))
+
+    event.listen(modelo, "before_insert", atualizar)
+    event.listen(modelo, "before_update", atualizar)
+    return modelo
+
+
+# ---------------------------------------------------------------------------
+# Índice n-grama em memória (SQLite e outros bancos sem pg_trgm)
+# ---------------------------------------------------------------------------
+
+class IndiceNgramas:
+    """
+    Índice invertido trigrama -> ids, com ranqueamento por similaridade.
+
+    O índice vive na memória do processo e só acompanha os commits feitos
+    nele. Com vários workers, as escritas de um não chegam aos índices dos
+    outros até a próxima recarga (BUSCA_INDICE_RECARGA); em produção com
+    mais de um processo use o PostgreSQL, que busca direto pelo pg_trgm.
+    """
+
+    def __init__(self, recarga: float = BUSCA_INDICE_RECARGA):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Set] = defaultdict(set)
+        self._documentos: Dict[object, Tuple[str, FrozenSet[str]]] = {}
+        self.recarga = recarga
+        self.carregado = False
+        self.carregado_em = 0.0
+
+    def precisa_carregar(self) -> bool:
+        if not self.carregado:
+            return True
+        return self.recarga > 0 and time.monotonic() - self.carregado_em > self.recarga
+
+    def adicionar(self, id_, texto: str):
+        with self._lock:
+            self.remover(id_)
+            grams = trigramas(texto)
+            self._documentos[id_] = (texto, grams)
+            for gram in grams:
+                self._postings[gram].add(id_)
+
+    def remover(self, id_):
+        with self._lock:
+            anterior = self._documentos.pop(id_, None)
+            if anterior is None:
+                return
+            for gram in anterior[1]:
+                ids = self._postings.get(gram)
+                if ids is not None:
+                    ids.discard(id_)
+                    if not ids:
+                        del self._postings[gram]
+
+    def carregar(self, linhas: Iterable[Tuple[object, str]]):
+        postings: Dict[str, Set] = defaultdict(set)
+        documentos = {}
+        for id_, texto in linhas:
+            texto = texto or ""
+            grams = trigramas(texto)
+            documentos[id_] = (texto, grams)
+            for gram in grams:
+                postings[gram].add(id_)
+        with self._lock:
+            self._postings = postings
+            self._documentos = documentos
+            self.carregado = True
+            self.carregado_em = time.monotonic()
+
+    def buscar(self, termo: str, limite: int = MAXIMO_CANDIDATOS) -> List[Tuple[object, float]]:
+        """Ids ranqueados por similaridade de trigramas; ocorrências literais vêm primeiro."""
+        termo = normalizar(termo)
+        grams = trigramas(termo)
+        if not grams:
+            return []
+        # Um documento com similaridade >= SIMILARIDADE_MINIMA contém ao menos
+        # `minimo` trigramas do termo; logo aparece em uma das listas dos
+        # len(grams) - minimo + 1 trigramas mais raros (basta uni-las)
+        minimo = max(1, math.ceil(SIMILARIDADE_MINIMA * len(grams)))
+        with self._lock:
+            listas = sorted((self._postings.get(gram, ()) for gram in grams), key=len)
+            candidatos = set().union(*listas[:len(grams) - minimo + 1])
+            pontuados = []
+            for id_ in candidatos:
+                texto, grams_doc = self._documentos[id_]
+                similaridade = len(grams & grams_doc) / len(grams)
+                if termo in texto:
+                    pontuados.append((similaridade + 1.0, id_))
+                elif similaridade >= SIMILARIDADE_MINIMA:
+                    pontuados.append((similaridade, id_))
+        return [(id_, pontos) for pontos, id_ in heapq.nlargest(limite, pontuados, key=lambda item: item[0])]
+
+
+_indices: Dict[type, IndiceNgramas] = defaultdict(IndiceNgramas)
+
+
+def indice_local(sessao: Session, modelo) -> IndiceNgramas:
+    """Índice n-grama do modelo, (re)carregado do banco no primeiro uso e a cada BUSCA_INDICE_RECARGA segundos."""
+    indice = _indices[modelo]
+    if indice.precisa_carregar():
+        coluna, _ = _modelos_busca[modelo]
+        linhas = sessao.execute(select(modelo.id, getattr(modelo, coluna))).all()
+        indice.carregar(linhas)
+        logger.info(f"Índice de busca de {modelo.__tablename__} carregado ({len(linhas)} registros)")
+    return indice
+
+
+@event.listens_for(Session, "after_flush")
+def _registrar_alteracoes(sessao, contexto):
+    pendentes = sessao.info.setdefault("busca_pendente", [])
+    for objeto in list(sessao.new) + list(sessao.dirty):
+        config = _modelos_busca.get(type(objeto))
+        if config is not None:
+            pendentes.append((type(objeto), objeto.id, getattr(objeto, config[0]) or ""))
+    for objeto in sessao.deleted:
+        if type(objeto) in _modelos_busca:
+            pendentes.append((type(objeto), objeto.id, None))
+
+
+@event.listens_for(Session, "after_commit")
+def _aplicar_alteracoes(sessao):
+    for modelo, id_, texto in sessao.info.pop("busca_pendente", ()):
+        indice = _indices.get(modelo)
+        if indice is None or not indice.carregado:
+            continue
+        if texto is None:
+            indice.remover(id_)
+        else:
+            indice.adicionar(id_, texto)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_alteracoes(sessao):
+    sessao.info.pop("busca_pendente", None)
+
+
+# ---------------------------------------------------------------------------
+# Consulta ranqueada
+# ---------------------------------------------------------------------------
+
+def filtro_trigramas(consulta, modelo, termo: str):
+    """
+    Filtro e ordenação por similaridade no PostgreSQL (pg_trgm).
+
+    Tanto o LIKE quanto o operador %> (word_similarity) usam o índice GIN
+    gin_trgm_ops da coluna normalizada.
+    """
+    coluna = getattr(modelo, _modelos_busca[modelo][0])
+    termo = normalizar(termo)
+    return consulta.where(
+        or_(coluna.contains(termo, autoescape=True), coluna.op("%>")(termo))
+    ).order_by(func.word_similarity(termo, coluna).desc(), modelo.id)
+
+
+def filtro_ranking_local(consulta, modelo, ranking: Sequence[Tuple[object, float]]):
+    """Restringe a consulta aos ids ranqueados pelo índice local, na ordem do ranking."""
+    if not ranking:
+        return consulta.where(false())
+    posicoes = {id_: i for i, (id_, _) in enumerate(ranking)}
+    return consulta.where(modelo.id.in_(list(posicoes))).order_by(
+        case(posicoes, value=modelo.id), modelo.id
+    )
+
+
+def filtrar_busca(sessao: Session, consulta, modelo, termo: str, limite: int = MAXIMO_CANDIDATOS):
+    """
+    Restringe e ordena `consulta` (select() ou Query) pelo termo de busca.
+
+    `limite` só se aplica ao índice local: quantos dos melhores candidatos
+    entram na consulta.
+    """
+    if sessao.get_bind().dialect.name == "postgresql":
+        return filtro_trigramas(consulta, modelo, termo)
+    return filtro_ranking_local(consulta, modelo, indice_local(sessao, modelo).buscar(termo, limite))
+
+
+async def buscar_async(db, consulta, modelo, termo: str, skip: int = 0, limit: int = 100, projetada: bool = False):
+    """
+    Executa `consulta` restrita e ranqueada pelo termo, na AsyncSession.
+
+    `consulta` é um select() do modelo ou, com `projetada`, um select() de
+    colunas (ver src.utils.projecao); nesse caso devolve as linhas.
+    """
+    if db.bind.dialect.name == "postgresql":
+        consulta = filtro_trigramas(consulta, modelo, termo)
+    else:
+        indice = _indices[modelo]
+        if indice.precisa_carregar():
+            await db.run_sync(indice_local, modelo)
+        consulta = filtro_ranking_local(consulta, modelo, indice.buscar(termo, min(skip + limit, MAXIMO_CANDIDATOS)))
+    result = await db.execute(consulta.offset(skip).limit(limit))
+    return result.all() if projetada else result.scalars().all()
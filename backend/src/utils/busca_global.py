@@ -0,0 +1,250 @@
+import logging
+import re
+import string
+import threading
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from src.utils.busca import normalizar
+
+logger = logging.getLogger("medflow-busca")
+
+# Prefixos curtos demais expandiriam para boa parte do vocabulário
+TAMANHO_MINIMO_PREFIXO = 2
+# Pontuação de cada termo da consulta
+PONTOS_EXATO = 3
+PONTOS_PREFIXO = 1
+
+_PALAVRAS = re.compile(r"[0-9a-z]+")
+_DOCUMENTO_NUMERICO = re.compile(r"[\d\s.\-/]+")
+
+Chave = Tuple[str, Any]
+
+
+def tokens_documento(valores: Iterable[Any]) -> FrozenSet[str]:
+    """Palavras normalizadas dos valores; números formatados (CPF, CNPJ) também entram só com dígitos."""
+    tokens = set()
+    for valor in valores:
+        if valor is None:
+            continue
+        texto = normalizar(str(valor))
+        tokens.update(_PALAVRAS.findall(texto))
+        digitos = re.sub(r"\D", "", texto)
+        if len(digitos) >= 3:
+            tokens.add(digitos)
+    return frozenset(tokens)
+
+
+def tokens_consulta(consulta: str) -> List[str]:
+    """Termos da consulta; "123.456.789" vira um único termo numérico."""
+    texto = normalizar(consulta)
+    if _DOCUMENTO_NUMERICO.fullmatch(texto) and re.search(r"\d", texto):
+        return [re.sub(r"\D", "", texto)]
+    return list(dict.fromkeys(_PALAVRAS.findall(texto)))
+
+
+class EntidadeBusca:
+    """Como um modelo aparece na busca global: campos indexados, título e detalhe."""
+
+    def __init__(self, tipo: str, modelo, titulo: str, campos: Sequence[str], detalhe: str = ""):
+        self.tipo = tipo
+        self.modelo = modelo
+        self.titulo = titulo
+        self.campos = tuple(campos)
+        self.detalhe = detalhe
+        campos_detalhe = [nome for _, nome, _, _ in string.Formatter().parse(detalhe) if nome]
+        self.colunas = tuple(dict.fromkeys(("id", titulo, *self.campos, *campos_detalhe)))
+
+    def documento(self, objeto) -> Tuple[str, str, FrozenSet[str]]:
+        """(título, detalhe, tokens) de um objeto ORM ou linha com as mesmas colunas."""
+        valores = {coluna: getattr(objeto, coluna) for coluna in self.colunas}
+        detalhe = self.detalhe.format(**{k: "" if v is None else v for k, v in valores.items()})
+        return (
+            str(valores[self.titulo] or ""),
+            detalhe.strip(" ·"),
+            tokens_documento(valores[campo] for campo in self.campos),
+        )
+
+
+class IndiceGlobal:
+    """Índice invertido token -> (tipo, id) de todas as entidades registradas."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._carga = threading.Lock()
+        self._postings: Dict[str, Set[Chave]] = defaultdict(set)
+        self._tokens: List[str] = []
+        self._documentos: Dict[Chave, Tuple[str, str, FrozenSet[str]]] = {}
+        # Títulos normalizados, chave de desempate da ordenação
+        self._titulos: Dict[Chave, str] = {}
+        self._pendentes: Optional[list] = None
+        self.pronto = False
+
+    def _adicionar(self, chave: Chave, documento):
+        self._remover(chave)
+        self._documentos[chave] = documento
+        self._titulos[chave] = normalizar(documento[0])
+        for token in documento[2]:
+            ids = self._postings[token]
+            if not ids:
+                insort(self._tokens, token)
+            ids.add(chave)
+
+    def _remover(self, chave: Chave):
+        anterior = self._documentos.pop(chave, None)
+        if anterior is None:
+            return
+        del self._titulos[chave]
+        for token in anterior[2]:
+            ids = self._postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(chave)
+            if not ids:
+                del self._postings[token]
+                del self._tokens[bisect_left(self._tokens, token)]
+
+    def aplicar(self, alteracoes: Iterable[Tuple[Chave, Optional[tuple]]]):
+        """Aplica inclusões/alterações (documento) e exclusões (None) confirmadas no banco."""
+        with self._lock:
+            if self._pendentes is not None:
+                # Reconstrução em andamento: reaplicadas sobre o novo índice
+                self._pendentes.extend(alteracoes)
+                return
+            for chave, documento in alteracoes:
+                if documento is None:
+                    self._remover(chave)
+                else:
+                    self._adicionar(chave, documento)
+
+    def reconstruir(self, sessao: Session, entidades: Iterable[EntidadeBusca]):
+        """Recarrega todo o índice a partir do banco."""
+        with self._lock:
+            self._pendentes = []
+        try:
+            postings: Dict[str, Set[Chave]] = defaultdict(set)
+            documentos = {}
+            for entidade in entidades:
+                consulta = select(*[getattr(entidade.modelo, c) for c in entidade.colunas])
+                for linha in sessao.execute(consulta.execution_options(yield_per=5000)):
+                    chave = (entidade.tipo, linha.id)
+                    documentos[chave] = entidade.documento(linha)
+                    for token in documentos[chave][2]:
+                        postings[token].add(chave)
+        except Exception:
+            with self._lock:
+                self._pendentes = None
+            raise
+        with self._lock:
+            self._postings = postings
+            self._tokens = sorted(postings)
+            self._documentos = documentos
+            self._titulos = {chave: normalizar(documento[0]) for chave, documento in documentos.items()}
+            pendentes, self._pendentes = self._pendentes, None
+            self.aplicar(pendentes)
+            self.pronto = True
+        logger.info(f"Índice de busca global carregado ({len(documentos)} registros, {len(postings)} termos)")
+
+    def _correspondencias(self, termo: str) -> Tuple[Set[Chave], Set[Chave]]:
+        """(registros com o termo como palavra, registros com alguma palavra iniciada pelo termo)."""
+        exatos = self._postings.get(termo, set())
+        if len(termo) < TAMANHO_MINIMO_PREFIXO:
+            return exatos, exatos
+        inicio = bisect_left(self._tokens, termo)
+        fim = inicio
+        while fim < len(self._tokens) and self._tokens[fim].startswith(termo):
+            fim += 1
+        return exatos, set().union(*(self._postings[token] for token in self._tokens[inicio:fim]))
+
+    @property
+    def documentos(self) -> int:
+        return len(self._documentos)
+
+    def buscar(self, consulta: str, limite: int = 20, tipos: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Registros que contêm todos os termos (como palavra ou prefixo), mais
+        relevantes primeiro: cada termo vale PONTOS_EXATO se for a palavra
+        inteira e PONTOS_PREFIXO se for só o início dela; empates por título.
+        """
+        termos = tokens_consulta(consulta)
+        if not termos:
+            return []
+        with self._lock:
+            correspondencias = [self._correspondencias(termo) for termo in termos]
+            # Interseções e contagens em operações de conjunto (C), partindo do menor
+            todos = sorted((encontrados for _, encontrados in correspondencias), key=len)
+            candidatos = todos[0].intersection(*todos[1:])
+            if tipos:
+                candidatos = {chave for chave in candidatos if chave[0] in tipos}
+            if not candidatos:
+                return []
+            if len(correspondencias) == 1:
+                palavra_inteira = candidatos & correspondencias[0][0]
+                camadas = {1: palavra_inteira, 0: candidatos - palavra_inteira}
+            else:
+                exatos = Counter()
+                for palavra_inteira, _ in correspondencias:
+                    exatos.update(candidatos & palavra_inteira)
+                camadas = defaultdict(list)
+                for chave in candidatos:
+                    camadas[exatos[chave]].append(chave)
+
+            resultados = []
+            for quantidade in sorted(camadas, reverse=True):
+                faltam = limite - len(resultados)
+                if faltam <= 0:
+                    break
+                pontos = len(termos) * PONTOS_PREFIXO + quantidade * (PONTOS_EXATO - PONTOS_PREFIXO)
+                for tipo, id_ in sorted(camadas[quantidade], key=self._titulos.__getitem__)[:faltam]:
+                    titulo, detalhe, _ = self._documentos[(tipo, id_)]
+                    resultados.append({"tipo": tipo, "id": id_, "titulo": titulo,
+                                       "detalhe": detalhe, "pontuacao": pontos})
+            return resultados
+
+
+indice_global = IndiceGlobal()
+_entidades: Dict[type, EntidadeBusca] = {}
+
+
+def registrar_entidade(tipo: str, modelo, titulo: str, campos: Sequence[str], detalhe: str = ""):
+    """Inclui `modelo` na busca global (GET /api/busca), indexando os `campos`."""
+    _entidades[modelo] = EntidadeBusca(tipo, modelo, titulo, campos, detalhe)
+    return modelo
+
+
+def carregar_indice_global(fabrica_sessao):
+    """Constrói o índice uma única vez; chamadas concorrentes aguardam a primeira."""
+    with indice_global._carga:
+        if indice_global.pronto:
+            return
+        with fabrica_sessao() as sessao:
+            indice_global.reconstruir(sessao, list(_entidades.values()))
+
+
+@event.listens_for(Session, "after_flush")
+def _registrar_alteracoes(sessao, contexto):
+    pendentes = sessao.info.setdefault("busca_global_pendente", [])
+    for objeto in list(sessao.new) + list(sessao.dirty):
+        entidade = _entidades.get(type(objeto))
+        if entidade is not None:
+            pendentes.append(((entidade.tipo, objeto.id), entidade.documento(objeto)))
+    for objeto in sessao.deleted:
+        entidade = _entidades.get(type(objeto))
+        if entidade is not None:
+            pendentes.append(((entidade.tipo, objeto.id), None))
+
+
+@event.listens_for(Session, "after_commit")
+def _aplicar_alteracoes(sessao):
+    pendentes = sessao.info.pop("busca_global_pendente", None)
+    if pendentes:
+        indice_global.aplicar(pendentes)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_alteracoes(sessao):
+    sessao.info.pop("busca_global_pendente", None)
@@ -0,0 +1,66 @@
+import importlib
+import importlib.util
+import sys
+import threading
+from types import ModuleType
+
+from starlette.concurrency import run_in_threadpool
+
+
+def modulo_tardio(nome: str) -> ModuleType:
+    """
+    Retorna o módulo informado sem executá-lo.
+
+    O código do módulo só é executado no primeiro acesso a um de seus
+    atributos, o que tira dependências pesadas (jose, fpdf etc.) do
+    caminho crítico de inicialização da API.
+    """
+    if nome in sys.modules:
+        return sys.modules[nome]
+
+    spec = importlib.util.find_spec(nome)
+    if spec is None:
+        raise ModuleNotFoundError(f"Módulo {nome} não encontrado", name=nome)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[nome] = modulo
+    loader.exec_module(modulo)
+    return modulo
+
+
+class RouterTardio:
+    """
+    Aplicação ASGI que importa o router de um subsistema apenas na
+    primeira requisição recebida.
+
+    Deve ser montada com `app.mount(prefixo, RouterTardio(...))`; o
+    caminho restante é resolvido pelo próprio router importado.
+    """
+
+    def __init__(self, modulo: str, atributo: str = "router"):
+        self.modulo = modulo
+        self.atributo = atributo
+        self._router = None
+        self._lock = threading.Lock()
+
+    @property
+    def carregado(self) -> bool:
+        return self._router is not None
+
+    def carregar(self):
+        """Importa o módulo (uma única vez) e retorna o router."""
+        if self._router is None:
+            with self._lock:
+                if self._router is None:
+                    modulo = importlib.import_module(self.modulo)
+                    self._router = getattr(modulo, self.atributo)
+        return self._router
+
+    async def __call__(self, scope, receive, send):
+        router = self._router
+        if router is None:
+            # A importação pode ser lenta; não bloquear o event loop
+            router = await run_in_threadpool(self.carregar)
+        await router(scope, receive, send)
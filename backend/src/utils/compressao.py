@@ -0,0 +1,200 @@
+"""
+Compressão negociada (Brotli ou gzip) das respostas da API.
+
+A codificação vem do `Accept-Encoding` do cliente: Brotli quando o pacote
+`brotli` está instalado e o cliente aceita `br`, senão gzip. Respostas
+menores que COMPRESSAO_MIN_BYTES seguem sem compressão. Respostas em
+partes (StreamingResponse) são comprimidas parte a parte; em CSV, NDJSON e
+SSE cada parte é descarregada ao cliente assim que chega (sync flush), para
+que uma exportação longa não fique parada no buffer do compressor.
+"""
+import os
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # Brotli é opcional; sem ele só gzip é oferecido
+    brotli = None
+
+COMPRESSAO_MIN_BYTES = int(os.getenv("COMPRESSAO_MIN_BYTES", "1024"))
+COMPRESSAO_NIVEL_GZIP = int(os.getenv("COMPRESSAO_NIVEL_GZIP", "6"))
+COMPRESSAO_NIVEL_BROTLI = int(os.getenv("COMPRESSAO_NIVEL_BROTLI", "4"))
+
+TIPOS_COMPRIMIVEIS = (
+    "application/json", "application/x-ndjson", "application/javascript", "application/xml", "text/",
+)
+# Formatos lidos incrementalmente pelo cliente: cada parte é descarregada na hora
+TIPOS_STREAMING = ("text/csv", "application/x-ndjson", "text/event-stream")
+
+
+def codificacoes_disponiveis():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def escolher_codificacao(accept_encoding: str) -> Optional[str]:
+    """Codificação preferida pelo cliente entre as disponíveis (respeita q=0 e `*`)."""
+    pesos = {}
+    for item in accept_encoding.split(","):
+        nome, _, parametros = item.strip().partition(";")
+        nome = nome.strip().lower()
+        if not nome:
+            continue
+        peso = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                peso = float(parametros[2:])
+            except ValueError:
+                peso = 0.0
+        pesos[nome] = peso
+    melhor, melhor_peso = None, 0.0
+    for codificacao in codificacoes_disponiveis():
+        peso = pesos.get(codificacao, pesos.get("*", 0.0))
+        if peso > melhor_peso:
+            melhor, melhor_peso = codificacao, peso
+    return melhor
+
+
+class _Gzip:
+    def __init__(self, nivel: int):
+        self._compressor = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def comprimir(self, dados: bytes, descarregar: bool = False) -> bytes:
+        saida = self._compressor.compress(dados)
+        return saida + self._compressor.flush(zlib.Z_SYNC_FLUSH) if descarregar else saida
+
+    def finalizar(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self, nivel: int):
+        self._compressor = brotli.Compressor(quality=nivel)
+
+    def comprimir(self, dados: bytes, descarregar: bool = False) -> bytes:
+        saida = self._compressor.process(dados)
+        return saida + self._compressor.flush() if descarregar else saida
+
+    def finalizar(self) -> bytes:
+        return self._compressor.finish()
+
+
+def _cabecalho(cabecalhos, nome: bytes) -> Optional[bytes]:
+    for chave, valor in cabecalhos:
+        if chave.lower() == nome:
+            return valor
+    return None
+
+
+def _sem(cabecalhos, *nomes: bytes):
+    return [(chave, valor) for chave, valor in cabecalhos if chave.lower() not in nomes]
+
+
+def _com_vary(cabecalhos):
+    vary = _cabecalho(cabecalhos, b"vary")
+    if vary is None:
+        return [*cabecalhos, (b"vary", b"Accept-Encoding")]
+    if b"accept-encoding" in vary.lower():
+        return cabecalhos
+    return [*_sem(cabecalhos, b"vary"), (b"vary", vary + b", Accept-Encoding")]
+
+
+class CompressaoMiddleware:
+    """
+    Middleware ASGI de compressão negociada.
+
+    Respostas em uma única parte são comprimidas inteiras (com
+    Content-Length); respostas em partes são acumuladas até o limite mínimo
+    e, a partir daí, comprimidas à medida que chegam.
+    """
+
+    def __init__(self, app, minimo: Optional[int] = None, nivel_gzip: Optional[int] = None,
+                 nivel_brotli: Optional[int] = None):
+        self.app = app
+        self.minimo = minimo if minimo is not None else COMPRESSAO_MIN_BYTES
+        self.nivel_gzip = nivel_gzip if nivel_gzip is not None else COMPRESSAO_NIVEL_GZIP
+        self.nivel_brotli = nivel_brotli if nivel_brotli is not None else COMPRESSAO_NIVEL_BROTLI
+
+    def _compressor(self, codificacao: str):
+        return _Brotli(self.nivel_brotli) if codificacao == "br" else _Gzip(self.nivel_gzip)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = _cabecalho(scope["headers"], b"accept-encoding") or b""
+        codificacao = escolher_codificacao(accept_encoding.decode("latin-1"))
+
+        inicio = None          # http.response.start retido até decidir se comprime
+        repassar = False       # resposta enviada sem alterações
+        compressor = None
+        descarregar = False
+        pendente = []
+
+        async def enviar_sem_compressao(corpo: bytes, mais: bool):
+            nonlocal repassar
+            repassar = True
+            await send(inicio)
+            await send({"type": "http.response.body", "body": corpo, "more_body": mais})
+
+        async def enviar(mensagem):
+            nonlocal inicio, repassar, compressor, descarregar
+            if repassar:
+                await send(mensagem)
+                return
+
+            if mensagem["type"] == "http.response.start":
+                cabecalhos = list(mensagem.get("headers", []))
+                tipo = (_cabecalho(cabecalhos, b"content-type") or b"").decode("latin-1").lower()
+                comprimivel = tipo.startswith(TIPOS_COMPRIMIVEIS)
+                if comprimivel:
+                    cabecalhos = _com_vary(cabecalhos)
+                mensagem = {**mensagem, "headers": cabecalhos}
+                if (codificacao is None or not comprimivel or mensagem["status"] in (204, 304)
+                        or _cabecalho(cabecalhos, b"content-encoding") is not None):
+                    repassar = True
+                    await send(mensagem)
+                    return
+                inicio = mensagem
+                descarregar = tipo.startswith(TIPOS_STREAMING)
+                return
+
+            if mensagem["type"] != "http.response.body":
+                await send(mensagem)
+                return
+
+            corpo = mensagem.get("body", b"")
+            mais = mensagem.get("more_body", False)
+
+            if compressor is None:
+                pendente.append(corpo)
+                tamanho = sum(len(parte) for parte in pendente)
+                if mais and tamanho < self.minimo:
+                    return
+                acumulado = b"".join(pendente)
+                pendente.clear()
+                if tamanho < self.minimo:
+                    await enviar_sem_compressao(acumulado, mais)
+                    return
+                compressor = self._compressor(codificacao)
+                cabecalhos = _sem(inicio["headers"], b"content-length", b"content-encoding")
+                cabecalhos.append((b"content-encoding", codificacao.encode()))
+                if not mais:
+                    # Resposta em uma única parte: comprime inteira e informa o tamanho final
+                    comprimido = compressor.comprimir(acumulado) + compressor.finalizar()
+                    cabecalhos.append((b"content-length", str(len(comprimido)).encode()))
+                    await send({**inicio, "headers": cabecalhos})
+                    await send({"type": "http.response.body", "body": comprimido})
+                    return
+                await send({**inicio, "headers": cabecalhos})
+                corpo = acumulado
+
+            if mais:
+                saida = compressor.comprimir(corpo, descarregar)
+                if saida:
+                    await send({"type": "http.response.body", "body": saida, "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": compressor.comprimir(corpo) + compressor.finalizar()})
+
+        await self.app(scope, receive, enviar)
@@ -0,0 +1,167 @@
+"""
+Estatísticas de consultas SQL por impressão digital (fingerprint).
+
+Cada instrução executada por qualquer Engine (medida por src.utils.tempo_sql)
+é normalizada — literais e parâmetros viram `?`, listas de IN e de VALUES
+viram uma só entrada — e as execuções com a mesma forma são agregadas: total
+de execuções, tempo total, máximo e p95 das últimas execuções. É um pg_stat_statements em memória, por
+processo, que funciona também no SQLite e mostra os parâmetros só pela
+forma (tipos e tamanhos), nunca pelos valores.
+
+Execuções acima de CONSULTAS_LENTAS_MS são registradas no log
+`medflow-consultas`. A tabela fica em GET /api/metrics/consultas
+(administradores).
+"""
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from src.utils.tempo_sql import ao_executar
+
+logger = logging.getLogger("medflow-consultas")
+
+CONSULTAS_LENTAS_MS = float(os.getenv("CONSULTAS_LENTAS_MS", "500"))
+# Impressões digitais mantidas; acima disso a de menor tempo total é descartada
+CONSULTAS_MAX_IMPRESSOES = int(os.getenv("CONSULTAS_MAX_IMPRESSOES", "2000"))
+
+_LITERAL_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_PARAMETRO = re.compile(
+    r"%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+|\?|__\[POSTCOMPILE_\w+\]"
+    r"|\b\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b"
+)
+_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES = re.compile(r"(VALUES\s*\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+", re.IGNORECASE)
+_ESPACOS = re.compile(r"\s+")
+
+
+def impressao_digital(instrucao: str) -> str:
+    """
+    Forma normalizada da instrução: sem literais, parâmetros ou tamanhos de lista.
+
+    >>> impressao_digital("SELECT * FROM medicos WHERE id IN (?, ?, ?) AND nome = 'Ana'")
+    'SELECT * FROM medicos WHERE id IN (...) AND nome = ?'
+    """
+    normalizada = _LITERAL_TEXTO.sub("?", instrucao)
+    normalizada = _PARAMETRO.sub("?", normalizada)
+    normalizada = _LISTA.sub("(...)", normalizada)
+    normalizada = _VALUES.sub(r"\1", normalizada)
+    return _ESPACOS.sub(" ", normalizada).strip()
+
+
+def _forma(valor: Any) -> str:
+    if valor is None:
+        return "None"
+    if isinstance(valor, (str, bytes)):
+        return f"{type(valor).__name__}({len(valor)})"
+    if isinstance(valor, (list, tuple, set)):
+        return f"{type(valor).__name__}[{len(valor)}]"
+    return type(valor).__name__
+
+
+def forma_parametros(parametros: Any, executemany: bool = False) -> str:
+    """Tipos (e tamanhos) dos parâmetros, sem os valores."""
+    if executemany and isinstance(parametros, (list, tuple)):
+        primeiro = forma_parametros(parametros[0]) if parametros else "-"
+        return f"{len(parametros)}x {primeiro}"
+    if isinstance(parametros, dict):
+        return "{" + ", ".join(f"{nome}: {_forma(valor)}" for nome, valor in parametros.items()) + "}"
+    if isinstance(parametros, (list, tuple)):
+        return "(" + ", ".join(_forma(valor) for valor in parametros) + ")"
+    return _forma(parametros)
+
+
+class EstatisticaConsulta:
+    def __init__(self, impressao: str, janela: int):
+        self.impressao = impressao
+        self.id = hashlib.blake2b(impressao.encode(), digest_size=6).hexdigest()
+        self.execucoes = 0
+        self.lentas = 0
+        self.tempo_total_s = 0.0
+        self.maximo_s = 0.0
+        self.duracoes = deque(maxlen=janela)
+        self.ultima_forma = ""
+
+    def resumo(self) -> Dict[str, Any]:
+        duracoes = sorted(self.duracoes)
+        return {
+            "id": self.id,
+            "consulta": self.impressao,
+            "execucoes": self.execucoes,
+            "lentas": self.lentas,
+            "tempo_total_ms": round(self.tempo_total_s * 1000, 3),
+            "media_ms": round(self.tempo_total_s * 1000 / self.execucoes, 3) if self.execucoes else 0.0,
+            "p95_ms": round(duracoes[math.ceil(len(duracoes) * 0.95) - 1] * 1000, 3) if duracoes else 0.0,
+            "maximo_ms": round(self.maximo_s * 1000, 3),
+            "parametros": self.ultima_forma,
+        }
+
+
+class RegistroConsultas:
+    """Acumula as estatísticas por impressão digital (p95 sobre as últimas `janela` execuções)."""
+
+    ORDENACOES = ("tempo_total_ms", "p95_ms", "maximo_ms", "media_ms", "execucoes", "lentas")
+
+    def __init__(self, limite_lenta_ms: float = CONSULTAS_LENTAS_MS,
+                 max_impressoes: int = CONSULTAS_MAX_IMPRESSOES, janela: int = 500):
+        self.limite_lenta_s = limite_lenta_ms / 1000
+        self.max_impressoes = max_impressoes
+        self.janela = janela
+        self._lock = threading.Lock()
+        self._estatisticas: Dict[str, EstatisticaConsulta] = {}
+        # Cache instrução -> impressão: o SQLAlchemy reaproveita as mesmas strings compiladas
+        self._impressoes: Dict[str, str] = {}
+        self.descartadas = 0
+
+    def _impressao(self, instrucao: str) -> str:
+        impressao = self._impressoes.get(instrucao)
+        if impressao is None:
+            impressao = impressao_digital(instrucao)
+            if len(self._impressoes) >= self.max_impressoes * 4:
+                self._impressoes.clear()
+            self._impressoes[instrucao] = impressao
+        return impressao
+
+    def registrar(self, instrucao: str, parametros: Any, executemany: bool, duracao_s: float):
+        impressao = self._impressao(instrucao)
+        lenta = duracao_s >= self.limite_lenta_s
+        forma = forma_parametros(parametros, executemany) if lenta else None
+        with self._lock:
+            estatistica = self._estatisticas.get(impressao)
+            if estatistica is None:
+                if len(self._estatisticas) >= self.max_impressoes:
+                    menor = min(self._estatisticas.values(), key=lambda e: e.tempo_total_s)
+                    del self._estatisticas[menor.impressao]
+                    self.descartadas += 1
+                estatistica = self._estatisticas[impressao] = EstatisticaConsulta(impressao, self.janela)
+            estatistica.execucoes += 1
+            estatistica.tempo_total_s += duracao_s
+            estatistica.maximo_s = max(estatistica.maximo_s, duracao_s)
+            estatistica.duracoes.append(duracao_s)
+            if lenta:
+                estatistica.lentas += 1
+                estatistica.ultima_forma = forma
+        if lenta:
+            logger.warning(
+                f"Consulta lenta ({duracao_s * 1000:.1f} ms) [{estatistica.id}]: {impressao[:500]} "
+                f"parâmetros {forma}"
+            )
+
+    def resumo(self, ordenar: str = "tempo_total_ms", limite: Optional[int] = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            resumos = [estatistica.resumo() for estatistica in self._estatisticas.values()]
+        resumos.sort(key=lambda r: r[ordenar], reverse=True)
+        return resumos[:limite] if limite is not None else resumos
+
+    def limpar(self):
+        with self._lock:
+            self._estatisticas.clear()
+            self.descartadas = 0
+
+
+registro_consultas = RegistroConsultas()
+ao_executar(registro_consultas.registrar)
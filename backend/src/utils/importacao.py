@@ -0,0 +1,633 @@
+"""
+Importação de CSV no servidor, em segundo plano e em blocos.
+
+O arquivo enviado é gravado em disco e lido de IMPORTACAO_TAMANHO_BLOCO em
+IMPORTACAO_TAMANHO_BLOCO linhas. Cada bloco é convertido e validado (CPF,
+CNPJ, datas e e-mails com src.utils.validators, tipos com o esquema
+Pydantic de criação), tem as referências resolvidas com uma consulta IN por
+tabela e é gravado numa transação própria. A memória usada depende do
+tamanho do bloco, não do arquivo: os erros por linha vão para um CSV ao
+lado do arquivo, que pode ser baixado enquanto a importação corre.
+"""
+import asyncio
+import atexit
+import csv
+import io
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Type, get_args
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from src.utils.auditoria import auditar_lote, sem_captura_por_linha
+from src.utils.validators import formatar_cnpj, formatar_cpf, validar_cnpj, validar_cpf, validar_data, validar_email
+
+logger = logging.getLogger("medflow-importacao")
+
+IMPORTACAO_TAMANHO_BLOCO = int(os.getenv("IMPORTACAO_TAMANHO_BLOCO", "1000"))
+IMPORTACAO_MAX_MB = float(os.getenv("IMPORTACAO_MAX_MB", "200"))
+# Importações processadas ao mesmo tempo; as demais aguardam na fila
+IMPORTACAO_SIMULTANEAS = int(os.getenv("IMPORTACAO_SIMULTANEAS", "2"))
+# Importações encerradas mantidas (com seus relatórios de erros)
+IMPORTACAO_MAX_TAREFAS = int(os.getenv("IMPORTACAO_MAX_TAREFAS", "50"))
+IMPORTACAO_DIR = os.getenv("IMPORTACAO_DIR") or tempfile.gettempdir()
+
+# Erros por linha devolvidos na consulta da tarefa; o relatório completo fica em disco
+ERROS_EM_MEMORIA = 100
+
+FORMATOS_DATA = ("%Y-%m-%d", "%d/%m/%Y")
+FORMATOS_DATA_HORA = (
+    "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M",
+    "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M",
+)
+BOOLEANOS = {"sim": True, "s": True, "não": False, "nao": False, "n": False}
+
+
+class ErroImportacao(Exception):
+    """Problema que impede a importação do arquivo inteiro (cabeçalho, codificação, tamanho)."""
+
+
+def somente_digitos(valor: str) -> str:
+    return "".join(filter(str.isdigit, valor))
+
+
+def variantes_cnpj(valor: str) -> Tuple[str, ...]:
+    """Um CNPJ pode estar gravado só com os dígitos ou formatado."""
+    return (somente_digitos(valor), formatar_cnpj(valor))
+
+
+def _tipo(campo) -> Any:
+    """Tipo de um campo do esquema, sem o Optional."""
+    argumentos = [argumento for argumento in get_args(campo.annotation) if argumento is not type(None)]
+    return argumentos[0] if argumentos else campo.annotation
+
+
+def _data(valor: str, formatos: Sequence[str]) -> Optional[datetime]:
+    for formato in formatos:
+        if validar_data(valor, formato):
+            return datetime.strptime(valor, formato)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Especificação das entidades importáveis
+# ---------------------------------------------------------------------------
+
+class Referencia:
+    """
+    Chave estrangeira importada pelo id (`campo`, ex.: medico_id) ou por uma
+    coluna natural do registro referenciado (ex.: medico_crm -> Medico.crm).
+    """
+
+    def __init__(self, campo: str, modelo, nome: str, chave: Optional[str] = None,
+                 normalizar: Callable[[str], str] = str.strip,
+                 variantes: Optional[Callable[[str], Sequence[str]]] = None, feminino: bool = False):
+        self.campo = campo
+        self.modelo = modelo
+        self.nome = nome
+        self.feminino = feminino
+        self.chave = chave
+        self.coluna = f"{campo[:-len('_id')]}_{chave}" if chave else None
+        # Forma comparada entre o arquivo e o banco (ex.: só os dígitos do CNPJ)
+        self.normalizar = normalizar
+        # Valores procurados no banco para uma chave do arquivo
+        self.variantes = variantes or (lambda valor: (normalizar(valor),))
+
+
+class EspecificacaoImportacao:
+    """
+    Como uma entidade é importada: o esquema de criação (tipos e campos
+    obrigatórios), as colunas de CPF, CNPJ e e-mail, as referências e uma
+    validação final opcional do registro.
+    """
+
+    def __init__(self, modelo, esquema: Type[BaseModel], cpf: Sequence[str] = (), cnpj: Sequence[str] = (),
+                 emails: Sequence[str] = (), referencias: Sequence[Referencia] = (),
+                 validar: Optional[Callable[[BaseModel], List[str]]] = None, exige_admin: bool = False):
+        self.modelo = modelo
+        self.esquema = esquema
+        self.cpf = set(cpf)
+        self.cnpj = set(cnpj)
+        self.emails = set(emails)
+        self.referencias = {referencia.campo: referencia for referencia in referencias}
+        self.validar = validar
+        self.exige_admin = exige_admin
+        self.tipos = {nome: _tipo(campo) for nome, campo in esquema.model_fields.items()}
+        self.obrigatorias = [nome for nome, campo in esquema.model_fields.items() if campo.is_required()]
+        self._chaves = {referencia.coluna: referencia for referencia in referencias if referencia.coluna}
+        self.colunas = list(self.tipos) + list(self._chaves)
+
+    def verificar_cabecalho(self, cabecalho: Sequence[str]) -> List[str]:
+        """Colunas do arquivo que serão ignoradas; ErroImportacao se faltar uma obrigatória."""
+        presentes = set(cabecalho)
+        faltando = []
+        for nome in self.obrigatorias:
+            referencia = self.referencias.get(nome)
+            if nome in presentes or (referencia and referencia.coluna in presentes):
+                continue
+            faltando.append(f"{nome} (ou {referencia.coluna})" if referencia and referencia.coluna else nome)
+        if faltando:
+            raise ErroImportacao(f"Colunas obrigatórias ausentes: {', '.join(faltando)}")
+        return [coluna for coluna in cabecalho if coluna not in self.colunas]
+
+    def converter(self, valores: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, str], List[Tuple[str, str]]]:
+        """
+        Converte uma linha do CSV: (valores para o esquema, chaves naturais das
+        referências por campo, problemas como (campo, mensagem)). Células
+        vazias ficam de fora, para valerem os padrões do esquema.
+        """
+        dados: Dict[str, Any] = {}
+        chaves: Dict[str, str] = {}
+        problemas: List[Tuple[str, str]] = []
+        for coluna, valor in valores.items():
+            # Células além do cabeçalho (coluna None) ou faltando no fim da linha (valor None)
+            if coluna is None or valor is None:
+                continue
+            valor = valor.strip()
+            if not valor:
+                continue
+            if coluna in self._chaves:
+                chaves[self._chaves[coluna].campo] = valor
+                continue
+            tipo = self.tipos.get(coluna)
+            if tipo is None:
+                continue
+            if coluna in self.referencias:
+                if not valor.isdigit():
+                    problemas.append((coluna, f"Id inválido: {valor}"))
+                    continue
+                valor = int(valor)
+            elif coluna in self.cpf:
+                if not validar_cpf(valor):
+                    problemas.append((coluna, f"CPF inválido: {valor}"))
+                    continue
+                valor = formatar_cpf(valor)
+            elif coluna in self.cnpj:
+                if not validar_cnpj(valor):
+                    problemas.append((coluna, f"CNPJ inválido: {valor}"))
+                    continue
+                valor = formatar_cnpj(valor)
+            elif coluna in self.emails:
+                if not validar_email(valor):
+                    problemas.append((coluna, f"E-mail inválido: {valor}"))
+                    continue
+            elif tipo is datetime:
+                convertido = _data(valor, FORMATOS_DATA_HORA)
+                if convertido is None:
+                    # ISO 8601 com fuso (2025-03-01T07:00:00-03:00) fica com o Pydantic
+                    try:
+                        convertido = datetime.fromisoformat(valor)
+                    except ValueError:
+                        problemas.append((coluna, f"Data e hora inválida (use AAAA-MM-DD HH:MM ou DD/MM/AAAA HH:MM): {valor}"))
+                        continue
+                valor = convertido
+            elif tipo is date:
+                convertido = _data(valor, FORMATOS_DATA)
+                if convertido is None:
+                    problemas.append((coluna, f"Data inválida (use AAAA-MM-DD ou DD/MM/AAAA): {valor}"))
+                    continue
+                valor = convertido.date()
+            elif tipo is bool:
+                valor = BOOLEANOS.get(valor.casefold(), valor)
+            elif tipo is float and "," in valor:
+                # Formato brasileiro: 1.234,56
+                valor = valor.replace(".", "").replace(",", ".")
+            dados[coluna] = valor
+        for campo in chaves:
+            if campo in dados:
+                problemas.append((campo, f"Informe {campo} ou {self.referencias[campo].coluna}, não os dois"))
+        return dados, chaves, problemas
+
+    def validar_registro(self, dados: Dict[str, Any]) -> Tuple[Optional[BaseModel], List[Tuple[str, str]]]:
+        """Registro do esquema de criação, ou os problemas encontrados pelo Pydantic e pela validação final."""
+        try:
+            registro = self.esquema.model_validate(dados)
+        except ValidationError as e:
+            return None, [(".".join(str(parte) for parte in erro["loc"]), erro["msg"]) for erro in e.errors()]
+        if self.validar is None:
+            return registro, []
+        try:
+            return registro, [("", mensagem) for mensagem in self.validar(registro)]
+        except TypeError as e:
+            # Ex.: comparar datas com e sem fuso horário na mesma linha
+            return None, [("", str(e))]
+
+
+class ResolvedorReferencias:
+    """
+    Resolve as referências de um bloco com uma consulta por tabela (ids e
+    chaves naturais no mesmo IN), guardando o que já foi visto na importação.
+    """
+
+    MAXIMO_CACHE = 100_000
+
+    def __init__(self, referencias: Sequence[Referencia]):
+        self.referencias = list(referencias)
+        # campo -> id -> is_active (None: não existe)
+        self._ids: Dict[str, Dict[int, Optional[bool]]] = {r.campo: {} for r in self.referencias}
+        # campo -> chave normalizada -> [(id, is_active)]
+        self._chaves: Dict[str, Dict[str, List[Tuple[int, bool]]]] = {r.campo: {} for r in self.referencias}
+
+    def _tamanho_cache(self) -> int:
+        return sum(map(len, self._ids.values())) + sum(map(len, self._chaves.values()))
+
+    async def _carregar(self, db, referencia: Referencia, ids: set, chaves: set):
+        conhecidos_ids, conhecidas_chaves = self._ids[referencia.campo], self._chaves[referencia.campo]
+        ids = {id_ for id_ in ids if id_ not in conhecidos_ids}
+        chaves = {chave for chave in chaves if referencia.normalizar(chave) not in conhecidas_chaves}
+        if not ids and not chaves:
+            return
+        modelo = referencia.modelo
+        colunas = [modelo.id, modelo.is_active]
+        condicoes = []
+        if ids:
+            condicoes.append(modelo.id.in_(ids))
+        if chaves:
+            coluna_chave = getattr(modelo, referencia.chave)
+            colunas.append(coluna_chave)
+            condicoes.append(coluna_chave.in_({v for chave in chaves for v in referencia.variantes(chave)}))
+        if self._tamanho_cache() > self.MAXIMO_CACHE:
+            for cache in (*self._ids.values(), *self._chaves.values()):
+                cache.clear()
+        result = await db.execute(select(*colunas).where(or_(*condicoes)))
+        conhecidos_ids.update(dict.fromkeys(ids))
+        for chave in chaves:
+            conhecidas_chaves[referencia.normalizar(chave)] = []
+        for linha in result.all():
+            ativo = linha[1] is not False
+            if linha[0] in ids:
+                conhecidos_ids[linha[0]] = ativo
+            if chaves and linha[2] is not None:
+                encontrados = conhecidas_chaves.get(referencia.normalizar(linha[2]))
+                if encontrados is not None and all(id_ != linha[0] for id_, _ in encontrados):
+                    encontrados.append((linha[0], ativo))
+
+    async def resolver(self, db, linhas: Sequence[Tuple[Dict[str, Any], Dict[str, str], List[Tuple[str, str]]]]):
+        """Preenche o id de cada referência em `dados` ou registra o problema da linha."""
+        for referencia in self.referencias:
+            campo = referencia.campo
+            ids = {dados[campo] for dados, _, _ in linhas if campo in dados}
+            chaves = {chaves[campo] for _, chaves, _ in linhas if campo in chaves}
+            await self._carregar(db, referencia, ids, chaves)
+            for dados, chaves_linha, problemas in linhas:
+                if campo in dados:
+                    ativo = self._ids[campo].get(dados[campo])
+                    descricao = f"{referencia.nome} {dados[campo]}"
+                elif campo in chaves_linha:
+                    encontrados = self._chaves[campo].get(referencia.normalizar(chaves_linha[campo]), [])
+                    descricao = f"{referencia.nome} com {referencia.chave} {chaves_linha[campo]}"
+                    if len(encontrados) > 1:
+                        problemas.append((campo, f"{descricao} é ambíguo ({len(encontrados)} registros)"))
+                        continue
+                    if encontrados:
+                        dados[campo], ativo = encontrados[0]
+                    else:
+                        ativo = None
+                else:
+                    continue
+                final = "a" if referencia.feminino else "o"
+                if ativo is None:
+                    problemas.append((campo, f"{descricao} não encontrad{final}"))
+                elif not ativo:
+                    problemas.append((campo, f"{descricao} está inativ{final}"))
+
+
+# ---------------------------------------------------------------------------
+# Leitura em blocos
+# ---------------------------------------------------------------------------
+
+class LeitorBlocos:
+    """Lê o CSV em blocos de (número da linha no arquivo, valores por coluna)."""
+
+    def __init__(self, caminho: str, codificacao: str, delimitador: Optional[str], tamanho: int):
+        self.tamanho = tamanho
+        self._binario = open(caminho, "rb")
+        self._texto = io.TextIOWrapper(self._binario, encoding=codificacao, newline="")
+        try:
+            if delimitador is None:
+                primeira = self._texto.readline()
+                try:
+                    delimitador = csv.Sniffer().sniff(primeira, delimiters=",;\t|").delimiter
+                except csv.Error:
+                    delimitador = ","
+                self._texto.seek(0)
+            self._leitor = csv.DictReader(self._texto, delimiter=delimitador)
+            if not self._leitor.fieldnames:
+                raise ErroImportacao("Arquivo vazio")
+            self._leitor.fieldnames = [nome.strip() for nome in self._leitor.fieldnames]
+        except Exception:
+            self.fechar()
+            raise
+
+    @property
+    def cabecalho(self) -> List[str]:
+        return list(self._leitor.fieldnames)
+
+    @property
+    def posicao(self) -> int:
+        """Bytes já lidos do arquivo (aproximado: o TextIOWrapper lê adiantado)."""
+        return self._binario.tell()
+
+    def proximo(self) -> List[Tuple[int, Dict[str, Any]]]:
+        bloco = []
+        for valores in self._leitor:
+            bloco.append((self._leitor.line_num, valores))
+            if len(bloco) >= self.tamanho:
+                break
+        return bloco
+
+    def fechar(self):
+        self._texto.close()
+
+
+def salvar_upload(origem, caminho: str, limite_bytes: int) -> int:
+    """Copia o arquivo enviado para `caminho` em pedaços de 1 MiB; ErroImportacao acima do limite."""
+    total = 0
+    with open(caminho, "wb") as destino:
+        while True:
+            pedaco = origem.read(1024 * 1024)
+            if not pedaco:
+                return total
+            total += len(pedaco)
+            if total > limite_bytes:
+                raise ErroImportacao(f"Arquivo maior que {IMPORTACAO_MAX_MB:g} MB")
+            destino.write(pedaco)
+
+
+def ler_relatorio(caminho: str, pedaco: int = 64 * 1024) -> Iterator[bytes]:
+    """Conteúdo do relatório de erros gravado até agora (ele cresce enquanto a importação corre)."""
+    tamanho = os.path.getsize(caminho)
+    with open(caminho, "rb") as arquivo:
+        while tamanho > 0:
+            dados = arquivo.read(min(pedaco, tamanho))
+            if not dados:
+                return
+            tamanho -= len(dados)
+            yield dados
+
+
+# ---------------------------------------------------------------------------
+# Tarefas
+# ---------------------------------------------------------------------------
+
+class TarefaImportacao:
+    """Estado e progresso de uma importação."""
+
+    FINAIS = ("concluida", "falhou", "cancelada")
+
+    def __init__(self, entidade: str, especificacao: EspecificacaoImportacao, usuario_id: Optional[int],
+                 nome_arquivo: Optional[str], codificacao: str, delimitador: Optional[str]):
+        self.id = uuid.uuid4().hex
+        self.entidade = entidade
+        self.especificacao = especificacao
+        self.usuario_id = usuario_id
+        self.nome_arquivo = nome_arquivo
+        self.codificacao = codificacao
+        self.delimitador = delimitador
+        self.diretorio = tempfile.mkdtemp(prefix=f"medflow-importacao-{self.id[:8]}-", dir=IMPORTACAO_DIR)
+        self.estado = "na_fila"
+        self.mensagem: Optional[str] = None
+        self.bytes_total = 0
+        self.bytes_lidos = 0
+        self.linhas_lidas = 0
+        self.importadas = 0
+        self.rejeitadas = 0
+        self.colunas_ignoradas: List[str] = []
+        self.erros: List[Dict[str, Any]] = []
+        self.criada_em = datetime.now(timezone.utc)
+        self.iniciada_em: Optional[datetime] = None
+        self.concluida_em: Optional[datetime] = None
+        # Verificado entre os blocos: o bloco em andamento é gravado por inteiro
+        self.cancelamento_pedido = False
+        self._tarefa: Optional[asyncio.Task] = None
+
+    @property
+    def caminho_arquivo(self) -> str:
+        return os.path.join(self.diretorio, "arquivo.csv")
+
+    @property
+    def caminho_erros(self) -> str:
+        return os.path.join(self.diretorio, "erros.csv")
+
+    @property
+    def finalizada(self) -> bool:
+        return self.estado in self.FINAIS
+
+    def resumo(self) -> Dict[str, Any]:
+        if self.estado == "concluida" or not self.bytes_total:
+            progresso = 100.0 if self.estado == "concluida" else 0.0
+        else:
+            progresso = round(min(100.0, 100 * self.bytes_lidos / self.bytes_total), 1)
+        return {
+            "id": self.id,
+            "entidade": self.entidade,
+            "estado": self.estado,
+            "mensagem": self.mensagem,
+            "arquivo": self.nome_arquivo,
+            "usuario_id": self.usuario_id,
+            "progresso": progresso,
+            "linhas_lidas": self.linhas_lidas,
+            "importadas": self.importadas,
+            "rejeitadas": self.rejeitadas,
+            "colunas_ignoradas": self.colunas_ignoradas,
+            "erros": self.erros,
+            "criada_em": self.criada_em,
+            "iniciada_em": self.iniciada_em,
+            "concluida_em": self.concluida_em,
+        }
+
+    def registrar_erros(self, escritor, linha: int, problemas: Sequence[Tuple[str, str]]):
+        self.rejeitadas += 1
+        for campo, mensagem in problemas:
+            escritor.writerow([linha, campo, mensagem])
+            if len(self.erros) < ERROS_EM_MEMORIA:
+                self.erros.append({"linha": linha, "campo": campo, "mensagem": mensagem})
+
+
+async def _inserir(db, modelo, registros: Sequence[Tuple[int, BaseModel]]) -> List[Any]:
+    """Insere e confirma os registros; retorna os ids gravados."""
+    objetos = [modelo(**registro.model_dump()) for _, registro in registros]
+    db.add_all(objetos)
+    await db.flush()
+    # Lidos antes do commit, que expira os objetos
+    ids = [objeto.id for objeto in objetos]
+    await db.commit()
+    return ids
+
+
+async def _gravar(db, modelo, registros: Sequence[Tuple[int, BaseModel]]) -> List[Tuple[int, str]]:
+    """
+    Grava o bloco numa transação. Se ela falhar, grava linha a linha para
+    isolar as rejeitadas; retorna (linha, mensagem) das que não entraram.
+
+    A auditoria recebe um registro por bloco (auditar_lote), não um por linha.
+    """
+    if not registros:
+        return []
+    with sem_captura_por_linha(db):
+        try:
+            ids = await _inserir(db, modelo, registros)
+            auditar_lote(modelo.__tablename__, "create_lote", ids, {"origem": "importacao"})
+            return []
+        except SQLAlchemyError as e:
+            await db.rollback()
+            if len(registros) == 1:
+                return [(registros[0][0], f"Erro ao gravar: {e.__class__.__name__}")]
+        finally:
+            # Libera os objetos do bloco: a memória não cresce com o arquivo
+            db.expunge_all()
+        falhas, ids = [], []
+        for linha, registro in registros:
+            try:
+                ids += await _inserir(db, modelo, [(linha, registro)])
+            except SQLAlchemyError as e:
+                await db.rollback()
+                falhas.append((linha, f"Erro ao gravar: {e.__class__.__name__}"))
+            finally:
+                db.expunge_all()
+        auditar_lote(modelo.__tablename__, "create_lote", ids, {"origem": "importacao"})
+    return falhas
+
+
+class RegistroImportacoes:
+    """Importações em andamento e as últimas encerradas, com no máximo `simultaneas` processando ao mesmo tempo."""
+
+    def __init__(self, simultaneas: int = IMPORTACAO_SIMULTANEAS, max_tarefas: int = IMPORTACAO_MAX_TAREFAS,
+                 tamanho_bloco: int = IMPORTACAO_TAMANHO_BLOCO):
+        self.max_tarefas = max_tarefas
+        self.tamanho_bloco = tamanho_bloco
+        self._semaforo = asyncio.Semaphore(simultaneas)
+        self._tarefas: "OrderedDict[str, TarefaImportacao]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tarefas)
+
+    def obter(self, tarefa_id: str) -> Optional[TarefaImportacao]:
+        return self._tarefas.get(tarefa_id)
+
+    def listar(self, usuario_id: Optional[int] = None) -> List[TarefaImportacao]:
+        """Mais recentes primeiro; só as do usuário, se informado."""
+        tarefas = [t for t in self._tarefas.values() if usuario_id is None or t.usuario_id == usuario_id]
+        return tarefas[::-1]
+
+    def criar(self, *args, **kwargs) -> TarefaImportacao:
+        tarefa = TarefaImportacao(*args, **kwargs)
+        self._tarefas[tarefa.id] = tarefa
+        encerradas = [t for t in self._tarefas.values() if t.finalizada]
+        for antiga in encerradas[:max(0, len(self._tarefas) - self.max_tarefas)]:
+            self.remover(antiga)
+        return tarefa
+
+    def remover(self, tarefa: TarefaImportacao):
+        self._tarefas.pop(tarefa.id, None)
+        shutil.rmtree(tarefa.diretorio, ignore_errors=True)
+
+    def iniciar(self, tarefa: TarefaImportacao, fabrica_sessoes):
+        """Processa a tarefa em segundo plano com sessões de `fabrica_sessoes` (ex.: AsyncSessionLocal)."""
+        tarefa._tarefa = asyncio.create_task(self._executar(tarefa, fabrica_sessoes))
+
+    async def cancelar(self, tarefa: TarefaImportacao) -> bool:
+        """
+        Interrompe a tarefa e aguarda o fim do bloco em andamento; os blocos
+        já gravados permanecem. Falso se a tarefa já estava encerrada.
+        """
+        if tarefa.finalizada or tarefa._tarefa is None:
+            return False
+        if tarefa.estado == "na_fila":
+            tarefa._tarefa.cancel()
+        else:
+            tarefa.cancelamento_pedido = True
+        await asyncio.gather(tarefa._tarefa, return_exceptions=True)
+        return True
+
+    async def _executar(self, tarefa: TarefaImportacao, fabrica_sessoes):
+        inicio = time.perf_counter()
+        try:
+            async with self._semaforo:
+                tarefa.estado = "processando"
+                tarefa.iniciada_em = datetime.now(timezone.utc)
+                await self._processar(tarefa, fabrica_sessoes)
+            tarefa.estado = "cancelada" if tarefa.cancelamento_pedido else "concluida"
+        except asyncio.CancelledError:
+            tarefa.estado = "cancelada"
+            raise
+        except (ErroImportacao, UnicodeDecodeError, csv.Error) as e:
+            tarefa.estado = "falhou"
+            tarefa.mensagem = (
+                f"O arquivo não está em {tarefa.codificacao} (a partir da linha {tarefa.linhas_lidas + 2})"
+                if isinstance(e, UnicodeDecodeError) else str(e)
+            )
+        except Exception as e:
+            tarefa.estado = "falhou"
+            tarefa.mensagem = f"Erro inesperado: {e.__class__.__name__}"
+            logger.exception(f"Importação {tarefa.id} de {tarefa.entidade} falhou")
+        finally:
+            tarefa.concluida_em = datetime.now(timezone.utc)
+            if os.path.exists(tarefa.caminho_arquivo):
+                os.remove(tarefa.caminho_arquivo)
+            logger.info(
+                f"Importação {tarefa.id} de {tarefa.entidade} {tarefa.estado}: {tarefa.importadas} importadas, "
+                f"{tarefa.rejeitadas} rejeitadas em {time.perf_counter() - inicio:.1f}s"
+            )
+
+    async def _processar(self, tarefa: TarefaImportacao, fabrica_sessoes):
+        especificacao = tarefa.especificacao
+        leitor = await run_in_threadpool(
+            LeitorBlocos, tarefa.caminho_arquivo, tarefa.codificacao, tarefa.delimitador, self.tamanho_bloco
+        )
+        resolvedor = ResolvedorReferencias(especificacao.referencias.values())
+        try:
+            tarefa.colunas_ignoradas = especificacao.verificar_cabecalho(leitor.cabecalho)
+            with open(tarefa.caminho_erros, "w", newline="", encoding="utf-8") as arquivo_erros:
+                escritor = csv.writer(arquivo_erros)
+                escritor.writerow(["linha", "campo", "mensagem"])
+                async with fabrica_sessoes() as db:
+                    while not tarefa.cancelamento_pedido:
+                        bloco = await run_in_threadpool(leitor.proximo)
+                        if not bloco:
+                            break
+                        await self._processar_bloco(db, tarefa, resolvedor, bloco, escritor)
+                        arquivo_erros.flush()
+                        tarefa.linhas_lidas += len(bloco)
+                        tarefa.bytes_lidos = leitor.posicao
+        finally:
+            await run_in_threadpool(leitor.fechar)
+
+    async def _processar_bloco(self, db, tarefa: TarefaImportacao, resolvedor: ResolvedorReferencias,
+                               bloco: Sequence[Tuple[int, Dict[str, Any]]], escritor):
+        especificacao = tarefa.especificacao
+        convertidas = [especificacao.converter(valores) for _, valores in bloco]
+        await resolvedor.resolver(db, convertidas)
+
+        validos = []
+        for (linha, _), (dados, _, problemas) in zip(bloco, convertidas):
+            registro, problemas_registro = especificacao.validar_registro(dados)
+            # O campo já rejeitado na conversão não é reportado de novo pelo Pydantic ("Field required")
+            campos = {campo for campo, _ in problemas}
+            problemas.extend(problema for problema in problemas_registro if problema[0] not in campos)
+            if problemas:
+                tarefa.registrar_erros(escritor, linha, problemas)
+            else:
+                validos.append((linha, registro))
+
+        falhas = await _gravar(db, especificacao.modelo, validos)
+        for linha, mensagem in falhas:
+            tarefa.registrar_erros(escritor, linha, [("", mensagem)])
+        tarefa.importadas += len(validos) - len(falhas)
+
+    def limpar_diretorios(self):
+        for tarefa in self._tarefas.values():
+            shutil.rmtree(tarefa.diretorio, ignore_errors=True)
+
+
+importacoes = RegistroImportacoes()
+atexit.register(importacoes.limpar_diretorios)
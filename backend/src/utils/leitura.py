@@ -0,0 +1,49 @@
+import os
+from typing import AsyncIterator, Iterable, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.engine import RowMapping
+
+# Linhas buscadas do cursor por vez ao transmitir resultados grandes
+TAMANHO_LOTE_LEITURA = int(os.getenv("DB_YIELD_PER", "2000"))
+
+
+def colunas(modelo, nomes: Optional[Iterable[str]] = None) -> list:
+    """Colunas Core da tabela do modelo (todas, ou as de `nomes`, nessa ordem)."""
+    tabela = modelo.__table__
+    if nomes is None:
+        return list(tabela.c)
+    return [tabela.c[nome] for nome in nomes]
+
+
+def consulta_leitura(modelo, nomes: Optional[Iterable[str]] = None):
+    """
+    select() Core das colunas do modelo.
+
+    O resultado são linhas, não entidades: nada entra no identity map da
+    sessão, não há rastreamento de alterações e nem eventos de carga do ORM.
+    """
+    return select(*colunas(modelo, nomes))
+
+
+async def ler(db, consulta) -> Sequence[RowMapping]:
+    """Executa uma consulta somente leitura e devolve as linhas como mapeamentos."""
+    return (await db.execute(consulta)).mappings().all()
+
+
+async def transmitir(db, consulta, tamanho: int = TAMANHO_LOTE_LEITURA) -> AsyncIterator[Sequence[RowMapping]]:
+    """
+    Percorre o resultado em lotes de `tamanho` linhas (yield_per), sem
+    carregá-lo inteiro na memória.
+
+    O cursor fica aberto enquanto o iterador é consumido; por isso a sessão
+    deve ser própria do iterador (ex.: `async with AsyncSessionLocal()`
+    dentro do gerador de uma StreamingResponse), e não a da dependência
+    get_async_db, encerrada antes do envio do corpo.
+    """
+    resultado = await db.stream(consulta.execution_options(yield_per=tamanho))
+    try:
+        async for lote in resultado.mappings().partitions():
+            yield lote
+    finally:
+        await resultado.close()
@@ -0,0 +1,62 @@
+from typing import Generic, List, Sequence, TypeVar
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+# Ids aceitos por requisição (o IN continua usando o índice da chave primária)
+MAXIMO_IDS = 1000
+
+
+class LoteIds(BaseModel, Generic[T]):
+    """Registros buscados por uma lista de ids, na ordem pedida."""
+    items: List[T]
+    nao_encontrados: List[int]
+
+
+class BatchGetRequest(BaseModel):
+    ids: List[int]
+
+
+def validar_ids(ids: Sequence[int]) -> List[int]:
+    """Remove repetições (mantendo a ordem) e aplica o limite de MAXIMO_IDS."""
+    unicos = list(dict.fromkeys(ids))
+    if len(unicos) > MAXIMO_IDS:
+        raise HTTPException(status_code=400, detail=f"Informe no máximo {MAXIMO_IDS} ids por requisição")
+    return unicos
+
+
+def interpretar_ids(texto: str) -> List[int]:
+    """Converte `?ids=1,2,3` em uma lista de ids."""
+    try:
+        return validar_ids([int(parte) for parte in texto.split(",") if parte.strip()])
+    except ValueError:
+        raise HTTPException(status_code=400, detail="O parâmetro ids deve ser uma lista de inteiros separados por vírgula")
+
+
+def filtrar_ids(consulta, modelo, ids: Sequence[int]):
+    """Restringe um select() ou Query aos ids informados, em uma única consulta IN."""
+    return consulta.where(modelo.id.in_(ids))
+
+
+def montar_lote(registros, ids: Sequence[int]) -> dict:
+    """Ordena os registros como em `ids` e lista os ids que não existem."""
+    por_id = {registro.id: registro for registro in registros}
+    return {
+        "items": [por_id[id_] for id_ in ids if id_ in por_id],
+        "nao_encontrados": [id_ for id_ in ids if id_ not in por_id],
+    }
+
+
+async def buscar_por_ids(db, consulta, modelo, ids: Sequence[int], projetada: bool = False) -> dict:
+    """
+    Executa `consulta` restrita aos ids, na AsyncSession.
+
+    `consulta` é um select() do modelo ou, com `projetada`, um select() de
+    colunas que inclui `modelo.id` (ver src.utils.projecao).
+    """
+    if not ids:
+        return montar_lote([], ids)
+    result = await db.execute(filtrar_ids(consulta, modelo, ids))
+    return montar_lote(result.all() if projetada else result.scalars().unique().all(), ids)
@@ -0,0 +1,266 @@
+"""
+Métricas da API no formato texto do Prometheus (GET /metrics).
+
+MetricasHttpMiddleware mede cada requisição com relógio monotônico e
+alimenta um histograma por (método, rota, status), onde a rota é o modelo
+do caminho (`/api/medicos/{medico_id}`), não o caminho concreto, para
+manter a cardinalidade baixa. Coletores registrados com registrar_coletor()
+acrescentam, no momento da coleta, métricas de outros subsistemas (pool de
+conexões, caches).
+
+O log por requisição é estruturado (uma linha JSON) e amostrado: entram
+LOG_REQUISICOES_AMOSTRA das requisições (0 a 1, padrão 0.1), mais todas as
+que terminam em erro 5xx ou passam de LOG_REQUISICOES_LENTAS_MS.
+"""
+import logging
+import math
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import orjson
+from starlette.routing import Match
+
+logger = logging.getLogger("medflow-api.requisicoes")
+
+LOG_REQUISICOES_AMOSTRA = float(os.getenv("LOG_REQUISICOES_AMOSTRA", "0.1"))
+LOG_REQUISICOES_LENTAS_MS = float(os.getenv("LOG_REQUISICOES_LENTAS_MS", "1000"))
+
+# Limites dos buckets de latência, em segundos
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+ROTA_DESCONHECIDA = "desconhecida"
+
+Rotulos = Tuple[Tuple[str, str], ...]
+# (nome, tipo, ajuda, [(rótulos, valor)])
+Familia = Tuple[str, str, str, List[Tuple[Rotulos, float]]]
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(rotulos: Rotulos) -> str:
+    if not rotulos:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in rotulos) + "}"
+
+
+def _numero(valor: float) -> str:
+    if valor == math.inf:
+        return "+Inf"
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))
+    return repr(valor)
+
+
+class Histograma:
+    """Histograma cumulativo por conjunto de rótulos (contagens por bucket, soma e total)."""
+
+    def __init__(self, nome: str, ajuda: str, nomes_rotulos: Sequence[str], buckets: Sequence[float] = BUCKETS_LATENCIA):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.nomes_rotulos = tuple(nomes_rotulos)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observar(self, valores_rotulos: Sequence[str], valor: float):
+        chave = tuple(valores_rotulos)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                # contagens por bucket + soma + total
+                serie = self._series[chave] = [0] * len(self.buckets) + [0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[i] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def linhas(self) -> Iterable[str]:
+        yield f"# HELP {self.nome} {self.ajuda}"
+        yield f"# TYPE {self.nome} histogram"
+        with self._lock:
+            series = {chave: list(serie) for chave, serie in self._series.items()}
+        for chave, serie in sorted(series.items()):
+            rotulos = tuple(zip(self.nomes_rotulos, chave))
+            for limite, contagem in zip(self.buckets, serie):
+                yield f"{self.nome}_bucket{_rotulos(rotulos + (('le', _numero(limite)),))} {contagem}"
+            yield f"{self.nome}_bucket{_rotulos(rotulos + (('le', '+Inf'),))} {serie[-1]}"
+            yield f"{self.nome}_sum{_rotulos(rotulos)} {_numero(serie[-2])}"
+            yield f"{self.nome}_count{_rotulos(rotulos)} {serie[-1]}"
+
+
+class RegistroMetricas:
+    """Métricas HTTP próprias e coletores de outros subsistemas, expostos juntos em texto."""
+
+    def __init__(self):
+        self.latencia = Histograma(
+            "medflow_http_requisicao_duracao_segundos",
+            "Duração das requisições HTTP por método, rota e status",
+            ("metodo", "rota", "status"),
+        )
+        self._lock = threading.Lock()
+        self.em_andamento = 0
+        self._coletores: List[Callable[[], Iterable[Familia]]] = []
+
+    def entrar(self):
+        with self._lock:
+            self.em_andamento += 1
+
+    def sair(self):
+        with self._lock:
+            self.em_andamento -= 1
+
+    def registrar_coletor(self, coletor: Callable[[], Iterable[Familia]]):
+        self._coletores.append(coletor)
+
+    def texto(self) -> str:
+        linhas = list(self.latencia.linhas())
+        linhas += [
+            "# HELP medflow_http_requisicoes_em_andamento Requisições HTTP em andamento",
+            "# TYPE medflow_http_requisicoes_em_andamento gauge",
+            f"medflow_http_requisicoes_em_andamento {self.em_andamento}",
+        ]
+        for coletor in self._coletores:
+            try:
+                familias = list(coletor())
+            except Exception as e:
+                logger.warning(f"Falha no coletor de métricas {getattr(coletor, '__name__', coletor)}: {e}")
+                continue
+            for nome, tipo, ajuda, amostras in familias:
+                linhas.append(f"# HELP {nome} {ajuda}")
+                linhas.append(f"# TYPE {nome} {tipo}")
+                linhas.extend(f"{nome}{_rotulos(rotulos)} {_numero(valor)}" for rotulos, valor in amostras)
+        return "\n".join(linhas) + "\n"
+
+
+registro_metricas = RegistroMetricas()
+
+
+def rota_da_requisicao(scope) -> str:
+    """Modelo do caminho da rota atendida (inclui o prefixo de routers montados)."""
+    rota = scope.get("route")
+    caminho = getattr(rota, "path", None)
+    if caminho is not None:
+        return scope.get("root_path", "") + caminho
+    # Respostas dadas antes do roteamento (ex.: 304 do GET condicional): procura a rota no app
+    app = scope.get("app")
+    for rota in getattr(app, "routes", ()):
+        correspondencia, _ = rota.matches(scope)
+        if correspondencia == Match.FULL:
+            return getattr(rota, "path", ROTA_DESCONHECIDA)
+    return ROTA_DESCONHECIDA
+
+
+def registrar_requisicao(metodo: str, rota: str, caminho: str, status: int, duracao_s: float, cliente: Optional[str]):
+    duracao_ms = duracao_s * 1000
+    if status < 500 and duracao_ms < LOG_REQUISICOES_LENTAS_MS and random.random() >= LOG_REQUISICOES_AMOSTRA:
+        return
+    nivel = logging.WARNING if status >= 500 or duracao_ms >= LOG_REQUISICOES_LENTAS_MS else logging.INFO
+    logger.log(nivel, orjson.dumps({
+        "evento": "requisicao",
+        "metodo": metodo,
+        "rota": rota,
+        "caminho": caminho,
+        "status": status,
+        "duracao_ms": round(duracao_ms, 2),
+        "cliente": cliente,
+    }).decode())
+
+
+class MetricasHttpMiddleware:
+    """Middleware ASGI que mede as requisições HTTP (duração até o fim do corpo da resposta)."""
+
+    def __init__(self, app, registro: Optional[RegistroMetricas] = None):
+        self.app = app
+        self.registro = registro or registro_metricas
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        inicio = time.perf_counter()
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        self.registro.entrar()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            self.registro.sair()
+            duracao = time.perf_counter() - inicio
+            rota = rota_da_requisicao(scope)
+            self.registro.latencia.observar((scope["method"], rota, str(status)), duracao)
+            cliente = scope.get("client")
+            registrar_requisicao(scope["method"], rota, scope["path"], status, duracao, cliente[0] if cliente else None)
+
+
+# ---------------------------------------------------------------------------
+# Coletores
+# ---------------------------------------------------------------------------
+
+def coletor_pools(pools: Dict[str, Tuple[object, Callable[[], object]]]) -> Callable[[], List[Familia]]:
+    """
+    Métricas dos pools de conexões: `pools` mapeia o nome do pool para
+    (MetricasPool, função que devolve o pool atual do engine).
+    """
+    def coletar() -> List[Familia]:
+        contadores = {
+            "checkouts": ("medflow_db_pool_checkouts_total", "Checkouts de conexão"),
+            "espera_total_ms": ("medflow_db_pool_espera_segundos_total", "Tempo total de espera no checkout"),
+            "timeouts": ("medflow_db_pool_timeouts_total", "Checkouts que estouraram o timeout do pool"),
+            "conexoes_criadas": ("medflow_db_pool_conexoes_criadas_total", "Conexões abertas com o banco"),
+            "invalidacoes": ("medflow_db_pool_invalidacoes_total", "Conexões invalidadas"),
+        }
+        medidores = {
+            "em_uso": ("medflow_db_pool_conexoes_em_uso", "Conexões em uso"),
+            "ociosas": ("medflow_db_pool_conexoes_ociosas", "Conexões ociosas no pool"),
+            "overflow": ("medflow_db_pool_overflow", "Conexões além do tamanho do pool"),
+            "tamanho": ("medflow_db_pool_tamanho", "Tamanho configurado do pool"),
+        }
+        valores: Dict[str, List[Tuple[Rotulos, float]]] = {chave: [] for chave in (*contadores, *medidores)}
+        for nome, (metricas, obter_pool) in pools.items():
+            rotulos = (("pool", nome),)
+            resumo = metricas.resumo(obter_pool())
+            for chave in contadores:
+                valor = getattr(metricas, chave)
+                valores[chave].append((rotulos, valor / 1000 if chave == "espera_total_ms" else valor))
+            for chave in medidores:
+                if resumo.get(chave) is not None:
+                    valores[chave].append((rotulos, resumo[chave]))
+        familias = [(nome, "counter", ajuda, valores[chave]) for chave, (nome, ajuda) in contadores.items()]
+        familias += [(nome, "gauge", ajuda, valores[chave]) for chave, (nome, ajuda) in medidores.items() if valores[chave]]
+        return familias
+    return coletar
+
+
+def coletar_caches() -> List[Familia]:
+    """Caches em memória: contagens da paginação, GET condicional e índice da busca global."""
+    from src.utils.busca_global import indice_global
+    from src.utils.paginacao import cache_contagens
+    from src.utils.versoes import contadores_condicional
+
+    return [
+        ("medflow_cache_consultas_total", "counter", "Consultas aos caches em memória por resultado", [
+            ((("cache", "contagens"), ("resultado", "acerto")), cache_contagens.acertos),
+            ((("cache", "contagens"), ("resultado", "falta")), cache_contagens.faltas),
+        ]),
+        ("medflow_cache_itens", "gauge", "Itens nos caches em memória", [
+            ((("cache", "contagens"),), len(cache_contagens)),
+            ((("cache", "busca_global"),), indice_global.documentos),
+        ]),
+        ("medflow_http_condicional_total", "counter", "Respostas das rotas com ETag por resultado", [
+            ((("resultado", "nao_modificada"),), contadores_condicional.nao_modificadas),
+            ((("resultado", "completa"),), contadores_condicional.respostas - contadores_condicional.nao_modificadas),
+        ]),
+    ]
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class MetricasPool:
+    """Acumula métricas de checkout do pool de conexões (tempo de espera, timeouts etc.)."""
+
+    def __init__(self, janela: int = 1000):
+        self._lock = threading.Lock()
+        self._esperas = deque(maxlen=janela)
+        self.checkouts = 0
+        self.espera_total_ms = 0.0
+        self.espera_maxima_ms = 0.0
+        self.timeouts = 0
+        self.conexoes_criadas = 0
+        self.invalidacoes = 0
+
+    def registrar_espera(self, espera_ms: float):
+        with self._lock:
+            self.checkouts += 1
+            self.espera_total_ms += espera_ms
+            self.espera_maxima_ms = max(self.espera_maxima_ms, espera_ms)
+            self._esperas.append(espera_ms)
+
+    def registrar_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def registrar_conexao(self, *args):
+        with self._lock:
+            self.conexoes_criadas += 1
+
+    def registrar_invalidacao(self, *args):
+        with self._lock:
+            self.invalidacoes += 1
+
+    def monitorar(self, engine):
+        """Registra os eventos de conexão do engine nestas métricas."""
+        event.listen(engine, "connect", self.registrar_conexao)
+        event.listen(engine, "invalidate", self.registrar_invalidacao)
+
+    def resumo(self, pool) -> Dict[str, Any]:
+        """Retorna as métricas acumuladas e a utilização atual do pool."""
+        with self._lock:
+            esperas = sorted(self._esperas)
+            resumo = {
+                "checkouts": self.checkouts,
+                "espera_media_ms": round(self.espera_total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "espera_p95_ms": round(esperas[int(len(esperas) * 0.95) - 1], 3) if esperas else 0.0,
+                "espera_maxima_ms": round(self.espera_maxima_ms, 3),
+                "timeouts": self.timeouts,
+                "conexoes_criadas": self.conexoes_criadas,
+                "invalidacoes": self.invalidacoes,
+            }
+
+        resumo["pool"] = type(pool).__name__
+        if isinstance(pool, QueuePool):
+            capacidade = pool.size() + max(pool._max_overflow, 0)
+            em_uso = pool.checkedout()
+            resumo.update({
+                "tamanho": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "em_uso": em_uso,
+                "ociosas": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "utilizacao": round(em_uso / capacidade, 3) if capacidade > 0 else None,
+            })
+        return resumo
+
+
+metricas_pool = MetricasPool()
+metricas_pool_assincrono = MetricasPool()
+metricas_pool_replica = MetricasPool()
+metricas_pool_replica_assincrono = MetricasPool()
+
+
+class _CheckoutMonitorado:
+    """Mede o tempo de espera de cada checkout do pool."""
+
+    metricas: MetricasPool
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            self.metricas.registrar_timeout()
+            raise
+        finally:
+            self.metricas.registrar_espera((time.perf_counter() - inicio) * 1000)
+
+
+class PoolMonitorado(_CheckoutMonitorado, QueuePool):
+    """QueuePool do engine síncrono com métricas de checkout."""
+
+    metricas = metricas_pool
+
+
+class PoolAssincronoMonitorado(_CheckoutMonitorado, AsyncAdaptedQueuePool):
+    """Pool do engine assíncrono com métricas de checkout."""
+
+    metricas = metricas_pool_assincrono
+
+
+class PoolReplicaMonitorado(_CheckoutMonitorado, QueuePool):
+    """QueuePool do engine síncrono da réplica de leitura."""
+
+    metricas = metricas_pool_replica
+
+
+class PoolReplicaAssincronoMonitorado(_CheckoutMonitorado, AsyncAdaptedQueuePool):
+    """Pool do engine assíncrono da réplica de leitura."""
+
+    metricas = metricas_pool_replica_assincrono
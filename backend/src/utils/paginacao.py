@@ -0,0 +1,230 @@
+import base64
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import text, tuple_
+
+T = TypeVar("T")
+
+
+class PaginaCursor(BaseModel, Generic[T]):
+    """Página de uma listagem paginada por cursor (keyset)."""
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+def _serializar(valor: Any) -> Any:
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return valor
+
+
+def _desserializar(valor: Any, coluna) -> Any:
+    if valor is None:
+        return None
+    try:
+        tipo = coluna.type.python_type
+    except NotImplementedError:
+        return valor
+    if tipo is datetime:
+        return datetime.fromisoformat(valor)
+    if tipo is date:
+        return date.fromisoformat(valor)
+    return tipo(valor)
+
+
+def codificar_cursor(valores: Sequence[Any]) -> str:
+    """Gera um cursor opaco a partir dos valores da chave de ordenação."""
+    bruto = json.dumps([_serializar(v) for v in valores], separators=(",", ":"))
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, colunas: Sequence) -> List[Any]:
+    """Converte um cursor de volta nos valores tipados da chave de ordenação."""
+    try:
+        preenchimento = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+        if not isinstance(valores, list) or len(valores) != len(colunas):
+            raise ValueError("cursor com formato inesperado")
+        return [_desserializar(valor, coluna) for valor, coluna in zip(valores, colunas)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+
+
+def aplicar_cursor(consulta, colunas: Sequence, cursor: Optional[str], limit: int, descendente: bool = False):
+    """
+    Aplica paginação por chave (keyset) a um select()/Query.
+
+    As linhas são ordenadas pelas `colunas` (a última deve ser única, como
+    o id) e apenas as posteriores ao cursor são retornadas. A comparação
+    por tupla, (a, b) > (:a, :b), permite ao PostgreSQL e ao SQLite
+    posicionar-se direto no índice composto. Busca-se uma linha a mais
+    para saber se existe próxima página. Com `descendente`, a ordem é
+    invertida (mais recentes primeiro) e o mesmo índice é percorrido de trás
+    para frente.
+    """
+    if cursor:
+        valores = decodificar_cursor(cursor, colunas)
+        if descendente:
+            consulta = consulta.where(tuple_(*colunas) < tuple_(*valores))
+        else:
+            consulta = consulta.where(tuple_(*colunas) > tuple_(*valores))
+    ordem = [coluna.desc() for coluna in colunas] if descendente else list(colunas)
+    return consulta.order_by(*ordem).limit(limit + 1)
+
+
+def montar_pagina(itens: Sequence[Any], colunas: Sequence, limit: int) -> dict:
+    """Corta a linha extra buscada por aplicar_cursor() e calcula o próximo cursor."""
+    itens = list(itens)
+    next_cursor = None
+    if len(itens) > limit:
+        itens = itens[:limit]
+        ultimo = itens[-1]
+        next_cursor = codificar_cursor([getattr(ultimo, coluna.key) for coluna in colunas])
+    return {"items": itens, "next_cursor": next_cursor}
+
+
+# ---------------------------------------------------------------------------
+# Paginação por página sem COUNT(*) (blueprints Flask)
+# ---------------------------------------------------------------------------
+
+PAGINACAO_CACHE_TTL = float(os.getenv("PAGINACAO_CACHE_TTL", "60"))
+PAGINACAO_CACHE_MAX = 512
+
+
+class CacheContagem:
+    """Cache em memória, com TTL, das contagens usadas como total das listagens."""
+
+    def __init__(self, ttl: float = PAGINACAO_CACHE_TTL, maximo: int = PAGINACAO_CACHE_MAX):
+        self.ttl = ttl
+        self.maximo = maximo
+        self._lock = threading.Lock()
+        self._valores: "OrderedDict[Any, Tuple[float, int]]" = OrderedDict()
+        self.acertos = 0
+        self.faltas = 0
+
+    def __len__(self) -> int:
+        return len(self._valores)
+
+    def obter(self, chave) -> Optional[int]:
+        with self._lock:
+            item = self._valores.get(chave)
+            if item is None or item[0] < time.monotonic():
+                self._valores.pop(chave, None)
+                self.faltas += 1
+                return None
+            self.acertos += 1
+            return item[1]
+
+    def guardar(self, chave, valor: int):
+        with self._lock:
+            self._valores[chave] = (time.monotonic() + self.ttl, valor)
+            self._valores.move_to_end(chave)
+            while len(self._valores) > self.maximo:
+                self._valores.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._valores.clear()
+
+
+cache_contagens = CacheContagem()
+
+
+def _chave_consulta(consulta) -> Tuple[str, str]:
+    compilada = consulta.statement.compile()
+    return str(compilada), repr(sorted(compilada.params.items()))
+
+
+def contar_em_cache(consulta) -> int:
+    """COUNT(*) exato da consulta, reaproveitado por PAGINACAO_CACHE_TTL segundos."""
+    chave = _chave_consulta(consulta)
+    total = cache_contagens.obter(chave)
+    if total is None:
+        total = consulta.order_by(None).count()
+        cache_contagens.guardar(chave, total)
+    return total
+
+
+def estimar_contagem(consulta) -> Optional[int]:
+    """
+    Estimativa de linhas pelas estatísticas do PostgreSQL, sem varrer a tabela.
+
+    Sem filtros usa pg_class.reltuples; com filtros usa a estimativa do
+    planejador (EXPLAIN). Retorna None em outros bancos ou quando a tabela
+    ainda não foi analisada.
+    """
+    conexao = consulta.session.connection()
+    if conexao.dialect.name != "postgresql":
+        return None
+    instrucao = consulta.order_by(None).statement
+    if instrucao.whereclause is None:
+        tabela = instrucao.get_final_froms()[0]
+        estimativa = conexao.execute(
+            text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:tabela)"),
+            {"tabela": tabela.name},
+        ).scalar()
+    else:
+        compilada = instrucao.compile(dialect=conexao.dialect)
+        plano = conexao.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compilada}", compilada.params
+        ).scalar()
+        if isinstance(plano, str):
+            plano = json.loads(plano)
+        estimativa = plano[0]["Plan"]["Plan Rows"]
+    if estimativa is None or estimativa < 0:
+        return None
+    return int(estimativa)
+
+
+def paginar_sem_contagem(consulta, page: int, per_page: int, total: Optional[str] = None) -> Tuple[list, dict]:
+    """
+    Substituto de Query.paginate() que não executa COUNT(*) a cada página.
+
+    Busca per_page + 1 linhas para calcular has_next. O total só é calculado
+    quando pedido pelo cliente (parâmetro `total`): "estimado" usa as
+    estatísticas do banco (caindo para a contagem em cache fora do
+    PostgreSQL) e qualquer outro valor verdadeiro usa a contagem exata em
+    cache. Retorna os itens da página e o bloco `pagination` da resposta.
+    """
+    page = max(page or 1, 1)
+    if not per_page or per_page < 1:
+        per_page = 20
+
+    itens = consulta.limit(per_page + 1).offset((page - 1) * per_page).all()
+    has_next = len(itens) > per_page
+    itens = itens[:per_page]
+
+    paginacao = {
+        "page": page,
+        "per_page": per_page,
+        "has_next": has_next,
+        "has_prev": page > 1,
+        "total": None,
+        "pages": None,
+        "total_estimado": False,
+    }
+
+    modo = (total or "").strip().lower()
+    if modo in ("", "0", "false", "nao", "não"):
+        return itens, paginacao
+
+    quantidade = None
+    if modo == "estimado":
+        quantidade = estimar_contagem(consulta)
+        paginacao["total_estimado"] = quantidade is not None
+    if quantidade is None:
+        quantidade = contar_em_cache(consulta)
+    # A página atual é exata: corrige estimativas/caches defasados
+    quantidade = max(quantidade, (page - 1) * per_page + len(itens) + (1 if has_next else 0))
+    paginacao["total"] = quantidade
+    paginacao["pages"] = math.ceil(quantidade / per_page) if quantidade else 0
+    return itens, paginacao
@@ -0,0 +1,406 @@
+"""
+Particionamento e arquivamento por competência (YYYY-MM).
+
+No PostgreSQL, `plantoes` e `itens_calculados_producao` (migração 0005) e
+`historico_operacoes` (migração 0008) são tabelas particionadas por faixa de
+competência, com uma partição mensal `<tabela>_pAAAA_MM` e uma partição
+padrão `<tabela>_padrao`. Partições futuras são criadas pelo comando
+`python particoes.py criar`.
+
+Anos fechados podem ser arquivados de duas formas:
+
+- `consolidar_ano`: as partições mensais viram uma única partição anual no
+  schema `arquivo` (opcionalmente em outro tablespace); continua sendo lida
+  pelo próprio PostgreSQL, que só a visita quando a faixa consultada chega lá;
+- `exportar_ano`: as linhas vão para um arquivo JSON Lines compactado
+  (gzip), registrado em `arquivos_competencia`, e saem do banco. O arquivo
+  fica em ARQUIVO_DIR, se definido (um disco persistente), ou no próprio
+  catálogo (`conteudo`), que sobrevive a um novo deploy. Leituras feitas com
+  `ler_arquivados`/`ler_competencias` (relatórios e auditoria) incluem o
+  arquivo apenas quando a faixa pedida alcança o ano arquivado.
+
+O histórico de operações tem retenção em meses (`reter`): os meses mais
+antigos que a retenção são exportados mês a mês da mesma forma, e os
+arquivos podem ser descartados depois de um prazo (`descartar_arquivos`).
+"""
+import base64
+import datetime
+import gzip
+import io
+import json
+import logging
+import os
+import uuid
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import (
+    Column, DateTime, Integer, LargeBinary, MetaData, String, Table, and_, delete, func, insert, inspect, select, text
+)
+
+logger = logging.getLogger("medflow-particoes")
+
+TABELAS_PARTICIONADAS = ("plantoes", "itens_calculados_producao", "historico_operacoes")
+SCHEMA_ARQUIVO = "arquivo"
+# Diretório dos arquivos exportados; vazio: gravados no catálogo, no banco
+ARQUIVO_DIR = os.getenv("ARQUIVO_DIR") or None
+
+metadata_arquivos = MetaData()
+
+# Catálogo dos períodos exportados: em `caminho` (ARQUIVO_DIR) ou em `conteudo` (migração 0009)
+arquivos_competencia = Table(
+    "arquivos_competencia", metadata_arquivos,
+    Column("id", Integer, primary_key=True),
+    Column("tabela", String(100), nullable=False),
+    Column("competencia_inicio", String(7), nullable=False),
+    Column("competencia_fim", String(7), nullable=False),
+    Column("caminho", String(500), nullable=True),
+    Column("linhas", Integer, nullable=False),
+    Column("criado_em", DateTime(timezone=True), server_default=func.now()),
+    Column("conteudo", LargeBinary, nullable=True),
+)
+
+
+# ---------------------------------------------------------------------------
+# Competências
+# ---------------------------------------------------------------------------
+
+def competencia_de(data: datetime.date) -> str:
+    return f"{data.year:04d}-{data.month:02d}"
+
+
+def proxima_competencia(competencia: str) -> str:
+    ano, mes = int(competencia[:4]), int(competencia[5:7])
+    return f"{ano + mes // 12:04d}-{mes % 12 + 1:02d}"
+
+
+def competencia_anterior(competencia: str, meses: int = 1) -> str:
+    ano, mes = int(competencia[:4]), int(competencia[5:7])
+    indice = ano * 12 + (mes - 1) - meses
+    return f"{indice // 12:04d}-{indice % 12 + 1:02d}"
+
+
+def competencias_entre(inicio: str, fim: str) -> List[str]:
+    """Competências de `inicio` a `fim`, inclusive."""
+    competencias = []
+    atual = inicio
+    while atual <= fim:
+        competencias.append(atual)
+        atual = proxima_competencia(atual)
+    return competencias
+
+
+def nome_particao(tabela: str, competencia: str) -> str:
+    return f"{tabela}_p{competencia[:4]}_{competencia[5:7]}"
+
+
+# ---------------------------------------------------------------------------
+# Partições (PostgreSQL)
+# ---------------------------------------------------------------------------
+
+def eh_particionada(conexao, tabela: str) -> bool:
+    if conexao.dialect.name != "postgresql":
+        return False
+    return bool(conexao.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :tabela AND c.relnamespace = 'public'::regnamespace"
+    ), {"tabela": tabela}).scalar())
+
+
+def particoes(conexao, tabela: str) -> List[Tuple[str, str, str]]:
+    """(schema, partição, limites) de cada partição da tabela."""
+    return [tuple(linha) for linha in conexao.execute(text(
+        "SELECT n.nspname, c.relname, pg_get_expr(c.relpartbound, c.oid) "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE i.inhparent = CAST(:tabela AS regclass) ORDER BY c.relname"
+    ), {"tabela": f"public.{tabela}"})]
+
+
+def criar_particao_mensal(conexao, tabela: str, competencia: str) -> bool:
+    """Cria a partição mensal da competência; retorna False se ela já existia."""
+    nome = nome_particao(tabela, competencia)
+    if inspect(conexao).has_table(nome):
+        return False
+    # Linhas que caíram na partição padrão precisam sair dela antes
+    padrao = f"{tabela}_padrao"
+    tem_padrao = inspect(conexao).has_table(padrao)
+    if tem_padrao:
+        conexao.execute(text(f'ALTER TABLE "{tabela}" DETACH PARTITION "{padrao}"'))
+    conexao.execute(text(
+        f'CREATE TABLE "{nome}" PARTITION OF "{tabela}" '
+        f"FOR VALUES FROM ('{competencia}') TO ('{proxima_competencia(competencia)}')"
+    ))
+    if tem_padrao:
+        conexao.execute(text(
+            f'INSERT INTO "{tabela}" SELECT * FROM "{padrao}" WHERE competencia >= :inicio AND competencia < :fim'
+        ), {"inicio": competencia, "fim": proxima_competencia(competencia)})
+        conexao.execute(text(
+            f'DELETE FROM "{padrao}" WHERE competencia >= :inicio AND competencia < :fim'
+        ), {"inicio": competencia, "fim": proxima_competencia(competencia)})
+        conexao.execute(text(f'ALTER TABLE "{tabela}" ATTACH PARTITION "{padrao}" DEFAULT'))
+    return True
+
+
+def criar_particoes(conexao, meses_a_frente: int = 3, hoje: Optional[datetime.date] = None) -> List[str]:
+    """Garante as partições da competência atual e dos próximos `meses_a_frente` meses."""
+    atual = competencia_de(hoje or datetime.date.today())
+    competencias = [atual]
+    for _ in range(meses_a_frente):
+        competencias.append(proxima_competencia(competencias[-1]))
+    criadas = []
+    for tabela in TABELAS_PARTICIONADAS:
+        if not eh_particionada(conexao, tabela):
+            continue
+        for competencia in competencias:
+            if criar_particao_mensal(conexao, tabela, competencia):
+                criadas.append(nome_particao(tabela, competencia))
+    return criadas
+
+
+def _verificar_ano_fechado(ano: int, hoje: Optional[datetime.date] = None):
+    if ano >= (hoje or datetime.date.today()).year:
+        raise ValueError(f"Só anos fechados podem ser arquivados ({ano} ainda está em aberto)")
+
+
+def _remover_particoes(conexao, tabela: str, inicio: str, fim: str):
+    """Desanexa e remove as partições mensais das competências de `inicio` a `fim`."""
+    for competencia in competencias_entre(inicio, fim):
+        nome = nome_particao(tabela, competencia)
+        if inspect(conexao).has_table(nome):
+            conexao.execute(text(f'ALTER TABLE "{tabela}" DETACH PARTITION "{nome}"'))
+            conexao.execute(text(f'DROP TABLE "{nome}"'))
+
+
+def consolidar_ano(conexao, tabela: str, ano: int, tablespace: Optional[str] = None) -> str:
+    """Substitui as partições mensais do ano por uma partição anual no schema de arquivo."""
+    _verificar_ano_fechado(ano)
+    if not eh_particionada(conexao, tabela):
+        raise ValueError(f"{tabela} não é particionada (a consolidação exige PostgreSQL)")
+    arquivo = f"{SCHEMA_ARQUIVO}.{tabela}_{ano}"
+    espaco = f' TABLESPACE "{tablespace}"' if tablespace else ""
+    conexao.execute(text(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA_ARQUIVO}"))
+    conexao.execute(text(f'CREATE TABLE {arquivo} (LIKE "{tabela}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS){espaco}'))
+    conexao.execute(text(
+        f'INSERT INTO {arquivo} SELECT * FROM "{tabela}" WHERE competencia >= :inicio AND competencia < :fim'
+    ), {"inicio": f"{ano}-01", "fim": f"{ano + 1}-01"})
+    _remover_particoes(conexao, tabela, f"{ano}-01", f"{ano}-12")
+    if inspect(conexao).has_table(f"{tabela}_padrao"):
+        conexao.execute(text(
+            f'DELETE FROM "{tabela}_padrao" WHERE competencia >= :inicio AND competencia < :fim'
+        ), {"inicio": f"{ano}-01", "fim": f"{ano + 1}-01"})
+    # A CHECK equivalente ao limite evita a varredura de validação no ATTACH
+    conexao.execute(text(
+        f"ALTER TABLE {arquivo} ADD CONSTRAINT {tabela}_{ano}_faixa "
+        f"CHECK (competencia IS NOT NULL AND competencia >= '{ano}-01' AND competencia < '{ano + 1}-01')"
+    ))
+    conexao.execute(text(
+        f'ALTER TABLE "{tabela}" ATTACH PARTITION {arquivo} FOR VALUES FROM (\'{ano}-01\') TO (\'{ano + 1}-01\')'
+    ))
+    return arquivo
+
+
+# ---------------------------------------------------------------------------
+# Arquivos compactados
+# ---------------------------------------------------------------------------
+
+def _codificar(valor):
+    if isinstance(valor, (datetime.date, datetime.datetime, datetime.time)):
+        return valor.isoformat()
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(valor)).decode()
+    if isinstance(valor, (uuid.UUID, Decimal)):
+        return str(valor)
+    return valor
+
+
+def _decodificador(coluna):
+    try:
+        tipo = coluna.type.python_type
+    except NotImplementedError:
+        return lambda valor: valor
+    if tipo is datetime.datetime:
+        return datetime.datetime.fromisoformat
+    if tipo is datetime.date:
+        return datetime.date.fromisoformat
+    if tipo is datetime.time:
+        return datetime.time.fromisoformat
+    if tipo is bytes:
+        return base64.b64decode
+    if tipo in (uuid.UUID, Decimal):
+        return tipo
+    return lambda valor: valor
+
+
+def refletir(conexao, tabela: str) -> Table:
+    # Sem refletir as tabelas referenciadas pelas chaves estrangeiras
+    return Table(tabela, MetaData(), autoload_with=conexao, resolve_fks=False)
+
+
+def _escrever(arquivo, resultado) -> int:
+    linhas = 0
+    for linha in resultado.mappings():
+        arquivo.write(json.dumps({k: _codificar(v) for k, v in linha.items()}, ensure_ascii=False))
+        arquivo.write("\n")
+        linhas += 1
+    return linhas
+
+
+def exportar_competencias(conexao, tabela: str, inicio: str, fim: str, diretorio: Optional[str],
+                          nome: str) -> Tuple[str, int]:
+    """
+    Grava as linhas das competências de `inicio` a `fim` compactadas em
+    `<diretorio>/<nome>.jsonl.gz` ou, sem `diretorio`, no próprio catálogo
+    (o arquivo compactado é montado em memória), registra o arquivo e remove
+    as linhas (ou partições mensais) do banco. Retorna (destino, linhas).
+    """
+    alvo = refletir(conexao, tabela)
+    consulta = select(alvo).where(alvo.c.competencia.between(inicio, fim)).execution_options(yield_per=5000)
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+        caminho = os.path.abspath(os.path.join(diretorio, f"{nome}.jsonl.gz"))
+        if os.path.exists(caminho):
+            raise FileExistsError(f"{caminho} já existe")
+        with gzip.open(caminho, "wt", encoding="utf-8") as arquivo:
+            linhas = _escrever(arquivo, conexao.execute(consulta))
+        conteudo = None
+        destino = caminho
+    else:
+        catalogo = arquivos_competencia.c
+        if conexao.execute(select(catalogo.id).where(
+            catalogo.tabela == tabela, catalogo.competencia_inicio <= fim, catalogo.competencia_fim >= inicio,
+        ).limit(1)).first() is not None:
+            raise ValueError(f"{tabela} de {inicio} a {fim} já tem competências arquivadas")
+        compactado = io.BytesIO()
+        with gzip.open(compactado, "wt", encoding="utf-8") as arquivo:
+            linhas = _escrever(arquivo, conexao.execute(consulta))
+        caminho = None
+        conteudo = compactado.getvalue()
+        destino = f"{arquivos_competencia.name} ({nome})"
+
+    conexao.execute(insert(arquivos_competencia).values(
+        tabela=tabela, competencia_inicio=inicio, competencia_fim=fim, caminho=caminho, linhas=linhas,
+        conteudo=conteudo,
+    ))
+    if eh_particionada(conexao, tabela):
+        # Partições anuais consolidadas inteiramente dentro da faixa
+        for ano in range(int(inicio[:4]), int(fim[:4]) + 1):
+            anual = f"{tabela}_{ano}"
+            if inicio <= f"{ano}-01" and f"{ano}-12" <= fim and inspect(conexao).has_table(anual, schema=SCHEMA_ARQUIVO):
+                conexao.execute(text(f'ALTER TABLE "{tabela}" DETACH PARTITION {SCHEMA_ARQUIVO}.{anual}'))
+                conexao.execute(text(f"DROP TABLE {SCHEMA_ARQUIVO}.{anual}"))
+        _remover_particoes(conexao, tabela, inicio, fim)
+    # Sobras (partição padrão ou bancos sem particionamento)
+    conexao.execute(delete(alvo).where(alvo.c.competencia.between(inicio, fim)))
+    logger.info(f"{linhas} linhas de {tabela} ({inicio} a {fim}) exportadas para {destino}")
+    return destino, linhas
+
+
+def exportar_ano(conexao, tabela: str, ano: int, diretorio: Optional[str]) -> Tuple[str, int]:
+    """Exporta um ano fechado como `<tabela>_<ano>.jsonl.gz` (ver exportar_competencias)."""
+    _verificar_ano_fechado(ano)
+    return exportar_competencias(conexao, tabela, f"{ano}-01", f"{ano}-12", diretorio, f"{tabela}_{ano}")
+
+
+def reter(conexao, tabela: str, meses: int, diretorio: Optional[str],
+          hoje: Optional[datetime.date] = None) -> List[Tuple[str, int]]:
+    """
+    Mantém no banco só as `meses` competências mais recentes da tabela
+    (incluindo a atual); cada competência anterior vira um arquivo
+    `<tabela>_AAAA_MM.jsonl.gz`. Retorna (destino, linhas) de cada arquivo.
+    """
+    if meses < 1:
+        raise ValueError("A retenção deve ser de pelo menos um mês")
+    corte = competencia_anterior(competencia_de(hoje or datetime.date.today()), meses - 1)
+    alvo = refletir(conexao, tabela)
+    antigas = conexao.execute(
+        select(alvo.c.competencia).where(alvo.c.competencia < corte).distinct().order_by(alvo.c.competencia)
+    ).scalars().all()
+    exportados = []
+    for competencia in antigas:
+        nome = f"{tabela}_{competencia[:4]}_{competencia[5:7]}"
+        exportados.append(exportar_competencias(conexao, tabela, competencia, competencia, diretorio, nome))
+    # Partições mensais vazias além da retenção
+    if eh_particionada(conexao, tabela):
+        for schema, particao, _ in particoes(conexao, tabela):
+            if schema == "public" and particao.startswith(f"{tabela}_p"):
+                competencia = particao[len(tabela) + 2:].replace("_", "-")
+                if competencia < corte:
+                    _remover_particoes(conexao, tabela, competencia, competencia)
+    return exportados
+
+
+def descartar_arquivos(conexao, tabela: str, antes_de: str) -> int:
+    """Apaga os arquivos exportados (e suas entradas no catálogo) que terminam antes da competência."""
+    if not inspect(conexao).has_table(arquivos_competencia.name):
+        return 0
+    catalogo = arquivos_competencia.c
+    antigos = conexao.execute(
+        select(catalogo.id, catalogo.caminho).where(catalogo.tabela == tabela, catalogo.competencia_fim < antes_de)
+    ).all()
+    for id_, caminho in antigos:
+        if caminho and os.path.exists(caminho):
+            os.remove(caminho)
+        conexao.execute(delete(arquivos_competencia).where(catalogo.id == id_))
+        logger.info(f"Arquivo descartado: {caminho or f'{arquivos_competencia.name} {id_}'}")
+    return len(antigos)
+
+
+def arquivos_na_faixa(conexao, tabela: str, inicio: str, fim: str) -> List[Tuple[int, Optional[str]]]:
+    """(id, caminho) dos arquivos exportados que contêm alguma competência entre `inicio` e `fim`, mais novos primeiro."""
+    if not inspect(conexao).has_table(arquivos_competencia.name):
+        return []
+    catalogo = arquivos_competencia.c
+    return [tuple(linha) for linha in conexao.execute(
+        select(catalogo.id, catalogo.caminho).where(
+            catalogo.tabela == tabela,
+            catalogo.competencia_inicio <= fim,
+            catalogo.competencia_fim >= inicio,
+        ).order_by(catalogo.competencia_inicio.desc())
+    )]
+
+
+def _abrir_arquivo(conexao, id_: int, caminho: Optional[str]):
+    if caminho:
+        return gzip.open(caminho, "rt", encoding="utf-8")
+    conteudo = conexao.execute(
+        select(arquivos_competencia.c.conteudo).where(arquivos_competencia.c.id == id_)
+    ).scalar()
+    return gzip.open(io.BytesIO(conteudo), "rt", encoding="utf-8")
+
+
+def ler_arquivados(conexao, tabela: str, inicio: str, fim: str, **filtros: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Linhas exportadas da tabela com competência entre `inicio` e `fim` e
+    colunas iguais aos `filtros`, dos arquivos mais novos para os mais
+    antigos. Sem arquivos na faixa, custa uma consulta ao catálogo.
+    """
+    arquivos = arquivos_na_faixa(conexao, tabela, inicio, fim)
+    if not arquivos:
+        return
+    alvo = refletir(conexao, tabela)
+    decodificadores = {coluna.name: _decodificador(coluna) for coluna in alvo.columns}
+    esperados = {nome: _codificar(valor) for nome, valor in filtros.items()}
+    for id_, caminho in arquivos:
+        with _abrir_arquivo(conexao, id_, caminho) as arquivo:
+            for texto in arquivo:
+                linha = json.loads(texto)
+                if not inicio <= linha["competencia"] <= fim:
+                    continue
+                if any(linha.get(nome) != valor for nome, valor in esperados.items()):
+                    continue
+                yield {k: None if v is None else decodificadores[k](v) for k, v in linha.items()}
+
+
+def ler_competencias(conexao, tabela: str, inicio: str, fim: str, **filtros: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Linhas da tabela com competência entre `inicio` e `fim` e colunas iguais
+    aos `filtros`, dos arquivos exportados que a faixa alcançar (ver
+    ler_arquivados) e depois do banco.
+    """
+    yield from ler_arquivados(conexao, tabela, inicio, fim, **filtros)
+    alvo = refletir(conexao, tabela)
+    condicoes = [alvo.c.competencia.between(inicio, fim)]
+    condicoes += [alvo.c[nome] == valor for nome, valor in filtros.items()]
+    for linha in conexao.execute(select(alvo).where(and_(*condicoes))).mappings():
+        yield dict(linha)
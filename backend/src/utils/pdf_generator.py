@@ -5,8 +5,19 @@ import tempfile
 from fpdf import FPDF
 import locale
 
-# Configurar locale para formatação de números
-locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
+_locale_configurado = False
+
+def _configurar_locale():
+    """Configura o locale pt_BR para formatação de valores (apenas uma vez)."""
+    global _locale_configurado
+    if _locale_configurado:
+        return
+    try:
+        locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
+    except locale.Error:
+        # Locale indisponível no servidor: manter o padrão do sistema
+        pass
+    _locale_configurado = True
 
 class PDF(FPDF):
     """Classe personalizada para geração de PDF."""
@@ -95,6 +106,8 @@ def gerar_pdf_producao_medica(dados: Dict[str, Any], logo_path: Optional[str] =
     Returns:
         str: Caminho para o arquivo PDF gerado
     """
+    _configurar_locale()
+    
     # Criar PDF
     pdf = PDF()
     pdf.alias_nb_pages()
@@ -210,6 +223,8 @@ def gerar_pdf_prolabore(dados: Dict[str, Any], logo_path: Optional[str] = None)
     Returns:
         str: Caminho para o arquivo PDF gerado
     """
+    _configurar_locale()
+    
     # Criar PDF
     pdf = PDF()
     pdf.alias_nb_pages()
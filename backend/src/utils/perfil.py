@@ -0,0 +1,290 @@
+"""
+Diagnóstico de requisições lentas: contabilidade de SQL e perfil sob demanda.
+
+Toda requisição HTTP conta as consultas SQL executadas e o tempo gasto nelas
+(medidos por src.utils.tempo_sql, em qualquer Engine) e devolve o
+resultado no cabeçalho `Server-Timing` (`db`, `app` e `total`), visível na
+aba de rede do navegador. Uma mesma instrução repetida mais de
+PERFIL_LIMITE_REPETICOES vezes na requisição (o padrão N+1: uma consulta por
+item de uma lista) gera um aviso no log e a entrada `n1` no Server-Timing.
+
+Administradores podem pedir o perfil de uma requisição com `?perfilar=1` ou
+o cabeçalho `X-Perfilar: 1`: a rota é executada normalmente, amostrando as
+pilhas de chamadas a cada PERFIL_INTERVALO_MS, e a resposta é substituída por
+um relatório em texto (funções com mais amostras, consultas mais repetidas
+e as pilhas no formato "collapsed" do flamegraph.pl/speedscope). As amostras
+da thread do event loop incluem o que outras requisições simultâneas
+estiverem executando; para um perfil limpo, use um servidor sem carga.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from src.utils.metricas import rota_da_requisicao
+from src.utils.tempo_sql import ao_executar
+
+logger = logging.getLogger("medflow-perfil")
+
+PERFIL_LIMITE_REPETICOES = int(os.getenv("PERFIL_LIMITE_REPETICOES", "10"))
+PERFIL_INTERVALO_MS = float(os.getenv("PERFIL_INTERVALO_MS", "2"))
+
+# Arquivos cujas funções, no topo da pilha de uma thread auxiliar, indicam thread ociosa
+_ESPERA = ("threading.py", "queue.py", "selectors.py", os.path.join("concurrent", "futures", "thread.py"))
+
+
+# ---------------------------------------------------------------------------
+# Contabilidade de SQL
+# ---------------------------------------------------------------------------
+
+class ContabilidadeSQL:
+    """Consultas executadas em uma requisição: total, tempo e repetições por instrução."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.consultas = 0
+        self.tempo_s = 0.0
+        self.por_instrucao: Counter = Counter()
+        self.tempo_por_instrucao: Dict[str, float] = {}
+
+    def registrar(self, instrucao: str, duracao_s: float):
+        with self._lock:
+            self.consultas += 1
+            self.tempo_s += duracao_s
+            self.por_instrucao[instrucao] += 1
+            self.tempo_por_instrucao[instrucao] = self.tempo_por_instrucao.get(instrucao, 0.0) + duracao_s
+
+    def repetidas(self, limite: int = PERFIL_LIMITE_REPETICOES) -> List[Tuple[str, int]]:
+        """Instruções executadas mais de `limite` vezes (suspeitas de N+1), da mais repetida à menos."""
+        with self._lock:
+            return [(instrucao, vezes) for instrucao, vezes in self.por_instrucao.most_common() if vezes > limite]
+
+
+_contabilidade_atual: ContextVar[Optional[ContabilidadeSQL]] = ContextVar("contabilidade_sql", default=None)
+
+
+def contabilidade_atual() -> Optional[ContabilidadeSQL]:
+    """Contabilidade da requisição em andamento (None fora de uma requisição HTTP)."""
+    return _contabilidade_atual.get()
+
+
+@ao_executar
+def _contabilizar_consulta(instrucao, parametros, executemany, duracao_s):
+    contabilidade = _contabilidade_atual.get()
+    if contabilidade is not None:
+        contabilidade.registrar(instrucao, duracao_s)
+
+
+# ---------------------------------------------------------------------------
+# Perfil por amostragem
+# ---------------------------------------------------------------------------
+
+def _rotulo(codigo) -> str:
+    arquivo = codigo.co_filename
+    for prefixo in sys.path:
+        if prefixo and arquivo.startswith(prefixo + os.sep):
+            arquivo = arquivo[len(prefixo) + 1:]
+            break
+    return f"{getattr(codigo, 'co_qualname', codigo.co_name)} ({arquivo}:{codigo.co_firstlineno})"
+
+
+class AmostradorPilhas:
+    """
+    Perfil por amostragem: uma thread lê as pilhas de todas as threads
+    (sys._current_frames) a cada `intervalo_ms` e conta as pilhas vistas.
+
+    A thread `principal` (a do event loop) é sempre amostrada; nas demais
+    (threadpool das rotas síncronas) as amostras de threads ociosas são
+    descartadas.
+    """
+
+    def __init__(self, intervalo_ms: float = PERFIL_INTERVALO_MS, principal: Optional[int] = None):
+        self.intervalo_s = intervalo_ms / 1000
+        self.principal = principal if principal is not None else threading.get_ident()
+        self.pilhas: Counter = Counter()
+        self.amostras = 0
+        self.duracao_s = 0.0
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._executar, name="medflow-perfil", daemon=True)
+
+    def _amostrar(self):
+        proprio = threading.get_ident()
+        for ident, quadro in sys._current_frames().items():
+            if ident == proprio:
+                continue
+            if ident != self.principal and quadro.f_code.co_filename.endswith(_ESPERA):
+                continue
+            pilha = []
+            while quadro is not None:
+                pilha.append(_rotulo(quadro.f_code))
+                quadro = quadro.f_back
+            self.pilhas[tuple(reversed(pilha))] += 1
+        self.amostras += 1
+
+    def _executar(self):
+        inicio = time.perf_counter()
+        while not self._parar.wait(self.intervalo_s):
+            self._amostrar()
+        self.duracao_s = time.perf_counter() - inicio
+
+    def iniciar(self):
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        self._thread.join()
+
+    def funcoes(self, limite: int = 30) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]:
+        """(funções por amostras próprias, funções por amostras acumuladas), as `limite` maiores."""
+        proprias: Counter = Counter()
+        acumuladas: Counter = Counter()
+        for pilha, vezes in self.pilhas.items():
+            proprias[pilha[-1]] += vezes
+            for funcao in set(pilha):
+                acumuladas[funcao] += vezes
+        return proprias.most_common(limite), acumuladas.most_common(limite)
+
+
+def relatorio_perfil(metodo: str, caminho: str, status: int, duracao_s: float,
+                     amostrador: AmostradorPilhas, contabilidade: ContabilidadeSQL) -> str:
+    """Relatório em texto do perfil de uma requisição."""
+    linhas = [
+        f"Perfil de {metodo} {caminho}",
+        f"status {status}, {duracao_s * 1000:.1f} ms, {amostrador.amostras} amostras "
+        f"a cada {amostrador.intervalo_s * 1000:g} ms",
+        f"SQL: {contabilidade.consultas} consultas, {contabilidade.tempo_s * 1000:.1f} ms",
+        "",
+    ]
+    proprias, acumuladas = amostrador.funcoes()
+    total = sum(amostrador.pilhas.values()) or 1
+    linhas.append("Funções por amostras próprias:")
+    linhas += [f"  {vezes:6d} {100 * vezes / total:5.1f}%  {funcao}" for funcao, vezes in proprias]
+    linhas += ["", "Funções por amostras acumuladas:"]
+    linhas += [f"  {vezes:6d} {100 * vezes / total:5.1f}%  {funcao}" for funcao, vezes in acumuladas]
+    linhas += ["", "Consultas mais executadas (vezes, ms, instrução):"]
+    for instrucao, vezes in contabilidade.por_instrucao.most_common(20):
+        tempo_ms = contabilidade.tempo_por_instrucao[instrucao] * 1000
+        linhas.append(f"  {vezes:6d} {tempo_ms:9.1f}  {' '.join(instrucao.split())[:300]}")
+    linhas += ["", "Pilhas (formato collapsed):"]
+    linhas += [f"{';'.join(pilha)} {vezes}" for pilha, vezes in amostrador.pilhas.most_common()]
+    return "\n".join(linhas) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------------
+
+def _cabecalho(scope, nome: bytes) -> bytes:
+    for chave, valor in scope["headers"]:
+        if chave == nome:
+            return valor
+    return b""
+
+
+def perfil_pedido(scope) -> bool:
+    """A requisição pede perfil (`?perfilar=1` ou `X-Perfilar: 1`)?"""
+    if _cabecalho(scope, b"x-perfilar") in (b"1", b"true"):
+        return True
+    parametros = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return parametros.get("perfilar", [""])[-1] in ("1", "true")
+
+
+def server_timing(contabilidade: ContabilidadeSQL, duracao_s: float, repetidas: List[Tuple[str, int]]) -> str:
+    entradas = [
+        f'db;dur={contabilidade.tempo_s * 1000:.1f};desc="{contabilidade.consultas} consultas"',
+        f"app;dur={max(duracao_s - contabilidade.tempo_s, 0.0) * 1000:.1f}",
+        f"total;dur={duracao_s * 1000:.1f}",
+    ]
+    if repetidas:
+        entradas.append(f'n1;desc="{len(repetidas)} instrucoes repetidas, ate {repetidas[0][1]}x"')
+    return ", ".join(entradas)
+
+
+class PerfilRequisicaoMiddleware:
+    """
+    Middleware ASGI de contabilidade de SQL (Server-Timing, alerta de N+1) e
+    perfil sob demanda.
+
+    `verificar_admin(authorization)` decide se o cabeçalho Authorization é de
+    um administrador; só então o pedido de perfil é atendido (para os demais,
+    a requisição segue normalmente).
+    """
+
+    def __init__(self, app, verificar_admin: Callable[[str], Awaitable[bool]],
+                 limite_repeticoes: Optional[int] = None):
+        self.app = app
+        self.verificar_admin = verificar_admin
+        self.limite_repeticoes = limite_repeticoes if limite_repeticoes is not None else PERFIL_LIMITE_REPETICOES
+
+    async def _admin(self, scope) -> bool:
+        try:
+            return await self.verificar_admin(_cabecalho(scope, b"authorization").decode("latin-1"))
+        except Exception as e:
+            logger.warning(f"Falha ao verificar permissão de perfil: {e}")
+            return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        perfilar = perfil_pedido(scope) and await self._admin(scope)
+        contabilidade = ContabilidadeSQL()
+        token = _contabilidade_atual.set(contabilidade)
+        inicio = time.perf_counter()
+        repetidas: List[Tuple[str, int]] = []
+
+        async def enviar(mensagem):
+            nonlocal repetidas
+            if mensagem["type"] == "http.response.start":
+                repetidas = contabilidade.repetidas(self.limite_repeticoes)
+                timing = server_timing(contabilidade, time.perf_counter() - inicio, repetidas)
+                mensagem = {**mensagem, "headers": [*mensagem.get("headers", []), (b"server-timing", timing.encode())]}
+            await send(mensagem)
+
+        if not perfilar:
+            try:
+                await self.app(scope, receive, enviar)
+            finally:
+                _contabilidade_atual.reset(token)
+            for instrucao, vezes in repetidas:
+                logger.warning(
+                    f"Possível N+1 em {scope['method']} {rota_da_requisicao(scope)}: "
+                    f"instrução executada {vezes} vezes: {' '.join(instrucao.split())[:300]}"
+                )
+            return
+
+        # Perfil: a resposta da rota é descartada e substituída pelo relatório
+        status = 500
+
+        async def descartar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+
+        amostrador = AmostradorPilhas()
+        amostrador.iniciar()
+        try:
+            await self.app(scope, receive, descartar)
+        finally:
+            amostrador.parar()
+            _contabilidade_atual.reset(token)
+        duracao = time.perf_counter() - inicio
+        corpo = relatorio_perfil(scope["method"], scope["path"], status, duracao, amostrador, contabilidade).encode()
+        logger.info(f"Perfil de {scope['method']} {scope['path']}: {amostrador.amostras} amostras, "
+                    f"{contabilidade.consultas} consultas")
+        await enviar({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(corpo)).encode()),
+                (b"cache-control", b"no-store"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": corpo})
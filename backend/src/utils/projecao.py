@@ -0,0 +1,78 @@
+from collections import namedtuple
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Type
+
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy import select
+
+from src.utils.leitura import colunas
+
+
+def _json_padrao(valor: Any):
+    # datetime, date, time e UUID já são tratados pelo próprio orjson
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def serializar_json(conteudo: Any) -> bytes:
+    # UTC como "Z", igual ao pydantic nas rotas que validam o response_model
+    return orjson.dumps(conteudo, default=_json_padrao, option=orjson.OPT_UTC_Z)
+
+
+class Projecao:
+    """
+    Listagem serializada direto de tuplas de colunas.
+
+    A consulta seleciona as colunas do modelo de resposta (ou só as pedidas
+    em `?fields=id,nome`), mais as `extras` necessárias para cursor e ids, que
+    não vão para a resposta. As linhas viram JSON com orjson, sem construir
+    entidades ORM nem validar o response_model da rota, que continua
+    descrevendo o formato na documentação.
+    """
+
+    def __init__(self, modelo, resposta: Type[BaseModel], fields: Optional[str] = None, extras: Sequence = ()):
+        self.modelo = modelo
+        permitidos = [nome for nome in resposta.model_fields if nome in modelo.__table__.c]
+        pedidos = [campo.strip() for campo in fields.split(",") if campo.strip()] if fields else []
+        invalidos = [campo for campo in pedidos if campo not in permitidos]
+        if invalidos:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Campos inválidos em fields: {', '.join(invalidos)}. Permitidos: {', '.join(permitidos)}",
+            )
+        self.campos: List[str] = list(dict.fromkeys(pedidos)) or permitidos
+        nomes_extras = [coluna.key for coluna in (modelo.id, *extras) if coluna.key not in self.campos]
+        self._colunas = colunas(modelo, self.campos + list(dict.fromkeys(nomes_extras)))
+        self._linha = namedtuple("Linha", [coluna.key for coluna in self._colunas])
+
+    def consulta(self):
+        """select() Core das colunas projetadas (ver src.utils.leitura)."""
+        return select(*self._colunas)
+
+    def query(self, db):
+        """Equivalente de consulta() para as rotas com Session síncrona (db.query)."""
+        return db.query(*self._colunas)
+
+    def linhas(self, result):
+        return result.all()
+
+    def linha(self, valores: dict):
+        """Linha no formato das da consulta a partir de um dicionário (ex.: lido de um arquivo)."""
+        return self._linha(*(valores.get(campo) for campo in self._linha._fields))
+
+    def _dicionarios(self, linhas) -> List[dict]:
+        campos = self.campos
+        quantidade = len(campos)
+        return [dict(zip(campos, linha[:quantidade])) for linha in linhas]
+
+    def responder(self, conteudo) -> Response:
+        """Serializa `conteudo` (lista de linhas, página por cursor ou lote por ids)."""
+        if isinstance(conteudo, dict):
+            conteudo = {**conteudo, "items": self._dicionarios(conteudo["items"])}
+        else:
+            conteudo = self._dicionarios(conteudo)
+        return Response(content=serializar_json(conteudo), media_type="application/json")
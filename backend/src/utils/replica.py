@@ -0,0 +1,281 @@
+"""
+Roteamento de leituras para a réplica do banco (DATABASE_REPLICA_URL).
+
+Sessões abertas dentro de um contexto de leitura (requisições GET/HEAD e
+relatórios em usando_replica()) executam SELECTs na réplica; escritas e
+qualquer consulta depois de um flush vão para o primário. Depois de uma
+escrita, o cliente continua no primário por DB_REPLICA_STICKY_SECONDS, o
+suficiente para a réplica alcançá-lo (read-your-writes). O cliente é
+reconhecido pelo token do cabeçalho Authorization, guardado (como hash) no
+próprio processo: o frontend e a API ficam em sites diferentes e o navegador
+não envia cookies entre eles. O cookie REPLICA_COOKIE continua sendo
+definido para os demais clientes (SameSite=None; Secure em HTTPS).
+
+Se a réplica falhar ao conectar, ela é marcada como indisponível por
+DB_REPLICA_RETRY_SECONDS e as leituras voltam ao primário; uma requisição
+GET que falhou na réplica antes de começar a responder é repetida no
+primário.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("medflow-replica")
+
+REPLICA_COOKIE = "medflow_primario"
+METODOS_LEITURA = {"GET", "HEAD", "OPTIONS"}
+# POSTs que só leem (o corpo carrega a consulta), tratados como GET
+SUFIXOS_LEITURA = ("/batch-get",)
+# Clientes fixados no primário guardados por processo (os mais antigos saem primeiro)
+MAX_CLIENTES_FIXADOS = 10_000
+
+
+class EstadoReplica:
+    """Réplica associada a um engine primário, com o controle de disponibilidade."""
+
+    def __init__(self, engine: Engine, nova_tentativa_s: float):
+        self.engine = engine
+        self.nova_tentativa_s = nova_tentativa_s
+        self._lock = threading.Lock()
+        self._indisponivel_ate = 0.0
+        self.falhas = 0
+        self.leituras = 0
+        event.listen(engine, "handle_error", self._verificar_erro)
+
+    @property
+    def disponivel(self) -> bool:
+        return time.monotonic() >= self._indisponivel_ate
+
+    def marcar_indisponivel(self, motivo):
+        with self._lock:
+            if self.disponivel:
+                logger.warning(f"Réplica indisponível, leituras no primário por {self.nova_tentativa_s:.0f}s: {motivo}")
+            self._indisponivel_ate = time.monotonic() + self.nova_tentativa_s
+            self.falhas += 1
+
+    def _verificar_erro(self, contexto):
+        # Falhas de conexão (inclusive no connect inicial) derrubam a réplica;
+        # erros de SQL comuns não
+        if contexto.is_disconnect or contexto.connection is None:
+            self.marcar_indisponivel(contexto.original_exception)
+
+    def resumo(self):
+        return {"disponivel": self.disponivel, "leituras": self.leituras, "falhas": self.falhas}
+
+
+# engine primário (síncrono) -> réplica
+_replicas: Dict[Engine, EstadoReplica] = {}
+
+
+def registrar_replica(primario: Engine, replica: Engine) -> EstadoReplica:
+    """Associa `replica` ao engine `primario`; para engines assíncronos, use os .sync_engine."""
+    estado = EstadoReplica(replica, float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30")))
+    _replicas[primario] = estado
+    return estado
+
+
+def replica_de(primario: Engine) -> Optional[EstadoReplica]:
+    return _replicas.get(primario)
+
+
+class ContextoLeitura:
+    """Decisão de roteamento da requisição/tarefa atual."""
+
+    def __init__(self, leitura: bool):
+        self.leitura = leitura
+        self.usou_replica = False
+
+
+_contexto: ContextVar[Optional[ContextoLeitura]] = ContextVar("contexto_replica", default=None)
+
+
+@contextmanager
+def usando_replica(leitura: bool = True):
+    """Roteia as leituras das sessões abertas no bloco para a réplica (relatórios, jobs)."""
+    contexto = ContextoLeitura(leitura)
+    token = _contexto.set(contexto)
+    try:
+        yield contexto
+    finally:
+        _contexto.reset(token)
+
+
+class SessaoRoteada(Session):
+    """Session que envia as leituras de um contexto de leitura para a réplica do engine."""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        primario = super().get_bind(mapper=mapper, clause=clause, **kw)
+        contexto = _contexto.get()
+        if contexto is None or not contexto.leitura or self._flushing or self.info.get("escrita"):
+            return primario
+        estado = _replicas.get(primario)
+        if estado is None or not estado.disponivel:
+            return primario
+        contexto.usou_replica = True
+        estado.leituras += 1
+        return estado.engine
+
+
+@event.listens_for(SessaoRoteada, "before_flush")
+def _fixar_primario(sessao, contexto, instancias):
+    # Depois de escrever, a sessão lê do primário para enxergar as próprias alterações
+    sessao.info["escrita"] = True
+
+
+@event.listens_for(SessaoRoteada, "after_commit")
+@event.listens_for(SessaoRoteada, "after_rollback")
+def _liberar_primario(sessao):
+    sessao.info.pop("escrita", None)
+
+
+class FixacaoPrimario:
+    """Clientes que escreveram há menos de `fixacao_s` segundos, por chave (hash do token)."""
+
+    def __init__(self, fixacao_s: float, maximo: int = MAX_CLIENTES_FIXADOS):
+        self.fixacao_s = fixacao_s
+        self.maximo = maximo
+        self._lock = threading.Lock()
+        self._ate: "OrderedDict[str, float]" = OrderedDict()
+
+    def fixar(self, chave: str):
+        agora = time.monotonic()
+        with self._lock:
+            self._ate[chave] = agora + self.fixacao_s
+            self._ate.move_to_end(chave)
+            # A ordem é a do vencimento: os vencidos estão no início
+            while self._ate and (len(self._ate) > self.maximo or next(iter(self._ate.values())) <= agora):
+                self._ate.popitem(last=False)
+
+    def fixado(self, chave: str) -> bool:
+        with self._lock:
+            ate = self._ate.get(chave)
+        return ate is not None and time.monotonic() < ate
+
+    def __len__(self):
+        return len(self._ate)
+
+
+def _cabecalho(scope, nome: bytes) -> Optional[bytes]:
+    for chave, valor in scope.get("headers", ()):
+        if chave == nome:
+            return valor
+    return None
+
+
+class RoteamentoReplicaMiddleware:
+    """
+    Middleware ASGI que define o contexto de leitura de cada requisição.
+
+    Métodos de leitura usam a réplica, a menos que o cliente (token ou
+    cookie) tenha feito uma escrita bem-sucedida há pouco. Se a réplica cair
+    no meio de uma leitura que ainda não começou a responder, a requisição é
+    repetida no primário.
+    """
+
+    def __init__(self, app, fixacao_s: Optional[float] = None):
+        self.app = app
+        self.fixacao_s = int(fixacao_s if fixacao_s is not None else os.getenv("DB_REPLICA_STICKY_SECONDS", "10"))
+        self.fixacao = FixacaoPrimario(self.fixacao_s)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _replicas:
+            await self.app(scope, receive, send)
+            return
+
+        metodo = scope["method"]
+        leitura_por_post = metodo == "POST" and scope["path"].rstrip("/").endswith(SUFIXOS_LEITURA)
+        if metodo not in METODOS_LEITURA and not leitura_por_post:
+            await self.app(scope, receive, self._enviar_fixando(scope, send))
+            return
+        # O corpo de um POST de leitura é guardado para que ele possa ser repetido no primário
+        corpo = await self._ler_corpo(receive) if leitura_por_post else None
+
+        def receptor():
+            return receive if corpo is None else self._reproduzir(corpo, receive)
+
+        contexto = ContextoLeitura(leitura=not self._fixado_no_primario(scope))
+        iniciada = False
+
+        async def enviar(mensagem):
+            nonlocal iniciada
+            iniciada = True
+            await send(mensagem)
+
+        token = _contexto.set(contexto)
+        try:
+            await self.app(scope, receptor(), enviar)
+        except Exception:
+            if iniciada or not contexto.usou_replica or all(e.disponivel for e in _replicas.values()):
+                raise
+            logger.warning(f"Repetindo {metodo} {scope['path']} no primário após falha da réplica")
+            contexto.leitura = False
+            await self.app(scope, receptor(), send)
+        finally:
+            _contexto.reset(token)
+
+    @staticmethod
+    async def _ler_corpo(receive) -> bytes:
+        partes = []
+        while True:
+            mensagem = await receive()
+            if mensagem["type"] != "http.request":
+                break
+            partes.append(mensagem.get("body", b""))
+            if not mensagem.get("more_body", False):
+                break
+        return b"".join(partes)
+
+    @staticmethod
+    def _reproduzir(corpo: bytes, receive):
+        """`receive` que entrega o corpo já lido e depois aguarda o original (desconexão)."""
+        pendente = True
+
+        async def receber():
+            nonlocal pendente
+            if pendente:
+                pendente = False
+                return {"type": "http.request", "body": corpo, "more_body": False}
+            return await receive()
+        return receber
+
+    @staticmethod
+    def _chave_cliente(scope) -> Optional[str]:
+        """Hash do cabeçalho Authorization (o token em si não fica na memória)."""
+        autorizacao = _cabecalho(scope, b"authorization")
+        return hashlib.sha256(autorizacao).hexdigest() if autorizacao else None
+
+    def _fixado_no_primario(self, scope) -> bool:
+        chave = self._chave_cliente(scope)
+        if chave is not None and self.fixacao.fixado(chave):
+            return True
+        cookies = _cabecalho(scope, b"cookie")
+        return cookies is not None and any(
+            parte.strip().startswith(f"{REPLICA_COOKIE}=") for parte in cookies.decode("latin-1").split(";")
+        )
+
+    def _cookie(self, scope) -> bytes:
+        # Em HTTPS (direto ou atrás do proxy do Render) o cookie vale entre sites
+        https = scope.get("scheme") == "https" or _cabecalho(scope, b"x-forwarded-proto") == b"https"
+        politica = "SameSite=None; Secure" if https else "SameSite=Lax"
+        return f"{REPLICA_COOKIE}=1; Max-Age={self.fixacao_s}; Path=/; HttpOnly; {politica}".encode()
+
+    def _enviar_fixando(self, scope, send):
+        chave = self._chave_cliente(scope)
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start" and mensagem["status"] < 400:
+                if chave is not None:
+                    self.fixacao.fixar(chave)
+                mensagem["headers"] = [*mensagem.get("headers", []), (b"set-cookie", self._cookie(scope))]
+            await send(mensagem)
+        return enviar
@@ -0,0 +1,49 @@
+"""
+Cronometragem única das consultas SQL de qualquer Engine.
+
+Um par de eventos before/after_cursor_execute mede cada execução uma vez e
+repassa (instrução, parâmetros, executemany, duração) aos consumidores
+registrados com ao_executar(): a contabilidade por requisição de
+src.utils.perfil e as estatísticas por impressão digital de
+src.utils.consultas_lentas.
+"""
+import time
+from typing import Any, Callable, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+Consumidor = Callable[[str, Any, bool, float], None]
+
+_consumidores: List[Consumidor] = []
+
+
+def ao_executar(consumidor: Consumidor) -> Consumidor:
+    """Registra `consumidor(instrucao, parametros, executemany, duracao_s)`; pode ser usado como decorador."""
+    if consumidor not in _consumidores:
+        _consumidores.append(consumidor)
+    return consumidor
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_da_consulta(conexao, cursor, instrucao, parametros, contexto, executemany):
+    conexao.info.setdefault("consulta_inicio", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _depois_da_consulta(conexao, cursor, instrucao, parametros, contexto, executemany):
+    inicios = conexao.info.get("consulta_inicio")
+    if not inicios:
+        return
+    duracao_s = time.perf_counter() - inicios.pop()
+    for consumidor in _consumidores:
+        consumidor(instrucao, parametros, executemany, duracao_s)
+
+
+@event.listens_for(Engine, "handle_error")
+def _consulta_com_erro(contexto_erro):
+    # Sem after_cursor_execute: descarta o início registrado para não desalinhar a pilha
+    conexao = contexto_erro.connection
+    inicios = conexao.info.get("consulta_inicio") if conexao is not None else None
+    if inicios:
+        inicios.pop()
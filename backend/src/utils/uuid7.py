@@ -0,0 +1,77 @@
+import secrets
+import threading
+import time
+import uuid
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeDecorator
+
+_lock = threading.Lock()
+_ultimo_ms = 0
+_sequencia = 0
+
+
+def uuid7() -> uuid.UUID:
+    """
+    UUID versão 7 (RFC 9562): 48 bits de timestamp em ms seguidos de bits
+    aleatórios, de modo que chaves geradas em sequência ficam ordenadas e
+    os INSERTs vão para o fim do índice em vez de páginas aleatórias.
+
+    Os 12 bits de `rand_a` são um contador que garante a ordem também
+    entre UUIDs gerados no mesmo milissegundo neste processo.
+    """
+    global _ultimo_ms, _sequencia
+    with _lock:
+        agora = time.time_ns() // 1_000_000
+        if agora > _ultimo_ms:
+            _ultimo_ms = agora
+            # Começa na metade inferior para deixar espaço ao incremento
+            _sequencia = secrets.randbits(11)
+        else:
+            _sequencia += 1
+            if _sequencia > 0xFFF:
+                _ultimo_ms += 1
+                _sequencia = secrets.randbits(11)
+        ms, sequencia = _ultimo_ms, _sequencia
+    valor = (ms & 0xFFFFFFFFFFFF) << 80
+    valor |= 0x7 << 76
+    valor |= sequencia << 64
+    valor |= 0b10 << 62
+    valor |= secrets.randbits(62)
+    return uuid.UUID(int=valor)
+
+
+class UUIDCompacto(TypeDecorator):
+    """
+    UUID armazenado de forma compacta: tipo nativo `uuid` no PostgreSQL e
+    BLOB de 16 bytes nos demais bancos (em vez de VARCHAR(36)).
+
+    Aceita uuid.UUID ou a forma textual na escrita e sempre devolve uuid.UUID.
+    """
+
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    @property
+    def python_type(self):
+        return uuid.UUID
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=True))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            value = uuid.UUID(str(value))
+        return value if dialect.name == "postgresql" else value.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return uuid.UUID(bytes=bytes(value))
+        return uuid.UUID(str(value))
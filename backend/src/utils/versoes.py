@@ -0,0 +1,196 @@
+"""
+Contadores de versão por tabela e GET condicional (ETag / 304).
+
+Cada escrita pelo ORM em uma tabela de referência (tipos de plantão,
+hospitais, empresas, contratos) incrementa a versão da tabela em
+`versoes_tabelas`, na mesma transação. As rotas que leem essas
+tabelas respondem com um ETag fraco derivado das versões, do caminho, da
+query string e da credencial; um `If-None-Match` igual recebe 304 sem que a
+rota seja executada, e `Cache-Control` faz o navegador revalidar em vez de
+baixar de novo.
+
+Escritas que não passam pelo flush do ORM (insert()/update() Core) devem
+chamar incrementar_versoes() na mesma conexão.
+"""
+import hashlib
+import logging
+import os
+from itertools import chain
+from typing import Dict, Iterable, Optional, Sequence
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, event, func, insert, select, update
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("medflow-versoes")
+
+metadata_versoes = MetaData()
+
+versoes_tabelas = Table(
+    "versoes_tabelas", metadata_versoes,
+    Column("tabela", String(100), primary_key=True),
+    Column("versao", Integer, nullable=False, default=0),
+    Column("atualizado_em", DateTime(timezone=True), server_default=func.now()),
+)
+
+# Dados de referência: mudam raramente e são relidos a cada carregamento de página.
+# Só as tabelas lidas por alguma rota de ROTAS_VERSIONADAS: as tabelas INSS/IRRF
+# são servidas apenas pelos blueprints Flask, fora da API FastAPI e deste middleware
+TABELAS_VERSIONADAS = frozenset({
+    "tipos_plantao", "hospitais", "empresas", "contratos", "contratos_tipos_plantao",
+})
+
+# Prefixo da rota -> tabelas cujo conteúdo aparece nas respostas (inclui os perfis de carga)
+ROTAS_VERSIONADAS: Dict[str, Sequence[str]] = {
+    "/api/tipos-plantao": ("tipos_plantao",),
+    "/api/hospitais": ("hospitais", "empresas"),
+    "/api/empresas": ("empresas", "hospitais"),
+    "/api/contratos": ("contratos", "contratos_tipos_plantao", "tipos_plantao"),
+}
+
+
+# ---------------------------------------------------------------------------
+# Contadores
+# ---------------------------------------------------------------------------
+
+def incrementar_versoes(conexao, tabelas: Iterable[str]):
+    """Incrementa a versão das tabelas, criando o contador se ainda não existir."""
+    for tabela in sorted(set(tabelas)):
+        resultado = conexao.execute(
+            update(versoes_tabelas)
+            .where(versoes_tabelas.c.tabela == tabela)
+            .values(versao=versoes_tabelas.c.versao + 1, atualizado_em=func.now())
+        )
+        if resultado.rowcount == 0:
+            conexao.execute(insert(versoes_tabelas).values(tabela=tabela, versao=1))
+
+
+def _tabelas_alteradas(sessao) -> set:
+    tabelas = set()
+    for objeto in chain(sessao.new, sessao.deleted, (o for o in sessao.dirty if sessao.is_modified(o))):
+        tabela = getattr(objeto, "__table__", None)
+        if tabela is not None and tabela.name in TABELAS_VERSIONADAS:
+            tabelas.add(tabela.name)
+    return tabelas
+
+
+@event.listens_for(Session, "after_flush")
+def _registrar_versoes(sessao, contexto):
+    tabelas = _tabelas_alteradas(sessao)
+    if tabelas:
+        incrementar_versoes(sessao.connection(), tabelas)
+
+
+async def versoes_atuais(db, tabelas: Sequence[str]) -> Dict[str, int]:
+    """Versão de cada tabela (0 para as que nunca foram alteradas)."""
+    resultado = await db.execute(
+        select(versoes_tabelas.c.tabela, versoes_tabelas.c.versao).where(versoes_tabelas.c.tabela.in_(tabelas))
+    )
+    versoes = dict(resultado.all())
+    return {tabela: versoes.get(tabela, 0) for tabela in tabelas}
+
+
+# ---------------------------------------------------------------------------
+# GET condicional
+# ---------------------------------------------------------------------------
+
+def _cabecalho(scope, nome: bytes) -> bytes:
+    for chave, valor in scope["headers"]:
+        if chave == nome:
+            return valor
+    return b""
+
+
+def calcular_etag(versoes: Dict[str, int], scope) -> str:
+    """
+    ETag fraco da resposta: muda com a versão de qualquer tabela envolvida.
+
+    A credencial entra no hash para que só quem já recebeu a resposta com ela
+    consiga um 304 (o 304 é decidido antes da autenticação, na rota).
+    """
+    resumo = hashlib.blake2b(digest_size=8)
+    resumo.update(scope["path"].encode())
+    resumo.update(b"?" + scope.get("query_string", b""))
+    resumo.update(_cabecalho(scope, b"authorization"))
+    marcador = ".".join(f"{versoes[tabela]}" for tabela in sorted(versoes))
+    return f'W/"{marcador}-{resumo.hexdigest()}"'
+
+
+def etag_confere(if_none_match: str, etag: str) -> bool:
+    """Compara If-None-Match com o ETag (comparação fraca, aceita lista e `*`)."""
+    if not if_none_match:
+        return False
+    candidatos = [valor.strip() for valor in if_none_match.split(",")]
+    sem_prefixo = etag[2:] if etag.startswith("W/") else etag
+    return "*" in candidatos or any(
+        (candidato[2:] if candidato.startswith("W/") else candidato) == sem_prefixo for candidato in candidatos
+    )
+
+
+class ContadoresCondicional:
+    """Respostas das rotas versionadas: total e quantas foram 304."""
+
+    def __init__(self):
+        self.respostas = 0
+        self.nao_modificadas = 0
+
+
+contadores_condicional = ContadoresCondicional()
+
+
+class CacheCondicionalMiddleware:
+    """
+    Middleware ASGI de GET condicional para as rotas de ROTAS_VERSIONADAS.
+
+    Lê as versões das tabelas da rota (uma consulta pela chave primária),
+    responde 304 quando `If-None-Match` confere e, nas respostas 2xx, define
+    ETag e Cache-Control. Deve ficar dentro do RoteamentoReplicaMiddleware,
+    para que as versões sejam lidas do mesmo banco que o conteúdo.
+    """
+
+    def __init__(self, app, sessoes, rotas: Optional[Dict[str, Sequence[str]]] = None,
+                 max_age: Optional[int] = None):
+        self.app = app
+        self.sessoes = sessoes
+        self.rotas = rotas if rotas is not None else ROTAS_VERSIONADAS
+        max_age = int(max_age if max_age is not None else os.getenv("CACHE_REFERENCIA_MAX_AGE", "0"))
+        # private: a resposta depende do usuário autenticado e não deve ir para caches compartilhados
+        self.cache_control = f"private, max-age={max_age}, must-revalidate" if max_age > 0 else "private, no-cache"
+
+    def _tabelas(self, caminho: str) -> Optional[Sequence[str]]:
+        for prefixo, tabelas in self.rotas.items():
+            if caminho == prefixo or caminho.startswith(prefixo + "/"):
+                return tabelas
+        return None
+
+    async def __call__(self, scope, receive, send):
+        tabelas = self._tabelas(scope["path"]) if scope["type"] == "http" and scope["method"] in ("GET", "HEAD") else None
+        if tabelas is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            async with self.sessoes() as db:
+                etag = calcular_etag(await versoes_atuais(db, tabelas), scope)
+        except Exception as e:
+            # Sem contadores (ex.: migração pendente) a rota responde normalmente, sem cache
+            logger.warning(f"Versões indisponíveis para {scope['path']}: {e}")
+            await self.app(scope, receive, send)
+            return
+
+        cabecalhos = [(b"etag", etag.encode()), (b"cache-control", self.cache_control.encode())]
+        contadores_condicional.respostas += 1
+        if etag_confere(_cabecalho(scope, b"if-none-match").decode("latin-1"), etag):
+            contadores_condicional.nao_modificadas += 1
+            await send({"type": "http.response.start", "status": 304, "headers": cabecalhos})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start" and 200 <= mensagem["status"] < 300:
+                existentes = {chave.lower() for chave, _ in mensagem.get("headers", [])}
+                mensagem = {**mensagem, "headers": [
+                    *mensagem.get("headers", []), *(c for c in cabecalhos if c[0] not in existentes)
+                ]}
+            await send(mensagem)
+
+        await self.app(scope, receive, enviar)
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# Os testes importam o backend como os scripts da raiz (src.*)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _auditoria_pendente_temporaria(tmp_path_factory):
+    """Registros de auditoria não gravados nos testes nunca vão para a árvore do repositório."""
+    from src.utils import auditoria
+    auditoria.escritor_auditoria.pendentes = str(tmp_path_factory.mktemp("auditoria") / "pendentes.jsonl")
+    yield
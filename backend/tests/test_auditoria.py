@@ -0,0 +1,211 @@
+import contextvars
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import JSON, Column, DateTime, Integer, String, create_engine, select
+from sqlalchemy.orm import Session, declarative_base
+
+from src.utils import auditoria
+from src.utils.auditoria import EscritorAuditoria, SIGILO
+
+Base = declarative_base()
+
+
+class Conta(Base):
+    __tablename__ = "contas"
+
+    id = Column(Integer, primary_key=True)
+    nome = Column(String(50), nullable=False)
+    email = Column(String(50))
+    senha = Column(String(50))
+    created_at = Column(DateTime, default=datetime.now)
+
+
+class Historico(Base):
+    __tablename__ = "historico"
+
+    id = Column(Integer, primary_key=True)
+    usuario_id = Column(Integer)
+    tipo_operacao = Column(String(50), nullable=False)
+    entidade = Column(String(50), nullable=False)
+    entidade_id = Column(Integer)
+    dados_anteriores = Column(JSON(none_as_null=True))
+    dados_novos = Column(JSON(none_as_null=True))
+    data_hora = Column(DateTime(timezone=True))
+    ip_origem = Column(String(50))
+    competencia = Column(String(7), nullable=False)
+
+
+class SessaoAuditada(Session):
+    pass
+
+
+auditoria.auditar_sessoes(SessaoAuditada)
+
+
+class EscritorFalso:
+    def __init__(self):
+        self.registros = []
+
+    def enfileirar(self, registros):
+        self.registros.extend(registros)
+
+
+@pytest.fixture
+def capturados(monkeypatch):
+    escritor = EscritorFalso()
+    monkeypatch.setattr(auditoria, "escritor_auditoria", escritor)
+    auditoria.registrar_auditoria(Conta, sigilosos=("senha",))
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    escritor.engine = engine
+    yield escritor
+    engine.dispose()
+    del auditoria._auditados[Conta]
+
+
+def _na_requisicao(funcao):
+    """Executa `funcao` com a origem definida, como numa requisição autenticada."""
+    def executar():
+        auditoria.definir_origem(7, "10.0.0.1")
+        funcao()
+    contextvars.copy_context().run(executar)
+
+
+def test_criacao_grava_os_valores_preenchidos(capturados):
+    def criar():
+        with SessaoAuditada(capturados.engine) as sessao:
+            sessao.add(Conta(id=1, nome="Ana", senha="segredo"))
+            sessao.commit()
+
+    _na_requisicao(criar)
+    registro, = capturados.registros
+    assert registro["tipo_operacao"] == "create"
+    assert registro["entidade"] == "contas"
+    assert registro["entidade_id"] == 1
+    assert (registro["usuario_id"], registro["ip_origem"]) == (7, "10.0.0.1")
+    assert registro["competencia"] == registro["data_hora"].strftime("%Y-%m")
+    # created_at é ignorada e email, vazio, não aparece
+    assert registro["dados_anteriores"] is None
+    assert registro["dados_novos"] == {"id": 1, "nome": "Ana", "senha": SIGILO}
+
+
+def test_alteracao_grava_so_as_colunas_alteradas(capturados):
+    with SessaoAuditada(capturados.engine) as sessao:
+        sessao.add(Conta(id=1, nome="Ana", email="a@x.com", senha="s1"))
+        sessao.commit()
+        capturados.registros.clear()
+
+        conta = sessao.get(Conta, 1)
+        conta.nome = "Ana"  # sem alteração real
+        sessao.commit()
+        assert capturados.registros == []
+
+        # Atribuição com o objeto expirado pelo commit: o "antes" vem do banco
+        conta.email = "ana@x.com"
+        conta.senha = "s2"
+        sessao.commit()
+    registro, = capturados.registros
+    assert registro["tipo_operacao"] == "update"
+    assert registro["dados_anteriores"] == {"email": "a@x.com", "senha": SIGILO}
+    assert registro["dados_novos"] == {"email": "ana@x.com", "senha": SIGILO}
+
+
+def test_exclusao_grava_a_linha_removida(capturados):
+    with SessaoAuditada(capturados.engine) as sessao:
+        sessao.add(Conta(id=1, nome="Ana", email="a@x.com"))
+        sessao.commit()
+        capturados.registros.clear()
+        sessao.delete(sessao.get(Conta, 1))
+        sessao.commit()
+    registro, = capturados.registros
+    assert registro["tipo_operacao"] == "delete"
+    assert registro["entidade_id"] == 1
+    assert registro["dados_anteriores"] == {"id": 1, "nome": "Ana", "email": "a@x.com"}
+    assert registro["dados_novos"] is None
+
+
+def test_rollback_descarta_os_registros(capturados):
+    with SessaoAuditada(capturados.engine) as sessao:
+        sessao.add(Conta(id=1, nome="Ana"))
+        sessao.flush()
+        sessao.rollback()
+    assert capturados.registros == []
+
+
+def test_sessoes_e_modelos_fora_da_auditoria(capturados):
+    # Mesma tabela, outra classe: a auditoria é por modelo, não por nome de tabela
+    Outra = declarative_base()
+
+    class OutraConta(Outra):
+        __tablename__ = "contas"
+
+        id = Column(Integer, primary_key=True)
+        nome = Column(String(50), nullable=False)
+
+    with SessaoAuditada(capturados.engine) as sessao:
+        sessao.add(OutraConta(id=1, nome="Ana"))
+        sessao.commit()
+    # Sessão comum (scripts, testes): não auditada
+    with Session(capturados.engine) as sessao:
+        sessao.add(Conta(id=2, nome="Bia"))
+        sessao.commit()
+    assert capturados.registros == []
+
+
+def test_auditar_lote_compacta_os_ids(capturados):
+    auditoria.auditar_lote("plantoes", "create_lote", [5, 1, 2, 3, 9], {"origem": "bulk"})
+    registro, = capturados.registros
+    assert registro["entidade_id"] is None
+    assert registro["dados_novos"] == {"quantidade": 5, "ids": [[1, 3], [5, 5], [9, 9]], "origem": "bulk"}
+
+
+@pytest.fixture
+def destino(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'auditoria.db'}")
+    Base.metadata.create_all(engine)
+    yield engine, str(tmp_path / "pendentes.jsonl")
+    engine.dispose()
+
+
+def _registros(quantidade):
+    return [auditoria._registro("update", "contas", i, None, {"nome": f"n{i}"}) for i in range(1, quantidade + 1)]
+
+
+def _gravados(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(Historico.entidade_id).order_by(Historico.id)).scalars().all()
+
+
+def test_escritor_grava_em_lotes(destino):
+    engine, pendentes = destino
+    # Intervalo longo: cada lote fecha pelo tamanho, o último na parada
+    escritor = EscritorAuditoria(lote=3, intervalo_ms=60_000, pendentes=pendentes)
+    escritor.configurar(engine, Historico.__table__)
+    escritor.enfileirar(_registros(7))
+    escritor.parar(timeout=5)
+    assert (escritor.gravados, escritor.lotes, escritor.falhas) == (7, 3, 0)
+    assert _gravados(engine) == list(range(1, 8))
+
+
+def test_fila_cheia_vai_para_o_arquivo_sem_bloquear(destino, monkeypatch):
+    engine, pendentes = destino
+    escritor = EscritorAuditoria(fila_max=2, pendentes=pendentes)
+    escritor.configurar(engine, Historico.__table__)
+    # Sem a thread, ninguém consome a fila
+    monkeypatch.setattr(escritor, "_iniciar", lambda: None)
+    escritor.enfileirar(_registros(5))
+    assert escritor.na_fila == 2
+    assert escritor.falhas == 3
+    with open(pendentes, "rb") as arquivo:
+        assert len(arquivo.readlines()) == 3
+
+    # O excedente é reenviado na próxima inicialização
+    proximo = EscritorAuditoria(lote=10, intervalo_ms=10, pendentes=pendentes)
+    proximo.configurar(engine, Historico.__table__)
+    proximo.enfileirar([])
+    proximo.parar(timeout=5)
+    assert proximo.gravados == 3
+    assert _gravados(engine) == [3, 4, 5]
+    assert not any(nome.startswith("pendentes") for nome in os.listdir(os.path.dirname(pendentes)))
@@ -0,0 +1,150 @@
+import argparse
+import asyncio
+import json
+import os
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import particoes
+from src.models import Base, HistoricoOperacao
+from src.routes.auditoria import read_historico
+from src.utils.particoes import arquivos_competencia, competencia_anterior, competencia_de, metadata_arquivos
+
+ADMIN = SimpleNamespace(is_admin=True)
+TABELAS = [Base.metadata.tables[nome] for nome in ("users", "historico_operacoes")]
+
+
+def _registros():
+    """30 registros, um por dia a partir de 1º/3/2025, alternando entidade, usuário e operação."""
+    return [
+        {
+            "id": i, "usuario_id": None, "tipo_operacao": ("create", "update", "delete")[i % 3],
+            "entidade": "plantoes" if i % 2 else "medicos", "entidade_id": i % 4,
+            "dados_novos": {"n": i}, "data_hora": datetime(2025, 3, 1) + timedelta(days=i - 1),
+            "competencia": (datetime(2025, 3, 1) + timedelta(days=i - 1)).strftime("%Y-%m"),
+        }
+        for i in range(1, 31)
+    ]
+
+
+def _consultar(**parametros):
+    """Percorre todas as páginas de GET /api/auditoria; retorna (ids, páginas, campos da primeira)."""
+    parametros = {
+        "entidade": None, "entidade_id": None, "usuario_id": None, "tipo_operacao": None,
+        "inicio": None, "fim": None, "cursor": None, "limit": 50, "fields": None,
+        "current_user": ADMIN, **parametros,
+    }
+
+    async def executar():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=TABELAS)
+            await conn.execute(insert(HistoricoOperacao.__table__), _registros())
+        ids, paginas, campos = [], 0, None
+        async with AsyncSession(engine) as db:
+            while True:
+                pagina = json.loads((await read_historico(db=db, **parametros)).body)
+                campos = campos or (sorted(pagina["items"][0]) if pagina["items"] else [])
+                ids += [item["id"] for item in pagina["items"]]
+                paginas += 1
+                if pagina["next_cursor"] is None:
+                    break
+                parametros["cursor"] = pagina["next_cursor"]
+        await engine.dispose()
+        return ids, paginas, campos
+    return asyncio.run(executar())
+
+
+def test_paginas_dos_mais_recentes_aos_mais_antigos():
+    ids, paginas, _ = _consultar(limit=7)
+    assert ids == list(range(30, 0, -1))
+    assert paginas == 5
+
+
+@pytest.mark.parametrize("filtros, esperados", [
+    ({"entidade": "plantoes"}, [i for i in range(30, 0, -1) if i % 2]),
+    ({"entidade": "medicos", "entidade_id": 2}, [i for i in range(30, 0, -1) if i % 2 == 0 and i % 4 == 2]),
+    ({"tipo_operacao": "delete"}, [i for i in range(30, 0, -1) if i % 3 == 2]),
+    # inicio inclusivo, fim exclusivo
+    ({"inicio": datetime(2025, 3, 10), "fim": datetime(2025, 3, 13)}, [12, 11, 10]),
+    ({"inicio": datetime(2025, 3, 29)}, [30, 29]),
+])
+def test_filtros(filtros, esperados):
+    ids, _, _ = _consultar(limit=4, **filtros)
+    assert ids == esperados
+
+
+def test_campos_pedidos():
+    _, _, campos = _consultar(fields="entidade,id", limit=5)
+    assert campos == ["entidade", "id"]
+
+
+@pytest.mark.parametrize("parametros, status", [
+    ({"current_user": SimpleNamespace(is_admin=False)}, 403),
+    ({"entidade_id": 1}, 400),
+    ({"inicio": datetime(2025, 3, 2), "fim": datetime(2025, 3, 1)}, 400),
+    ({"fields": "senha"}, 400),
+])
+def test_requisicoes_recusadas(parametros, status):
+    with pytest.raises(HTTPException) as erro:
+        _consultar(**parametros)
+    assert erro.value.status_code == status
+
+
+# ---------------------------------------------------------------------------
+# Retenção (python particoes.py reter)
+# ---------------------------------------------------------------------------
+
+def test_retencao_exporta_e_descarta(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'medflow.db'}")
+    Base.metadata.create_all(engine, tables=TABELAS)
+    metadata_arquivos.create_all(engine)
+    atual = competencia_de(date.today())
+    # Um registro por mês, do atual até 5 meses atrás
+    meses = [competencia_anterior(atual, i) for i in range(6)]
+    with engine.begin() as conn:
+        conn.execute(insert(HistoricoOperacao.__table__), [
+            {"id": i + 1, "tipo_operacao": "update", "entidade": "plantoes",
+             "data_hora": datetime(int(mes[:4]), int(mes[5:]), 15), "competencia": mes}
+            for i, mes in enumerate(meses)
+        ])
+
+    argumentos = argparse.Namespace(tabela="historico_operacoes", meses=3, descartar_apos=0, diretorio=None)
+    particoes.comando_reter(engine, argumentos)
+    with engine.connect() as conn:
+        no_banco = conn.execute(select(HistoricoOperacao.competencia).order_by(HistoricoOperacao.id)).scalars().all()
+        catalogo = conn.execute(select(arquivos_competencia.c.competencia_inicio, arquivos_competencia.c.caminho)
+                                .order_by(arquivos_competencia.c.competencia_inicio)).all()
+    assert no_banco == meses[:3]
+    assert catalogo == [(mes, None) for mes in reversed(meses[3:])]
+
+    # Executar de novo não exporta nada; com descarte, os arquivos além de 5 meses somem
+    argumentos.descartar_apos = 5
+    particoes.comando_reter(engine, argumentos)
+    with engine.connect() as conn:
+        restantes = conn.execute(select(arquivos_competencia.c.competencia_inicio)
+                                 .order_by(arquivos_competencia.c.competencia_inicio)).scalars().all()
+        assert conn.execute(select(func.count()).select_from(HistoricoOperacao.__table__)).scalar() == 3
+    assert restantes == [meses[4], meses[3]]
+    engine.dispose()
+
+
+def test_descarte_apaga_os_arquivos_do_diretorio(tmp_path):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=TABELAS)
+    metadata_arquivos.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(HistoricoOperacao.__table__), [
+            {"id": 1, "tipo_operacao": "update", "entidade": "plantoes",
+             "data_hora": datetime(2024, 1, 15), "competencia": "2024-01"},
+        ])
+        (caminho, linhas), = particoes.reter(conn, "historico_operacoes", 1, str(tmp_path), hoje=date(2025, 1, 1))
+        assert (os.path.exists(caminho), linhas) == (True, 1)
+        assert particoes.descartar_arquivos(conn, "historico_operacoes", "2024-02") == 1
+    assert not os.path.exists(caminho)
+    engine.dispose()
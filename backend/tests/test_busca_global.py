@@ -0,0 +1,117 @@
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from src.utils.busca_global import (
+    PONTOS_EXATO, PONTOS_PREFIXO, EntidadeBusca, IndiceGlobal, tokens_consulta, tokens_documento,
+)
+
+Base = declarative_base()
+
+
+class Pessoa(Base):
+    __tablename__ = "pessoas"
+
+    id = Column(Integer, primary_key=True)
+    nome = Column(String(80), nullable=False)
+    cpf = Column(String(14))
+    crm = Column(String(20))
+
+
+class Local(Base):
+    __tablename__ = "locais"
+
+    id = Column(Integer, primary_key=True)
+    nome = Column(String(80), nullable=False)
+    cidade = Column(String(80))
+
+
+PESSOAS = EntidadeBusca("medico", Pessoa, "nome", ["nome", "cpf", "crm"], detalhe="CRM {crm}")
+LOCAIS = EntidadeBusca("hospital", Local, "nome", ["nome", "cidade"], detalhe="{cidade}")
+
+
+@pytest.fixture
+def indice():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as sessao:
+        sessao.add_all([
+            Pessoa(id=1, nome="José Ávila", cpf="123.456.789-09", crm="1001"),
+            Pessoa(id=2, nome="Josefa Lima", cpf="987.654.321-00", crm="1002"),
+            Pessoa(id=3, nome="Ana Santos", cpf=None, crm="2001"),
+            Local(id=1, nome="Hospital Santa Casa", cidade="São José"),
+            Local(id=2, nome="Hospital Santos Dumont", cidade="Campinas"),
+        ])
+        sessao.commit()
+        indice = IndiceGlobal()
+        indice.reconstruir(sessao, [PESSOAS, LOCAIS])
+    engine.dispose()
+    return indice
+
+
+def _chaves(resultados):
+    return [(r["tipo"], r["id"]) for r in resultados]
+
+
+def test_tokens_documento_inclui_digitos_dos_documentos():
+    tokens = tokens_documento(["José Ávila", "123.456.789-09", None])
+    assert {"jose", "avila", "123", "456", "789", "09", "12345678909"} <= tokens
+
+
+def test_tokens_consulta():
+    assert tokens_consulta("123.456.789-09") == ["12345678909"]
+    assert tokens_consulta("  José   josé ÁVILA ") == ["jose", "avila"]
+    assert tokens_consulta("  ") == []
+
+
+def test_construcao(indice):
+    assert indice.pronto
+    assert indice.documentos == 5
+
+
+def test_palavra_inteira_antes_de_prefixo(indice):
+    resultados = indice.buscar("jose")
+    # "José Ávila" e o hospital de "São José" têm a palavra; "Josefa" só o prefixo
+    assert _chaves(resultados) == [("hospital", 1), ("medico", 1), ("medico", 2)]
+    assert [r["pontuacao"] for r in resultados] == [PONTOS_EXATO, PONTOS_EXATO, PONTOS_PREFIXO]
+
+
+def test_todos_os_termos_sao_exigidos(indice):
+    assert _chaves(indice.buscar("hospital sant")) == [("hospital", 1), ("hospital", 2)]
+    assert _chaves(indice.buscar("hospital santos")) == [("hospital", 2)]
+    assert indice.buscar("hospital inexistente") == []
+
+
+def test_mais_termos_exatos_primeiro(indice):
+    resultados = indice.buscar("hospital santos")
+    assert resultados[0]["pontuacao"] == 2 * PONTOS_EXATO
+    resultados = indice.buscar("santos")
+    assert _chaves(resultados) == [("medico", 3), ("hospital", 2)]
+
+
+def test_documento_formatado_e_detalhe(indice):
+    resultado, = indice.buscar("12345678909")
+    assert resultado == {
+        "tipo": "medico", "id": 1, "titulo": "José Ávila",
+        "detalhe": "CRM 1001", "pontuacao": PONTOS_EXATO,
+    }
+
+
+def test_prefixo_curto_so_casa_palavra_inteira(indice):
+    assert indice.buscar("a") == []
+
+
+def test_filtro_por_tipo_e_limite(indice):
+    assert _chaves(indice.buscar("jose", tipos={"medico"})) == [("medico", 1), ("medico", 2)]
+    assert _chaves(indice.buscar("jose", limite=1)) == [("hospital", 1)]
+
+
+def test_alteracoes_confirmadas(indice):
+    indice.aplicar([
+        (("medico", 2), PESSOAS.documento(Pessoa(id=2, nome="Josefa Prado", cpf=None, crm="1002"))),
+        (("medico", 3), None),
+    ])
+    assert indice.buscar("lima") == []
+    assert _chaves(indice.buscar("prado")) == [("medico", 2)]
+    assert indice.buscar("ana") == []
+    assert indice.documentos == 4
@@ -0,0 +1,129 @@
+import asyncio
+import gzip
+import zlib
+
+import pytest
+
+from src.utils import compressao
+from src.utils.compressao import CompressaoMiddleware, escolher_codificacao
+
+
+@pytest.fixture
+def com_brotli(monkeypatch):
+    # Só a negociação: o compressor Brotli em si é testado quando o pacote está instalado
+    monkeypatch.setattr(compressao, "brotli", object())
+
+
+@pytest.mark.parametrize("accept_encoding, esperada", [
+    ("gzip, deflate, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("*", "br"),
+    ("*;q=0.5, br;q=0", "gzip"),
+    ("deflate", None),
+    ("", None),
+    ("gzip;q=abc", None),
+])
+def test_negociacao_com_brotli(com_brotli, accept_encoding, esperada):
+    assert escolher_codificacao(accept_encoding) == esperada
+
+
+def test_sem_brotli_so_gzip(monkeypatch):
+    monkeypatch.setattr(compressao, "brotli", None)
+    assert escolher_codificacao("br") is None
+    assert escolher_codificacao("br, gzip") == "gzip"
+
+
+class Aplicacao:
+    def __init__(self, partes, tipo=b"application/json", status=200, cabecalhos=()):
+        self.partes = partes
+        self.tipo = tipo
+        self.status = status
+        self.cabecalhos = list(cabecalhos)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status,
+                    "headers": [(b"content-type", self.tipo), *self.cabecalhos]})
+        for i, parte in enumerate(self.partes):
+            await send({"type": "http.response.body", "body": parte, "more_body": i < len(self.partes) - 1})
+
+
+def _executar(app, accept_encoding=b"gzip", metodo="GET", minimo=100):
+    enviadas = []
+
+    async def send(mensagem):
+        enviadas.append(mensagem)
+
+    scope = {"type": "http", "method": metodo, "headers": [(b"accept-encoding", accept_encoding)]}
+    asyncio.run(CompressaoMiddleware(app, minimo=minimo)(scope, None, send))
+    inicio, *corpo = enviadas
+    return dict(inicio["headers"]), [mensagem["body"] for mensagem in corpo]
+
+
+def test_resposta_inteira_comprimida_com_tamanho():
+    conteudo = b'{"itens": [' + b", ".join(b'{"id": %d}' % i for i in range(200)) + b"]}"
+    cabecalhos, corpo = _executar(Aplicacao([conteudo]))
+    assert cabecalhos[b"content-encoding"] == b"gzip"
+    assert cabecalhos[b"vary"] == b"Accept-Encoding"
+    assert int(cabecalhos[b"content-length"]) == len(corpo[0])
+    assert gzip.decompress(corpo[0]) == conteudo
+
+
+@pytest.mark.parametrize("app, accept_encoding, metodo", [
+    (Aplicacao([b"x" * 50]), b"gzip", "GET"),                     # abaixo do mínimo
+    (Aplicacao([b"x" * 500], tipo=b"image/png"), b"gzip", "GET"),  # tipo não comprimível
+    (Aplicacao([b"x" * 500]), b"identity", "GET"),                 # cliente não aceita
+    (Aplicacao([b"x" * 500], cabecalhos=[(b"content-encoding", b"gzip")]), b"gzip", "GET"),
+    (Aplicacao([b""], status=304), b"gzip", "GET"),
+    (Aplicacao([b"x" * 500]), b"gzip", "HEAD"),
+])
+def test_respostas_sem_compressao(app, accept_encoding, metodo):
+    cabecalhos, corpo = _executar(app, accept_encoding, metodo)
+    # Corpo intacto e, no máximo, a codificação que a própria rota definiu
+    assert b"".join(corpo) == b"".join(app.partes)
+    assert cabecalhos.get(b"content-encoding") == dict(app.cabecalhos).get(b"content-encoding")
+
+
+def test_vary_existente_e_preservado():
+    cabecalhos, _ = _executar(Aplicacao([b"x" * 500], cabecalhos=[(b"vary", b"Origin")]))
+    assert cabecalhos[b"vary"] == b"Origin, Accept-Encoding"
+
+
+def test_streaming_csv_descarrega_cada_parte():
+    partes = [b"id;nome\n" + b"".join(b"%d;medico %d\n" % (i, i) for i in range(20))] + [
+        b"%d;medico %d\n" % (i, i) for i in range(20, 25)
+    ]
+    cabecalhos, corpo = _executar(Aplicacao(partes, tipo=b"text/csv; charset=utf-8"))
+    assert cabecalhos[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in cabecalhos
+    # Cada parte comprimida já traz todo o conteúdo enviado até ali (sync flush)
+    descompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    recebido = b""
+    for i, comprimido in enumerate(corpo[:-1]):
+        recebido += descompressor.decompress(comprimido)
+        assert recebido == b"".join(partes[:i + 1])
+    recebido += descompressor.decompress(corpo[-1]) + descompressor.flush()
+    assert recebido == b"".join(partes)
+
+
+def test_partes_pequenas_acumuladas_ate_o_minimo():
+    partes = [b"[", b"1,", b"2", b"]"]
+    cabecalhos, corpo = _executar(Aplicacao(partes))
+    assert b"content-encoding" not in cabecalhos
+    assert corpo == [b"[1,2]"]
+
+
+def test_json_em_partes_sem_descarregar():
+    partes = [b"x" * 200] * 5
+    _, corpo = _executar(Aplicacao(partes))
+    # Sem sync flush, o compressor guarda a saída até o fim
+    assert gzip.decompress(b"".join(corpo)) == b"".join(partes)
+    assert sum(1 for parte in corpo if parte) < len(partes)
+
+
+def test_compressao_brotli():
+    brotli = pytest.importorskip("brotli")
+    conteudo = b'{"nome": "medico"}' * 100
+    cabecalhos, corpo = _executar(Aplicacao([conteudo]), accept_encoding=b"br")
+    assert cabecalhos[b"content-encoding"] == b"br"
+    assert brotli.decompress(corpo[0]) == conteudo
@@ -0,0 +1,90 @@
+import contextvars
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.utils import consultas_lentas, perfil, tempo_sql
+from src.utils.consultas_lentas import RegistroConsultas, forma_parametros, impressao_digital
+from src.utils.perfil import ContabilidadeSQL
+
+
+@pytest.mark.parametrize("instrucao, esperada", [
+    # Listas de IN, de qualquer tamanho e expandidas pelo SQLAlchemy, viram uma entrada
+    ("SELECT * FROM medicos WHERE id IN (1, 2, 3)", "SELECT * FROM medicos WHERE id IN (...)"),
+    ("SELECT * FROM medicos WHERE id IN (?, ?)", "SELECT * FROM medicos WHERE id IN (...)"),
+    ("SELECT * FROM medicos WHERE id IN (__[POSTCOMPILE_id_1])", "SELECT * FROM medicos WHERE id IN (...)"),
+    # INSERT de várias linhas
+    ("INSERT INTO plantoes (a, b) VALUES (?, ?), (?, ?), (?, ?)", "INSERT INTO plantoes (a, b) VALUES (...)"),
+    ("INSERT INTO plantoes (a) VALUES (%s)", "INSERT INTO plantoes (a) VALUES (...)"),
+    # Conversões de tipo do PostgreSQL ficam; os parâmetros de cada driver não
+    ("SELECT $1::integer, data::date FROM t WHERE x = :x AND y = %(y)s",
+     "SELECT ?::integer, data::date FROM t WHERE x = ? AND y = ?"),
+    # Literais (com aspas escapadas) e números, mas não dígitos de nomes
+    ("SELECT 'it''s', 1.5e3, t2.valor FROM t2", "SELECT ?, ?, t2.valor FROM t2"),
+    ("select  *\n  from t limit 10 offset 20", "select * from t limit ? offset ?"),
+])
+def test_impressao_digital(instrucao, esperada):
+    assert impressao_digital(instrucao) == esperada
+
+
+def test_forma_dos_parametros_sem_valores():
+    assert forma_parametros({"nome": "Ana", "id": 3, "ids": [1, 2], "vazio": None}) == (
+        "{nome: str(3), id: int, ids: list[2], vazio: None}"
+    )
+    assert forma_parametros(("abc", 1.5)) == "(str(3), float)"
+    assert forma_parametros([{"a": 1}, {"a": 2}], executemany=True) == "2x {a: int}"
+
+
+def test_registro_agrega_pela_forma(caplog):
+    registro = RegistroConsultas(limite_lenta_ms=100)
+    for duracao in (0.01, 0.02, 0.03):
+        registro.registrar("SELECT * FROM t WHERE id = 1", None, False, duracao)
+    with caplog.at_level(logging.WARNING, logger="medflow-consultas"):
+        registro.registrar("SELECT * FROM t WHERE id = 2", {"id": 2}, False, 0.2)
+    resumo, = registro.resumo()
+    assert resumo["consulta"] == "SELECT * FROM t WHERE id = ?"
+    assert (resumo["execucoes"], resumo["lentas"], resumo["maximo_ms"], resumo["p95_ms"]) == (4, 1, 200.0, 200.0)
+    assert resumo["tempo_total_ms"] == 260.0
+    # Só a forma dos parâmetros vai para o log e a tabela
+    assert resumo["parametros"] == "{id: int}"
+    assert f"[{resumo['id']}]" in caplog.text and "{id: int}" in caplog.text
+
+
+def test_registro_descarta_a_de_menor_tempo_total():
+    registro = RegistroConsultas(max_impressoes=2)
+    registro.registrar("SELECT a FROM t", None, False, 0.3)
+    registro.registrar("SELECT b FROM t", None, False, 0.1)
+    registro.registrar("SELECT c FROM t", None, False, 0.2)
+    assert [r["consulta"] for r in registro.resumo()] == ["SELECT a FROM t", "SELECT c FROM t"]
+    assert registro.descartadas == 1
+
+
+def test_uma_medicao_alimenta_perfil_e_impressoes(monkeypatch):
+    registro = RegistroConsultas()
+    monkeypatch.setattr(consultas_lentas, "registro_consultas", registro)
+    # O consumidor registrado no import é o método do registro original; troca-o pelo do teste
+    monkeypatch.setattr(tempo_sql, "_consumidores", [perfil._contabilizar_consulta, registro.registrar])
+    engine = create_engine("sqlite://")
+    contabilidade = ContabilidadeSQL()
+
+    def executar():
+        perfil._contabilidade_atual.set(contabilidade)
+        with engine.connect() as conn:
+            for i in range(3):
+                conn.execute(text(f"SELECT {i}"))
+            assert not conn.info.get("consulta_inicio")
+
+    contextvars.copy_context().run(executar)
+    engine.dispose()
+    resumo, = registro.resumo()
+    assert (resumo["consulta"], resumo["execucoes"]) == ("SELECT ?", 3)
+    assert contabilidade.consultas == 3
+    # As duas visões recebem a mesma duração medida
+    assert contabilidade.tempo_s * 1000 == pytest.approx(resumo["tempo_total_ms"], abs=0.01)
+
+
+def test_consumidores_registrados_uma_vez():
+    assert tempo_sql._consumidores.count(perfil._contabilizar_consulta) == 1
+    assert tempo_sql.ao_executar(perfil._contabilizar_consulta) is perfil._contabilizar_consulta
+    assert tempo_sql._consumidores.count(perfil._contabilizar_consulta) == 1
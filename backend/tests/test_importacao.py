@@ -0,0 +1,260 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+from sqlalchemy import Boolean, Column, Date, DateTime, Float, ForeignKey, Integer, String, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from src.utils import auditoria
+from src.utils.importacao import (
+    EspecificacaoImportacao, ErroImportacao, LeitorBlocos, Referencia, _gravar, variantes_cnpj,
+)
+
+Base = declarative_base()
+
+
+class Empresa(Base):
+    __tablename__ = "empresas"
+
+    id = Column(Integer, primary_key=True)
+    cnpj = Column(String(18))
+    is_active = Column(Boolean, default=True)
+
+
+class Pessoa(Base):
+    __tablename__ = "pessoas"
+
+    id = Column(Integer, primary_key=True)
+    nome = Column(String(50), nullable=False)
+    cpf = Column(String(14), unique=True, nullable=False)
+    cnpj = Column(String(18))
+    nascimento = Column(Date)
+    inicio = Column(DateTime(timezone=True))
+    ativo = Column(Boolean)
+    valor = Column(Float)
+    empresa_id = Column(Integer, ForeignKey("empresas.id"))
+
+
+class PessoaCreate(BaseModel):
+    nome: str
+    cpf: str
+    cnpj: Optional[str] = None
+    nascimento: Optional[date] = None
+    inicio: Optional[datetime] = None
+    ativo: Optional[bool] = None
+    valor: Optional[float] = None
+    empresa_id: Optional[int] = None
+
+
+ESPECIFICACAO = EspecificacaoImportacao(
+    Pessoa, PessoaCreate, cpf=("cpf",), cnpj=("cnpj",),
+    referencias=(Referencia("empresa_id", Empresa, "Empresa", chave="cnpj", variantes=variantes_cnpj, feminino=True),),
+)
+
+
+def _csv(tmp_path, conteudo, codificacao="utf-8"):
+    caminho = tmp_path / "arquivo.csv"
+    caminho.write_bytes(conteudo.encode(codificacao))
+    return str(caminho)
+
+
+# ---------------------------------------------------------------------------
+# Leitura em blocos
+# ---------------------------------------------------------------------------
+
+def test_leitura_em_blocos_com_delimitador_detectado(tmp_path):
+    linhas = "".join(f"P{i};{i}\n" for i in range(1, 6))
+    leitor = LeitorBlocos(_csv(tmp_path, f" nome ;cpf\n{linhas}"), "utf-8", None, 2)
+    try:
+        assert leitor.cabecalho == ["nome", "cpf"]
+        blocos = [leitor.proximo() for _ in range(4)]
+    finally:
+        leitor.fechar()
+    assert [len(bloco) for bloco in blocos] == [2, 2, 1, 0]
+    # Número da linha no arquivo (o cabeçalho é a linha 1)
+    assert [linha for bloco in blocos for linha, _ in bloco] == [2, 3, 4, 5, 6]
+    assert blocos[2][0][1] == {"nome": "P5", "cpf": "5"}
+
+
+def test_linha_do_arquivo_com_campo_de_varias_linhas(tmp_path):
+    leitor = LeitorBlocos(_csv(tmp_path, 'nome,obs\nA,"um\ndois"\nB,x\n'), "utf-8", ",", 10)
+    try:
+        bloco = leitor.proximo()
+    finally:
+        leitor.fechar()
+    assert [(linha, valores["nome"]) for linha, valores in bloco] == [(3, "A"), (4, "B")]
+    assert bloco[0][1]["obs"] == "um\ndois"
+
+
+def test_codificacao_informada(tmp_path):
+    leitor = LeitorBlocos(_csv(tmp_path, "nome\nJoão\n", "latin-1"), "latin-1", None, 10)
+    try:
+        assert leitor.proximo() == [(2, {"nome": "João"})]
+    finally:
+        leitor.fechar()
+
+
+def test_arquivo_vazio(tmp_path):
+    with pytest.raises(ErroImportacao):
+        LeitorBlocos(_csv(tmp_path, ""), "utf-8", None, 10)
+
+
+# ---------------------------------------------------------------------------
+# Conversão e validação das linhas
+# ---------------------------------------------------------------------------
+
+def test_cabecalho():
+    assert ESPECIFICACAO.verificar_cabecalho(["nome", "cpf", "empresa_cnpj", "extra"]) == ["extra"]
+    with pytest.raises(ErroImportacao) as erro:
+        ESPECIFICACAO.verificar_cabecalho(["nome"])
+    assert str(erro.value) == "Colunas obrigatórias ausentes: cpf"
+
+
+def test_converte_documentos_datas_e_numeros():
+    dados, chaves, problemas = ESPECIFICACAO.converter({
+        "nome": " Ana ", "cpf": "52998224725", "cnpj": "11222333000181",
+        "nascimento": "01/03/1990", "inicio": "2025-03-01 07:00", "ativo": "Sim", "valor": "1.234,56",
+        # Vazias, além do cabeçalho, faltando no fim da linha e desconhecidas ficam de fora
+        "empresa_id": "", None: ["sobra"], "outra": None, "extra": "x",
+    })
+    assert problemas == []
+    assert chaves == {}
+    assert dados == {
+        "nome": "Ana", "cpf": "529.982.247-25", "cnpj": "11.222.333/0001-81",
+        "nascimento": date(1990, 3, 1), "inicio": datetime(2025, 3, 1, 7), "ativo": True, "valor": "1234.56",
+    }
+    registro, problemas = ESPECIFICACAO.validar_registro(dados)
+    assert problemas == []
+    assert registro.valor == 1234.56
+
+
+def test_data_e_hora_iso_com_fuso():
+    dados, _, problemas = ESPECIFICACAO.converter({"inicio": "2025-03-01T07:00:00-03:00"})
+    assert problemas == []
+    assert dados["inicio"] == datetime(2025, 3, 1, 7, tzinfo=timezone(timedelta(hours=-3)))
+
+
+@pytest.mark.parametrize("coluna, valor, mensagem", [
+    ("cpf", "529.982.247-24", "CPF inválido: 529.982.247-24"),
+    ("cpf", "111.111.111-11", "CPF inválido: 111.111.111-11"),
+    ("cnpj", "11222333000182", "CNPJ inválido: 11222333000182"),
+    ("nascimento", "31/02/1990", "Data inválida (use AAAA-MM-DD ou DD/MM/AAAA): 31/02/1990"),
+    ("nascimento", "1990/03/01", "Data inválida (use AAAA-MM-DD ou DD/MM/AAAA): 1990/03/01"),
+    ("inicio", "amanhã", "Data e hora inválida (use AAAA-MM-DD HH:MM ou DD/MM/AAAA HH:MM): amanhã"),
+    ("empresa_id", "E1", "Id inválido: E1"),
+])
+def test_valores_invalidos(coluna, valor, mensagem):
+    dados, _, problemas = ESPECIFICACAO.converter({"nome": "Ana", coluna: valor})
+    assert problemas == [(coluna, mensagem)]
+    assert coluna not in dados
+
+
+def test_referencia_pela_chave_natural():
+    dados, chaves, problemas = ESPECIFICACAO.converter({"empresa_cnpj": "11.222.333/0001-81"})
+    assert (dados, chaves, problemas) == ({}, {"empresa_id": "11.222.333/0001-81"}, [])
+    _, _, problemas = ESPECIFICACAO.converter({"empresa_id": "1", "empresa_cnpj": "11222333000181"})
+    assert problemas == [("empresa_id", "Informe empresa_id ou empresa_cnpj, não os dois")]
+
+
+# ---------------------------------------------------------------------------
+# Gravação do bloco
+# ---------------------------------------------------------------------------
+
+def _pessoa(nome, cpf):
+    return PessoaCreate(nome=nome, cpf=cpf)
+
+
+class SessaoAuditada(Session):
+    pass
+
+
+auditoria.auditar_sessoes(SessaoAuditada)
+
+
+class EscritorFalso:
+    def __init__(self):
+        self.registros = []
+
+    def enfileirar(self, registros):
+        self.registros.extend(registros)
+
+
+@pytest.fixture(autouse=True)
+def auditados(monkeypatch):
+    escritor = EscritorFalso()
+    monkeypatch.setattr(auditoria, "escritor_auditoria", escritor)
+    auditoria.registrar_auditoria(Pessoa)
+    yield escritor.registros
+    del auditoria._auditados[Pessoa]
+
+
+def _gravar_bloco(registros, existentes=()):
+    async def executar():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSession(engine, sync_session_class=SessaoAuditada) as sessao:
+            sessao.add_all([Pessoa(**registro.model_dump(include={"nome", "cpf"})) for registro in existentes])
+            await sessao.commit()
+            auditoria.escritor_auditoria.registros.clear()
+            falhas = await _gravar(sessao, Pessoa, registros)
+            gravados = (await sessao.execute(select(Pessoa.nome).order_by(Pessoa.id))).scalars().all()
+        await engine.dispose()
+        return falhas, gravados
+    return asyncio.run(executar())
+
+
+def _lote(auditados):
+    """(quantidade, ids) do registro único de auditoria do bloco."""
+    registro, = auditados
+    assert (registro["tipo_operacao"], registro["entidade"], registro["entidade_id"]) == ("create_lote", "pessoas", None)
+    assert registro["dados_novos"]["origem"] == "importacao"
+    return registro["dados_novos"]["quantidade"], registro["dados_novos"]["ids"]
+
+
+def test_bloco_gravado_numa_transacao(auditados):
+    falhas, gravados = _gravar_bloco([(2, _pessoa("A", "1")), (3, _pessoa("B", "2"))])
+    assert falhas == []
+    assert gravados == ["A", "B"]
+    # Um registro para o bloco, nenhum por linha
+    assert _lote(auditados) == (2, [[1, 2]])
+
+
+def test_falha_no_bloco_grava_linha_a_linha(auditados):
+    falhas, gravados = _gravar_bloco(
+        [(2, _pessoa("A", "1")), (3, _pessoa("B", "9")), (4, _pessoa("C", "2")), (5, _pessoa("D", "2"))],
+        existentes=[_pessoa("X", "9")],
+    )
+    # Só as linhas que violam a unicidade ficam de fora
+    assert falhas == [(3, "Erro ao gravar: IntegrityError"), (5, "Erro ao gravar: IntegrityError")]
+    assert gravados == ["X", "A", "C"]
+    assert _lote(auditados)[0] == 2
+
+
+def test_falha_de_uma_linha_so(auditados):
+    falhas, gravados = _gravar_bloco([(7, _pessoa("B", "9"))], existentes=[_pessoa("X", "9")])
+    assert falhas == [(7, "Erro ao gravar: IntegrityError")]
+    assert gravados == ["X"]
+    assert auditados == []
+
+
+def test_bloco_vazio():
+    assert _gravar_bloco([]) == ([], [])
+
+
+def test_fora_da_importacao_a_captura_continua(auditados):
+    async def executar():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSession(engine, sync_session_class=SessaoAuditada) as sessao:
+            await _gravar(sessao, Pessoa, [(2, _pessoa("A", "1"))])
+            sessao.add(Pessoa(nome="B", cpf="2"))
+            await sessao.commit()
+        await engine.dispose()
+    asyncio.run(executar())
+    # A mesma sessão volta a capturar linha a linha depois do bloco
+    assert [registro["tipo_operacao"] for registro in auditados] == ["create_lote", "create"]
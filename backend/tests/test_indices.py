@@ -0,0 +1,110 @@
+import os
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import Boolean, Column, Date, MetaData, String, Table, create_engine, insert, select, text
+from sqlalchemy.schema import CreateTable
+
+from src.models import Base, HistoricoOperacao, Plantao
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEDICOS = list(range(1, 41))
+INICIO = datetime(2024, 1, 1)
+
+
+def _configuracao(conexao):
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "alembic"))
+    config.attributes["connection"] = conexao
+    return config
+
+
+def _popular(conn):
+    """Massa de dados pequena, mas com cardinalidade realista (40 médicos, dois anos)."""
+    aleatorio = random.Random(42)
+    conn.execute(insert(Base.metadata.tables["medicos"]), [
+        {"id": i, "nome": f"Médico {i}", "crm": str(i), "cpf": str(i)} for i in MEDICOS
+    ])
+    conn.execute(insert(Base.metadata.tables["hospitais"]), [{"id": 1, "nome": "H"}])
+    conn.execute(insert(Base.metadata.tables["tipos_plantao"]), [{"id": 1, "nome": "T"}])
+    linhas = []
+    for i in range(1, 6001):
+        data_inicio = INICIO + timedelta(hours=aleatorio.randint(0, 2 * 365 * 24))
+        linhas.append({
+            "id": i, "medico_id": aleatorio.choice(MEDICOS), "hospital_id": 1, "tipo_plantao_id": 1,
+            "data_inicio": data_inicio, "data_fim": data_inicio + timedelta(hours=12),
+            "valor": aleatorio.uniform(100, 3000), "competencia": data_inicio.strftime("%Y-%m"),
+        })
+    conn.execute(insert(Plantao.__table__), linhas)
+    conn.execute(insert(HistoricoOperacao.__table__), [
+        {
+            "id": linha["id"], "usuario_id": None, "tipo_operacao": "create", "entidade": "plantoes",
+            "entidade_id": linha["id"], "data_hora": linha["data_inicio"], "competencia": linha["competencia"],
+        }
+        for linha in linhas
+    ])
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('indices') / 'medflow.db'}")
+    # Tabelas dos modelos sem os índices: quem os cria são as migrações, como em produção
+    with engine.begin() as conn:
+        for tabela in Base.metadata.sorted_tables:
+            conn.execute(CreateTable(tabela))
+        _popular(conn)
+    with engine.connect() as conn:
+        command.upgrade(_configuracao(conn), "head")
+        conn.commit()
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    yield engine
+    engine.dispose()
+
+
+def _consultas():
+    plantoes = Plantao.__table__
+    historico = HistoricoOperacao.__table__
+    periodo = (plantoes.c.data_inicio >= datetime(2025, 3, 1), plantoes.c.data_inicio < datetime(2025, 4, 1))
+    # Plantões do médico no período
+    yield "plantoes_medico", select(plantoes).where(plantoes.c.medico_id == 7, *periodo)
+    # Listagem do período, paginada por (data_inicio, id)
+    yield "plantoes_periodo", select(plantoes).where(*periodo).order_by(plantoes.c.data_inicio, plantoes.c.id)
+    # Auditoria de uma entidade e do período, mais recentes primeiro
+    yield "historico_entidade", select(historico).where(
+        historico.c.entidade == "plantoes", historico.c.entidade_id == 7,
+    ).order_by(historico.c.data_hora.desc(), historico.c.id.desc())
+    yield "historico_periodo", select(historico).where(
+        historico.c.data_hora >= datetime(2025, 3, 1),
+    ).order_by(historico.c.data_hora.desc(), historico.c.id.desc())
+
+
+def _plano(conn, consulta):
+    sql = str(consulta.compile(conn, compile_kwargs={"literal_binds": True}))
+    return [linha[-1] for linha in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+
+
+@pytest.mark.parametrize("nome, consulta", list(_consultas()), ids=[nome for nome, _ in _consultas()])
+def test_consulta_usa_indice(engine, nome, consulta):
+    """As consultas por médico, período e entidade não podem cair em varredura sequencial nem ordenar."""
+    with engine.connect() as conn:
+        plano = _plano(conn, consulta)
+    problemas = [passo for passo in plano if passo.startswith("SCAN") or "TEMP B-TREE" in passo]
+    assert not problemas, f"Varredura ou ordenação no plano: {plano}"
+
+
+def test_tabela_fora_dos_esquemas_conhecidos_falha():
+    engine = create_engine("sqlite://")
+    # Tabela do esquema completo sem as colunas dos índices
+    Table(
+        "prolabores", MetaData(),
+        Column("id", String(36), primary_key=True), Column("data", Date), Column("ativo", Boolean),
+    ).create(engine)
+    with engine.connect() as conn:
+        with pytest.raises(RuntimeError, match="prolabores não tem as colunas .*competencia, confirmado, medico_id"):
+            command.upgrade(_configuracao(conn), "0001")
+    engine.dispose()
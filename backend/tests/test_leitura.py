@@ -0,0 +1,146 @@
+import asyncio
+import csv
+import io
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.models import Base, Hospital, Medico, Plantao
+from src.routes import importacao_exportacao
+from src.routes.relatorios import relatorio_plantoes_por_medico
+from src.utils.leitura import colunas, consulta_leitura, ler, transmitir
+from src.utils.particoes import metadata_arquivos
+
+USUARIO = SimpleNamespace(id=1, is_admin=False)
+TABELAS = [Base.metadata.tables[nome] for nome in ("empresas", "hospitais", "medicos", "tipos_plantao", "plantoes")]
+
+
+def _criar(conn):
+    Base.metadata.create_all(conn, tables=TABELAS)
+    metadata_arquivos.create_all(conn)
+    conn.execute(insert(Medico.__table__), [
+        {"id": i, "nome": f"Médico {i:02d}", "crm": str(i), "cpf": str(i)} for i in range(1, 26)
+    ])
+    conn.execute(insert(Hospital.__table__), [{"id": 1, "nome": "H1"}, {"id": 2, "nome": "H2"}])
+    conn.execute(insert(Base.metadata.tables["tipos_plantao"]), [{"id": 1, "nome": "T"}])
+    conn.execute(insert(Plantao.__table__), [
+        {"id": i, "medico_id": 1 + i % 2, "hospital_id": 1 + i % 3 // 2, "tipo_plantao_id": 1,
+         "data_inicio": datetime(2025, 3, i, 19), "data_fim": datetime(2025, 3, i + 1, 7), "valor": 100.0 * i,
+         "competencia": "2025-03"}
+        for i in range(1, 7)
+    ])
+
+
+def _com_banco(usar):
+    """Executa `usar(sessoes)` com uma fábrica de AsyncSession sobre um SQLite preparado por _criar."""
+    async def executar():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(_criar)
+        try:
+            return await usar(async_sessionmaker(engine))
+        finally:
+            await engine.dispose()
+    return asyncio.run(executar())
+
+
+def test_colunas_na_ordem_pedida():
+    assert [coluna.key for coluna in colunas(Medico, ["nome", "id"])] == ["nome", "id"]
+    assert colunas(Medico) == list(Medico.__table__.c)
+    consulta = consulta_leitura(Medico, ["id", "crm"])
+    assert [coluna.name for coluna in consulta.selected_columns] == ["id", "crm"]
+
+
+def test_ler_devolve_mapeamentos_sem_entidades():
+    async def usar(sessoes):
+        async with sessoes() as db:
+            linhas = await ler(db, consulta_leitura(Medico, ["id", "nome"]).where(Medico.id <= 2).order_by(Medico.id))
+            return [dict(linha) for linha in linhas], len(db.identity_map)
+
+    linhas, entidades = _com_banco(usar)
+    assert linhas == [{"id": 1, "nome": "Médico 01"}, {"id": 2, "nome": "Médico 02"}]
+    assert entidades == 0
+
+
+def test_transmitir_em_lotes_de_yield_per():
+    async def usar(sessoes):
+        async with sessoes() as db:
+            lotes = [
+                [linha["id"] for linha in lote]
+                async for lote in transmitir(db, consulta_leitura(Medico, ["id"]).order_by(Medico.id), tamanho=10)
+            ]
+            return lotes, len(db.identity_map)
+
+    lotes, entidades = _com_banco(usar)
+    assert [len(lote) for lote in lotes] == [10, 10, 5]
+    assert sum(lotes, []) == list(range(1, 26))
+    assert entidades == 0
+
+
+def test_transmissao_interrompida_libera_a_conexao():
+    async def usar(sessoes):
+        async with sessoes() as db:
+            lotes = transmitir(db, consulta_leitura(Medico, ["id"]), tamanho=10)
+            await lotes.__anext__()
+            await lotes.aclose()
+            # O cursor foi fechado: a mesma sessão volta a consultar normalmente
+            return len(await ler(db, consulta_leitura(Medico, ["id"])))
+
+    assert _com_banco(usar) == 25
+
+
+# ---------------------------------------------------------------------------
+# Rotas
+# ---------------------------------------------------------------------------
+
+def _exportar(entidade, monkeypatch):
+    async def usar(sessoes):
+        monkeypatch.setattr(importacao_exportacao, "AsyncSessionLocal", sessoes)
+        resposta = await importacao_exportacao.exportar_csv(entidade, current_user=USUARIO)
+        partes = [parte async for parte in resposta.body_iterator]
+        return resposta, "".join(partes)
+    return _com_banco(usar)
+
+
+def test_exportacao_csv_transmitida(monkeypatch):
+    resposta, conteudo = _exportar("plantoes", monkeypatch)
+    assert resposta.headers["content-disposition"] == 'attachment; filename="plantoes.csv"'
+    linhas = list(csv.reader(io.StringIO(conteudo)))
+    assert linhas[0] == ["data_inicio", "data_fim", "valor", "medico_id", "hospital_id", "tipo_plantao_id",
+                         "status", "observacoes", "id", "created_at", "updated_at"]
+    assert [linha[8] for linha in linhas[1:]] == [str(i) for i in range(1, 7)]
+    assert linhas[1][:3] == ["2025-03-01 19:00:00", "2025-03-02 07:00:00", "100.0"]
+
+
+def test_exportacao_de_entidade_desconhecida(monkeypatch):
+    with pytest.raises(HTTPException) as erro:
+        _exportar("usuarios", monkeypatch)
+    assert erro.value.status_code == 404
+
+
+def _relatorio(**parametros):
+    async def usar(sessoes):
+        async with sessoes() as db:
+            return await relatorio_plantoes_por_medico(db=db, current_user=USUARIO, **parametros)
+    return _com_banco(usar)
+
+
+def test_relatorio_agregado_no_banco():
+    assert _relatorio(inicio=date(2025, 3, 2), fim=date(2025, 3, 5), hospital_id=None) == [
+        {"medico_id": 1, "medico": "Médico 01", "quantidade": 2, "valor_total": 600.0},
+        {"medico_id": 2, "medico": "Médico 02", "quantidade": 2, "valor_total": 800.0},
+    ]
+    assert _relatorio(inicio=date(2025, 3, 1), fim=date(2025, 3, 31), hospital_id=2) == [
+        {"medico_id": 1, "medico": "Médico 01", "quantidade": 1, "valor_total": 200.0},
+        {"medico_id": 2, "medico": "Médico 02", "quantidade": 1, "valor_total": 500.0},
+    ]
+
+
+def test_relatorio_com_periodo_invertido():
+    with pytest.raises(HTTPException) as erro:
+        _relatorio(inicio=date(2025, 3, 2), fim=date(2025, 3, 1), hospital_id=None)
+    assert erro.value.status_code == 400
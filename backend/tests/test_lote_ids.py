@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import Column, Integer, String, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import declarative_base
+
+from src.utils.lote_ids import MAXIMO_IDS, buscar_por_ids, interpretar_ids, validar_ids
+
+Base = declarative_base()
+
+
+class Registro(Base):
+    __tablename__ = "registros"
+
+    id = Column(Integer, primary_key=True)
+    nome = Column(String(50), nullable=False)
+
+
+def test_remove_repeticoes_mantendo_a_ordem():
+    assert validar_ids([3, 1, 3, 7, 1]) == [3, 1, 7]
+
+
+def test_limite_de_ids():
+    assert len(validar_ids(list(range(MAXIMO_IDS)))) == MAXIMO_IDS
+    # O limite vale para os ids distintos
+    assert len(validar_ids(list(range(MAXIMO_IDS)) * 2)) == MAXIMO_IDS
+    with pytest.raises(HTTPException) as erro:
+        validar_ids(list(range(MAXIMO_IDS + 1)))
+    assert erro.value.status_code == 400
+    assert str(MAXIMO_IDS) in erro.value.detail
+
+
+def test_interpretar_ids():
+    assert interpretar_ids("3, 1,,7,3") == [3, 1, 7]
+    assert interpretar_ids("") == []
+    with pytest.raises(HTTPException) as erro:
+        interpretar_ids("1,dois")
+    assert erro.value.status_code == 400
+    with pytest.raises(HTTPException):
+        interpretar_ids(",".join(str(i) for i in range(MAXIMO_IDS + 1)))
+
+
+def _buscar(ids, projetada=False):
+    async def executar():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(Registro), [{"id": i, "nome": f"r{i}"} for i in (1, 3, 5)])
+        consulta = select(Registro.id, Registro.nome) if projetada else select(Registro)
+        async with AsyncSession(engine) as sessao:
+            lote = await buscar_por_ids(sessao, consulta, Registro, ids, projetada=projetada)
+        await engine.dispose()
+        return lote
+    return asyncio.run(executar())
+
+
+def test_busca_na_ordem_pedida_com_nao_encontrados():
+    lote = _buscar([5, 2, 1, 9])
+    assert [registro.id for registro in lote["items"]] == [5, 1]
+    assert lote["nao_encontrados"] == [2, 9]
+
+
+def test_busca_projetada():
+    lote = _buscar([3, 4], projetada=True)
+    assert [tuple(linha) for linha in lote["items"]] == [(3, "r3")]
+    assert lote["nao_encontrados"] == [4]
+
+
+def test_lista_vazia():
+    assert _buscar([]) == {"items": [], "nao_encontrados": []}
@@ -0,0 +1,162 @@
+import json
+import logging
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from src.utils import metricas
+from src.utils.metricas import Histograma, MetricasHttpMiddleware, RegistroMetricas, coletor_pools
+from src.utils.metricas_pool import MetricasPool, PoolMonitorado
+
+
+def test_histograma_cumulativo():
+    histograma = Histograma("latencia", "Latência", ("rota",), buckets=(0.5, 0.1, 1))
+    for valor in (0.05, 0.1, 0.3, 2.0):
+        histograma.observar(("/a",), valor)
+    histograma.observar(('/b"\n',), 0.2)
+    assert list(histograma.linhas()) == [
+        "# HELP latencia Latência",
+        "# TYPE latencia histogram",
+        'latencia_bucket{rota="/a",le="0.1"} 2',
+        'latencia_bucket{rota="/a",le="0.5"} 3',
+        'latencia_bucket{rota="/a",le="1"} 3',
+        'latencia_bucket{rota="/a",le="+Inf"} 4',
+        'latencia_sum{rota="/a"} 2.45',
+        'latencia_count{rota="/a"} 4',
+        'latencia_bucket{rota="/b\\"\\n",le="0.1"} 0',
+        'latencia_bucket{rota="/b\\"\\n",le="0.5"} 1',
+        'latencia_bucket{rota="/b\\"\\n",le="1"} 1',
+        'latencia_bucket{rota="/b\\"\\n",le="+Inf"} 1',
+        'latencia_sum{rota="/b\\"\\n"} 0.2',
+        'latencia_count{rota="/b\\"\\n"} 1',
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------------
+
+class NaoModificado:
+    """Responde 304 antes do roteamento, como o GET condicional (src.utils.versoes)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == "/api/medicos/304":
+            await send({"type": "http.response.start", "status": 304, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await self.app(scope, receive, send)
+
+
+@pytest.fixture
+def registro():
+    registro = RegistroMetricas()
+    medicos = APIRouter()
+
+    @medicos.get("/{medico_id}")
+    async def read_medico(medico_id: int):
+        return {"id": medico_id}
+
+    @medicos.get("/falha/erro")
+    async def falha():
+        assert registro.em_andamento == 1
+        raise RuntimeError("falhou")
+
+    tardio = FastAPI()
+
+    @tardio.get("/plantoes-por-medico/{formato}")
+    async def relatorio(formato: str):
+        return {}
+
+    api = FastAPI()
+    api.include_router(medicos, prefix="/api/medicos")
+    # Routers tardios são montados como apps próprios
+    api.mount("/api/relatorios", tardio)
+    api.add_middleware(NaoModificado)
+    api.add_middleware(MetricasHttpMiddleware, registro=registro)
+    cliente = TestClient(api, raise_server_exceptions=False)
+    for caminho in ("/api/medicos/1", "/api/medicos/2", "/api/medicos/x", "/api/medicos/304",
+                    "/api/medicos/falha/erro", "/api/relatorios/plantoes-por-medico/csv", "/inexistente"):
+        cliente.get(caminho)
+    return registro
+
+
+def _contagens(registro):
+    prefixo = "medflow_http_requisicao_duracao_segundos_count"
+    contagens = {}
+    for linha in registro.latencia.linhas():
+        if linha.startswith(prefixo):
+            rotulos, valor = linha[len(prefixo):].rsplit(" ", 1)
+            contagens[rotulos[1:-1]] = int(valor)
+    return contagens
+
+
+def test_latencia_pelo_modelo_da_rota(registro):
+    assert _contagens(registro) == {
+        'metodo="GET",rota="/api/medicos/{medico_id}",status="200"': 2,
+        'metodo="GET",rota="/api/medicos/{medico_id}",status="422"': 1,
+        # O 304 sai antes do roteamento e ainda assim é atribuído à rota
+        'metodo="GET",rota="/api/medicos/{medico_id}",status="304"': 1,
+        'metodo="GET",rota="/api/medicos/falha/erro",status="500"': 1,
+        'metodo="GET",rota="/api/relatorios/plantoes-por-medico/{formato}",status="200"': 1,
+        'metodo="GET",rota="desconhecida",status="404"': 1,
+    }
+    assert registro.em_andamento == 0
+
+
+def test_texto_com_coletores(registro, caplog):
+    metricas_pool = MetricasPool()
+    engine = create_engine("sqlite:///:memory:", poolclass=PoolMonitorado, pool_size=3)
+    metricas_pool.registrar_espera(1.5)
+    metricas_pool.registrar_espera(2.5)
+
+    def coletor_com_falha():
+        raise RuntimeError("indisponível")
+
+    registro.registrar_coletor(coletor_com_falha)
+    registro.registrar_coletor(coletor_pools({"principal": (metricas_pool, lambda: engine.pool)}))
+    with caplog.at_level(logging.WARNING, logger="medflow-api.requisicoes"):
+        texto = registro.texto()
+    engine.dispose()
+
+    linhas = texto.splitlines()
+    assert "medflow_http_requisicoes_em_andamento 0" in linhas
+    assert "# TYPE medflow_db_pool_checkouts_total counter" in linhas
+    assert 'medflow_db_pool_checkouts_total{pool="principal"} 2' in linhas
+    assert 'medflow_db_pool_espera_segundos_total{pool="principal"} 0.004' in linhas
+    assert 'medflow_db_pool_tamanho{pool="principal"} 3' in linhas
+    # Um coletor com falha não derruba os demais
+    assert "coletor_com_falha" in caplog.text
+
+
+# ---------------------------------------------------------------------------
+# Log amostrado
+# ---------------------------------------------------------------------------
+
+def test_log_amostrado_mantem_erros_e_lentas(monkeypatch, caplog):
+    monkeypatch.setattr(metricas, "LOG_REQUISICOES_AMOSTRA", 0.0)
+    monkeypatch.setattr(metricas, "LOG_REQUISICOES_LENTAS_MS", 500.0)
+    with caplog.at_level(logging.INFO, logger="medflow-api.requisicoes"):
+        metricas.registrar_requisicao("GET", "/api/medicos/{medico_id}", "/api/medicos/1", 200, 0.01, "10.0.0.1")
+        metricas.registrar_requisicao("GET", "/api/medicos/{medico_id}", "/api/medicos/2", 200, 0.6, "10.0.0.1")
+        metricas.registrar_requisicao("POST", "/api/plantoes/", "/api/plantoes/", 503, 0.01, None)
+    registros = [(registro.levelno, json.loads(registro.getMessage())) for registro in caplog.records]
+    assert [(nivel, corpo["caminho"], corpo["status"]) for nivel, corpo in registros] == [
+        (logging.WARNING, "/api/medicos/2", 200),
+        (logging.WARNING, "/api/plantoes/", 503),
+    ]
+    assert registros[0][1] == {
+        "evento": "requisicao", "metodo": "GET", "rota": "/api/medicos/{medico_id}", "caminho": "/api/medicos/2",
+        "status": 200, "duracao_ms": 600.0, "cliente": "10.0.0.1",
+    }
+
+
+def test_log_com_amostra_total(monkeypatch, caplog):
+    monkeypatch.setattr(metricas, "LOG_REQUISICOES_AMOSTRA", 1.0)
+    with caplog.at_level(logging.INFO, logger="medflow-api.requisicoes"):
+        metricas.registrar_requisicao("GET", "/api/medicos/", "/api/medicos/", 200, 0.001, None)
+    assert [registro.levelno for registro in caplog.records] == [logging.INFO]
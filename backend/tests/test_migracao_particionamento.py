@@ -0,0 +1,159 @@
+import ast
+import glob
+import os
+from datetime import datetime
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+
+from src.migracoes.particionamento import indice_unico_particionado
+from src.models import Base
+from src.utils.particoes import eh_particionada, particoes
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Banco PostgreSQL descartável para o caminho de particionamento (o schema public é recriado)
+TESTE_POSTGRESQL_URL = os.getenv("TESTE_POSTGRESQL_URL")
+
+TABELAS = ["users", "medicos", "empresas", "hospitais", "tipos_plantao", "plantoes"]
+
+
+def _configuracao(conexao):
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "alembic"))
+    config.attributes["connection"] = conexao
+    return config
+
+
+def _banco_na_0004(engine):
+    """Esquema dos modelos como estava antes da 0005 (plantoes sem competencia), com dois plantões."""
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables[t] for t in TABELAS])
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE plantoes DROP COLUMN competencia"))
+        conn.execute(text("INSERT INTO medicos (id, nome, crm, cpf) VALUES (1, 'M', '1', '1')"))
+        conn.execute(text("INSERT INTO hospitais (id, nome) VALUES (1, 'H')"))
+        conn.execute(text("INSERT INTO tipos_plantao (id, nome) VALUES (1, 'T')"))
+        conn.execute(text(
+            "INSERT INTO plantoes (data_inicio, data_fim, valor, medico_id, hospital_id, tipo_plantao_id) "
+            "VALUES (:inicio, :inicio, 100, 1, 1, 1)"
+        ), [{"inicio": datetime(2025, 1, 10, 7)}, {"inicio": datetime(2025, 3, 5, 19)}])
+        command.stamp(_configuracao(conn), "0004")
+
+
+def _competencias(conn):
+    return conn.execute(text("SELECT id, competencia FROM plantoes ORDER BY id")).all()
+
+
+@pytest.mark.parametrize("definicao, esperada", [
+    ("CREATE UNIQUE INDEX ux ON public.plantoes USING btree (medico_id, data_inicio)",
+     "CREATE UNIQUE INDEX ux ON public.plantoes USING btree (medico_id, data_inicio, competencia)"),
+    ("CREATE UNIQUE INDEX ux ON public.plantoes USING btree (competencia, medico_id)",
+     "CREATE UNIQUE INDEX ux ON public.plantoes USING btree (competencia, medico_id)"),
+])
+def test_indice_unico_ganha_competencia(definicao, esperada):
+    assert indice_unico_particionado("plantoes", definicao) == esperada
+
+
+@pytest.mark.parametrize("definicao", [
+    "CREATE UNIQUE INDEX ux ON public.plantoes USING btree (lower((observacoes)::text))",
+    "CREATE UNIQUE INDEX ux ON public.plantoes USING btree (medico_id) WHERE (status = 'agendado'::text)",
+    "CREATE UNIQUE INDEX ux ON public.plantoes USING btree (medico_id) INCLUDE (valor)",
+])
+def test_indice_unico_nao_adaptavel(definicao):
+    with pytest.raises(RuntimeError, match="não pode ser adaptado"):
+        indice_unico_particionado("plantoes", definicao)
+
+
+def test_migracoes_nao_importam_o_estado_da_aplicacao():
+    # Só src.migracoes (congelado); src.models e src.utils mudam depois das migrações
+    for caminho in glob.glob(os.path.join(BASE_DIR, "alembic", "versions", "*.py")):
+        with open(caminho, encoding="utf-8") as arquivo:
+            arvore = ast.parse(arquivo.read())
+        for no in ast.walk(arvore):
+            modulos = [no.module or ""] if isinstance(no, ast.ImportFrom) else (
+                [nome.name for nome in no.names] if isinstance(no, ast.Import) else [])
+            for modulo in modulos:
+                assert not modulo.startswith("src") or modulo.startswith("src.migracoes"), (caminho, modulo)
+
+
+def test_competencia_dos_plantoes_no_sqlite(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migracao.db'}")
+    _banco_na_0004(engine)
+    with engine.begin() as conn:
+        command.upgrade(_configuracao(conn), "0005")
+        assert _competencias(conn) == [(1, "2025-01"), (2, "2025-03")]
+        command.downgrade(_configuracao(conn), "0004")
+        assert "competencia" not in {c["name"] for c in inspect(conn).get_columns("plantoes")}
+    engine.dispose()
+
+
+@pytest.fixture
+def postgresql():
+    if not TESTE_POSTGRESQL_URL:
+        pytest.skip("TESTE_POSTGRESQL_URL não definida")
+    engine = create_engine(TESTE_POSTGRESQL_URL)
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    _banco_na_0004(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_particionamento_no_postgresql(postgresql):
+    with postgresql.begin() as conn:
+        conn.execute(text("CREATE UNIQUE INDEX ux_plantoes_medico_inicio ON plantoes (medico_id, data_inicio)"))
+        command.upgrade(_configuracao(conn), "0005")
+
+        assert eh_particionada(conn, "plantoes")
+        nomes = {particao for _, particao, _ in particoes(conn, "plantoes")}
+        assert {"plantoes_p2025_01", "plantoes_p2025_03", "plantoes_padrao"} <= nomes
+        assert _competencias(conn) == [(1, "2025-01"), (2, "2025-03")]
+        indices = {i["name"]: i["column_names"] for i in inspect(conn).get_indexes("plantoes")}
+        assert indices["ux_plantoes_medico_inicio"] == ["medico_id", "data_inicio", "competencia"]
+        assert "ix_plantoes_data_inicio_id" in indices
+        # A sequência do id continua valendo depois da recriação
+        novo = conn.execute(text(
+            "INSERT INTO plantoes (data_inicio, data_fim, valor, medico_id, hospital_id, tipo_plantao_id, competencia) "
+            "VALUES (now(), now(), 1, 1, 1, 1, to_char(now(), 'YYYY-MM')) RETURNING id"
+        )).scalar()
+        assert novo == 3
+
+        command.downgrade(_configuracao(conn), "0004")
+        assert not eh_particionada(conn, "plantoes")
+        assert "competencia" not in {c["name"] for c in inspect(conn).get_columns("plantoes")}
+        assert conn.execute(text("SELECT count(*) FROM plantoes")).scalar() == 3
+
+
+def test_chave_estrangeira_recebida_impede_o_particionamento(postgresql):
+    with postgresql.connect() as conn:
+        conn.execute(text("CREATE TABLE escalas (id serial PRIMARY KEY, plantao_id integer REFERENCES plantoes (id))"))
+        conn.commit()
+        with pytest.raises(RuntimeError, match="escalas"):
+            with conn.begin():
+                command.upgrade(_configuracao(conn), "0005")
+        assert not eh_particionada(conn, "plantoes")
+        assert inspect(conn).get_foreign_keys("escalas")
+
+
+def test_historico_particionado_no_postgresql(postgresql):
+    with postgresql.begin() as conn:
+        command.upgrade(_configuracao(conn), "0007")
+        conn.execute(text("CREATE INDEX ix_historico_ip ON historico_operacoes (ip_origem)"))
+        conn.execute(text(
+            "INSERT INTO historico_operacoes (tipo_operacao, entidade, data_hora) VALUES ('create', 'medicos', now())"
+        ))
+        command.upgrade(_configuracao(conn), "0008")
+
+        assert eh_particionada(conn, "historico_operacoes")
+        # 0005 não particiona o histórico: ele só existe a partir da 0007
+        assert not inspect(conn).has_table("historico_operacoes_anterior")
+        indices = {i["name"] for i in inspect(conn).get_indexes("historico_operacoes")}
+        assert {"ix_historico_ip", "ix_historico_operacoes_entidade"} <= indices
+        assert inspect(conn).get_foreign_keys("historico_operacoes")
+
+        command.downgrade(_configuracao(conn), "0007")
+        assert not eh_particionada(conn, "historico_operacoes")
+        assert "ix_historico_ip" in {i["name"] for i in inspect(conn).get_indexes("historico_operacoes")}
+        assert conn.execute(text("SELECT count(*) FROM historico_operacoes")).scalar() == 1
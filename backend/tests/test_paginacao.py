@@ -0,0 +1,102 @@
+import base64
+import json
+from datetime import date, datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import Column, Date, DateTime, Integer, MetaData, String, Table, create_engine, insert, select
+
+from src.utils.paginacao import aplicar_cursor, codificar_cursor, decodificar_cursor, montar_pagina
+
+metadata = MetaData()
+itens = Table(
+    "itens", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("nome", String(50), nullable=False),
+    Column("criado_em", DateTime, nullable=False),
+    Column("vencimento", Date),
+)
+CHAVE = (itens.c.nome, itens.c.id)
+
+
+@pytest.fixture(scope="module")
+def conexao():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        # Vários nomes repetidos: a ordem entre eles é decidida pelo id
+        conn.execute(insert(itens), [
+            {"id": i, "nome": f"nome-{i % 3}", "criado_em": datetime(2025, 1, 1, 8, i % 60)}
+            for i in range(1, 23)
+        ])
+    with engine.connect() as conn:
+        yield conn
+    engine.dispose()
+
+
+def _percorrer(conexao, limit, descendente=False):
+    ids, cursor, paginas = [], None, 0
+    while True:
+        consulta = aplicar_cursor(select(itens), CHAVE, cursor, limit, descendente=descendente)
+        pagina = montar_pagina(conexao.execute(consulta).all(), CHAVE, limit)
+        assert len(pagina["items"]) <= limit
+        ids.extend(linha.id for linha in pagina["items"])
+        paginas += 1
+        cursor = pagina["next_cursor"]
+        if cursor is None:
+            return ids, paginas
+
+
+def test_cursor_ida_e_volta_preserva_os_tipos():
+    colunas = (itens.c.criado_em, itens.c.vencimento, itens.c.nome, itens.c.id)
+    valores = [datetime(2025, 3, 1, 7, 30), date(2025, 3, 31), "Ana", 42]
+    assert decodificar_cursor(codificar_cursor(valores), colunas) == valores
+
+
+def test_cursor_aceita_nulos():
+    assert decodificar_cursor(codificar_cursor([None, 1]), (itens.c.vencimento, itens.c.id)) == [None, 1]
+
+
+@pytest.mark.parametrize("cursor", [
+    "!!!",
+    base64.urlsafe_b64encode(b"nao e json").decode(),
+    base64.urlsafe_b64encode(json.dumps({"nome": "x"}).encode()).decode(),
+    # Número de valores diferente do número de colunas da chave
+    codificar_cursor(["nome-1"]),
+    # Valor que não converte para o tipo da coluna
+    codificar_cursor(["nome-1", "abc"]),
+])
+def test_cursor_invalido_retorna_400(cursor):
+    with pytest.raises(HTTPException) as erro:
+        decodificar_cursor(cursor, CHAVE)
+    assert erro.value.status_code == 400
+
+
+def test_cursor_adulterado_retorna_400():
+    cursor = codificar_cursor(["nome-1", 4])
+    adulterado = cursor[:-2] + ("A" if cursor[-2] != "A" else "B") + "%"
+    with pytest.raises(HTTPException) as erro:
+        decodificar_cursor(adulterado, CHAVE)
+    assert erro.value.status_code == 400
+
+
+def test_empate_na_chave_de_ordenacao_e_desfeito_pelo_id(conexao):
+    esperado = [linha.id for linha in conexao.execute(select(itens).order_by(*CHAVE))]
+    for limit in (1, 2, 5, 7, 22, 50):
+        ids, paginas = _percorrer(conexao, limit)
+        # Cada linha aparece uma única vez, na ordem (nome, id), mesmo com nomes repetidos
+        assert ids == esperado
+        assert paginas == max(1, -(-len(esperado) // limit))
+
+
+def test_ordem_descendente(conexao):
+    esperado = [linha.id for linha in conexao.execute(select(itens).order_by(itens.c.nome.desc(), itens.c.id.desc()))]
+    ids, _ = _percorrer(conexao, 4, descendente=True)
+    assert ids == esperado
+
+
+def test_ultima_pagina_sem_proximo_cursor(conexao):
+    consulta = aplicar_cursor(select(itens), CHAVE, None, 100)
+    pagina = montar_pagina(conexao.execute(consulta).all(), CHAVE, 100)
+    assert pagina["next_cursor"] is None
+    assert len(pagina["items"]) == 22
@@ -0,0 +1,126 @@
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from src.utils import paginacao
+from src.utils.paginacao import CacheContagem, estimar_contagem, paginar_sem_contagem
+
+Base = declarative_base()
+
+
+class Registro(Base):
+    __tablename__ = "registros"
+
+    id = Column(Integer, primary_key=True)
+    nome = Column(String(50), nullable=False)
+
+
+@pytest.fixture(scope="module")
+def sessao():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as sessao:
+        sessao.add_all(Registro(id=i, nome=f"nome-{i % 4}") for i in range(1, 26))
+        sessao.commit()
+        yield sessao
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def cache_limpo():
+    paginacao.cache_contagens.limpar()
+    yield
+    paginacao.cache_contagens.limpar()
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+
+def test_cache_expira_apos_ttl(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(paginacao.time, "monotonic", relogio)
+    cache = CacheContagem(ttl=10, maximo=5)
+    cache.guardar("a", 42)
+    relogio.agora += 9
+    assert cache.obter("a") == 42
+    relogio.agora += 2
+    assert cache.obter("a") is None
+    assert len(cache) == 0
+    assert (cache.acertos, cache.faltas) == (1, 1)
+
+
+def test_cache_descarta_a_chave_mais_antiga():
+    cache = CacheContagem(ttl=60, maximo=2)
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    # Regravar "a" a torna a mais recente
+    cache.guardar("a", 3)
+    cache.guardar("c", 4)
+    assert len(cache) == 2
+    assert cache.obter("b") is None
+    assert cache.obter("a") == 3
+    assert cache.obter("c") == 4
+
+
+def test_sem_total_nao_conta(sessao):
+    consulta = sessao.query(Registro).order_by(Registro.id)
+    itens, pagina = paginar_sem_contagem(consulta, 1, 10)
+    assert [r.id for r in itens] == list(range(1, 11))
+    assert pagina == {
+        "page": 1, "per_page": 10, "has_next": True, "has_prev": False,
+        "total": None, "pages": None, "total_estimado": False,
+    }
+    assert len(paginacao.cache_contagens) == 0
+
+
+@pytest.mark.parametrize("valor", ["", "0", "false", "nao", "não", " NAO "])
+def test_valores_falsos_de_total(sessao, valor):
+    consulta = sessao.query(Registro).order_by(Registro.id)
+    _, pagina = paginar_sem_contagem(consulta, 1, 10, total=valor)
+    assert pagina["total"] is None
+
+
+def test_ultima_pagina(sessao):
+    consulta = sessao.query(Registro).order_by(Registro.id)
+    itens, pagina = paginar_sem_contagem(consulta, 3, 10)
+    assert [r.id for r in itens] == list(range(21, 26))
+    assert pagina["has_next"] is False
+    assert pagina["has_prev"] is True
+
+
+def test_parametros_invalidos_usam_padrao(sessao):
+    consulta = sessao.query(Registro).order_by(Registro.id)
+    _, pagina = paginar_sem_contagem(consulta, 0, 0)
+    assert (pagina["page"], pagina["per_page"]) == (1, 20)
+
+
+def test_total_exato_fica_em_cache(sessao):
+    consulta = sessao.query(Registro).filter(Registro.nome == "nome-1").order_by(Registro.id)
+    _, pagina = paginar_sem_contagem(consulta, 1, 4, total="1")
+    assert (pagina["total"], pagina["pages"]) == (7, 2)
+    assert pagina["total_estimado"] is False
+    paginar_sem_contagem(consulta, 2, 4, total="1")
+    assert paginacao.cache_contagens.acertos == 1
+
+
+def test_total_em_cache_defasado_e_corrigido(sessao):
+    consulta = sessao.query(Registro).order_by(Registro.id)
+    chave = paginacao._chave_consulta(consulta)
+    paginacao.cache_contagens.guardar(chave, 3)
+    _, pagina = paginar_sem_contagem(consulta, 2, 10, total="1")
+    # A segunda página tem 10 linhas e ainda há próxima: pelo menos 21
+    assert pagina["total"] == 21
+    assert pagina["pages"] == 3
+
+
+def test_estimado_fora_do_postgresql_usa_contagem(sessao):
+    consulta = sessao.query(Registro).order_by(Registro.id)
+    assert estimar_contagem(consulta) is None
+    _, pagina = paginar_sem_contagem(consulta, 1, 10, total="estimado")
+    assert pagina["total"] == 25
+    assert pagina["total_estimado"] is False
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import os
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.models import Base, HistoricoOperacao, Medico, Plantao
+from src.routes.auditoria import read_historico
+from src.routes.relatorios import relatorio_plantoes_por_medico
+from src.utils.particoes import (
+    arquivos_competencia, exportar_competencias, ler_arquivados, ler_competencias, metadata_arquivos, reter,
+)
+
+TABELAS = ["users", "medicos", "hospitais", "tipos_plantao", "plantoes", "historico_operacoes"]
+ADMIN = SimpleNamespace(is_admin=True)
+
+
+def _criar(conn):
+    Base.metadata.create_all(conn, tables=[Base.metadata.tables[t] for t in TABELAS])
+    metadata_arquivos.create_all(conn)
+    conn.execute(insert(Medico.__table__), [
+        {"id": 1, "nome": "Bruno", "crm": "1", "cpf": "1"},
+        {"id": 2, "nome": "Ana", "crm": "2", "cpf": "2"},
+    ])
+    conn.execute(insert(Base.metadata.tables["hospitais"]), [{"id": 1, "nome": "H1"}, {"id": 2, "nome": "H2"}])
+    conn.execute(insert(Base.metadata.tables["tipos_plantao"]), [{"id": 1, "nome": "T"}])
+
+
+def _plantao(id_, medico_id, inicio, valor, hospital_id=1):
+    return {
+        "id": id_, "medico_id": medico_id, "hospital_id": hospital_id, "tipo_plantao_id": 1,
+        "data_inicio": inicio, "data_fim": inicio, "valor": valor, "competencia": inicio.strftime("%Y-%m"),
+    }
+
+
+def _historico(id_, data_hora, entidade="plantoes"):
+    return {
+        "id": id_, "tipo_operacao": "update", "entidade": entidade, "entidade_id": id_,
+        "dados_novos": {"n": id_}, "data_hora": data_hora, "competencia": data_hora.strftime("%Y-%m"),
+    }
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        _criar(conn)
+    yield engine
+    engine.dispose()
+
+
+# ---------------------------------------------------------------------------
+# Exportação e leitura
+# ---------------------------------------------------------------------------
+
+def test_exportacao_para_o_catalogo(engine):
+    with engine.begin() as conn:
+        conn.execute(insert(Plantao.__table__), [
+            _plantao(1, 1, datetime(2024, 1, 5, 7), 100),
+            _plantao(2, 2, datetime(2024, 6, 5, 7), 200, hospital_id=2),
+            _plantao(3, 1, datetime(2025, 2, 5, 7), 300),
+        ])
+        destino, linhas = exportar_competencias(conn, "plantoes", "2024-01", "2024-12", None, "plantoes_2024")
+    assert (destino, linhas) == ("arquivos_competencia (plantoes_2024)", 2)
+    with engine.connect() as conn:
+        caminho, conteudo = conn.execute(select(arquivos_competencia.c.caminho, arquivos_competencia.c.conteudo)).one()
+        assert caminho is None and conteudo
+        assert conn.execute(select(func.count()).select_from(Plantao.__table__)).scalar() == 1
+
+        arquivados = list(ler_arquivados(conn, "plantoes", "2024-01", "2024-12", hospital_id=2))
+        assert [(p["id"], p["data_inicio"], p["valor"]) for p in arquivados] == [(2, datetime(2024, 6, 5, 7), 200)]
+        # Faixa que não alcança o ano exportado: só o banco
+        assert [p["id"] for p in ler_competencias(conn, "plantoes", "2025-01", "2025-12")] == [3]
+        assert [p["id"] for p in ler_competencias(conn, "plantoes", "2024-06", "2025-12")] == [2, 3]
+
+        # O mesmo período não é exportado duas vezes
+        with pytest.raises(ValueError):
+            exportar_competencias(conn, "plantoes", "2024-06", "2024-06", None, "plantoes_2024_06")
+
+
+def test_exportacao_para_o_diretorio(engine, tmp_path):
+    with engine.begin() as conn:
+        conn.execute(insert(HistoricoOperacao.__table__), [
+            _historico(1, datetime(2024, 1, 5)), _historico(2, datetime(2024, 2, 5)), _historico(3, datetime(2025, 3, 1)),
+        ])
+        exportados = reter(conn, "historico_operacoes", 2, str(tmp_path), hoje=date(2025, 3, 10))
+    assert [os.path.basename(destino) for destino, _ in exportados] == [
+        "historico_operacoes_2024_01.jsonl.gz", "historico_operacoes_2024_02.jsonl.gz",
+    ]
+    with engine.connect() as conn:
+        assert conn.execute(select(arquivos_competencia.c.conteudo)).scalars().all() == [None, None]
+        # Arquivos mais novos primeiro
+        lidos = list(ler_arquivados(conn, "historico_operacoes", "2024-01", "2024-12"))
+    assert [(r["id"], r["dados_novos"]) for r in lidos] == [(2, {"n": 2}), (1, {"n": 1})]
+
+
+# ---------------------------------------------------------------------------
+# Relatório e auditoria
+# ---------------------------------------------------------------------------
+
+def _na_api(preparar, consultar):
+    async def executar():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(_criar)
+            await conn.run_sync(preparar)
+        async with AsyncSession(engine) as sessao:
+            resultado = await consultar(sessao)
+        await engine.dispose()
+        return resultado
+    return asyncio.run(executar())
+
+
+def test_relatorio_inclui_plantoes_arquivados():
+    def preparar(conn):
+        conn.execute(insert(Plantao.__table__), [
+            _plantao(1, 1, datetime(2024, 12, 30, 7), 100),
+            _plantao(2, 2, datetime(2024, 12, 31, 7), 50),
+            _plantao(3, 2, datetime(2024, 11, 30, 7), 999),  # fora do período
+            _plantao(4, 1, datetime(2025, 1, 2, 7), 300),
+        ])
+        exportar_competencias(conn, "plantoes", "2024-01", "2024-12", None, "plantoes_2024")
+
+    resumo = _na_api(preparar, lambda db: relatorio_plantoes_por_medico(
+        inicio=date(2024, 12, 1), fim=date(2025, 1, 31), hospital_id=None, db=db, current_user=ADMIN,
+    ))
+    assert resumo == [
+        {"medico_id": 2, "medico": "Ana", "quantidade": 1, "valor_total": 50.0},
+        {"medico_id": 1, "medico": "Bruno", "quantidade": 2, "valor_total": 400.0},
+    ]
+
+
+def test_auditoria_continua_nos_meses_exportados():
+    def preparar(conn):
+        conn.execute(insert(HistoricoOperacao.__table__), [
+            _historico(1, datetime(2024, 1, 5)), _historico(2, datetime(2024, 1, 6)),
+            _historico(3, datetime(2024, 2, 5), entidade="medicos"), _historico(4, datetime(2024, 2, 6)),
+            _historico(5, datetime(2025, 3, 1)), _historico(6, datetime(2025, 3, 2)),
+        ])
+        reter(conn, "historico_operacoes", 1, None, hoje=date(2025, 3, 10))
+
+    async def percorrer(db):
+        ids, cursor = [], None
+        while True:
+            resposta = await read_historico(
+                entidade="plantoes", entidade_id=None, usuario_id=None, tipo_operacao=None, inicio=None,
+                fim=None, cursor=cursor, limit=2, fields=None, db=db, current_user=ADMIN,
+            )
+            pagina = json.loads(resposta.body)
+            ids.extend(item["id"] for item in pagina["items"])
+            cursor = pagina["next_cursor"]
+            if cursor is None:
+                return ids
+
+    assert _na_api(preparar, percorrer) == [6, 5, 4, 2, 1]
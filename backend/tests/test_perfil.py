@@ -0,0 +1,104 @@
+import contextvars
+
+import pytest
+from sqlalchemy import Column, ForeignKey, Integer, String, create_engine, insert, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, declarative_base, relationship, selectinload
+
+from src.utils import perfil
+from src.utils.perfil import ContabilidadeSQL
+
+Base = declarative_base()
+
+
+class Autor(Base):
+    __tablename__ = "autores"
+
+    id = Column(Integer, primary_key=True)
+    nome = Column(String(50), nullable=False)
+
+
+class Livro(Base):
+    __tablename__ = "livros"
+
+    id = Column(Integer, primary_key=True)
+    autor_id = Column(Integer, ForeignKey("autores.id"), nullable=False)
+    autor = relationship(Autor)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Autor), [{"id": i, "nome": f"a{i}"} for i in range(1, 16)])
+        conn.execute(insert(Livro), [{"id": i, "autor_id": i} for i in range(1, 16)])
+    yield engine
+    engine.dispose()
+
+
+def _contabilizar(funcao):
+    """Executa `funcao` como se fosse uma requisição, devolvendo a contabilidade."""
+    def executar():
+        contabilidade = ContabilidadeSQL()
+        perfil._contabilidade_atual.set(contabilidade)
+        funcao()
+        return contabilidade
+    return contextvars.copy_context().run(executar)
+
+
+def test_repetidas_acima_do_limite():
+    contabilidade = ContabilidadeSQL()
+    for _ in range(12):
+        contabilidade.registrar("SELECT b", 0.001)
+    for _ in range(3):
+        contabilidade.registrar("SELECT a", 0.002)
+    for _ in range(11):
+        contabilidade.registrar("SELECT c", 0.001)
+    assert contabilidade.consultas == 26
+    assert contabilidade.tempo_s == pytest.approx(0.029)
+    assert contabilidade.repetidas(10) == [("SELECT b", 12), ("SELECT c", 11)]
+    assert contabilidade.repetidas(11) == [("SELECT b", 12)]
+    assert contabilidade.repetidas(12) == []
+
+
+def test_detecta_lazy_load_por_item(engine):
+    def listar():
+        with Session(engine) as sessao:
+            for livro in sessao.scalars(select(Livro)):
+                livro.autor.nome
+
+    contabilidade = _contabilizar(listar)
+    assert contabilidade.consultas == 16
+    (instrucao, vezes), = contabilidade.repetidas(10)
+    assert vezes == 15
+    assert "FROM autores" in instrucao
+
+
+def test_carga_antecipada_nao_e_n_mais_1(engine):
+    def listar():
+        with Session(engine) as sessao:
+            for livro in sessao.scalars(select(Livro).options(selectinload(Livro.autor))):
+                livro.autor.nome
+
+    contabilidade = _contabilizar(listar)
+    assert contabilidade.consultas == 2
+    assert contabilidade.repetidas(10) == []
+
+
+def test_fora_de_requisicao_nada_e_contado(engine):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert perfil.contabilidade_atual() is None
+
+
+def test_consulta_com_erro_nao_desalinha_os_tempos(engine):
+    def executar():
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM inexistente"))
+            conn.execute(text("SELECT 1"))
+            assert not conn.info.get("consulta_inicio")
+
+    contabilidade = _contabilizar(executar)
+    assert contabilidade.consultas == 1
@@ -0,0 +1,82 @@
+import contextvars
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event, insert, select
+from sqlalchemy.orm import Session
+
+from src.models import Base, Empresa, Hospital, Medico, Plantao, TipoPlantao
+from src.models import perfis_carga
+from src.models.perfis_carga import CargaNaoPrevistaError, com_perfil, opcoes_perfil, usando_perfil
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    # Inserções pelo Core: não passam pelos eventos de sessão (auditoria, busca)
+    with engine.begin() as conn:
+        conn.execute(insert(Empresa.__table__), [{"id": 1, "nome": "E", "razao_social": "E Ltda", "cnpj": "1"}])
+        conn.execute(insert(Hospital.__table__), [{"id": 1, "nome": "H", "empresa_id": 1}])
+        conn.execute(insert(Medico.__table__), [{"id": 1, "nome": "M", "crm": "1", "cpf": "1"}])
+        conn.execute(insert(TipoPlantao.__table__), [{"id": 1, "nome": "T"}])
+        conn.execute(insert(Plantao.__table__), [{
+            "id": 1, "data_inicio": datetime(2025, 1, 1, 7), "data_fim": datetime(2025, 1, 1, 19),
+            "valor": 1000.0, "medico_id": 1, "hospital_id": 1, "tipo_plantao_id": 1,
+        }])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def modo_estrito():
+    perfis_carga.ativar_modo_estrito()
+    yield
+    event.remove(Session, "do_orm_execute", perfis_carga._verificar_lazy_load)
+
+
+def _em_contexto_novo(funcao):
+    # com_perfil declara o perfil no contexto atual; isola cada teste
+    return contextvars.copy_context().run(funcao)
+
+
+def test_com_perfil_carrega_relacionamentos(engine):
+    def executar():
+        with Session(engine) as sessao:
+            plantao = sessao.scalars(com_perfil(select(Plantao), "plantao.detalhado")).unique().one()
+            assert perfis_carga._perfil_ativo.get() == "plantao.detalhado"
+        # Sessão fechada: qualquer lazy load falharia com DetachedInstanceError
+        return plantao.medico.nome, plantao.hospital.empresa.nome, plantao.tipo_plantao.nome
+
+    assert _em_contexto_novo(executar) == ("M", "E", "T")
+    assert perfis_carga._perfil_ativo.get() is None
+
+
+def test_perfil_desconhecido():
+    with pytest.raises(ValueError, match="desconhecido"):
+        opcoes_perfil("plantao.inexistente")
+
+
+def test_usando_perfil_restaura_o_contexto():
+    with usando_perfil("empresa.detalhado") as opcoes:
+        assert len(opcoes) == 1
+        assert perfis_carga._perfil_ativo.get() == "empresa.detalhado"
+    assert perfis_carga._perfil_ativo.get() is None
+
+
+def test_modo_estrito_levanta_em_lazy_load(engine, modo_estrito):
+    def executar():
+        with Session(engine) as sessao:
+            # O perfil não inclui Hospital.plantoes
+            hospital = sessao.scalars(com_perfil(select(Hospital), "hospital.detalhado")).one()
+            assert hospital.empresa.nome == "E"
+            with pytest.raises(CargaNaoPrevistaError, match="plantoes.*hospital.detalhado"):
+                hospital.plantoes
+
+    _em_contexto_novo(executar)
+
+
+def test_modo_estrito_sem_perfil_permite_lazy_load(engine, modo_estrito):
+    with Session(engine) as sessao:
+        hospital = sessao.get(Hospital, 1)
+        assert [p.id for p in hospital.plantoes] == [1]
@@ -0,0 +1,145 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.models import Base, Hospital, Medico, Plantao, TipoPlantao
+from src.routes import plantoes as rotas
+from src.routes.plantoes import PlantaoBulkRequest, PlantaoCreate, create_plantoes_bulk, validar_plantoes
+
+
+def _plantao(dia=1, **campos):
+    dados = {
+        "data_inicio": datetime(2025, 1, dia, 7), "data_fim": datetime(2025, 1, dia, 19), "valor": 1000.0,
+        "medico_id": 1, "hospital_id": 1, "tipo_plantao_id": 1,
+    }
+    dados.update(campos)
+    return PlantaoCreate(**dados)
+
+
+@pytest.fixture
+def banco(monkeypatch):
+    auditados = []
+    monkeypatch.setattr(rotas, "auditar_lote", lambda *args: auditados.append(args))
+
+    async def preparar():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(Medico.__table__), [
+                {"id": 1, "nome": "Ativo", "crm": "1", "cpf": "1", "is_active": True},
+                {"id": 2, "nome": "Inativo", "crm": "2", "cpf": "2", "is_active": False},
+            ])
+            await conn.execute(insert(Hospital.__table__), [{"id": 1, "nome": "H"}])
+            await conn.execute(insert(TipoPlantao.__table__), [{"id": 1, "nome": "T"}])
+            # Falha na gravação de uma linha que passou pela validação
+            await conn.execute(text(
+                "CREATE TRIGGER falha_gravacao BEFORE INSERT ON plantoes WHEN NEW.observacoes = 'falhar' "
+                "BEGIN SELECT RAISE(ABORT, 'falha simulada'); END"
+            ))
+        return engine
+
+    engine = asyncio.run(preparar())
+    yield engine, auditados
+    asyncio.run(engine.dispose())
+
+
+def _executar(engine, funcao, *args):
+    async def executar():
+        async with AsyncSession(engine) as sessao:
+            return await funcao(sessao, *args)
+    return asyncio.run(executar())
+
+
+async def _gravar(sessao, requisicao):
+    return await create_plantoes_bulk(requisicao, db=sessao, current_user=None)
+
+
+async def _gravados(sessao):
+    result = await sessao.execute(select(Plantao.id, Plantao.observacoes, Plantao.competencia).order_by(Plantao.id))
+    return result.all()
+
+
+def test_validacao_em_conjunto(banco):
+    engine, _ = banco
+    consultas = []
+
+    def contar(conn, cursor, instrucao, *args):
+        consultas.append(instrucao)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", contar)
+    erros = _executar(engine, validar_plantoes, [
+        _plantao(),
+        _plantao(medico_id=2),
+        _plantao(medico_id=9, hospital_id=8),
+        _plantao(data_fim=datetime(2025, 1, 1, 6), status="pendente"),
+    ] + [_plantao(dia=d) for d in range(2, 30)])
+    event.remove(engine.sync_engine, "before_cursor_execute", contar)
+
+    # Uma consulta IN por tabela referenciada, independente da quantidade de plantões
+    assert len(consultas) == 3
+    assert erros == {
+        1: ["Médico 2 está inativo"],
+        2: ["Médico 9 não encontrado", "Hospital 8 não encontrado"],
+        3: ["data_fim deve ser posterior a data_inicio", "Status inválido: pendente"],
+    }
+
+
+def test_gravacao_em_lotes_preserva_a_ordem(banco, monkeypatch):
+    engine, auditados = banco
+    monkeypatch.setattr(rotas, "TAMANHO_LOTE_BULK", 2)
+    requisicao = PlantaoBulkRequest(plantoes=[_plantao(dia=d, observacoes=f"p{d}") for d in range(1, 6)])
+    resposta = _executar(engine, _gravar, requisicao)
+    assert resposta.criados == 5
+    assert resposta.erros == []
+    gravados = _executar(engine, _gravados)
+    # Cada id devolvido corresponde ao plantão enviado na mesma posição
+    assert [observacao for _, observacao, _ in gravados] == [f"p{d}" for d in range(1, 6)]
+    assert resposta.ids == [id_ for id_, _, _ in gravados]
+    assert {competencia for _, _, competencia in gravados} == {"2025-01"}
+    assert auditados == [("plantoes", "create_lote", resposta.ids)]
+
+
+def test_sucesso_parcial_sem_atomico(banco, monkeypatch):
+    engine, auditados = banco
+    monkeypatch.setattr(rotas, "TAMANHO_LOTE_BULK", 2)
+    requisicao = PlantaoBulkRequest(plantoes=[
+        _plantao(observacoes="a"),
+        _plantao(medico_id=9),  # rejeitado na validação
+        _plantao(observacoes="b"),
+        # Os lotes são dos plantões válidos ([0, 2] e [3, 4]): este derruba o seu, com "c"
+        _plantao(observacoes="falhar"),
+        _plantao(observacoes="c"),
+    ])
+    resposta = _executar(engine, _gravar, requisicao)
+    assert resposta.criados == 2
+    assert [id_ is not None for id_ in resposta.ids] == [True, False, True, False, False]
+    assert [(erro.indice, erro.erros) for erro in resposta.erros] == [
+        (1, ["Médico 9 não encontrado"]),
+        (3, ["Erro ao gravar: IntegrityError"]),
+        (4, ["Erro ao gravar: IntegrityError"]),
+    ]
+    assert [observacao for _, observacao, _ in _executar(engine, _gravados)] == ["a", "b"]
+    assert auditados == [("plantoes", "create_lote", [id_ for id_ in resposta.ids if id_ is not None])]
+
+
+def test_atomico_rejeita_tudo_com_erro_de_validacao(banco):
+    engine, _ = banco
+    requisicao = PlantaoBulkRequest(plantoes=[_plantao(), _plantao(medico_id=9)], atomico=True)
+    with pytest.raises(HTTPException) as erro:
+        _executar(engine, _gravar, requisicao)
+    assert erro.value.status_code == 422
+    assert erro.value.detail == [{"indice": 1, "erros": ["Médico 9 não encontrado"]}]
+    assert _executar(engine, _gravados) == []
+
+
+def test_atomico_desfaz_lotes_ja_gravados(banco, monkeypatch):
+    engine, _ = banco
+    monkeypatch.setattr(rotas, "TAMANHO_LOTE_BULK", 1)
+    requisicao = PlantaoBulkRequest(plantoes=[_plantao(), _plantao(observacoes="falhar")], atomico=True)
+    with pytest.raises(Exception):
+        _executar(engine, _gravar, requisicao)
+    assert _executar(engine, _gravados) == []
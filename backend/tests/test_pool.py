@@ -0,0 +1,131 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from src.models import get_async_engine_options, get_async_url, get_engine_options
+from src.utils.metricas_pool import MetricasPool, PoolAssincronoMonitorado, PoolMonitorado
+
+POSTGRES = "postgresql://medflow@localhost/medflow"
+
+
+@pytest.fixture(autouse=True)
+def ambiente_limpo(monkeypatch):
+    for nome in ("DB_POOL_SIZE", "DB_MAX_OVERFLOW", "DB_MAX_CONNECTIONS", "WEB_CONCURRENCY", "DB_POOL_TIMEOUT",
+                 "DB_POOL_RECYCLE", "DB_POOL_PRE_PING", "DB_STATEMENT_TIMEOUT_MS", "DB_PGBOUNCER"):
+        monkeypatch.delenv(nome, raising=False)
+
+
+# ---------------------------------------------------------------------------
+# Configuração do pool
+# ---------------------------------------------------------------------------
+
+def test_padroes():
+    opcoes = get_engine_options(POSTGRES)
+    assert opcoes == {
+        "poolclass": PoolMonitorado, "pool_size": 5, "max_overflow": 10, "pool_timeout": 30.0,
+        "pool_recycle": 300, "pool_pre_ping": True,
+        "connect_args": {"options": "-c statement_timeout=30000"},
+    }
+
+
+def test_sqlite_em_memoria_sem_pool():
+    assert get_engine_options("sqlite://") == {}
+    assert get_engine_options("sqlite:///:memory:") == {}
+
+
+def test_variaveis_de_ambiente(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "8")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "2")
+    monkeypatch.setenv("DB_POOL_TIMEOUT", "1.5")
+    monkeypatch.setenv("DB_POOL_RECYCLE", "60")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+    monkeypatch.setenv("DB_STATEMENT_TIMEOUT_MS", "0")
+    opcoes = get_engine_options(POSTGRES)
+    assert (opcoes["pool_size"], opcoes["max_overflow"], opcoes["pool_timeout"]) == (8, 2, 1.5)
+    assert (opcoes["pool_recycle"], opcoes["pool_pre_ping"]) == (60, False)
+    assert "connect_args" not in opcoes
+
+
+@pytest.mark.parametrize("maximo, workers, overflow, esperado", [
+    # O limite do banco é dividido entre os workers: pool + overflow cabem em cada parte
+    ("40", "4", "4", (6, 4)),
+    ("40", "2", "10", (10, 10)),
+    ("6", "4", "10", (1, 0)),
+])
+def test_limite_de_conexoes_dividido_entre_workers(monkeypatch, maximo, workers, overflow, esperado):
+    monkeypatch.setenv("DB_MAX_CONNECTIONS", maximo)
+    monkeypatch.setenv("WEB_CONCURRENCY", workers)
+    monkeypatch.setenv("DB_MAX_OVERFLOW", overflow)
+    opcoes = get_engine_options(POSTGRES)
+    assert (opcoes["pool_size"], opcoes["max_overflow"]) == esperado
+
+
+def test_pgbouncer_sem_parametros_de_sessao(monkeypatch):
+    monkeypatch.setenv("DB_PGBOUNCER", "1")
+    assert "connect_args" not in get_engine_options(POSTGRES)
+    assincrono = get_async_engine_options(get_async_url(POSTGRES))
+    assert assincrono["connect_args"] == {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+
+
+def test_engine_assincrono():
+    url = get_async_url(POSTGRES)
+    assert url == "postgresql+asyncpg://medflow@localhost/medflow"
+    opcoes = get_async_engine_options(url)
+    assert opcoes["poolclass"] is PoolAssincronoMonitorado
+    assert opcoes["connect_args"] == {"server_settings": {"statement_timeout": "30000"}}
+    assert get_async_url("sqlite:///./medflow.db") == "sqlite+aiosqlite:///./medflow.db"
+
+
+# ---------------------------------------------------------------------------
+# Métricas
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def pool_de_teste(tmp_path):
+    """Engine com pool de uma conexão e métricas próprias, para não misturar com as da aplicação."""
+    metricas = MetricasPool()
+    pool = type("PoolDeTeste", (PoolMonitorado,), {"metricas": metricas})
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=pool, pool_size=1, max_overflow=0,
+                           pool_timeout=0.05)
+    metricas.monitorar(engine)
+    yield engine, metricas
+    engine.dispose()
+
+
+def test_checkouts_e_utilizacao(pool_de_teste):
+    engine, metricas = pool_de_teste
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    with engine.connect():
+        resumo = metricas.resumo(engine.pool)
+    assert (resumo["checkouts"], resumo["conexoes_criadas"], resumo["timeouts"]) == (4, 1, 0)
+    assert (resumo["pool"], resumo["tamanho"], resumo["em_uso"], resumo["utilizacao"]) == ("PoolDeTeste", 1, 1, 1.0)
+    assert resumo["espera_maxima_ms"] >= resumo["espera_p95_ms"] >= 0
+    assert metricas.resumo(engine.pool)["em_uso"] == 0
+
+
+def test_timeout_contabilizado(pool_de_teste):
+    engine, metricas = pool_de_teste
+    with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    resumo = metricas.resumo(engine.pool)
+    assert (resumo["checkouts"], resumo["timeouts"]) == (2, 1)
+    # A espera até o timeout entra nas estatísticas
+    assert resumo["espera_maxima_ms"] >= 50
+
+
+def test_invalidacao_contabilizada(pool_de_teste):
+    engine, metricas = pool_de_teste
+    with engine.connect() as conn:
+        conn.invalidate()
+    assert metricas.resumo(engine.pool)["invalidacoes"] == 1
+
+
+def test_resumo_de_pool_sem_fila():
+    resumo = MetricasPool().resumo(create_engine("sqlite://").pool)
+    assert resumo == {
+        "checkouts": 0, "espera_media_ms": 0.0, "espera_p95_ms": 0.0, "espera_maxima_ms": 0.0, "timeouts": 0,
+        "conexoes_criadas": 0, "invalidacoes": 0, "pool": "SingletonThreadPool",
+    }
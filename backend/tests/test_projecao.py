@@ -0,0 +1,98 @@
+import json
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import Column, Date, Integer, Numeric, String, create_engine, insert
+from sqlalchemy.orm import declarative_base
+
+from src.utils.paginacao import aplicar_cursor, montar_pagina
+from src.utils.projecao import Projecao
+
+Base = declarative_base()
+
+
+class Registro(Base):
+    __tablename__ = "registros"
+
+    id = Column(Integer, primary_key=True)
+    nome = Column(String(50), nullable=False)
+    nascimento = Column(Date)
+    saldo = Column(Numeric(10, 2))
+    segredo = Column(String(50))
+
+
+class RegistroResponse(BaseModel):
+    id: int
+    nome: str
+    nascimento: Optional[date] = None
+    saldo: Optional[float] = None
+    # Calculado fora da tabela: não pode ser projetado
+    rotulo: Optional[str] = None
+
+
+CHAVE = (Registro.nome, Registro.id)
+
+
+@pytest.fixture(scope="module")
+def conexao():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Registro), [
+            {"id": 1, "nome": "b", "nascimento": date(1990, 5, 1), "saldo": Decimal("10.50"), "segredo": "x"},
+            {"id": 2, "nome": "a", "nascimento": None, "saldo": None, "segredo": "y"},
+        ])
+    with engine.connect() as conn:
+        yield conn
+    engine.dispose()
+
+
+def _corpo(resposta):
+    return json.loads(resposta.body)
+
+
+def test_campo_desconhecido_retorna_400():
+    with pytest.raises(HTTPException) as erro:
+        Projecao(Registro, RegistroResponse, "id,segredo,inexistente")
+    assert erro.value.status_code == 400
+    assert erro.value.detail == (
+        "Campos inválidos em fields: segredo, inexistente. Permitidos: id, nome, nascimento, saldo"
+    )
+
+
+def test_campo_fora_da_tabela_retorna_400():
+    with pytest.raises(HTTPException) as erro:
+        Projecao(Registro, RegistroResponse, "rotulo")
+    assert erro.value.status_code == 400
+
+
+def test_sem_fields_usa_as_colunas_do_modelo_de_resposta(conexao):
+    projecao = Projecao(Registro, RegistroResponse)
+    linhas = conexao.execute(projecao.consulta().order_by(Registro.id)).all()
+    assert _corpo(projecao.responder(linhas)) == [
+        {"id": 1, "nome": "b", "nascimento": "1990-05-01", "saldo": 10.5},
+        {"id": 2, "nome": "a", "nascimento": None, "saldo": None},
+    ]
+
+
+def test_fields_seleciona_so_as_colunas_pedidas(conexao):
+    projecao = Projecao(Registro, RegistroResponse, " nome , nome,")
+    consulta = projecao.consulta()
+    # O id entra na consulta (ids e cursor) mas não na resposta
+    assert [coluna.name for coluna in consulta.selected_columns] == ["nome", "id"]
+    linhas = conexao.execute(consulta.order_by(Registro.id)).all()
+    assert _corpo(projecao.responder(linhas)) == [{"nome": "b"}, {"nome": "a"}]
+
+
+def test_pagina_por_cursor_e_lote(conexao):
+    projecao = Projecao(Registro, RegistroResponse, "saldo", extras=CHAVE)
+    linhas = conexao.execute(aplicar_cursor(projecao.consulta(), CHAVE, "", 1)).all()
+    pagina = _corpo(projecao.responder(montar_pagina(linhas, CHAVE, 1)))
+    assert pagina["items"] == [{"saldo": None}]
+    assert pagina["next_cursor"]
+    lote = _corpo(projecao.responder({"items": linhas[:1], "nao_encontrados": [9]}))
+    assert lote == {"items": [{"saldo": None}], "nao_encontrados": [9]}
@@ -0,0 +1,196 @@
+import asyncio
+
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine, select
+from sqlalchemy.orm import declarative_base
+
+from src.utils import replica
+from src.utils.replica import (
+    REPLICA_COOKIE, EstadoReplica, FixacaoPrimario, RoteamentoReplicaMiddleware, SessaoRoteada, usando_replica,
+)
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "itens"
+
+    id = Column(Integer, primary_key=True)
+    nome = Column(String(50))
+
+
+@pytest.fixture
+def engines(tmp_path, monkeypatch):
+    """Primário e réplica em arquivos separados; cada um sabe de onde veio a leitura."""
+    primario = create_engine(f"sqlite:///{tmp_path / 'primario.db'}")
+    copia = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, nome in ((primario, "primario"), (copia, "replica")):
+        Base.metadata.create_all(engine)
+        with SessaoRoteada(engine) as sessao:
+            sessao.add(Item(id=1, nome=nome))
+            sessao.commit()
+    monkeypatch.setattr(replica, "_replicas", {primario: EstadoReplica(copia, 30)})
+    yield primario, copia
+    primario.dispose()
+    copia.dispose()
+
+
+# ---------------------------------------------------------------------------
+# Sessão
+# ---------------------------------------------------------------------------
+
+def _nome(sessao):
+    return sessao.execute(select(Item.nome).where(Item.id == 1)).scalar()
+
+
+def test_leitura_na_replica_e_escrita_no_primario(engines):
+    primario, _ = engines
+    with usando_replica(), SessaoRoteada(primario) as sessao:
+        assert _nome(sessao) == "replica"
+        sessao.add(Item(id=2, nome="novo"))
+        sessao.flush()
+        # Depois do flush a sessão enxerga as próprias alterações
+        assert _nome(sessao) == "primario"
+        sessao.commit()
+        assert _nome(sessao) == "replica"
+    # Fora de um contexto de leitura tudo vai para o primário
+    with SessaoRoteada(primario) as sessao:
+        assert _nome(sessao) == "primario"
+
+
+def test_replica_indisponivel_volta_ao_primario(engines):
+    primario, _ = engines
+    replica.replica_de(primario).marcar_indisponivel("teste")
+    with usando_replica() as contexto, SessaoRoteada(primario) as sessao:
+        assert _nome(sessao) == "primario"
+        assert not contexto.usou_replica
+
+
+# ---------------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------------
+
+class Aplicacao:
+    """App ASGI que registra o roteamento de cada chamada e responde `status`."""
+
+    def __init__(self, status=200, falhas=0):
+        self.status = status
+        self.falhas = falhas
+        self.leituras = []
+
+    async def __call__(self, scope, receive, send):
+        contexto = replica._contexto.get()
+        self.leituras.append(contexto.leitura if contexto else None)
+        if self.falhas:
+            self.falhas -= 1
+            contexto.usou_replica = True
+            next(iter(replica._replicas.values())).marcar_indisponivel("conexão recusada")
+            raise ConnectionError("réplica caiu")
+        await send({"type": "http.response.start", "status": self.status, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+
+def _requisicao(middleware, metodo, caminho="/api/medicos", cabecalhos=(), scheme="http"):
+    scope = {"type": "http", "method": metodo, "path": caminho, "scheme": scheme, "headers": list(cabecalhos)}
+    enviadas = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(mensagem):
+        enviadas.append(mensagem)
+
+    asyncio.run(middleware(scope, receive, send))
+    inicio = enviadas[0]
+    return inicio["status"], [valor.decode() for nome, valor in inicio["headers"] if nome == b"set-cookie"]
+
+
+TOKEN_ANA = (b"authorization", b"Bearer token-ana")
+TOKEN_BIA = (b"authorization", b"Bearer token-bia")
+
+
+def test_classificacao_das_requisicoes(engines):
+    app = Aplicacao()
+    middleware = RoteamentoReplicaMiddleware(app, fixacao_s=10)
+    _requisicao(middleware, "GET")
+    _requisicao(middleware, "HEAD")
+    _requisicao(middleware, "POST", "/api/plantoes/batch-get")
+    _requisicao(middleware, "POST", "/api/plantoes")
+    _requisicao(middleware, "DELETE", "/api/plantoes/1")
+    # Escritas não abrem contexto de leitura: as sessões usam o primário
+    assert app.leituras == [True, True, True, None, None]
+
+
+def test_escrita_fixa_o_cliente_pelo_token(engines):
+    app = Aplicacao()
+    middleware = RoteamentoReplicaMiddleware(app, fixacao_s=10)
+    _requisicao(middleware, "PUT", "/api/medicos/1", [TOKEN_ANA])
+    _requisicao(middleware, "GET", cabecalhos=[TOKEN_ANA])
+    _requisicao(middleware, "GET", cabecalhos=[TOKEN_BIA])
+    _requisicao(middleware, "GET")
+    assert app.leituras[1:] == [False, True, True]
+
+
+def test_escrita_com_erro_nao_fixa(engines):
+    app = Aplicacao(status=422)
+    middleware = RoteamentoReplicaMiddleware(app, fixacao_s=10)
+    status, cookies = _requisicao(middleware, "POST", cabecalhos=[TOKEN_ANA])
+    assert (status, cookies) == (422, [])
+    app.status = 200
+    _requisicao(middleware, "GET", cabecalhos=[TOKEN_ANA])
+    assert app.leituras[-1] is True
+
+
+@pytest.mark.parametrize("scheme, cabecalhos, politica", [
+    ("https", [], "SameSite=None; Secure"),
+    ("http", [(b"x-forwarded-proto", b"https")], "SameSite=None; Secure"),
+    ("http", [], "SameSite=Lax"),
+])
+def test_cookie_entre_sites_em_https(engines, scheme, cabecalhos, politica):
+    middleware = RoteamentoReplicaMiddleware(Aplicacao(), fixacao_s=10)
+    _, cookies = _requisicao(middleware, "POST", cabecalhos=cabecalhos, scheme=scheme)
+    assert cookies == [f"{REPLICA_COOKIE}=1; Max-Age=10; Path=/; HttpOnly; {politica}"]
+
+
+def test_cookie_fixa_clientes_sem_token(engines):
+    app = Aplicacao()
+    middleware = RoteamentoReplicaMiddleware(app, fixacao_s=10)
+    _requisicao(middleware, "GET", cabecalhos=[(b"cookie", f"outro=1; {REPLICA_COOKIE}=1".encode())])
+    assert app.leituras == [False]
+
+
+def test_falha_da_replica_repete_no_primario(engines):
+    app = Aplicacao(falhas=1)
+    status, _ = _requisicao(RoteamentoReplicaMiddleware(app, fixacao_s=10), "GET")
+    assert status == 200
+    assert app.leituras == [True, False]
+
+
+def test_falha_depois_de_responder_nao_repete(engines):
+    class RespondeEFalha(Aplicacao):
+        async def __call__(self, scope, receive, send):
+            self.leituras.append(replica._contexto.get().leitura)
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            raise ConnectionError("réplica caiu")
+
+    app = RespondeEFalha()
+    with pytest.raises(ConnectionError):
+        _requisicao(RoteamentoReplicaMiddleware(app, fixacao_s=10), "GET")
+    assert app.leituras == [True]
+
+
+def test_fixacao_vence_e_e_limitada(monkeypatch):
+    agora = [100.0]
+    monkeypatch.setattr(replica.time, "monotonic", lambda: agora[0])
+    fixacao = FixacaoPrimario(10, maximo=2)
+    fixacao.fixar("a")
+    agora[0] = 105.0
+    fixacao.fixar("b")
+    assert fixacao.fixado("a") and fixacao.fixado("b")
+    agora[0] = 111.0
+    assert not fixacao.fixado("a")
+    # Vencidos saem na próxima escrita; acima do máximo, sai o mais antigo
+    fixacao.fixar("c")
+    assert len(fixacao) == 2
+    fixacao.fixar("d")
+    assert (len(fixacao), fixacao.fixado("b"), fixacao.fixado("c")) == (2, False, True)
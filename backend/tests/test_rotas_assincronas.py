@@ -0,0 +1,139 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.models import Base, User, get_async_db, get_password_hash
+from src.routes import auth, calculos, empresas, hospitais
+from src.utils import auditoria
+from src.utils.replica import SessaoRoteada
+from src.utils.versoes import metadata_versoes
+
+SENHA = "segredo123"
+
+
+class EscritorFalso:
+    def __init__(self):
+        self.registros = []
+
+    def enfileirar(self, registros):
+        self.registros.extend(registros)
+
+
+@pytest.fixture(scope="module")
+def auditados():
+    """Registros de auditoria das rotas, em memória em vez do banco da aplicação."""
+    escritor = EscritorFalso()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(auditoria, "escritor_auditoria", escritor)
+        yield escritor.registros
+
+
+@pytest.fixture(scope="module")
+def cliente(tmp_path_factory, auditados):
+    """As rotas assíncronas contra um SQLite próprio, com a mesma fábrica de sessões da aplicação."""
+    caminho = tmp_path_factory.mktemp("rotas") / "medflow.db"
+    engine = create_engine(f"sqlite:///{caminho}")
+    Base.metadata.create_all(engine)
+    metadata_versoes.create_all(engine)
+    with SessaoRoteada(engine) as sessao:
+        sessao.add_all([
+            User(nome="Admin", email="admin@medflow.com", senha_hash=get_password_hash(SENHA), is_admin=True),
+            User(nome="Ana", email="ana@medflow.com", senha_hash=get_password_hash(SENHA)),
+            User(nome="Inativo", email="inativo@medflow.com", senha_hash=get_password_hash(SENHA), is_active=False),
+        ])
+        sessao.commit()
+    engine.dispose()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{caminho}")
+    sessoes = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False,
+                                 sync_session_class=SessaoRoteada)
+
+    async def get_db_de_teste():
+        async with sessoes() as db:
+            yield db
+
+    api = FastAPI()
+    api.include_router(auth.router, prefix="/api/auth")
+    api.include_router(empresas.router, prefix="/api/empresas")
+    api.include_router(hospitais.router, prefix="/api/hospitais")
+    api.include_router(calculos.router, prefix="/api/calculos")
+    api.dependency_overrides[get_async_db] = get_db_de_teste
+    with TestClient(api) as cliente:
+        yield cliente
+
+
+def _cabecalhos(cliente, email="admin@medflow.com"):
+    resposta = cliente.post("/api/auth/login-json", json={"email": email, "password": SENHA})
+    assert resposta.status_code == 200
+    return {"Authorization": f"Bearer {resposta.json()['access_token']}"}
+
+
+def test_login_e_usuario_atual(cliente):
+    cabecalhos = _cabecalhos(cliente, "ana@medflow.com")
+    assert cliente.get("/api/auth/me", headers=cabecalhos).json() == {
+        "id": 2, "email": "ana@medflow.com", "nome": "Ana", "is_admin": False,
+    }
+    # Formulário OAuth2 passa pelo mesmo caminho assíncrono
+    resposta = cliente.post("/api/auth/login", data={"username": "admin@medflow.com", "password": SENHA})
+    assert (resposta.status_code, resposta.json()["is_admin"]) == (200, True)
+
+
+@pytest.mark.parametrize("email, senha", [("ana@medflow.com", "errada"), ("ninguem@medflow.com", SENHA)])
+def test_login_recusado(cliente, email, senha):
+    assert cliente.post("/api/auth/login-json", json={"email": email, "password": senha}).status_code == 401
+
+
+def test_token_invalido_e_usuario_inativo(cliente):
+    assert cliente.get("/api/auth/me", headers={"Authorization": "Bearer invalido"}).status_code == 401
+    assert cliente.get("/api/auth/me", headers=_cabecalhos(cliente, "inativo@medflow.com")).status_code == 400
+
+
+def test_ciclo_de_vida_de_empresa_e_hospitais(cliente, auditados):
+    cabecalhos = _cabecalhos(cliente)
+    auditados.clear()
+    empresa = cliente.post("/api/empresas/", headers=cabecalhos, json={
+        "nome": "Clínica Sul", "razao_social": "Clínica Sul Ltda", "cnpj": "00.000.000/0001-00",
+    }).json()
+    for nome in ("Hospital B", "Hospital A"):
+        resposta = cliente.post("/api/hospitais/", headers=cabecalhos, json={"nome": nome, "empresa_id": empresa["id"]})
+        assert resposta.status_code == 200
+
+    # Relações carregadas pelos perfis de carga: nada de lazy load fora do event loop
+    detalhada = cliente.get(f"/api/empresas/{empresa['id']}/detalhado", headers=cabecalhos).json()
+    assert sorted(h["nome"] for h in detalhada["hospitais"]) == ["Hospital A", "Hospital B"]
+    detalhados = cliente.get("/api/hospitais/detalhados", headers=cabecalhos).json()
+    assert [(h["nome"], h["empresa"]["nome"]) for h in detalhados] == [
+        ("Hospital A", "Clínica Sul"), ("Hospital B", "Clínica Sul"),
+    ]
+
+    primeira = cliente.get("/api/hospitais/", params={"cursor": "", "limit": 1}, headers=cabecalhos).json()
+    segunda = cliente.get("/api/hospitais/", params={"cursor": primeira["next_cursor"], "limit": 1},
+                          headers=cabecalhos).json()
+    assert [h["nome"] for h in primeira["items"] + segunda["items"]] == ["Hospital A", "Hospital B"]
+
+    hospital_id = primeira["items"][0]["id"]
+    atualizado = cliente.put(f"/api/hospitais/{hospital_id}", headers=cabecalhos, json={
+        "nome": "Hospital A", "cidade": "Curitiba", "empresa_id": empresa["id"],
+    }).json()
+    assert atualizado["cidade"] == "Curitiba"
+    assert cliente.delete(f"/api/hospitais/{hospital_id}", headers=cabecalhos).status_code == 204
+    assert cliente.get(f"/api/hospitais/{hospital_id}", headers=cabecalhos).status_code == 404
+
+    # Os commits das sessões assíncronas passam pela captura de auditoria, atribuídos ao usuário do token
+    assert [(r["entidade"], r["tipo_operacao"]) for r in auditados] == [
+        ("empresas", "create"), ("hospitais", "create"), ("hospitais", "create"),
+        ("hospitais", "update"), ("hospitais", "delete"),
+    ]
+    assert {r["usuario_id"] for r in auditados} == {1}
+
+
+def test_permissoes_e_referencias(cliente):
+    admin = _cabecalhos(cliente)
+    ana = _cabecalhos(cliente, "ana@medflow.com")
+    assert cliente.post("/api/hospitais/", headers=ana, json={"nome": "X", "empresa_id": 1}).status_code == 403
+    assert cliente.post("/api/hospitais/", headers=admin, json={"nome": "X", "empresa_id": 999}).status_code == 404
+    assert cliente.delete("/api/empresas/999", headers=admin).status_code == 404
+    assert cliente.get("/api/calculos/", headers=ana).status_code == 200
+    assert cliente.get("/api/calculos/").status_code == 401
@@ -0,0 +1,90 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from uuid import UUID
+
+import pytest
+from sqlalchemy import create_engine, select
+
+from src.models import Base, Empresa, Hospital, Medico, Plantao, TipoPlantao
+from src.routes.empresas import EmpresaResponse
+from src.routes.hospitais import HospitalResponse
+from src.routes.medicos import MedicoResponse
+from src.routes.plantoes import PlantaoResponse
+from src.routes.tipos_plantao import TipoPlantaoResponse
+from src.utils import auditoria
+from src.utils.projecao import Projecao, serializar_json
+from src.utils.replica import SessaoRoteada
+from src.utils.versoes import metadata_versoes
+
+LISTAGENS = [
+    (Empresa, EmpresaResponse), (Hospital, HospitalResponse), (Medico, MedicoResponse),
+    (TipoPlantao, TipoPlantaoResponse), (Plantao, PlantaoResponse),
+]
+
+
+class EscritorFalso:
+    def enfileirar(self, registros):
+        pass
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[modelo.__table__ for modelo, _ in LISTAGENS])
+    metadata_versoes.create_all(engine)
+    with pytest.MonkeyPatch.context() as monkeypatch, SessaoRoteada(engine) as sessao:
+        monkeypatch.setattr(auditoria, "escritor_auditoria", EscritorFalso())
+        empresa = Empresa(nome="Clínica Sul", razao_social="Clínica Sul Ltda", cnpj="00.000.000/0001-00")
+        hospital = Hospital(nome="Hospital São José", cidade="Curitiba", empresa=empresa)
+        medicos = [
+            Medico(nome="Ana", crm="123", cpf="111", data_nascimento=date(1980, 2, 29), observacoes="ação \"urgente\""),
+            Medico(nome="Bia", crm="456", cpf="222", is_active=False),
+        ]
+        tipo = TipoPlantao(nome="Noturno", descricao=None)
+        sessao.add_all([hospital, *medicos, tipo])
+        sessao.flush()
+        sessao.add_all([
+            Plantao(data_inicio=datetime(2025, 3, 1, 19, 0), data_fim=datetime(2025, 3, 2, 7, 0, 0, 500),
+                    valor=1234.5, medico_id=medicos[0].id, hospital_id=hospital.id, tipo_plantao_id=tipo.id),
+            Plantao(data_inicio=datetime(2025, 3, 2, 19, 0), data_fim=datetime(2025, 3, 3, 7, 0), valor=1000,
+                    medico_id=medicos[1].id, hospital_id=hospital.id, tipo_plantao_id=tipo.id, status="realizado",
+                    updated_at=datetime(2025, 3, 4, 8, 30)),
+        ])
+        sessao.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("modelo, resposta", LISTAGENS, ids=[modelo.__name__ for modelo, _ in LISTAGENS])
+def test_tuplas_geram_o_mesmo_json_que_o_pydantic(engine, modelo, resposta):
+    projecao = Projecao(modelo, resposta)
+    with engine.connect() as conn:
+        linhas = conn.execute(projecao.consulta().order_by(modelo.id)).all()
+    with SessaoRoteada(engine) as sessao:
+        entidades = sessao.execute(select(modelo).order_by(modelo.id)).scalars().all()
+        esperado = [resposta.model_validate(entidade).model_dump(mode="json") for entidade in entidades]
+    assert esperado
+    assert json.loads(projecao.responder(linhas).body) == esperado
+
+
+@pytest.mark.parametrize("fuso", [timezone.utc, timezone(timedelta(hours=-3))])
+def test_datas_com_fuso_como_o_pydantic(fuso):
+    # timestamptz do PostgreSQL chega com fuso; o SQLite só devolve datas ingênuas
+    valores = {
+        "id": 7, "data_inicio": datetime(2025, 3, 1, 19, 0, tzinfo=fuso),
+        "data_fim": datetime(2025, 3, 2, 7, 0, 0, 123, tzinfo=fuso), "valor": 10.0, "medico_id": 1,
+        "hospital_id": 1, "tipo_plantao_id": 1, "status": "agendado", "observacoes": None,
+        "created_at": datetime(2025, 2, 1, tzinfo=fuso), "updated_at": None,
+    }
+    projecao = Projecao(Plantao, PlantaoResponse)
+    corpo = projecao.responder([projecao.linha(valores)]).body.decode()
+    assert corpo == f"[{PlantaoResponse(**valores).model_dump_json()}]"
+
+
+def test_tipos_sem_equivalente_no_orjson():
+    assert serializar_json({"saldo": Decimal("10.50"), "id": UUID(int=1)}) == (
+        b'{"saldo":10.5,"id":"00000000-0000-0000-0000-000000000001"}'
+    )
+    with pytest.raises(TypeError):
+        serializar_json({"conjunto": {1, 2}})
@@ -0,0 +1,121 @@
+import uuid
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateTable
+
+from src.utils import uuid7 as modulo
+from src.utils.uuid7 import UUIDCompacto, uuid7
+
+
+class Relogio:
+    def __init__(self, ms):
+        self.ms = ms
+
+    def __call__(self):
+        return self.ms * 1_000_000
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio(1_750_000_000_000)
+    monkeypatch.setattr(modulo.time, "time_ns", relogio)
+    monkeypatch.setattr(modulo, "_ultimo_ms", 0)
+    monkeypatch.setattr(modulo, "_sequencia", 0)
+    return relogio
+
+
+def _timestamp(valor: uuid.UUID) -> int:
+    return valor.int >> 80
+
+
+def _sequencia(valor: uuid.UUID) -> int:
+    return (valor.int >> 64) & 0xFFF
+
+
+def test_versao_e_variante(relogio):
+    valor = uuid7()
+    assert valor.version == 7
+    assert valor.variant == uuid.RFC_4122
+    assert _timestamp(valor) == relogio.ms
+
+
+def test_mesmo_milissegundo_incrementa_a_sequencia(relogio):
+    valores = [uuid7() for _ in range(100)]
+    assert valores == sorted(valores)
+    assert {_timestamp(v) for v in valores} == {relogio.ms}
+    sequencias = [_sequencia(v) for v in valores]
+    assert sequencias == list(range(sequencias[0], sequencias[0] + 100))
+
+
+def test_estouro_da_sequencia_avanca_o_milissegundo(relogio, monkeypatch):
+    anterior = uuid7()
+    monkeypatch.setattr(modulo, "_sequencia", 0xFFF)
+    seguinte = uuid7()
+    assert _timestamp(seguinte) == relogio.ms + 1
+    assert seguinte > anterior
+    # O relógio ainda não chegou ao milissegundo emprestado: continua nele
+    assert _timestamp(uuid7()) == relogio.ms + 1
+
+
+def test_relogio_voltando_mantem_a_ordem(relogio):
+    valores = [uuid7()]
+    relogio.ms -= 5000
+    valores += [uuid7() for _ in range(3)]
+    assert valores == sorted(valores)
+    assert {_timestamp(v) for v in valores} == {relogio.ms + 5000}
+    relogio.ms += 10_000
+    assert uuid7() > valores[-1]
+
+
+def test_muitos_valores_unicos_e_ordenados():
+    valores = [uuid7() for _ in range(20_000)]
+    assert len(set(valores)) == len(valores)
+    assert valores == sorted(valores)
+
+
+metadata = MetaData()
+registros = Table(
+    "registros", metadata,
+    Column("n", Integer, primary_key=True),
+    Column("chave", UUIDCompacto()),
+)
+
+
+def test_ida_e_volta_no_sqlite():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    valor = uuid7()
+    with engine.begin() as conn:
+        conn.execute(insert(registros), [
+            {"n": 1, "chave": valor},
+            {"n": 2, "chave": str(valor).upper()},
+            {"n": 3, "chave": None},
+        ])
+        armazenado = conn.exec_driver_sql("SELECT chave FROM registros WHERE n = 1").scalar()
+        lidos = conn.execute(select(registros.c.chave).order_by(registros.c.n)).scalars().all()
+    engine.dispose()
+    assert armazenado == valor.bytes
+    assert lidos == [valor, valor, None]
+
+
+def test_ida_e_volta_no_postgresql():
+    dialeto = postgresql.dialect()
+    tipo = UUIDCompacto()
+    valor = uuid7()
+    assert tipo.process_bind_param(valor, dialeto) is valor
+    assert tipo.process_bind_param(str(valor), dialeto) == valor
+    assert tipo.process_result_value(valor, dialeto) is valor
+    assert tipo.process_result_value(str(valor), dialeto) == valor
+    assert isinstance(tipo.load_dialect_impl(dialeto), postgresql.UUID)
+
+
+def test_ddl_por_dialeto():
+    assert "chave UUID" in str(CreateTable(registros).compile(dialect=postgresql.dialect()))
+    assert "chave BLOB" in str(CreateTable(registros).compile(dialect=sqlite.dialect()))
+
+
+def test_valor_invalido():
+    with pytest.raises(ValueError):
+        UUIDCompacto().process_bind_param("nao-e-uuid", sqlite.dialect())
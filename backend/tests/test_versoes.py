@@ -0,0 +1,160 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import Column, Integer, String, create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from src.utils.versoes import (
+    CacheCondicionalMiddleware, calcular_etag, etag_confere, incrementar_versoes, metadata_versoes, versoes_tabelas,
+)
+
+Base = declarative_base()
+
+
+class Tipo(Base):
+    # Mesmo nome de uma tabela versionada
+    __tablename__ = "tipos_plantao"
+
+    id = Column(Integer, primary_key=True)
+    nome = Column(String(50), nullable=False)
+
+
+class Nota(Base):
+    __tablename__ = "notas"
+
+    id = Column(Integer, primary_key=True)
+    texto = Column(String(50))
+
+
+def _escopo(caminho="/api/tipos-plantao/", query=b"", autorizacao=b"Bearer a"):
+    return {"path": caminho, "query_string": query, "headers": [(b"authorization", autorizacao)]}
+
+
+@pytest.mark.parametrize("if_none_match, confere", [
+    ('W/"1.2-abc"', True),
+    ('"1.2-abc"', True),
+    ('"0-x", W/"1.2-abc"', True),
+    ("*", True),
+    ('W/"1.3-abc"', False),
+    ("", False),
+])
+def test_comparacao_fraca_do_etag(if_none_match, confere):
+    assert etag_confere(if_none_match, 'W/"1.2-abc"') is confere
+
+
+def test_etag_muda_com_versao_caminho_query_e_credencial():
+    base = calcular_etag({"hospitais": 1, "empresas": 2}, _escopo())
+    assert base.startswith('W/"2.1-')
+    assert calcular_etag({"empresas": 2, "hospitais": 1}, _escopo()) == base
+    assert calcular_etag({"hospitais": 2, "empresas": 2}, _escopo()) != base
+    assert calcular_etag({"hospitais": 1, "empresas": 2}, _escopo("/api/hospitais/")) != base
+    assert calcular_etag({"hospitais": 1, "empresas": 2}, _escopo(query=b"limit=5")) != base
+    assert calcular_etag({"hospitais": 1, "empresas": 2}, _escopo(autorizacao=b"Bearer b")) != base
+
+
+def _versoes(conn):
+    return dict(conn.execute(select(versoes_tabelas.c.tabela, versoes_tabelas.c.versao)).all())
+
+
+def test_flush_incrementa_a_versao_das_tabelas_versionadas():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    metadata_versoes.create_all(engine)
+    with Session(engine) as sessao:
+        sessao.add(Tipo(id=1, nome="Diurno"))
+        sessao.add(Nota(id=1, texto="fora das versionadas"))
+        sessao.commit()
+        assert _versoes(sessao.connection()) == {"tipos_plantao": 1}
+
+        # Objeto tocado sem alteração real não conta
+        tipo = sessao.get(Tipo, 1)
+        tipo.nome = "Diurno"
+        sessao.commit()
+        assert _versoes(sessao.connection()) == {"tipos_plantao": 1}
+
+        tipo.nome = "Noturno"
+        sessao.commit()
+        sessao.delete(tipo)
+        sessao.commit()
+        assert _versoes(sessao.connection()) == {"tipos_plantao": 3}
+
+        # Alteração desfeita não deixa incremento
+        sessao.add(Tipo(id=2, nome="Extra"))
+        sessao.flush()
+        sessao.rollback()
+        assert _versoes(sessao.connection()) == {"tipos_plantao": 3}
+    engine.dispose()
+
+
+@pytest.fixture
+def cliente():
+    engine = create_async_engine("sqlite+aiosqlite://")
+
+    async def criar():
+        async with engine.begin() as conn:
+            await conn.run_sync(metadata_versoes.create_all)
+    asyncio.run(criar())
+
+    chamadas = []
+    api = FastAPI()
+
+    @api.get("/api/tipos-plantao/")
+    async def listar():
+        chamadas.append(1)
+        return [{"id": 1}]
+
+    @api.get("/api/medicos/")
+    async def medicos():
+        return []
+
+    sessoes = async_sessionmaker(engine)
+    cliente = TestClient(CacheCondicionalMiddleware(api, sessoes, max_age=0))
+    cliente.chamadas = chamadas
+    cliente.engine = engine
+    yield cliente
+    asyncio.run(engine.dispose())
+
+
+def _incrementar(engine, tabela):
+    async def executar():
+        async with engine.begin() as conn:
+            await conn.run_sync(incrementar_versoes, [tabela])
+    asyncio.run(executar())
+
+
+def test_304_sem_executar_a_rota(cliente):
+    primeira = cliente.get("/api/tipos-plantao/")
+    assert primeira.status_code == 200
+    etag = primeira.headers["etag"]
+    assert primeira.headers["cache-control"] == "private, no-cache"
+
+    segunda = cliente.get("/api/tipos-plantao/", headers={"If-None-Match": etag})
+    assert segunda.status_code == 304
+    assert segunda.headers["etag"] == etag
+    assert segunda.content == b""
+    assert len(cliente.chamadas) == 1
+
+    # Outra credencial não reaproveita o ETag de quem recebeu a resposta
+    outra = cliente.get("/api/tipos-plantao/", headers={"If-None-Match": etag, "Authorization": "Bearer x"})
+    assert outra.status_code == 200
+
+
+def test_escrita_invalida_o_etag(cliente):
+    etag = cliente.get("/api/tipos-plantao/").headers["etag"]
+    _incrementar(cliente.engine, "tipos_plantao")
+    resposta = cliente.get("/api/tipos-plantao/", headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert resposta.headers["etag"] != etag
+    # Tabela que não entra na rota não muda o ETag
+    etag = resposta.headers["etag"]
+    _incrementar(cliente.engine, "hospitais")
+    assert cliente.get("/api/tipos-plantao/", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_rotas_nao_versionadas_passam_direto(cliente):
+    resposta = cliente.get("/api/medicos/")
+    assert resposta.status_code == 200
+    assert "etag" not in resposta.headers